@@ -1,15 +1,33 @@
-"""AI layer: providers, orchestrator, RAG."""
-
-from dungeonmaster.ai.orchestrator import AIOrchestrator
-from dungeonmaster.ai.rag import RAGStore
-from dungeonmaster.ai.providers.base import BaseAIProvider
-from dungeonmaster.ai.providers.ollama import OllamaProvider
-from dungeonmaster.ai.providers.claude import ClaudeProvider
-
-__all__ = [
-    "AIOrchestrator",
-    "RAGStore",
-    "BaseAIProvider",
-    "OllamaProvider",
-    "ClaudeProvider",
-]
+"""
+AI layer: providers, orchestrator, RAG.
+
+Exports are resolved lazily (PEP 562) so importing dungeonmaster.ai or one of its
+submodules does not pull in ollama, anthropic or chromadb until they are used.
+"""
+
+import importlib
+from typing import Any
+
+_EXPORTS = {
+    "AIOrchestrator": "dungeonmaster.ai.orchestrator",
+    "ProviderPool": "dungeonmaster.ai.pool",
+    "RAGStore": "dungeonmaster.ai.rag",
+    "Reranker": "dungeonmaster.ai.rerank",
+    "ModelRouter": "dungeonmaster.ai.router",
+    "RulingCache": "dungeonmaster.ai.ruling_cache",
+    "SystemIndex": "dungeonmaster.ai.system_index",
+    "BaseAIProvider": "dungeonmaster.ai.providers.base",
+    "OllamaProvider": "dungeonmaster.ai.providers.ollama",
+    "ClaudeProvider": "dungeonmaster.ai.providers.claude",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
@@ -3,13 +3,25 @@ AI orchestrator: route by task type to narrative vs ruling provider.
 
 Narrative (flavor text, descriptions) uses the narrative_provider (e.g. Ollama).
 Ruling (rules, planning, adjudication) uses the ruling_provider (e.g. Claude).
-Falls back to the other if one is missing. generate() is the single entrypoint.
+Falls back to the other if one is missing or its call fails (callers whose
+output is optional, e.g. speculative drafts, pass fallback=False so a failing
+narrative provider does not put their calls on the ruling provider). Either provider
+may be a ProviderPool (several hosts with health checks and failover).
+generate() is the single entrypoint; its optional model overrides the primary
+provider's default (e.g. a smaller model chosen by ai/router.py).
+generate_stream() and generate_structured() route the same way; a stream only
+falls back while it has not yielded any text.
 """
 
+import asyncio
+import logging
+from collections.abc import AsyncIterator
 from typing import Any
 
 from dungeonmaster.ai.providers.base import BaseAIProvider, GenerateResult
 
+logger = logging.getLogger(__name__)
+
 
 class AIOrchestrator:
     """
@@ -27,42 +39,209 @@ class AIOrchestrator:
         # Fallback: use narrative for everything if no ruling provider
         self._default = narrative_provider or ruling_provider
 
+    def _providers(self) -> list[BaseAIProvider]:
+        return [
+            p for p in dict.fromkeys((self._narrative, self._ruling)) if p is not None
+        ]
+
+    async def start(self) -> None:
+        """Start provider background work (e.g. pool health probes)."""
+        for provider in self._providers():
+            await provider.start()
+
+    async def close(self) -> None:
+        await asyncio.gather(*(p.close() for p in self._providers()))
+
+    def in_flight(self, task_type: str = "narrative") -> int:
+        """Requests currently running on the provider for task_type (0 if not tracked)."""
+        provider = self._ruling if task_type == "ruling" else self._narrative
+        return getattr(provider or self._default, "in_flight", 0)
+
+    def model_for(self, task_type: str = "narrative") -> str | None:
+        """Default model of the provider that serves task_type (None if unknown)."""
+        provider = self._ruling if task_type == "ruling" else self._narrative
+        return getattr(provider or self._default, "default_model", None)
+
+    async def _generate_with_fallback(
+        self,
+        primary: BaseAIProvider | None,
+        secondary: BaseAIProvider | None,
+        prompt: str,
+        system: str | None,
+        model: str | None = None,
+        fallback: bool = True,
+        **kwargs: Any,
+    ) -> GenerateResult:
+        """
+        Call primary (with model, else its default); if it raises and a different secondary
+        exists, retry there with the secondary's default model (unless fallback is False).
+        """
+        provider = primary or secondary
+        if not provider:
+            return GenerateResult(text="", model="none", raw=None)
+        model = model or getattr(provider, "default_model", None)
+        try:
+            return await provider.generate(
+                prompt=prompt, model=model, system=system, **kwargs
+            )
+        except Exception as e:
+            if secondary is None or secondary is provider or not fallback:
+                raise
+            logger.warning(
+                "Provider %s failed (%s); falling back to %s",
+                provider.name,
+                e,
+                secondary.name,
+            )
+        model = getattr(secondary, "default_model", None)
+        return await secondary.generate(
+            prompt=prompt, model=model, system=system, **kwargs
+        )
+
     async def generate_narrative(
         self,
         prompt: str,
         system: str | None = None,
+        model: str | None = None,
+        fallback: bool = True,
         **kwargs: Any,
     ) -> GenerateResult:
         """Use narrative model (e.g. Ollama) for flavor text, descriptions."""
-        provider = self._narrative or self._default
-        if not provider:
-            return GenerateResult(text="", model="none", raw=None)
-        model = getattr(provider, "default_model", None)
-        return await provider.generate(prompt=prompt, model=model, system=system, **kwargs)
+        return await self._generate_with_fallback(
+            self._narrative,
+            self._ruling,
+            prompt,
+            system,
+            model=model,
+            fallback=fallback,
+            **kwargs,
+        )
 
     async def generate_ruling(
         self,
         prompt: str,
         system: str | None = None,
+        model: str | None = None,
+        fallback: bool = True,
         **kwargs: Any,
     ) -> GenerateResult:
         """Use ruling model (e.g. Claude) for rules, planning, decisions."""
-        provider = self._ruling or self._default
-        if not provider:
-            return GenerateResult(text="", model="none", raw=None)
-        model = getattr(provider, "default_model", None)
-        return await provider.generate(prompt=prompt, model=model, system=system, **kwargs)
+        return await self._generate_with_fallback(
+            self._ruling,
+            self._narrative,
+            prompt,
+            system,
+            model=model,
+            fallback=fallback,
+            **kwargs,
+        )
 
     async def generate(
         self,
         prompt: str,
         system: str | None = None,
         task_type: str = "narrative",
+        model: str | None = None,
+        fallback: bool = True,
         **kwargs: Any,
     ) -> GenerateResult:
         """
-        Generate with the appropriate provider. task_type in ('narrative', 'ruling').
+        Generate with the appropriate provider. task_type in ('narrative', 'ruling');
+        model (optional) overrides that provider's default model; fallback=False raises
+        instead of retrying on the other provider.
         """
         if task_type == "ruling":
-            return await self.generate_ruling(prompt, system=system, **kwargs)
-        return await self.generate_narrative(prompt, system=system, **kwargs)
+            return await self.generate_ruling(
+                prompt, system=system, model=model, fallback=fallback, **kwargs
+            )
+        return await self.generate_narrative(
+            prompt, system=system, model=model, fallback=fallback, **kwargs
+        )
+
+    def _pair(
+        self, task_type: str
+    ) -> tuple[BaseAIProvider | None, BaseAIProvider | None]:
+        """(primary, fallback) providers for task_type."""
+        if task_type == "ruling":
+            return self._ruling, self._narrative
+        return self._narrative, self._ruling
+
+    async def generate_stream(
+        self,
+        prompt: str,
+        system: str | None = None,
+        task_type: str = "narrative",
+        model: str | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[str]:
+        """Stream the reply in text chunks; falls back to the other provider only before the first chunk."""
+        primary, secondary = self._pair(task_type)
+        provider = primary or secondary
+        if not provider:
+            return
+        started = False
+        try:
+            async for chunk in provider.generate_stream(
+                prompt=prompt,
+                model=model or getattr(provider, "default_model", None),
+                system=system,
+                **kwargs,
+            ):
+                started = True
+                yield chunk
+            return
+        except Exception as e:
+            if started or secondary is None or secondary is provider:
+                raise
+            logger.warning(
+                "Provider %s failed (%s); falling back to %s",
+                provider.name,
+                e,
+                secondary.name,
+            )
+        async for chunk in secondary.generate_stream(
+            prompt=prompt,
+            model=getattr(secondary, "default_model", None),
+            system=system,
+            **kwargs,
+        ):
+            yield chunk
+
+    async def generate_structured(
+        self,
+        prompt: str,
+        schema: dict[str, Any],
+        system: str | None = None,
+        task_type: str = "narrative",
+        model: str | None = None,
+        **kwargs: Any,
+    ) -> dict[str, Any]:
+        """JSON object matching schema, via the providers' native structured modes where they have one."""
+        primary, secondary = self._pair(task_type)
+        provider = primary or secondary
+        if not provider:
+            raise RuntimeError("no AI provider configured")
+        try:
+            return await provider.generate_structured(
+                prompt=prompt,
+                schema=schema,
+                model=model or getattr(provider, "default_model", None),
+                system=system,
+                **kwargs,
+            )
+        except Exception as e:
+            if secondary is None or secondary is provider:
+                raise
+            logger.warning(
+                "Provider %s failed (%s); falling back to %s",
+                provider.name,
+                e,
+                secondary.name,
+            )
+        return await secondary.generate_structured(
+            prompt=prompt,
+            schema=schema,
+            model=getattr(secondary, "default_model", None),
+            system=system,
+            **kwargs,
+        )
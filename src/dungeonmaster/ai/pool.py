@@ -0,0 +1,365 @@
+"""
+Provider pool: several interchangeable providers behind one BaseAIProvider.
+
+The orchestrator holds one pool per task type (narrative, ruling). A pool
+routes each call to the healthy member with the lowest expected latency
+(EWMA latency weighted by in-flight requests), fails over to the next member
+on error, and opens a per-member circuit breaker after repeated failures.
+A background task probes members with is_available() so a dead host is
+skipped before a player's request hits it.
+
+Optional hedging: once a member has enough latency samples, a call that runs
+past that member's p95 latency fires the same request at the next-best
+member; whichever finishes first wins and the other is cancelled.
+
+Streams (generate_stream) fail over only until the first chunk has been
+yielded and are never hedged: text already sent cannot be taken back.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+from typing import Any
+
+from dungeonmaster.ai.providers.base import BaseAIProvider, GenerateResult
+from dungeonmaster.metrics import Metrics, percentile
+from dungeonmaster.metrics import metrics as default_metrics
+
+logger = logging.getLogger(__name__)
+
+_EWMA_ALPHA = 0.3
+
+
+class PoolMember:
+    """Routing and circuit-breaker state for one provider in a pool."""
+
+    def __init__(self, provider: BaseAIProvider, window: int = 200):
+        self.provider = provider
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.ewma: float | None = None
+        self.in_flight = 0
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+
+    @property
+    def label(self) -> str:
+        base_url = getattr(self.provider, "base_url", None)
+        return f"{self.provider.name}@{base_url}" if base_url else self.provider.name
+
+    def is_open(self, now: float) -> bool:
+        """True while the circuit breaker rejects traffic (half-open once cooldown passes)."""
+        return self.open_until > now
+
+    def p95(self) -> float | None:
+        return percentile(self.latencies, 0.95)
+
+    def expected_latency(self) -> float:
+        # Unknown members score 0 so they get tried (and measured) early
+        return (self.ewma or 0.0) * (1 + self.in_flight)
+
+    def record_success(self, latency: float) -> None:
+        self.latencies.append(latency)
+        self.ewma = (
+            latency
+            if self.ewma is None
+            else (_EWMA_ALPHA * latency + (1 - _EWMA_ALPHA) * self.ewma)
+        )
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.healthy = True
+
+    def record_failure(self, threshold: int, cooldown: float) -> bool:
+        """Count a failure; returns True if this opened the breaker."""
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= threshold:
+            self.open_until = time.monotonic() + cooldown
+            return True
+        return False
+
+
+class ProviderPool(BaseAIProvider):
+    """
+    Latency-aware, health-checked pool of providers for one task type.
+    Exposes the BaseAIProvider interface so the orchestrator treats it like a single provider.
+    """
+
+    def __init__(
+        self,
+        providers: list[BaseAIProvider],
+        pool_name: str = "pool",
+        health_interval: float = 30.0,
+        health_timeout: float = 5.0,
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        hedge: bool = False,
+        hedge_min_samples: int = 20,
+        metrics: Metrics | None = None,
+    ):
+        if not providers:
+            raise ValueError("ProviderPool needs at least one provider")
+        self._members = [PoolMember(p) for p in providers]
+        self._pool_name = pool_name
+        self._health_interval = health_interval
+        self._health_timeout = health_timeout
+        self._failure_threshold = failure_threshold
+        self._cooldown = cooldown
+        self._hedge = hedge
+        self._hedge_min_samples = hedge_min_samples
+        self._metrics = metrics or default_metrics
+        self._probe_task: asyncio.Task | None = None
+
+    @property
+    def name(self) -> str:
+        return self._pool_name
+
+    @property
+    def default_model(self) -> str | None:
+        return getattr(self._members[0].provider, "default_model", None)
+
+    @property
+    def members(self) -> list[PoolMember]:
+        return list(self._members)
+
+    @property
+    def in_flight(self) -> int:
+        """Requests currently running across all members (a queue-depth signal)."""
+        return sum(m.in_flight for m in self._members)
+
+    def _ranked(self, members: list[PoolMember] | None = None) -> list[PoolMember]:
+        """Members in routing order: healthy and closed first, then by expected latency."""
+        members = self._members if members is None else members
+        now = time.monotonic()
+        usable = [m for m in members if m.healthy and not m.is_open(now)]
+        if not usable:
+            # Everything is down: try whichever breaker closes soonest rather than fail outright
+            return sorted(members, key=lambda m: m.open_until)
+        return sorted(usable, key=lambda m: m.expected_latency())
+
+    async def _call(
+        self,
+        member: PoolMember,
+        fn: Callable[[BaseAIProvider], Awaitable[Any]],
+    ) -> Any:
+        member.in_flight += 1
+        start = time.monotonic()
+        try:
+            result = await fn(member.provider)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            if member.record_failure(self._failure_threshold, self._cooldown):
+                logger.warning(
+                    "Circuit opened for %s in pool %s", member.label, self._pool_name
+                )
+                self._metrics.incr(f"ai.pool.{self._pool_name}.breaker_open")
+            raise
+        finally:
+            member.in_flight -= 1
+        latency = time.monotonic() - start
+        member.record_success(latency)
+        self._metrics.observe(f"ai.pool.{self._pool_name}.latency", latency)
+        return result
+
+    def _hedge_delay(self, member: PoolMember) -> float | None:
+        if not self._hedge or len(member.latencies) < self._hedge_min_samples:
+            return None
+        return member.p95()
+
+    async def _call_hedged(
+        self,
+        primary: PoolMember,
+        backup: PoolMember | None,
+        fn: Callable[[BaseAIProvider], Awaitable[Any]],
+        tried: set[int],
+    ) -> Any:
+        """Call primary; past its p95 latency, race backup against it (backup is then added to tried)."""
+        delay = self._hedge_delay(primary) if backup is not None else None
+        if delay is None:
+            return await self._call(primary, fn)
+        first = asyncio.create_task(self._call(primary, fn))
+        try:
+            done, _ = await asyncio.wait({first}, timeout=delay)
+        except asyncio.CancelledError:
+            first.cancel()
+            raise
+        if done:
+            return first.result()
+        self._metrics.incr(f"ai.pool.{self._pool_name}.hedged")
+        tried.add(id(backup))
+        pending = {first, asyncio.create_task(self._call(backup, fn))}
+        error: BaseException | None = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+        raise error  # both attempts failed
+
+    async def _run(
+        self,
+        fn: Callable[[BaseAIProvider], Awaitable[Any]],
+        members: list[PoolMember] | None = None,
+    ) -> Any:
+        """Try members in routing order (with optional hedging); raise the last error if all fail."""
+        ranked = self._ranked(members)
+        error: Exception | None = None
+        tried: set[int] = set()  # backups a hedged call already ran are not retried
+        for i, member in enumerate(ranked):
+            if id(member) in tried:
+                continue
+            backup = ranked[i + 1] if i + 1 < len(ranked) else None
+            try:
+                return await self._call_hedged(member, backup, fn, tried)
+            except Exception as e:  # noqa: BLE001 - fail over on any provider error; the last is re-raised
+                error = e
+                if any(id(m) not in tried for m in ranked[i + 1 :]):
+                    logger.warning(
+                        "Provider %s failed in pool %s (%s); failing over",
+                        member.label,
+                        self._pool_name,
+                        e,
+                    )
+                    self._metrics.incr(f"ai.pool.{self._pool_name}.failover")
+        assert error is not None
+        raise error
+
+    async def generate(
+        self,
+        prompt: str,
+        model: str | None = None,
+        system: str | None = None,
+        **kwargs: Any,
+    ) -> GenerateResult:
+        return await self._run(
+            lambda p: p.generate(prompt=prompt, model=model, system=system, **kwargs)
+        )
+
+    async def generate_stream(
+        self,
+        prompt: str,
+        model: str | None = None,
+        system: str | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[str]:
+        """Stream from the best member, failing over to the next only while nothing was yielded."""
+        ranked = self._ranked()
+        error: Exception | None = None
+        for i, member in enumerate(ranked):
+            member.in_flight += 1
+            start = time.monotonic()
+            started = False
+            try:
+                async for chunk in member.provider.generate_stream(
+                    prompt=prompt, model=model, system=system, **kwargs
+                ):
+                    started = True
+                    yield chunk
+            except Exception as e:
+                if member.record_failure(self._failure_threshold, self._cooldown):
+                    logger.warning(
+                        "Circuit opened for %s in pool %s",
+                        member.label,
+                        self._pool_name,
+                    )
+                    self._metrics.incr(f"ai.pool.{self._pool_name}.breaker_open")
+                if started:
+                    raise
+                error = e
+                if i + 1 < len(ranked):
+                    logger.warning(
+                        "Provider %s failed in pool %s (%s); failing over",
+                        member.label,
+                        self._pool_name,
+                        e,
+                    )
+                    self._metrics.incr(f"ai.pool.{self._pool_name}.failover")
+                continue
+            finally:
+                member.in_flight -= 1
+            latency = time.monotonic() - start
+            member.record_success(latency)
+            self._metrics.observe(f"ai.pool.{self._pool_name}.latency", latency)
+            return
+        assert error is not None
+        raise error
+
+    async def generate_structured(
+        self,
+        prompt: str,
+        schema: dict[str, Any],
+        model: str | None = None,
+        system: str | None = None,
+        **kwargs: Any,
+    ) -> dict[str, Any]:
+        return await self._run(
+            lambda p: p.generate_structured(
+                prompt=prompt, schema=schema, model=model, system=system, **kwargs
+            )
+        )
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        """Embed via members that support it (e.g. Ollama), with the same failover."""
+        embedders = [m for m in self._members if hasattr(m.provider, "embed")]
+        if not embedders:
+            raise AttributeError(
+                f"No provider in pool {self._pool_name} supports embed()"
+            )
+        return await self._run(lambda p: p.embed(texts), members=embedders)
+
+    async def is_available(self) -> bool:
+        return any(m.healthy for m in self._members)
+
+    async def probe(self) -> None:
+        """Check every member once with is_available() and update health flags."""
+
+        async def check(member: PoolMember) -> None:
+            try:
+                ok = await asyncio.wait_for(
+                    member.provider.is_available(),
+                    timeout=self._health_timeout,
+                )
+            except Exception:  # noqa: BLE001 - a probe that fails in any way marks the member unhealthy
+                ok = False
+            if ok != member.healthy:
+                logger.info(
+                    "Provider %s in pool %s is now %s",
+                    member.label,
+                    self._pool_name,
+                    "healthy" if ok else "unhealthy",
+                )
+            member.healthy = ok
+
+        await asyncio.gather(*(check(m) for m in self._members))
+
+    async def _probe_loop(self) -> None:
+        while True:
+            await self.probe()
+            await asyncio.sleep(self._health_interval)
+
+    async def start(self) -> None:
+        """Start background health probes (no-op if already running or interval <= 0)."""
+        if self._probe_task is None and self._health_interval > 0:
+            self._probe_task = asyncio.create_task(self._probe_loop())
+
+    async def close(self) -> None:
+        """Stop health probes and close every member's clients."""
+        await asyncio.gather(
+            *(m.provider.close() for m in self._members), return_exceptions=True
+        )
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
@@ -0,0 +1,169 @@
+"""
+CPU-bound ingest preprocessing off the event loop.
+
+Reading a vault file, chunking it and hashing the chunks is pure CPU and disk
+work. Run on the asyncio thread (as RAGStore.ingest_path once did), a large
+re-ingest, e.g. a rulebook library at startup or after a bulk edit, delays live
+replies. Preprocessor runs it in a pool of worker processes (workers > 0), so
+it neither holds the event loop nor competes for the GIL; with workers = 0 it
+uses a worker thread instead.
+
+Files are sent to the workers in batches of batch_files, one task per batch,
+and each file comes back as one PreparedFile. A PreparedFile holds the chunks
+as a single "\\0"-joined string, which is also the text the content hash is
+taken over, plus an array of chunk lengths. The result pickles as one string
+and one byte buffer, not one object per chunk.
+
+The worker functions themselves need only the standard library, but a spawned
+worker also re-imports the parent's __main__ module (as __mp_main__), i.e.
+dungeonmaster.main with the config, vault, core and AI modules it imports.
+Those import their heavy dependencies lazily, so starting a worker costs a
+fraction of a second, paid once per pool rather than per batch; anything the
+entry module runs at import time must stay under its __name__ == "__main__"
+guard.
+"""
+
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+from array import array
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_text(text: str, chunk_size: int = 512, overlap: int = 64) -> list[str]:
+    """Sliding-window chunking by character count. Overlap characters are shared between adjacent chunks."""
+    if not text or chunk_size <= 0:
+        return []
+    step = chunk_size - overlap
+    # An overlap >= chunk_size never advanced the window (ingest hung), so no stored index
+    # depends on those boundaries: advance one character and stop once a chunk reaches the end
+    stop_at_end = step <= 0
+    chunks: list[str] = []
+    for start in range(0, len(text), max(1, step)):
+        chunk = text[start : start + chunk_size].strip()
+        if chunk:
+            chunks.append(chunk)
+        if stop_at_end and start + chunk_size >= len(text):
+            break
+    return chunks
+
+
+@dataclass
+class PreparedFile:
+    """One file chunked for ingest: its chunks packed into blob (see module docstring) and their hash."""
+
+    path: str
+    blob: str = ""
+    lengths: array = field(default_factory=lambda: array("q"))
+    source_hash: str = ""
+
+    @property
+    def texts(self) -> list[str]:
+        texts: list[str] = []
+        pos = 0
+        for length in self.lengths:
+            texts.append(self.blob[pos : pos + length])
+            pos += length + 1
+        return texts
+
+
+def prepare_file(path: str, chunk_size: int, overlap: int) -> PreparedFile:
+    """Read, chunk and hash one file; an unreadable or empty file yields no chunks."""
+    try:
+        text = Path(path).read_text(encoding="utf-8")
+    except (OSError, UnicodeDecodeError):
+        return PreparedFile(path)
+    texts = chunk_text(text, chunk_size, overlap)
+    if not texts:
+        return PreparedFile(path)
+    blob = "\0".join(texts)
+    source_hash = hashlib.sha256(blob.encode("utf-8")).hexdigest()
+    return PreparedFile(path, blob, array("q", map(len, texts)), source_hash)
+
+
+def prepare_files(
+    paths: list[str], chunk_size: int, overlap: int
+) -> list[PreparedFile]:
+    """prepare_file for a batch of files (one worker task)."""
+    return [prepare_file(path, chunk_size, overlap) for path in paths]
+
+
+@dataclass
+class PreprocessSettings:
+    """How many worker processes prepare files for ingest, and how many files go in one task."""
+
+    workers: int = 2  # 0 = a worker thread in this process
+    batch_files: int = 8
+
+    @classmethod
+    def from_config(cls, cfg: dict | None) -> "PreprocessSettings":
+        cfg = cfg or {}
+        return cls(
+            workers=int(cfg.get("workers", 2)),
+            batch_files=int(cfg.get("batch_files", 8)),
+        )
+
+
+class Preprocessor:
+    """Prepare files for ingest in worker processes (see module docstring); may be shared by RAG stores."""
+
+    def __init__(self, settings: PreprocessSettings | None = None):
+        self.settings = settings or PreprocessSettings()
+        self._executor: Executor | None = None
+
+    def _pool(self) -> Executor | None:
+        if self.settings.workers <= 0:
+            return None
+        if self._executor is None:
+            # spawn: forking a process that runs threads (event loop, watcher, HTTP pools) is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.settings.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    @property
+    def window(self) -> int:
+        """Files to prepare at once to keep every worker busy with one batch (bounds memory in ingest_all)."""
+        return max(1, self.settings.batch_files) * max(1, self.settings.workers)
+
+    async def _run(
+        self, batch: list[str], chunk_size: int, overlap: int
+    ) -> list[PreparedFile]:
+        pool = self._pool()
+        if pool is not None:
+            try:
+                return await asyncio.get_running_loop().run_in_executor(
+                    pool, prepare_files, batch, chunk_size, overlap
+                )
+            except BrokenProcessPool as e:
+                logger.warning("Preprocessing worker died, retrying in a thread: %s", e)
+                # other batches may have failed on the same pool
+                if self._executor is pool:
+                    self._executor = None  # a new pool is started for the next batch
+                    pool.shutdown(wait=False, cancel_futures=True)
+        return await asyncio.to_thread(prepare_files, batch, chunk_size, overlap)
+
+    async def prepare(
+        self, paths: list[Path], chunk_size: int = 512, overlap: int = 64
+    ) -> list[PreparedFile]:
+        """Prepare files (in batches, concurrently across workers); results in the order of paths."""
+        names = [str(path) for path in paths]
+        size = max(1, self.settings.batch_files)
+        batches = [names[i : i + size] for i in range(0, len(names), size)]
+        results = await asyncio.gather(
+            *(self._run(batch, chunk_size, overlap) for batch in batches)
+        )
+        return [prepared for batch in results for prepared in batch]
+
+    def close(self) -> None:
+        """Stop the worker processes (queued batches are cancelled)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -1,7 +1,26 @@
-"""AI providers: Ollama, Claude, etc."""
+"""
+AI providers: Ollama, Claude, etc.
 
-from dungeonmaster.ai.providers.base import BaseAIProvider
-from dungeonmaster.ai.providers.ollama import OllamaProvider
-from dungeonmaster.ai.providers.claude import ClaudeProvider
+Exports are resolved lazily so the base interface can be imported without
+loading every provider SDK.
+"""
 
-__all__ = ["BaseAIProvider", "OllamaProvider", "ClaudeProvider"]
+import importlib
+from typing import Any
+
+_EXPORTS = {
+    "BaseAIProvider": "dungeonmaster.ai.providers.base",
+    "OllamaProvider": "dungeonmaster.ai.providers.ollama",
+    "ClaudeProvider": "dungeonmaster.ai.providers.claude",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
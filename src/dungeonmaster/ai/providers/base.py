@@ -2,14 +2,21 @@
 Abstract base for LLM providers (Ollama, Claude, etc.).
 
 Each provider implements generate(prompt, model?, system?, **kwargs) and
-optionally is_available(). The orchestrator calls generate with a task_type
-to select narrative vs ruling model.
+optionally is_available(), start() and close(). generate_stream() (text chunks
+as they arrive) and generate_structured() (a JSON object matching a schema)
+have generic fallbacks built on generate(); providers override them with native
+streaming and JSON/tool-use modes. The orchestrator calls generate with a
+task_type to select narrative vs ruling model.
 """
 
+import json
 from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
 from dataclasses import dataclass
 from typing import Any
 
+from dungeonmaster.ai.providers.json_output import StructuredOutputError, loads_lenient
+
 
 @dataclass
 class GenerateResult:
@@ -43,6 +50,44 @@ class BaseAIProvider(ABC):
         """
         ...
 
+    async def generate_stream(
+        self,
+        prompt: str,
+        model: str | None = None,
+        system: str | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[str]:
+        """Yield the reply as text chunks as they arrive. Default: the whole generate() reply at once."""
+        result = await self.generate(prompt, model=model, system=system, **kwargs)
+        if result.text:
+            yield result.text
+
+    async def generate_structured(
+        self,
+        prompt: str,
+        schema: dict[str, Any],
+        model: str | None = None,
+        system: str | None = None,
+        **kwargs: Any,
+    ) -> dict[str, Any]:
+        """
+        Reply as a JSON object matching schema. Default: ask for JSON in the system prompt and
+        parse the reply leniently. Raises StructuredOutputError if no object comes back.
+        """
+        instructions = f"Reply with one JSON object matching this JSON Schema and nothing else:\n{json.dumps(schema)}"
+        system = f"{system}\n\n{instructions}" if system else instructions
+        result = await self.generate(prompt, model=model, system=system, **kwargs)
+        data = loads_lenient(result.text)
+        if not isinstance(data, dict):
+            raise StructuredOutputError("expected a JSON object")
+        return data
+
     async def is_available(self) -> bool:
         """Check if the provider can be used (e.g. Ollama reachable, API key set)."""
         return True
+
+    async def start(self) -> None:
+        """Start background work (e.g. health probes). Default: nothing to start."""
+
+    async def close(self) -> None:
+        """Release clients and stop background work. Default: nothing to release."""
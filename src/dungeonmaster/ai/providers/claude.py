@@ -2,14 +2,61 @@
 Claude (Anthropic) provider for rulings and planning.
 
 Used as the ruling_provider in the orchestrator when ANTHROPIC_API_KEY is set.
-Configure ruling_model in config ai.claude.
+Configure ruling_model, HTTP pool/timeout settings (transport) and the client-side
+rate limit / retry policy (rate_limit) in config ai.claude. Calls queue on a
+requests/min + input and output tokens/min limiter that is re-synced from the API's rate-limit
+headers; 429 / overloaded / 5xx responses are retried with jittered backoff.
+generate_stream() retries only while opening the stream (never after text has
+been yielded); generate_structured() forces a single tool call whose input
+schema is the requested JSON Schema.
 """
 
+import inspect
+from collections.abc import AsyncIterator
 from typing import Any
 
-from anthropic import AsyncAnthropic
+import anthropic
+from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
 
 from dungeonmaster.ai.providers.base import BaseAIProvider, GenerateResult
+from dungeonmaster.ai.providers.json_output import StructuredOutputError
+from dungeonmaster.ai.providers.rate_limit import (
+    RateLimiter,
+    RetryPolicy,
+    retry_with_backoff,
+)
+from dungeonmaster.ai.providers.transport import (
+    TransportSettings,
+    TransportStats,
+    client_kwargs,
+    http_module_for,
+)
+
+
+def _estimate_tokens(*texts: str | None) -> int:
+    """Rough input token estimate (~4 characters per token) for rate limiting."""
+    return sum(len(t) for t in texts if t) // 4 + 1
+
+
+_STRUCTURED_TOOL = "structured_output"
+
+
+def _is_retryable(error: Exception) -> bool:
+    """429, 408/409, overloaded (529) and other 5xx responses, plus connection errors and timeouts."""
+    if isinstance(error, anthropic.APIConnectionError):
+        return True
+    if isinstance(error, anthropic.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+
+def _retry_after(error: Exception) -> float | None:
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
 
 
 class ClaudeProvider(BaseAIProvider):
@@ -19,9 +66,25 @@ class ClaudeProvider(BaseAIProvider):
         self,
         api_key: str,
         default_model: str = "claude-3-5-sonnet-20241022",
+        transport: TransportSettings | None = None,
+        rate_limiter: RateLimiter | None = None,
+        retry_policy: RetryPolicy | None = None,
     ):
-        self._client = AsyncAnthropic(api_key=api_key or None)
+        transport = transport or TransportSettings()
+        http = http_module_for(DefaultAsyncHttpxClient)
+        self._stats = TransportStats("claude")
+        self._client = AsyncAnthropic(
+            api_key=api_key or None,
+            timeout=transport.timeout(http),
+            # Retries are ours (jittered, limiter-aware), not the SDK's
+            max_retries=0,
+            http_client=DefaultAsyncHttpxClient(
+                **client_kwargs(transport, self._stats, http)
+            ),
+        )
         self._default_model = default_model
+        self._limiter = rate_limiter or RateLimiter(name="claude")
+        self._retry_policy = retry_policy or RetryPolicy()
 
     @property
     def name(self) -> str:
@@ -31,6 +94,16 @@ class ClaudeProvider(BaseAIProvider):
     def default_model(self) -> str:
         return self._default_model
 
+    @property
+    def rate_limiter(self) -> RateLimiter:
+        """Client-side limiter; rate_limiter.stats exposes queue depth and wait times."""
+        return self._limiter
+
+    @property
+    def transport_stats(self) -> dict[str, TransportStats]:
+        """Connection reuse statistics for the API client."""
+        return {"messages": self._stats}
+
     async def generate(
         self,
         prompt: str,
@@ -40,12 +113,38 @@ class ClaudeProvider(BaseAIProvider):
     ) -> GenerateResult:
         model = model or self._default_model
         kwargs_use = {"max_tokens": 4096, **kwargs}
-        response = await self._client.messages.create(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-            system=system or "",
-            **kwargs_use,
+        estimate = _estimate_tokens(prompt, system)
+
+        async def attempt():
+            await self._limiter.acquire(estimate)
+            try:
+                raw = await self._client.messages.with_raw_response.create(
+                    model=model,
+                    messages=[{"role": "user", "content": prompt}],
+                    system=system or "",
+                    **kwargs_use,
+                )
+            except anthropic.APIStatusError as e:
+                self._limiter.update_from_headers(e.response.headers)
+                raise
+            self._limiter.update_from_headers(raw.headers)
+            parsed = raw.parse()
+            # Legacy SDK responses parse synchronously, newer async ones return a coroutine
+            return await parsed if inspect.isawaitable(parsed) else parsed
+
+        response = await retry_with_backoff(
+            attempt,
+            self._retry_policy,
+            is_retryable=_is_retryable,
+            retry_after=_retry_after,
+            name="claude",
         )
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            self._limiter.charge(
+                getattr(usage, "input_tokens", 0) - estimate,
+                getattr(usage, "output_tokens", 0),
+            )
         text = ""
         if response.content:
             for block in response.content:
@@ -53,5 +152,87 @@ class ClaudeProvider(BaseAIProvider):
                     text += block.text
         return GenerateResult(text=text, model=model, raw=response)
 
+    async def generate_stream(
+        self,
+        prompt: str,
+        model: str | None = None,
+        system: str | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[str]:
+        model = model or self._default_model
+        kwargs_use = {"max_tokens": 4096, **kwargs}
+        estimate = _estimate_tokens(prompt, system)
+
+        async def open_stream():
+            await self._limiter.acquire(estimate)
+            manager = self._client.messages.stream(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                system=system or "",
+                **kwargs_use,
+            )
+            try:
+                stream = await manager.__aenter__()
+            except anthropic.APIStatusError as e:
+                self._limiter.update_from_headers(e.response.headers)
+                raise
+            response = getattr(stream, "response", None)
+            if response is not None:
+                self._limiter.update_from_headers(response.headers)
+            return manager, stream
+
+        manager, stream = await retry_with_backoff(
+            open_stream,
+            self._retry_policy,
+            is_retryable=_is_retryable,
+            retry_after=_retry_after,
+            name="claude",
+        )
+        try:
+            async for text in stream.text_stream:
+                yield text
+            message = await stream.get_final_message()
+        finally:
+            await manager.__aexit__(None, None, None)
+        usage = getattr(message, "usage", None)
+        if usage is not None:
+            self._limiter.charge(
+                getattr(usage, "input_tokens", 0) - estimate,
+                getattr(usage, "output_tokens", 0),
+            )
+
+    async def generate_structured(
+        self,
+        prompt: str,
+        schema: dict[str, Any],
+        model: str | None = None,
+        system: str | None = None,
+        **kwargs: Any,
+    ) -> dict[str, Any]:
+        """Force a tool call with schema as its input schema and return the tool input."""
+        result = await self.generate(
+            prompt,
+            model=model,
+            system=system,
+            tools=[
+                {
+                    "name": _STRUCTURED_TOOL,
+                    "description": "Return the result.",
+                    "input_schema": schema,
+                }
+            ],
+            tool_choice={"type": "tool", "name": _STRUCTURED_TOOL},
+            **kwargs,
+        )
+        for block in getattr(result.raw, "content", None) or []:
+            if getattr(block, "type", "") == "tool_use" and isinstance(
+                getattr(block, "input", None), dict
+            ):
+                return block.input
+        raise StructuredOutputError("no tool_use block in the response")
+
     async def is_available(self) -> bool:
         return bool(self._client.api_key)
+
+    async def close(self) -> None:
+        await self._client.close()
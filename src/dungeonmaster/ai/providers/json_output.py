@@ -0,0 +1,62 @@
+"""
+Lenient JSON parsing of model output, shared by providers and ai/structured.py.
+
+Models wrap JSON in prose or leave trailing commas; loads_lenient() recovers
+the value or raises StructuredOutputError. This module has no dependencies
+beyond the standard library, so providers can use it without importing the
+scene schema (ai/structured.py, data/state.py).
+"""
+
+import json
+import re
+from typing import Any
+
+_TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+
+
+class StructuredOutputError(ValueError):
+    """Model output could not be parsed into the expected structure."""
+
+
+def _balanced_span(text: str) -> str | None:
+    """First balanced {...} or [...] in text (string-aware), or None."""
+    start = min((i for i in (text.find("{"), text.find("[")) if i >= 0), default=-1)
+    if start < 0:
+        return None
+    depth, in_string, escaped = 0, False, False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return text[start : i + 1]
+    return None
+
+
+def loads_lenient(text: str) -> Any:
+    """
+    Parse JSON from model output: the whole text, else its first balanced object/array,
+    retrying without trailing commas. Raises StructuredOutputError.
+    """
+    candidates = [text.strip()]
+    span = _balanced_span(text)
+    if span is not None and span != candidates[0]:
+        candidates.append(span)
+    for candidate in candidates:
+        for attempt in (candidate, _TRAILING_COMMA.sub(r"\1", candidate)):
+            try:
+                return json.loads(attempt)
+            except json.JSONDecodeError:
+                continue
+    raise StructuredOutputError(f"no valid JSON in {text[:80]!r}")
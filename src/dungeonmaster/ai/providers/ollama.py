@@ -3,13 +3,32 @@ Ollama provider: local LLM completion and embeddings.
 
 Used for narrative generation and (via embed()) for RAG embeddings. Configure
 base_url, default_model (narrative), and embedding_model in config ai.ollama.
+Chat and embedding requests use separate HTTP connection pools (ai.ollama.transport
+and ai.ollama.embedding_transport) so an ingest fan-out cannot starve player chats.
+generate_stream() uses streamed chat; generate_structured() passes the JSON Schema
+as Ollama's format so the model can only produce matching JSON.
 """
 
+from collections.abc import AsyncIterator
 from typing import Any
 
 from ollama import AsyncClient
 
 from dungeonmaster.ai.providers.base import BaseAIProvider, GenerateResult
+from dungeonmaster.ai.providers.json_output import StructuredOutputError, loads_lenient
+from dungeonmaster.ai.providers.transport import (
+    TransportSettings,
+    TransportStats,
+    client_kwargs,
+)
+
+
+def _messages(prompt: str, system: str | None) -> list[dict[str, str]]:
+    messages = []
+    if system:
+        messages.append({"role": "system", "content": system})
+    messages.append({"role": "user", "content": prompt})
+    return messages
 
 
 class OllamaProvider(BaseAIProvider):
@@ -20,16 +39,32 @@ class OllamaProvider(BaseAIProvider):
         base_url: str = "http://localhost:11434",
         default_model: str = "llama3.2",
         embedding_model: str = "nomic-embed-text",
+        transport: TransportSettings | None = None,
+        embedding_transport: TransportSettings | None = None,
     ):
         self._base_url = base_url.rstrip("/")
         self._default_model = default_model
         self._embedding_model = embedding_model
-        self._client = AsyncClient(host=self._base_url)
+        transport = transport or TransportSettings()
+        embedding_transport = embedding_transport or transport
+        self._chat_stats = TransportStats("ollama.chat")
+        self._embed_stats = TransportStats("ollama.embed")
+        self._client = AsyncClient(
+            host=self._base_url, **client_kwargs(transport, self._chat_stats)
+        )
+        self._embed_client = AsyncClient(
+            host=self._base_url,
+            **client_kwargs(embedding_transport, self._embed_stats),
+        )
 
     @property
     def name(self) -> str:
         return "ollama"
 
+    @property
+    def base_url(self) -> str:
+        return self._base_url
+
     @property
     def default_model(self) -> str:
         return self._default_model
@@ -38,6 +73,11 @@ class OllamaProvider(BaseAIProvider):
     def embedding_model(self) -> str:
         return self._embedding_model
 
+    @property
+    def transport_stats(self) -> dict[str, TransportStats]:
+        """Connection reuse statistics for the chat and embedding pools."""
+        return {"chat": self._chat_stats, "embed": self._embed_stats}
+
     async def generate(
         self,
         prompt: str,
@@ -46,22 +86,55 @@ class OllamaProvider(BaseAIProvider):
         **kwargs: Any,
     ) -> GenerateResult:
         model = model or self._default_model
-        messages = []
-        if system:
-            messages.append({"role": "system", "content": system})
-        messages.append({"role": "user", "content": prompt})
-
-        response = await self._client.chat(model=model, messages=messages, **kwargs)
+        response = await self._client.chat(
+            model=model, messages=_messages(prompt, system), **kwargs
+        )
         text = response.get("message", {}).get("content", "") or ""
         return GenerateResult(text=text, model=model, raw=response)
 
+    async def generate_stream(
+        self,
+        prompt: str,
+        model: str | None = None,
+        system: str | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[str]:
+        """Yield message content chunks from a streamed chat."""
+        model = model or self._default_model
+        stream = await self._client.chat(
+            model=model, messages=_messages(prompt, system), stream=True, **kwargs
+        )
+        async for part in stream:
+            text = part.get("message", {}).get("content", "") or ""
+            if text:
+                yield text
+
+    async def generate_structured(
+        self,
+        prompt: str,
+        schema: dict[str, Any],
+        model: str | None = None,
+        system: str | None = None,
+        **kwargs: Any,
+    ) -> dict[str, Any]:
+        """Constrain the reply to schema with Ollama's native format parameter."""
+        result = await self.generate(
+            prompt, model=model, system=system, format=schema, **kwargs
+        )
+        data = loads_lenient(result.text)
+        if not isinstance(data, dict):
+            raise StructuredOutputError("expected a JSON object")
+        return data
+
     async def embed(self, texts: list[str]) -> list[list[float]]:
         """Return embedding vectors for each text. Uses embedding_model."""
         if not texts:
             return []
         out = []
         for text in texts:
-            r = await self._client.embeddings(model=self._embedding_model, prompt=text)
+            r = await self._embed_client.embeddings(
+                model=self._embedding_model, prompt=text
+            )
             vec = r.get("embedding", [])
             out.append(vec)
         return out
@@ -70,5 +143,9 @@ class OllamaProvider(BaseAIProvider):
         try:
             await self._client.list()
             return True
-        except Exception:
+        except Exception:  # noqa: BLE001 - any failure means the server is not usable
             return False
+
+    async def close(self) -> None:
+        for client in (self._client, self._embed_client):
+            await client.close()
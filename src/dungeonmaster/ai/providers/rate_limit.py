@@ -0,0 +1,271 @@
+"""
+Client-side rate limiting and retry with backoff for API providers.
+
+TokenBucket is a classic refilling bucket; RateLimiter combines
+requests-per-minute, input-tokens-per-minute and output-tokens-per-minute
+buckets, queues callers FIFO until all have capacity, and re-syncs from the
+server's rate-limit response headers (remaining / reset). Output tokens are
+only known once a call has finished, so they are charged afterwards and a new
+call waits while the output bucket is in debt. retry_with_backoff retries transient failures (429,
+overloaded, 5xx, connection errors) with full-jitter exponential backoff,
+honouring Retry-After when the server sends one. Queue wait and retry counts
+are recorded in dungeonmaster.metrics.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections.abc import Awaitable, Callable, Mapping
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, TypeVar
+
+from dungeonmaster.metrics import Metrics
+from dungeonmaster.metrics import metrics as default_metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """Refilling token bucket. capacity tokens, refilled continuously at refill_per_second."""
+
+    def __init__(
+        self,
+        capacity: float,
+        refill_per_second: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._updated = clock()
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def _refill(self) -> None:
+        now = self._clock()
+        elapsed = max(0.0, now - self._updated)
+        self._tokens = min(
+            self.capacity, self._tokens + elapsed * self.refill_per_second
+        )
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount tokens are available (0 if available now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self._tokens >= amount:
+            return 0.0
+        if self.refill_per_second <= 0:
+            return float("inf")
+        return (amount - self._tokens) / self.refill_per_second
+
+    def consume(self, amount: float) -> None:
+        """Take tokens unconditionally; the balance may go negative (debt is repaid by refill)."""
+        self._refill()
+        self._tokens -= amount
+
+    def try_acquire(self, amount: float) -> bool:
+        if self.wait_time(amount) > 0:
+            return False
+        self.consume(min(amount, self.capacity))
+        return True
+
+    def sync(self, remaining: float, reset_in: float | None = None) -> None:
+        """
+        Align with server-reported state: never hold more than `remaining` tokens, and
+        when the server is exhausted, hold off until its window resets in reset_in seconds.
+        """
+        self._refill()
+        self._tokens = min(self._tokens, float(remaining))
+        if reset_in and self._tokens < 1 and self.refill_per_second > 0:
+            self._tokens = min(self._tokens, 1 - reset_in * self.refill_per_second)
+
+
+@dataclass
+class RateLimitStats:
+    """Queueing statistics for a RateLimiter."""
+
+    waiting: int = 0
+    acquired: int = 0
+    total_wait: float = 0.0
+    last_wait: float = 0.0
+
+
+class RateLimiter:
+    """
+    Requests/min + input tokens/min + output tokens/min limiter. acquire(tokens) waits FIFO
+    until every bucket allows the call and returns the seconds spent queued. A limit of 0
+    disables that bucket.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        output_tokens_per_minute: float = 0,
+        name: str = "ratelimit",
+        metrics: Metrics | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.requests = (
+            TokenBucket(requests_per_minute, requests_per_minute / 60.0, clock)
+            if requests_per_minute > 0
+            else None
+        )
+        self.tokens = (
+            TokenBucket(tokens_per_minute, tokens_per_minute / 60.0, clock)
+            if tokens_per_minute > 0
+            else None
+        )
+        self.output_tokens = (
+            TokenBucket(
+                output_tokens_per_minute, output_tokens_per_minute / 60.0, clock
+            )
+            if output_tokens_per_minute > 0
+            else None
+        )
+        self.stats = RateLimitStats()
+        self._metrics = metrics or default_metrics
+        self._lock = asyncio.Lock()
+
+    def _buckets(self, tokens: float) -> list[tuple[TokenBucket, float]]:
+        out = []
+        if self.requests is not None:
+            out.append((self.requests, 1.0))
+        if self.tokens is not None:
+            out.append((self.tokens, tokens))
+        if self.output_tokens is not None:
+            # charged after the call; wait while in debt
+            out.append((self.output_tokens, 0.0))
+        return out
+
+    async def acquire(self, tokens: float = 0) -> float:
+        """Wait for capacity for one request of ~tokens; returns seconds waited."""
+        start = time.monotonic()
+        self.stats.waiting += 1
+        self._metrics.gauge(f"ai.{self.name}.queue_depth", self.stats.waiting)
+        try:
+            async with self._lock:
+                while True:
+                    wait = max(
+                        (b.wait_time(n) for b, n in self._buckets(tokens)), default=0.0
+                    )
+                    if wait <= 0:
+                        break
+                    await asyncio.sleep(min(wait, 60.0))
+                for bucket, n in self._buckets(tokens):
+                    bucket.consume(min(n, bucket.capacity))
+        finally:
+            self.stats.waiting -= 1
+            self._metrics.gauge(f"ai.{self.name}.queue_depth", self.stats.waiting)
+        waited = time.monotonic() - start
+        self.stats.acquired += 1
+        self.stats.total_wait += waited
+        self.stats.last_wait = waited
+        self._metrics.observe(f"ai.{self.name}.queue_wait", waited)
+        return waited
+
+    def charge(self, tokens: float, output_tokens: float = 0) -> None:
+        """Charge tokens after the fact: input beyond the estimate, and the output generated."""
+        if self.tokens is not None and tokens > 0:
+            self.tokens.consume(tokens)
+        if self.output_tokens is not None and output_tokens > 0:
+            self.output_tokens.consume(output_tokens)
+
+    def update_from_headers(
+        self, headers: Mapping[str, str], prefix: str = "anthropic-ratelimit-"
+    ) -> None:
+        """Sync buckets from anthropic-ratelimit-{requests,input-tokens,output-tokens,tokens}-{remaining,reset}."""
+        # Input-token limits are what requests are charged against; fall back to combined tokens
+        for kinds, bucket in (
+            (("requests",), self.requests),
+            (("input-tokens", "tokens"), self.tokens),
+            (("output-tokens",), self.output_tokens),
+        ):
+            if bucket is None:
+                continue
+            for kind in kinds:
+                remaining = _float_or_none(headers.get(f"{prefix}{kind}-remaining"))
+                if remaining is not None:
+                    reset_in = _seconds_until(headers.get(f"{prefix}{kind}-reset"))
+                    bucket.sync(remaining=remaining, reset_in=reset_in)
+                    break
+
+
+def _float_or_none(value: Any) -> float | None:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _seconds_until(value: str | None) -> float | None:
+    """Parse an RFC 3339 reset timestamp (or plain seconds) into seconds from now."""
+    if not value:
+        return None
+    seconds = _float_or_none(value)
+    if seconds is not None:
+        return seconds
+    try:
+        when = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+@dataclass
+class RetryPolicy:
+    """Full-jitter exponential backoff: sleep uniform(0, min(max_delay, base_delay * 2**attempt))."""
+
+    max_retries: int = 5
+    base_delay: float = 1.0
+    max_delay: float = 30.0
+
+    def delay(self, attempt: int, retry_after: float | None = None) -> float:
+        cap = min(self.max_delay, self.base_delay * (2**attempt))
+        jittered = random.uniform(0, cap)
+        if retry_after is not None:
+            return max(retry_after, jittered)
+        return jittered
+
+
+async def retry_with_backoff(
+    fn: Callable[[], Awaitable[T]],
+    policy: RetryPolicy,
+    is_retryable: Callable[[Exception], bool],
+    retry_after: Callable[[Exception], float | None] = lambda e: None,
+    name: str = "retry",
+    metrics: Metrics | None = None,
+) -> T:
+    """Call fn until it succeeds, a non-retryable error occurs, or retries run out."""
+    metrics = metrics or default_metrics
+    attempt = 0
+    while True:
+        try:
+            return await fn()
+        except Exception as e:
+            if attempt >= policy.max_retries or not is_retryable(e):
+                raise
+            delay = policy.delay(attempt, retry_after(e))
+            attempt += 1
+            metrics.incr(f"ai.{name}.retries")
+            logger.warning(
+                "%s: retry %d/%d in %.1fs after %s",
+                name,
+                attempt,
+                policy.max_retries,
+                delay,
+                e,
+            )
+            await asyncio.sleep(delay)
@@ -0,0 +1,157 @@
+"""
+HTTP transport settings and connection-reuse statistics for provider clients.
+
+Both the Ollama and Anthropic SDKs sit on httpx. TransportSettings turns the
+ai.ollama.transport / ai.claude.transport config sections into httpx pool
+limits, keep-alive expiry, timeouts and (optionally) HTTP/2. TransportStats
+hooks into each request via httpcore's trace extension and counts requests
+vs. newly opened TCP connections, so connection setup cost is visible in
+dungeonmaster.metrics instead of hiding inside latency.
+"""
+
+import importlib
+import importlib.util
+import logging
+import time
+from dataclasses import dataclass, fields
+from types import ModuleType
+from typing import Any
+
+import httpx
+
+from dungeonmaster.metrics import Metrics
+from dungeonmaster.metrics import metrics as default_metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TransportSettings:
+    """Connection pool and timeout settings for one httpx client."""
+
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 60.0
+    connect_timeout: float = 5.0
+    read_timeout: float | None = 300.0
+    write_timeout: float = 30.0
+    pool_timeout: float = 30.0
+    http2: bool = False
+
+    @classmethod
+    def from_config(
+        cls,
+        cfg: dict[str, Any] | None,
+        base: "TransportSettings | None" = None,
+    ) -> "TransportSettings":
+        """Build from a config dict; missing keys come from base (or the defaults)."""
+        settings = base or cls()
+        known = {f.name for f in fields(cls)}
+        values = {f.name: getattr(settings, f.name) for f in fields(cls)}
+        values.update({k: v for k, v in (cfg or {}).items() if k in known})
+        return cls(**values)
+
+    def limits(self, http: ModuleType = httpx) -> httpx.Limits:
+        return http.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def timeout(self, http: ModuleType = httpx) -> httpx.Timeout:
+        return http.Timeout(
+            connect=self.connect_timeout,
+            read=self.read_timeout,
+            write=self.write_timeout,
+            pool=self.pool_timeout,
+        )
+
+
+class TransportStats:
+    """Counts requests and new TCP connections for one client (reuse = 1 - new/requests)."""
+
+    def __init__(self, name: str, metrics: Metrics | None = None):
+        self.name = name
+        self.requests = 0
+        self.new_connections = 0
+        self.connect_seconds = 0.0
+        self._metrics = metrics or default_metrics
+
+    @property
+    def reuse_ratio(self) -> float:
+        """Fraction of requests served on an already-open connection."""
+        if not self.requests:
+            return 0.0
+        return max(0.0, 1 - self.new_connections / self.requests)
+
+    def as_dict(self) -> dict[str, float]:
+        return {
+            "requests": self.requests,
+            "new_connections": self.new_connections,
+            "connect_seconds": self.connect_seconds,
+            "reuse_ratio": self.reuse_ratio,
+        }
+
+    async def on_request(self, request: httpx.Request) -> None:
+        """httpx request event hook: count the request and attach a trace callback."""
+        self.requests += 1
+        self._metrics.incr(f"ai.transport.{self.name}.requests")
+        connect_started: list[float] = []
+
+        async def trace(event: str, info: dict[str, Any]) -> None:
+            # httpcore trace events; only TCP connects (i.e. no pooled connection) matter here
+            if event.endswith("connect_tcp.started"):
+                connect_started.append(time.monotonic())
+            elif event.endswith("connect_tcp.complete"):
+                self.record_connect(
+                    time.monotonic() - connect_started.pop()
+                    if connect_started
+                    else None
+                )
+
+        request.extensions["trace"] = trace
+
+    def record_connect(self, elapsed: float | None) -> None:
+        self.new_connections += 1
+        self._metrics.incr(f"ai.transport.{self.name}.connections")
+        if elapsed is not None:
+            self.connect_seconds += elapsed
+            self._metrics.observe(f"ai.transport.{self.name}.connect_seconds", elapsed)
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+def http_module_for(client_cls: type) -> ModuleType:
+    """
+    The httpx-compatible package an SDK's client class is built on. Some SDK releases
+    vendor a renamed httpx and reject plain httpx Limits/Timeout objects.
+    """
+    for cls in client_cls.__mro__:
+        root = cls.__module__.partition(".")[0]
+        if root.startswith("httpx"):
+            return importlib.import_module(root)
+    return httpx
+
+
+def client_kwargs(
+    settings: TransportSettings,
+    stats: TransportStats | None = None,
+    http: ModuleType = httpx,
+) -> dict[str, Any]:
+    """Keyword arguments for an httpx AsyncClient (as accepted by the Ollama/Anthropic SDKs)."""
+    http2 = settings.http2
+    if http2 and not _http2_available():
+        logger.warning(
+            "HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1"
+        )
+        http2 = False
+    kwargs: dict[str, Any] = {
+        "limits": settings.limits(http),
+        "timeout": settings.timeout(http),
+        "http2": http2,
+    }
+    if stats is not None:
+        kwargs["event_hooks"] = {"request": [stats.on_request]}
+    return kwargs
@@ -1,39 +1,159 @@
 """
-RAG (Retrieval-Augmented Generation) store for system-agnostic rules and lore.
+RAG (Retrieval-Augmented Generation) store for rules, campaign notes and lore.
 
-Reads Markdown/TXT from the vault's systems/ directory, chunks with a sliding
-window, embeds via an async embed_fn (e.g. Ollama), and stores vectors in ChromaDB
-(persisted under vault/_index/chroma). Query returns the top-k most similar
-chunks for a given string, for injection into the DM's system prompt.
+Three namespaces, each its own ChromaDB collection (persisted under
+vault/_index/chroma):
+
+  rules     Markdown/TXT from systems/, chunked with a sliding window
+  entities  character and NPC Markdown from characters/ and npcs/
+  notes     session note events, ingested one event at a time as the
+            NoteTaker records them (ingest_notes), never by rescanning notes/
+
+Text is embedded via an async embed_fn (e.g. Ollama). retrieve() returns the
+top-k chunks of one namespace; retrieve_context() embeds the query once,
+queries every namespace in parallel and trims each result list to that
+namespace's token budget, so long-term campaign memory stays searchable while
+the prompt stays small. With a Reranker (ai/rerank.py), more candidates are
+fetched and picked by MMR over their stored embeddings, so overlapping
+sliding-window chunks do not crowd out other results.
+
+The Chroma client is opened lazily: open_async() opens it in a worker thread at
+startup, and until then retrieve() returns nothing (the engine serves replies in
+a degraded "rules index warming" mode) instead of blocking the event loop.
+Ingest and queries that arrive before the index is open (or after an open
+failed) await that open, or retry it, in a worker thread as well.
+
+Files are read, chunked and hashed off the event loop: by a Preprocessor's
+worker processes (ai/preprocess.py) when one is set, else in a worker thread;
+the Chroma reads and writes of ingest run in worker threads as well. Each chunk
+records the hash of its source file, so re-ingesting an unchanged file is a
+no-op, and a changed file's old chunks are replaced, none left behind. Listeners registered with add_source_listener are told when a
+source's chunks actually change (e.g. to invalidate cached rulings).
+
+Campaigns hosted in one process share resources through these hooks: a
+SharedChromaClient opens one Chroma client for all of their stores,
+collection_names points campaigns of the same game system at one rules
+collection while their notes and entities collections stay per campaign, and
+an EmbeddingCache shares query embeddings between stores.
+
+With a SystemIndex (ai/system_index.py), rulebooks are embedded once per host
+instead of once per vault: a rulebook whose content hash is already in the
+shared index is bound to it without any embedding call, a new one is embedded
+and added to it, and rules queries search the vault's bound rulebooks there
+next to the vault's own rules collection (the overlay, which keeps rulebooks a
+read-only index lacks), merged by distance. The hash each rulebook was bound
+to is recorded in vault/_index/system_sources.json, so a rulebook that changed
+while the process was down still invalidates cached rulings.
 """
 
+import asyncio
+import json
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Awaitable, Callable
+from typing import TYPE_CHECKING, Any
 
+from dungeonmaster.ai.preprocess import (
+    PreparedFile,
+    Preprocessor,
+    PreprocessSettings,
+    prepare_files,
+)
+from dungeonmaster.ai.preprocess import (
+    chunk_text as _chunk_text,
+)
+from dungeonmaster.ai.rerank import Reranker, estimate_tokens
+from dungeonmaster.ai.system_index import SystemIndex
 from dungeonmaster.data.vault import Vault
 
+if TYPE_CHECKING:  # core imports this module
+    from dungeonmaster.core.note_taker import NoteEvent
+
+logger = logging.getLogger(__name__)
+
+_QUERY_EMBED_CACHE_SIZE = 256
+
+NAMESPACES = ("rules", "notes", "entities")
+DEFAULT_BUDGETS = {"rules": 1500, "notes": 500, "entities": 400}  # tokens per namespace
+
+
+class EmbeddingCache:
+    """LRU of query embeddings by text; may be shared by stores that use the same embedding model."""
+
+    def __init__(self, max_entries: int = _QUERY_EMBED_CACHE_SIZE):
+        self._max_entries = max_entries
+        self._entries: OrderedDict[str, list[float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, text: str) -> list[float] | None:
+        vector = self._entries.get(text)
+        if vector is not None:
+            self._entries.move_to_end(text)
+        return vector
 
-def _chunk_text(text: str, chunk_size: int = 512, overlap: int = 64) -> list[str]:
-    """Sliding-window chunking by character count. Overlap characters are shared between adjacent chunks."""
-    if not text or chunk_size <= 0:
-        return []
-    chunks: list[str] = []
-    start = 0
-    while start < len(text):
-        end = start + chunk_size
-        chunk = text[start:end]
-        if chunk.strip():
-            chunks.append(chunk.strip())
-        start = end - overlap
-        if start >= len(text):
+    def put(self, text: str, vector: list[float]) -> None:
+        self._entries[text] = vector
+        self._entries.move_to_end(text)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+
+class SharedChromaClient:
+    """Chroma PersistentClient at path, created on first call (from any thread) and then reused."""
+
+    def __init__(self, path: str | Path):
+        self._path = Path(path)
+        self._lock = threading.Lock()
+        self._client: Any = None
+
+    def __call__(self) -> Any:
+        with self._lock:
+            if self._client is None:
+                import chromadb
+                from chromadb.config import Settings
+
+                self._path.mkdir(parents=True, exist_ok=True)
+                self._client = chromadb.PersistentClient(
+                    path=str(self._path),
+                    settings=Settings(anonymized_telemetry=False),
+                )
+            return self._client
+
+
+@dataclass
+class RetrievedChunk:
+    """A chunk returned by retrieve(): text plus where it came from."""
+
+    id: str
+    text: str
+    source: str = ""
+    distance: float = 0.0
+
+
+def _within_budget(
+    chunks: list[RetrievedChunk], budget_tokens: int, chars_per_token: float = 4.0
+) -> list[RetrievedChunk]:
+    """Leading chunks (best first) whose estimated tokens (at chars_per_token) fit in budget_tokens."""
+    out: list[RetrievedChunk] = []
+    used = 0
+    for chunk in chunks:
+        cost = estimate_tokens(chunk.text, chars_per_token)
+        if used + cost > budget_tokens:
             break
-    return chunks
+        out.append(chunk)
+        used += cost
+    return out
 
 
 class RAGStore:
     """
-    Ingest Markdown/TXT from vault systems/, chunk, embed, store in ChromaDB.
-    Retrieve relevant chunks for a query (system-agnostic rule context).
+    Ingest vault content into per-namespace ChromaDB collections (rules, notes, entities).
+    Retrieve relevant chunks for a query from one namespace, or from all of them within budgets.
     """
 
     def __init__(
@@ -45,103 +165,571 @@ class RAGStore:
         top_k: int = 5,
         collection_name: str = "dungeonmaster_systems",
         chroma_client: Any = None,
+        budgets: dict[str, int] | None = None,
+        reranker: Reranker | None = None,
+        collection_names: dict[str, str] | None = None,
+        client_factory: Callable[[], Any] | None = None,
+        query_cache: EmbeddingCache | None = None,
+        system_index: SystemIndex | None = None,
+        preprocessor: Preprocessor | None = None,
     ):
         self._vault = vault
         self._embed_fn = embed_fn
         self._chunk_size = chunk_size
         self._chunk_overlap = chunk_overlap
         self._top_k = top_k
-        self._collection_name = collection_name
+        self._collection_names = {
+            "rules": collection_name,
+            "notes": "dungeonmaster_notes",
+            "entities": "dungeonmaster_entities",
+            **(collection_names or {}),
+        }
+        self._budgets = {**DEFAULT_BUDGETS, **(budgets or {})}
+        self._reranker = reranker
+        self._source_listeners: list[Callable[[str], None]] = []
+        self._query_embeddings = (
+            query_cache if query_cache is not None else EmbeddingCache()
+        )
+        self._client = chroma_client
+        self._client_factory = client_factory
+        self._collections: dict[str, Any] = {}
+        self._system_index = system_index
+        # rulebook path -> hash bound in the system index
+        self._system_sources: dict[str, str] = {}
+        self._preprocessor = preprocessor
+        self._open_lock = threading.Lock()
+        self._open_task: asyncio.Future | None = None
         if chroma_client is not None:
-            self._client = chroma_client
-        else:
+            self.open()
+
+    @property
+    def ready(self) -> bool:
+        """True once the vector store is open and queries return real results."""
+        return bool(self._collections)
+
+    @property
+    def warming(self) -> bool:
+        """True while open_async() is opening the vector store in the background."""
+        return (
+            self._open_task is not None
+            and not self._open_task.done()
+            and not self.ready
+        )
+
+    def open(self) -> None:
+        """Open the Chroma client and collections (blocking; imports chromadb on first use)."""
+        with self._open_lock:
+            self._open()
+
+    def _open(self) -> None:
+        if self._collections:
+            return
+        if self._client is None and self._client_factory is not None:
+            self._client = self._client_factory()
+        if self._client is None:
             import chromadb
             from chromadb.config import Settings
-            persist_dir = str(vault.index_dir() / "chroma")
+
+            persist_dir = str(self._vault.index_dir() / "chroma")
             self._client = chromadb.PersistentClient(
                 path=persist_dir,
                 settings=Settings(anonymized_telemetry=False),
             )
-        self._collection = self._client.get_or_create_collection(
-            name=collection_name,
-            metadata={"description": "System rulebooks and source content"},
-        )
+        descriptions = {
+            "rules": "System rulebooks and source content",
+            "notes": "Campaign session note events",
+            "entities": "Character and NPC documents",
+        }
+        if self._system_index is not None:
+            self._load_system_sources()
+        self._collections = {
+            ns: self._client.get_or_create_collection(
+                name=name, metadata={"description": descriptions[ns]}
+            )
+            for ns, name in self._collection_names.items()
+        }
 
-    def _chunk_file(self, path: Path) -> list[tuple[str, str]]:
-        """Return list of (chunk_text, source_path) for a file."""
+    def _system_sources_path(self) -> Path:
+        return self._vault.index_dir() / "system_sources.json"
+
+    def _load_system_sources(self) -> None:
+        """Re-bind the rulebooks recorded last run that the system index still has."""
+        path = self._system_sources_path()
+        if not path.is_file():
+            return
         try:
-            text = self._vault.read_text(path)
-        except Exception:
+            recorded = json.loads(self._vault.read_text(path))
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning("Ignoring unreadable %s: %s", path, e)
+            return
+        if not isinstance(recorded, dict):
+            return
+        self._system_sources = {str(k): str(v) for k, v in recorded.items()}
+        for source, file_hash in self._system_sources.items():
+            if self._system_index.has(file_hash):
+                self._system_index.bind(source, file_hash)
+
+    def _save_system_sources(self) -> None:
+        self._vault.write_text(
+            self._system_sources_path(),
+            json.dumps(self._system_sources, sort_keys=True),
+        )
+
+    async def open_async(self) -> None:
+        """
+        Open the vector store in a worker thread so the event loop keeps serving. Callers
+        share one open in progress; after a failed open (its error is raised to every
+        waiter), the next call tries again.
+        """
+        if self.ready:
+            return
+        task = self._open_task
+        if task is None or (
+            task.done() and (task.cancelled() or task.exception() is not None)
+        ):
+            task = self._open_task = asyncio.ensure_future(asyncio.to_thread(self.open))
+        await asyncio.shield(task)
+
+    async def wait_ready(self) -> None:
+        """Wait until the vector store is open (opening it here if nobody else is)."""
+        await self.open_async()
+
+    def _coll(self, namespace: str) -> Any:
+        if not self._collections:
+            self.open()
+        return self._collections[namespace]
+
+    def namespace_for(self, path: Path) -> str | None:
+        """Namespace a vault file belongs in: rules (systems/), entities (characters/, npcs/), else None."""
+        path = Path(path).resolve()
+        if path.is_relative_to(self._vault.systems_dir().resolve()):
+            return "rules"
+        for root in (self._vault.characters_dir(), self._vault.npcs_dir()):
+            if path.is_relative_to(root.resolve()):
+                return "entities"
+        return None
+
+    def add_source_listener(self, listener: Callable[[str], None]) -> None:
+        """Call listener(source_path) whenever a source's chunks are replaced or deleted."""
+        self._source_listeners.append(listener)
+
+    def _notify_source_changed(self, source_path: str) -> None:
+        for listener in self._source_listeners:
+            listener(source_path)
+
+    async def _prepare(self, paths: list[Path]) -> list[PreparedFile]:
+        """Read, chunk and hash files off the event loop (see module docstring)."""
+        if not paths:
             return []
-        chunks = _chunk_text(
-            text,
-            chunk_size=self._chunk_size,
-            overlap=self._chunk_overlap,
+        if self._preprocessor is not None:
+            return await self._preprocessor.prepare(
+                paths, self._chunk_size, self._chunk_overlap
+            )
+        return await asyncio.to_thread(
+            prepare_files,
+            [str(p) for p in paths],
+            self._chunk_size,
+            self._chunk_overlap,
         )
-        return [(c, str(path)) for c in chunks]
 
-    async def ingest_path(self, path: Path) -> int:
+    def _stored_source_hash(
+        self, source_path: str, namespace: str = "rules"
+    ) -> str | None:
+        """Content hash recorded for a source's chunks, or None if not indexed."""
+        existing = self._coll(namespace).get(
+            where={"source": source_path},
+            include=["metadatas"],
+            limit=1,
+        )
+        metas = existing.get("metadatas") or []
+        if not metas:
+            return None
+        return (metas[0] or {}).get("source_hash")
+
+    async def ingest_path(self, path: Path, namespace: str | None = None) -> int:
         """
-        Ingest one file: chunk, embed, add to ChromaDB. Returns number of chunks added.
+        Ingest one file into namespace (default: by location, see namespace_for; rules otherwise):
+        chunk, embed, add to ChromaDB. Returns number of chunks added.
+        Files whose content hash matches what is already indexed are skipped (returns 0).
         """
-        pairs = self._chunk_file(path)
-        if not pairs:
+        await self.wait_ready()
+        namespace = namespace or self.namespace_for(path) or "rules"
+        (prepared,) = await self._prepare([path])
+        return await self._ingest_prepared(path, namespace, prepared)
+
+    async def _ingest_prepared(
+        self, path: Path, namespace: str, prepared: PreparedFile
+    ) -> int:
+        """Embed and store a prepared file's chunks unless its hash is already indexed."""
+        texts, source_hash = prepared.texts, prepared.source_hash
+        if not texts:
+            return 0
+        if namespace == "rules" and self._system_index is not None:
+            added = await self._ingest_system(path, texts, source_hash)
+            if added is not None:
+                return added
+        source = str(path)
+        stored = await asyncio.to_thread(self._stored_source_hash, source, namespace)
+        if stored == source_hash:
             return 0
-        texts = [p[0] for p in pairs]
         embeddings = await self._embed_fn(texts)
         if len(embeddings) != len(texts):
             return 0
-        ids = [f"{path.stem}_{i}" for i in range(len(texts))]
-        self._collection.upsert(
+        # characters/x.md and npcs/x.md share the entities namespace
+        prefix = (
+            path.stem if namespace == "rules" else f"{path.parent.name}/{path.stem}"
+        )
+        ids = [f"{prefix}_{i}" for i in range(len(texts))]
+        await asyncio.to_thread(
+            self._replace_chunks,
+            namespace,
+            source,
+            ids,
+            embeddings,
+            texts,
+            source_hash,
+            stored is not None,
+        )
+        self._notify_source_changed(source)
+        return len(texts)
+
+    def _replace_chunks(
+        self,
+        namespace: str,
+        source: str,
+        ids: list[str],
+        embeddings: list[list[float]],
+        texts: list[str],
+        source_hash: str,
+        indexed: bool,
+    ) -> None:
+        """Upsert a source's new chunks, then drop its old ones the new ids do not overwrite (worker thread)."""
+        collection = self._coll(namespace)
+        collection.upsert(
             ids=ids,
             embeddings=embeddings,
             documents=texts,
-            metadatas=[{"source": p[1]} for p in pairs],
+            metadatas=[{"source": source, "source_hash": source_hash} for _ in texts],
         )
-        return len(texts)
+        if indexed:  # a shrunk file leaves chunks past its new count behind
+            keep = set(ids)
+            stale = [
+                id_
+                for id_ in collection.get(where={"source": source}, include=[])["ids"]
+                if id_ not in keep
+            ]
+            if stale:
+                collection.delete(ids=stale)
+
+    async def _ingest_system(
+        self, path: Path, texts: list[str], source_hash: str
+    ) -> int | None:
+        """
+        Bind a rulebook to the shared system index, embedding and adding it there if it is new.
+        Returns chunks embedded, or None if it must go to this vault's rules collection instead
+        (a read-only index without it).
+        """
+        index, source = self._system_index, str(path)
+        if not await asyncio.to_thread(index.has, source_hash):
+            if not index.writable:
+                index.unbind(source)
+                self._forget_system_source(source)
+                return None
+            embeddings = await self._embed_fn(texts)
+            if len(embeddings) != len(texts):
+                return 0
+            await asyncio.to_thread(index.add, source_hash, texts, embeddings)
+            added = len(texts)
+        else:
+            added = 0
+        index.bind(source, source_hash)
+        if self._system_sources.get(source) != source_hash:
+            self._system_sources[source] = source_hash
+            self._save_system_sources()
+            # an older copy in the vault's own collection
+            await asyncio.to_thread(self._delete_chunks, source, "rules")
+            self._notify_source_changed(source)
+        return added
+
+    def _forget_system_source(self, source: str) -> bool:
+        """Drop the recorded binding of source; True if there was one."""
+        if self._system_sources.pop(source, None) is None:
+            return False
+        self._save_system_sources()
+        return True
 
     async def ingest_all(self) -> int:
-        """Ingest all system files from the vault. Returns total chunks added."""
-        files = self._vault.list_system_files()
+        """
+        Ingest all system, character and NPC files from the vault. Returns total chunks added.
+        Files are prepared one window at a time (a batch per worker), so only that many
+        prepared files are held in memory however large the vault is.
+        """
+        await self.wait_ready()
+        pre = self._preprocessor
+        window = pre.window if pre is not None else PreprocessSettings().batch_files
         total = 0
-        for path in files:
-            total += await self.ingest_path(path)
+        for namespace, paths in (
+            ("rules", self._vault.list_system_files()),
+            ("entities", self._vault.list_entity_files()),
+        ):
+            for start in range(0, len(paths), window):
+                batch = paths[start : start + window]
+                for path, prepared in zip(batch, await self._prepare(batch)):
+                    total += await self._ingest_prepared(path, namespace, prepared)
         return total
 
-    async def query(self, query_text: str, top_k: int | None = None) -> list[str]:
+    @property
+    def notes_seq(self) -> int:
+        """Sequence number of the last note event ingested (kept in the notes collection's metadata)."""
+        return int((self._coll("notes").metadata or {}).get("last_seq", 0))
+
+    async def ingest_notes(self, events: Iterable["NoteEvent"]) -> int:
         """
-        Retrieve top_k most relevant chunks for the query. Returns list of chunk texts.
+        Ingest note events newer than notes_seq (one embedding call for the batch). Each event
+        is chunked on its own, so earlier notes are never re-read or re-embedded.
+        Returns number of chunks added. If embedding fails (raises, or returns the wrong
+        number of vectors) notes_seq is not advanced, so the same events can be retried.
+        """
+        await self.wait_ready()
+        last = self.notes_seq
+        texts: list[str] = []
+        ids: list[str] = []
+        metadatas: list[dict[str, Any]] = []
+        newest = last
+        for event in events:
+            if event.seq <= last:
+                continue
+            newest = max(newest, event.seq)
+            who = f"{event.role} ({event.player_id})" if event.player_id else event.role
+            header = f"[{event.timestamp[:16]}] {who}: "
+            for i, chunk in enumerate(
+                _chunk_text(event.text, self._chunk_size, self._chunk_overlap)
+            ):
+                texts.append(header + chunk)
+                ids.append(f"note_{event.seq}_{i}")
+                metadatas.append(
+                    {
+                        "source": str(self._vault.note_path(event.note_id)),
+                        "seq": event.seq,
+                        "role": event.role,
+                        "player_id": event.player_id or "",
+                        "timestamp": event.timestamp,
+                    }
+                )
+        if texts:
+            embeddings = await self._embed_fn(texts)
+            if len(embeddings) != len(texts):
+                raise RuntimeError(
+                    f"embedding returned {len(embeddings)} vectors for {len(texts)} note chunks"
+                )
+            collection = self._coll("notes")
+            await asyncio.to_thread(
+                collection.upsert,
+                ids=ids,
+                embeddings=embeddings,
+                documents=texts,
+                metadatas=metadatas,
+            )
+        if newest > last:
+            collection = self._coll("notes")
+            await asyncio.to_thread(
+                collection.modify,
+                metadata={**(collection.metadata or {}), "last_seq": newest},
+            )
+        return len(texts)
+
+    async def embed_query(self, text: str) -> list[float]:
+        """
+        Embed a query string, reusing recent results (LRU) so the same text is
+        only embedded once. Returns [] if the embedding call produced nothing.
+        """
+        cached = self._query_embeddings.get(text)
+        if cached is not None:
+            return cached
+        vectors = await self._embed_fn([text])
+        if not vectors:
+            return []
+        self._query_embeddings.put(text, vectors[0])
+        return vectors[0]
+
+    async def retrieve(
+        self, query_text: str, top_k: int | None = None, namespace: str = "rules"
+    ) -> list[RetrievedChunk]:
+        """
+        Retrieve top_k most relevant chunks of namespace for the query, with ids, sources and distances.
         """
         k = top_k if top_k is not None else self._top_k
-        if k <= 0:
+        if k <= 0 or self.warming:
             return []
-        query_emb = await self._embed_fn([query_text])
+        await self.wait_ready()
+        query_emb = await self.embed_query(query_text)
         if not query_emb:
             return []
-        count = self._collection.count()
+        return await asyncio.to_thread(self._query, namespace, query_emb, k, query_text)
+
+    def _query(
+        self,
+        namespace: str,
+        query_emb: list[float],
+        k: int,
+        query_text: str = "",
+        budget_tokens: int | None = None,
+        exclude_sources: set[str] | None = None,
+        chars_per_token: float = 4.0,
+    ) -> list[RetrievedChunk]:
+        """
+        Best chunks of namespace (blocking): k chunks, or as many as fit budget_tokens. With a
+        reranker, k * overfetch candidates are fetched and picked by MMR instead of raw similarity.
+        Rules come from the vault's rulebooks in the system index and its own collection, merged.
+        """
+        rerank = self._reranker is not None
+        n = k * self._reranker.settings.overfetch if rerank else k
+        candidates = self._collection_candidates(namespace, query_emb, n, rerank)
+        if namespace == "rules" and self._system_index is not None:
+            candidates += self._system_candidates(query_emb, n, rerank)
+            candidates = sorted(candidates, key=lambda pair: pair[0].distance)[:n]
+        exclude = exclude_sources or set()
+        candidates = [(c, v) for c, v in candidates if c.source not in exclude]
+        chunks = [c for c, _ in candidates]
+        vectors = [v for _, v in candidates]
+        if rerank and candidates and all(v is not None for v in vectors):
+            limit = k if budget_tokens is None else None
+            return self._reranker.rerank(
+                query_text,
+                query_emb,
+                chunks,
+                vectors,
+                budget_tokens,
+                limit,
+                chars_per_token,
+            )
+        if budget_tokens is None:
+            return chunks[:k]
+        return _within_budget(chunks, budget_tokens, chars_per_token)
+
+    def _collection_candidates(
+        self, namespace: str, query_emb: list[float], n: int, with_vectors: bool
+    ) -> list[tuple[RetrievedChunk, Any]]:
+        """The n nearest chunks in namespace's collection, each with its embedding if with_vectors."""
+        collection = self._coll(namespace)
+        count = collection.count()
         if count == 0:
             return []
-        results = self._collection.query(
-            query_embeddings=query_emb,
-            n_results=min(k, count),
-            include=["documents"],
+        include = ["documents", "metadatas", "distances"] + (
+            ["embeddings"] if with_vectors else []
+        )
+        results = collection.query(
+            query_embeddings=[query_emb], n_results=min(n, count), include=include
         )
         docs = results.get("documents")
         if not docs or not docs[0]:
             return []
-        return list(docs[0])
+        ids = results.get("ids", [[]])[0]
+        metas = (results.get("metadatas") or [[]])[0] or [{}] * len(docs[0])
+        distances = (results.get("distances") or [[]])[0] or [0.0] * len(docs[0])
+        embeddings = results.get("embeddings")
+        vectors = (
+            list(embeddings[0]) if embeddings is not None and len(embeddings) else []
+        )
+        return [
+            (
+                RetrievedChunk(
+                    id=id_,
+                    text=doc,
+                    source=(meta or {}).get("source", ""),
+                    distance=float(dist),
+                ),
+                vectors[i] if vectors else None,
+            )
+            for i, (id_, doc, meta, dist) in enumerate(
+                zip(ids, docs[0], metas, distances)
+            )
+        ]
 
-    def delete_by_source(self, source_path: str) -> None:
-        """Remove all chunks that came from the given source path (for re-ingestion)."""
-        # ChromaDB filter by metadata
-        existing = self._collection.get(include=["metadatas"])
-        ids_to_delete = [
-            id_
-            for id_, meta in zip(
-                existing["ids"],
-                existing["metadatas"] or [],
+    def _system_candidates(
+        self, query_emb: list[float], n: int, with_vectors: bool
+    ) -> list[tuple[RetrievedChunk, Any]]:
+        """The n nearest chunks of this vault's rulebooks in the system index."""
+        # hash -> path (the first, if the vault has copies)
+        sources: dict[str, str] = {}
+        for source, file_hash in sorted(
+            self._system_index.bound(self._vault.systems_dir()).items()
+        ):
+            sources.setdefault(file_hash, source)
+        if not sources:
+            return []
+        return [
+            (
+                RetrievedChunk(
+                    id=f"{Path(sources[hit.file_hash]).stem}_{hit.index}",
+                    text=hit.text,
+                    source=sources[hit.file_hash],
+                    distance=hit.distance,
+                ),
+                hit.vector,
             )
-            if (meta or {}).get("source") == source_path
+            for hit in self._system_index.query(sources, query_emb, n, with_vectors)
         ]
+
+    async def retrieve_context(
+        self,
+        query_text: str,
+        top_k: int | None = None,
+        exclude_sources: set[str] | None = None,
+        chars_per_token: float = 4.0,
+    ) -> dict[str, list[RetrievedChunk]]:
+        """
+        Query every namespace with a budget in parallel (one query embedding) and fill each
+        namespace's token budget, best first (reranked when a reranker is set; top_k then only
+        sizes the candidate pool). Chunks whose source is in exclude_sources (e.g. the sheet
+        already in the prompt) are dropped. Chunk sizes are estimated at chars_per_token, the
+        ratio the prompt for the answering model uses (core.prompt.chars_per_token_for).
+        """
+        k = top_k if top_k is not None else self._top_k
+        namespaces = [ns for ns in NAMESPACES if self._budgets.get(ns, 0) > 0]
+        if k <= 0 or self.warming or not namespaces:
+            return {}
+        await self.wait_ready()
+        query_emb = await self.embed_query(query_text)
+        if not query_emb:
+            return {}
+        results = await asyncio.gather(
+            *(
+                asyncio.to_thread(
+                    self._query,
+                    ns,
+                    query_emb,
+                    k,
+                    query_text,
+                    self._budgets[ns],
+                    exclude_sources,
+                    chars_per_token,
+                )
+                for ns in namespaces
+            )
+        )
+        return dict(zip(namespaces, results))
+
+    async def query(self, query_text: str, top_k: int | None = None) -> list[str]:
+        """
+        Retrieve top_k most relevant chunks for the query. Returns list of chunk texts.
+        """
+        return [c.text for c in await self.retrieve(query_text, top_k=top_k)]
+
+    def delete_by_source(self, source_path: str, namespace: str | None = None) -> None:
+        """Remove all chunks that came from the given source path (for re-ingestion)."""
+        namespace = namespace or self.namespace_for(Path(source_path)) or "rules"
+        changed = False
+        if namespace == "rules" and self._system_index is not None:
+            self._system_index.unbind(source_path)
+            changed = self._forget_system_source(source_path)
+        if self._delete_chunks(source_path, namespace) or changed:
+            self._notify_source_changed(source_path)
+
+    def _delete_chunks(self, source_path: str, namespace: str) -> bool:
+        """Remove source_path's chunks from namespace's collection; True if there were any."""
+        collection = self._coll(namespace)
+        ids_to_delete = collection.get(where={"source": source_path}, include=[])["ids"]
         if ids_to_delete:
-            self._collection.delete(ids=ids_to_delete)
+            collection.delete(ids=ids_to_delete)
+        return bool(ids_to_delete)
@@ -0,0 +1,168 @@
+"""
+Post-retrieval reranking for RAG results.
+
+Sliding-window chunks overlap, so a plain top-k by vector similarity often
+spends several slots on nearly the same text. Reranker takes an over-fetched
+candidate list with its stored embeddings and picks chunks by Maximal
+Marginal Relevance (vectorized NumPy): each pick maximizes
+
+    mmr_lambda * relevance - (1 - mmr_lambda) * max similarity to chunks already picked
+
+and candidates at least duplicate_threshold similar (cosine) to a pick are
+dropped outright. Relevance is the cosine similarity to the query, or the
+score of an optional local cross-encoder (sentence-transformers, CPU) when
+one is configured and installed. Selection stops at a token budget rather
+than a fixed count, with the same chars-per-token estimate PromptBuilder uses
+for the prompt those chunks end up in. NumPy is imported on first use, so
+importing the app does not load it.
+"""
+
+import logging
+import math
+import threading
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:  # rag.py imports this module
+    import numpy as np
+
+    from dungeonmaster.ai.rag import RetrievedChunk
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str, chars_per_token: float = 4.0) -> int:
+    """Rough token count for budgeting: characters / chars_per_token, rounded up."""
+    return math.ceil(len(text) / chars_per_token) if text else 0
+
+
+@dataclass
+class RerankSettings:
+    """Candidate over-fetch factor, MMR trade-off and optional cross-encoder model."""
+
+    enabled: bool = True
+    overfetch: int = 4  # candidates fetched = top_k * overfetch
+    mmr_lambda: float = 0.7  # 1.0 = relevance only, 0.0 = diversity only
+    duplicate_threshold: float = 0.95  # cosine similarity treated as the same text
+    cross_encoder: str = ""  # e.g. "cross-encoder/ms-marco-MiniLM-L-6-v2"; "" disables
+
+    @classmethod
+    def from_config(cls, cfg: dict | None) -> "RerankSettings":
+        cfg = cfg or {}
+        return cls(
+            enabled=bool(cfg.get("enabled", True)),
+            overfetch=max(1, int(cfg.get("overfetch", 4))),
+            mmr_lambda=float(cfg.get("mmr_lambda", 0.7)),
+            duplicate_threshold=float(cfg.get("duplicate_threshold", 0.95)),
+            cross_encoder=str(cfg.get("cross_encoder") or ""),
+        )
+
+
+def _normalize(matrix: "np.ndarray") -> "np.ndarray":
+    import numpy as np
+
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+class Reranker:
+    """MMR selection with near-duplicate removal, optional cross-encoder relevance, token budget."""
+
+    def __init__(
+        self, settings: RerankSettings | None = None, cross_encoder: Any = None
+    ):
+        self.settings = settings or RerankSettings()
+        # anything with predict(list[(query, text)]) -> scores
+        self._cross_encoder = cross_encoder
+        self._cross_encoder_failed = False
+        # rerank runs in worker threads; load the model once
+        self._load_lock = threading.Lock()
+
+    def _load_cross_encoder(self) -> Any:
+        if (
+            self._cross_encoder is not None
+            or not self.settings.cross_encoder
+            or self._cross_encoder_failed
+        ):
+            return self._cross_encoder
+        with self._load_lock:
+            if self._cross_encoder is None and not self._cross_encoder_failed:
+                try:
+                    from sentence_transformers import CrossEncoder
+
+                    self._cross_encoder = CrossEncoder(
+                        self.settings.cross_encoder, device="cpu"
+                    )
+                except Exception as e:  # noqa: BLE001 - fall back to MMR on any load error
+                    # not installed, or the model could not be loaded
+                    logger.warning(
+                        "Cross-encoder %s unavailable, using MMR only: %s",
+                        self.settings.cross_encoder,
+                        e,
+                    )
+                    self._cross_encoder_failed = True
+        return self._cross_encoder
+
+    def _relevance(
+        self,
+        query_text: str,
+        query_vec: "np.ndarray",
+        vectors: "np.ndarray",
+        chunks: Sequence["RetrievedChunk"],
+    ) -> "np.ndarray":
+        import numpy as np
+
+        model = self._load_cross_encoder() if query_text else None
+        if model is not None:
+            scores = np.asarray(
+                model.predict([(query_text, c.text) for c in chunks]), dtype=float
+            )
+            # logits -> [0, 1], comparable with cosine
+            return 1.0 / (1.0 + np.exp(-scores))
+        return vectors @ query_vec
+
+    def rerank(
+        self,
+        query_text: str,
+        query_embedding: Sequence[float],
+        chunks: Sequence["RetrievedChunk"],
+        embeddings: Sequence[Sequence[float]],
+        budget_tokens: int | None = None,
+        limit: int | None = None,
+        chars_per_token: float = 4.0,
+    ) -> list["RetrievedChunk"]:
+        """
+        Pick chunks by MMR until budget_tokens (estimated at chars_per_token) or limit chunks
+        are used. Chunks that do not fit the remaining budget are skipped in favour of smaller ones.
+        Returns the picks in selection order (most relevant first).
+        """
+        import numpy as np
+
+        n = len(chunks)
+        if n == 0 or len(embeddings) != n or (limit is not None and limit <= 0):
+            return []
+        vectors = _normalize(np.asarray(embeddings, dtype=float))
+        query_vec = _normalize(np.asarray(query_embedding, dtype=float))
+        relevance = self._relevance(query_text, query_vec, vectors, chunks)
+        similarity = vectors @ vectors.T
+        costs = np.array([estimate_tokens(c.text, chars_per_token) for c in chunks])
+        lam = self.settings.mmr_lambda
+
+        available = np.ones(n, dtype=bool)
+        if budget_tokens is not None:
+            available &= costs <= budget_tokens
+        max_sim = np.zeros(n)
+        picked: list[int] = []
+        used = 0
+        while available.any() and (limit is None or len(picked) < limit):
+            scores = np.where(available, lam * relevance - (1 - lam) * max_sim, -np.inf)
+            best = int(np.argmax(scores))
+            picked.append(best)
+            used += int(costs[best])
+            available[best] = False
+            max_sim = np.maximum(max_sim, similarity[best])
+            available &= max_sim < self.settings.duplicate_threshold
+            if budget_tokens is not None:
+                available &= costs <= budget_tokens - used
+        return [chunks[i] for i in picked]
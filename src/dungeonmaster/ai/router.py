@@ -0,0 +1,318 @@
+"""
+Content-based model routing.
+
+Discord commands only hint at what a message needs: a /status question may be
+pure scene colour, and a plain DM may ask a real rules question. ModelRouter
+scores each message's complexity in [0, 1] with a cheap local classifier and
+picks the provider and model size from the score and the current queue depths:
+
+- score >= ruling_threshold: the ruling provider (large model) adjudicates;
+- score < small_threshold: the narrative provider's small_model, if configured;
+- otherwise: the narrative provider's default model.
+
+The classifier is keyword based (rules vocabulary, questions, dice notation,
+length versus in-character speech), blended with embedding similarity to a few
+prototype ruling/narrative messages when the query embedding is at hand. The
+engine passes the embedding RAG retrieval already computed (RAGStore caches it),
+so routing costs no extra model call; prototypes are embedded once, lazily.
+A command that explicitly asks for a ruling (task_type "ruling", e.g. /status)
+goes to the ruling provider and is never downgraded for load. Only one with no
+rules content at all (a low keyword score, no rules term, and an embedding
+nearer the narrative than the ruling prototypes) is routed like narration, to
+the small model if one is configured; without the embedding it stays a ruling.
+
+When the ruling queue is at ruling_queue_limit, moderately complex messages
+(below must_rule_threshold) are served by the narrative default model instead;
+when the narrative queue is at narrative_queue_limit, messages routed to the
+default narrative model drop to the small model. Each decision is counted in
+metrics as router.<task_type>.<size>.
+"""
+
+import logging
+import math
+import re
+from collections.abc import Awaitable, Callable, Sequence
+from dataclasses import dataclass
+
+from dungeonmaster.metrics import Metrics
+from dungeonmaster.metrics import metrics as default_metrics
+
+logger = logging.getLogger(__name__)
+
+_RULES_TERMS = (
+    "rule",
+    "rules as written",
+    "ruling",
+    "can i",
+    "could i",
+    "am i allowed",
+    "is it possible",
+    "how does",
+    "how do",
+    "does it",
+    "does that",
+    "does this",
+    "does my",
+    "modifier",
+    "bonus",
+    "penalty",
+    "saving throw",
+    "save dc",
+    "make a save",
+    "dc",
+    "difficulty",
+    "advantage",
+    "disadvantage",
+    "opportunity attack",
+    "attack of opportunity",
+    "reaction",
+    "bonus action",
+    "spell slot",
+    "concentration",
+    "in range",
+    "out of range",
+    "within range",
+    "cover",
+    "grapple",
+    "initiative",
+    "hit points",
+    "resistance",
+    "stack",
+    "condition",
+    "prone",
+    "stunned",
+    "multiclass",
+    "feat",
+)
+_NARRATIVE_TERMS = (
+    "i say",
+    "i tell",
+    "i ask",
+    "i look",
+    "i walk",
+    "i open",
+    "i enter",
+    "look around",
+    "describe",
+    "i shout",
+    "i whisper",
+    "i smile",
+    "i nod",
+    "i sit",
+)
+_TERM_PATTERN = {
+    name: re.compile(r"\b(?:" + "|".join(re.escape(t) for t in terms) + r")\b")
+    for name, terms in (("rules", _RULES_TERMS), ("narrative", _NARRATIVE_TERMS))
+}
+# e.g. "[Status/Ruling] ", added by the interface
+_COMMAND_PREFIX = re.compile(r"^\s*\[[^\]]*\]\s*")
+_DICE = re.compile(r"\b\d*d\d+\b")
+_QUOTE = re.compile(r"[\"“][^\"”]{3,}[\"”]")
+
+# Embedded once to place a message between the two kinds of request
+_RULING_PROTOTYPES = (
+    "Can I make an opportunity attack when the enemy moves out of reach?",
+    "Does half cover stack with the shield spell for my armor class?",
+    "How do saving throws work against this spell, and what is the DC?",
+)
+_NARRATIVE_PROTOTYPES = (
+    "I walk into the tavern and look around for the innkeeper.",
+    '"Good evening, friend," I say with a smile.',
+    "Describe the forest as we travel north.",
+)
+
+
+@dataclass
+class RouterSettings:
+    """Complexity thresholds, the small narrative model and queue-depth limits."""
+
+    enabled: bool = True
+    # e.g. "llama3.2:1b"; "" keeps simple messages on the default model
+    small_model: str = ""
+    small_threshold: float = 0.2
+    ruling_threshold: float = 0.55
+    must_rule_threshold: float = 0.85  # rulings this complex wait for the ruling queue
+    # share of the score from prototype similarity (when embedded)
+    embedding_weight: float = 0.5
+    ruling_queue_limit: int = 4  # 0 disables queue-based downgrades
+    narrative_queue_limit: int = 8
+
+    @classmethod
+    def from_config(cls, cfg: dict | None) -> "RouterSettings":
+        cfg = cfg or {}
+        return cls(
+            enabled=bool(cfg.get("enabled", True)),
+            small_model=str(cfg.get("small_model") or ""),
+            small_threshold=float(cfg.get("small_threshold", 0.2)),
+            ruling_threshold=float(cfg.get("ruling_threshold", 0.55)),
+            must_rule_threshold=float(cfg.get("must_rule_threshold", 0.85)),
+            embedding_weight=min(
+                1.0, max(0.0, float(cfg.get("embedding_weight", 0.5)))
+            ),
+            ruling_queue_limit=int(cfg.get("ruling_queue_limit", 4)),
+            narrative_queue_limit=int(cfg.get("narrative_queue_limit", 8)),
+        )
+
+
+@dataclass
+class Route:
+    """Where one message goes: task_type selects the provider, model overrides its default (None keeps it)."""
+
+    task_type: str
+    model: str | None
+    score: float
+    size: str  # "small", "default" or "large"
+    reason: str = ""
+    ruling_busy: bool = False  # the ruling queue was at ruling_queue_limit
+
+
+def keyword_score(text: str) -> float:
+    """Complexity in [0, 1] from rules vocabulary, questions, dice, length and in-character speech."""
+    text = _COMMAND_PREFIX.sub("", text)
+    lowered = text.lower()
+    rules = len(_TERM_PATTERN["rules"].findall(lowered))
+    narrative = len(_TERM_PATTERN["narrative"].findall(lowered)) + len(
+        _QUOTE.findall(text)
+    )
+    raw = (
+        0.2 * min(rules, 4)
+        + 0.15 * min(text.count("?"), 2)
+        + 0.15 * bool(_DICE.search(lowered))
+        + 0.1 * (len(text) > 400)
+        - 0.2 * min(narrative, 3)
+    )
+    return min(1.0, max(0.0, raw))
+
+
+def _cosine(a: Sequence[float], b: Sequence[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+def _centroid(vectors: Sequence[Sequence[float]]) -> list[float]:
+    return [sum(column) / len(vectors) for column in zip(*vectors)]
+
+
+class ModelRouter:
+    """Choose task type and model per message from its complexity and queue depths (see module docstring)."""
+
+    def __init__(
+        self,
+        settings: RouterSettings | None = None,
+        embed_fn: Callable[[list[str]], Awaitable[list[list[float]]]] | None = None,
+        metrics: Metrics | None = None,
+    ):
+        self.settings = settings or RouterSettings()
+        self._embed_fn = embed_fn
+        self._metrics = metrics if metrics is not None else default_metrics
+        self._prototypes: tuple[list[float], list[float]] | None = None
+        self._prototypes_failed = False
+
+    async def _load_prototypes(self) -> tuple[list[float], list[float]] | None:
+        if (
+            self._prototypes is None
+            and self._embed_fn is not None
+            and not self._prototypes_failed
+        ):
+            try:
+                vectors = await self._embed_fn(
+                    [*_RULING_PROTOTYPES, *_NARRATIVE_PROTOTYPES]
+                )
+                split = len(_RULING_PROTOTYPES)
+                if len(vectors) == split + len(_NARRATIVE_PROTOTYPES):
+                    self._prototypes = (
+                        _centroid(vectors[:split]),
+                        _centroid(vectors[split:]),
+                    )
+            except Exception as e:  # noqa: BLE001 - any provider error: keywords only
+                logger.warning(
+                    "Router prototypes could not be embedded, using keywords only: %s",
+                    e,
+                )
+            if self._prototypes is None:
+                self._prototypes_failed = True
+        return self._prototypes
+
+    async def _prototype_lean(self, embedding: Sequence[float] | None) -> float | None:
+        """Cosine to the ruling prototypes minus cosine to the narrative ones, or None without prototypes."""
+        prototypes = await self._load_prototypes() if embedding else None
+        if not prototypes or len(prototypes[0]) != len(embedding):
+            return None
+        ruling, narrative = prototypes
+        return _cosine(embedding, ruling) - _cosine(embedding, narrative)
+
+    async def score(self, text: str, embedding: Sequence[float] | None = None) -> float:
+        """Complexity in [0, 1]: keyword score, blended with prototype similarity when embedding is given."""
+        keywords = keyword_score(text)
+        lean = await self._prototype_lean(embedding)
+        if lean is None:
+            return keywords
+        similarity = min(1.0, max(0.0, 0.5 + 2.5 * lean))
+        weight = self.settings.embedding_weight
+        return (1 - weight) * keywords + weight * similarity
+
+    async def _no_rules_content(
+        self, text: str, embedding: Sequence[float] | None
+    ) -> bool:
+        """True only if keywords and prototypes agree text asks nothing of the rules (see module docstring)."""
+        words = _COMMAND_PREFIX.sub("", text).lower()
+        if keyword_score(text) >= self.settings.small_threshold or _TERM_PATTERN[
+            "rules"
+        ].search(words):
+            return False
+        lean = await self._prototype_lean(embedding)
+        return lean is not None and lean < 0
+
+    async def route(
+        self,
+        text: str,
+        task_type: str = "narrative",
+        embedding: Sequence[float] | None = None,
+        queue_depths: dict[str, int] | None = None,
+    ) -> Route:
+        """
+        Route one message. task_type is the command's: an explicit "ruling" request is never
+        downgraded for load, only when it has no rules content; anything else is routed by content. queue_depths maps
+        "narrative" and "ruling" to requests currently running on those providers.
+        """
+        s = self.settings
+        score = await self.score(text, embedding)
+        depths = queue_depths or {}
+        ruling_busy = 0 < s.ruling_queue_limit <= depths.get("ruling", 0)
+        narrative_busy = 0 < s.narrative_queue_limit <= depths.get("narrative", 0)
+
+        if task_type == "ruling" and await self._no_rules_content(text, embedding):
+            size = "small" if s.small_model else "default"
+            route = Route(
+                "narrative",
+                s.small_model or None,
+                score,
+                size,
+                reason="no rules content",
+            )
+        elif task_type == "ruling":
+            route = Route("ruling", None, score, "large", reason="requested")
+        elif score >= s.ruling_threshold and (
+            score >= s.must_rule_threshold or not ruling_busy
+        ):
+            route = Route("ruling", None, score, "large")
+        elif score >= s.ruling_threshold:
+            route = Route(
+                "narrative", None, score, "default", reason="ruling queue full"
+            )
+        elif s.small_model and score < s.small_threshold:
+            route = Route("narrative", s.small_model, score, "small")
+        elif s.small_model and narrative_busy:
+            route = Route(
+                "narrative",
+                s.small_model,
+                score,
+                "small",
+                reason="narrative queue full",
+            )
+        else:
+            route = Route("narrative", None, score, "default")
+        route.ruling_busy = ruling_busy
+        self._metrics.incr(f"router.{route.task_type}.{route.size}")
+        return route
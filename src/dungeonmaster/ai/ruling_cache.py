@@ -0,0 +1,239 @@
+"""
+Semantic response cache for rulings.
+
+Players at the same table often ask the same rules question in slightly
+different words. RulingCache remembers each ruling reply together with the
+(normalized, unit-length) embedding of the question and a hash of the RAG
+chunks that were retrieved for it. A later ruling whose question embedding is
+similar enough AND whose retrieved chunks hash identically is answered from
+the cache without calling the ruling model, whichever player asks and however
+the scene has changed since. A caller whose rulings depend on more than the
+question and the rules may pass that context too; it is hashed into the key.
+
+Entries are persisted as JSON under vault/_index/ and dropped when any of
+their source files is re-ingested (see RAGStore.add_source_listener). Called
+from the event loop, the file is rewritten in a worker thread.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import re
+import threading
+import time
+from collections.abc import Sequence
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from dungeonmaster.ai.rag import RetrievedChunk
+from dungeonmaster.data.vault import Vault
+
+logger = logging.getLogger(__name__)
+
+_COMMAND_PREFIX = re.compile(r"^\s*\[[^\]]*\]\s*")
+_NON_WORD = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_question(text: str) -> str:
+    """Lowercase, drop a leading [Command] tag and punctuation, collapse whitespace."""
+    text = _COMMAND_PREFIX.sub("", text)
+    text = _NON_WORD.sub(" ", text.lower())
+    return _SPACES.sub(" ", text).strip()
+
+
+def chunks_hash(chunks: Sequence[RetrievedChunk]) -> str:
+    """Stable hash of retrieved chunks (ids and text, in retrieval order)."""
+    h = hashlib.sha256()
+    for c in chunks:
+        h.update(c.id.encode("utf-8"))
+        h.update(b"\0")
+        h.update(c.text.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def context_hash(context: str) -> str:
+    """Hash of the non-RAG context a ruling was made in ("" for none)."""
+    return hashlib.sha256(context.encode("utf-8")).hexdigest() if context else ""
+
+
+def _unit(vector: Sequence[float]) -> list[float]:
+    norm = math.sqrt(sum(v * v for v in vector))
+    if norm == 0:
+        return list(vector)
+    return [v / norm for v in vector]
+
+
+@dataclass
+class CachedRuling:
+    """One cached ruling reply and the retrieval context it was generated for."""
+
+    question: str
+    embedding: list[float]
+    chunks_hash: str
+    reply: str
+    sources: list[str] = field(default_factory=list)
+    created: float = 0.0
+    last_hit: float = 0.0
+    context_hash: str = ""
+
+
+class RulingCache:
+    """
+    Opt-in semantic cache for task_type="ruling" replies, persisted in the vault index.
+    """
+
+    def __init__(
+        self,
+        vault: Vault,
+        similarity_threshold: float = 0.95,
+        max_entries: int = 512,
+        filename: str = "ruling_cache.json",
+    ):
+        self._vault = vault
+        self._path = vault.index_dir() / filename
+        self._threshold = similarity_threshold
+        self._max_entries = max_entries
+        self._entries: list[CachedRuling] = []
+        self.hits = 0
+        self.misses = 0
+        self._save_lock = threading.Lock()
+        # snapshots are written in the order they were taken
+        self._io_lock = threading.Lock()
+        # snapshot waiting for the writer thread
+        self._pending: list[dict] | None = None
+        self._writing = False
+        self._load()
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _load(self) -> None:
+        if not self._path.exists():
+            return
+        try:
+            data = json.loads(self._vault.read_text(self._path))
+            self._entries = [CachedRuling(**e) for e in data.get("entries", [])]
+        except (json.JSONDecodeError, TypeError) as e:
+            logger.warning("Ignoring unreadable ruling cache %s: %s", self._path, e)
+            self._entries = []
+
+    def _save(self) -> None:
+        """Persist the entries; from the event loop, in a worker thread (latest snapshot wins)."""
+        snapshot = [asdict(e) for e in self._entries]
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._write(snapshot)
+            return
+        with self._save_lock:
+            self._pending = snapshot
+            if self._writing:
+                return
+            self._writing = True
+        loop.run_in_executor(None, self._write_pending)
+
+    def _write_pending(self) -> None:
+        while True:
+            with self._io_lock:
+                with self._save_lock:
+                    snapshot, self._pending = self._pending, None
+                    if snapshot is None:
+                        self._writing = False
+                        return
+                try:
+                    self._write(snapshot)
+                except OSError as e:
+                    logger.warning("Could not save ruling cache %s: %s", self._path, e)
+
+    def _write(self, snapshot: list[dict]) -> None:
+        self._vault.write_text(self._path, json.dumps({"entries": snapshot}))
+
+    def flush(self) -> None:
+        """Write any snapshot still waiting for the writer thread (blocking)."""
+        with self._io_lock:
+            with self._save_lock:
+                snapshot, self._pending = self._pending, None
+            if snapshot is not None:
+                self._write(snapshot)
+
+    def lookup(
+        self,
+        question: str,
+        embedding: Sequence[float],
+        chunks: Sequence[RetrievedChunk],
+        context: str = "",
+    ) -> str | None:
+        """Return a cached reply for a similar question over the same chunks and context, or None."""
+        key = chunks_hash(chunks)
+        context_key = context_hash(context)
+        normalized = normalize_question(question)
+        query = _unit(embedding)
+        best: CachedRuling | None = None
+        best_score = self._threshold
+        for entry in self._entries:
+            if entry.chunks_hash != key or entry.context_hash != context_key:
+                continue
+            if entry.question == normalized:
+                best = entry
+                break
+            if len(entry.embedding) != len(query):
+                continue
+            score = sum(a * b for a, b in zip(entry.embedding, query))
+            if score >= best_score:
+                best, best_score = entry, score
+        if best is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        best.last_hit = time.time()
+        return best.reply
+
+    def store(
+        self,
+        question: str,
+        embedding: Sequence[float],
+        chunks: Sequence[RetrievedChunk],
+        reply: str,
+        context: str = "",
+    ) -> None:
+        """Cache a ruling reply made in context; evicts least recently used entries beyond max_entries."""
+        if not reply:
+            return
+        now = time.time()
+        self._entries.append(
+            CachedRuling(
+                question=normalize_question(question),
+                embedding=_unit(embedding),
+                chunks_hash=chunks_hash(chunks),
+                reply=reply,
+                sources=sorted({c.source for c in chunks if c.source}),
+                created=now,
+                last_hit=now,
+                context_hash=context_hash(context),
+            )
+        )
+        if len(self._entries) > self._max_entries:
+            self._entries.sort(key=lambda e: e.last_hit)
+            del self._entries[: len(self._entries) - self._max_entries]
+        self._save()
+
+    def invalidate_source(self, source_path: str) -> int:
+        """Drop every entry built from chunks of source_path. Returns number removed."""
+        before = len(self._entries)
+        self._entries = [e for e in self._entries if source_path not in e.sources]
+        removed = before - len(self._entries)
+        if removed:
+            self._save()
+        return removed
+
+    def clear(self) -> None:
+        self._entries = []
+        self._save()
@@ -0,0 +1,201 @@
+"""
+Structured output in model replies.
+
+The DM model ends a reply with a fenced ```json-patch block (a scene delta) or
+a ```json block (a whole scene, or {"scene_patch": ...}). FencedBlockParser
+finds these blocks incrementally: feed() it text chunks as they stream in and
+it returns each block as soon as its closing fence arrives, so the engine can
+apply a scene update before generation ends. As in Markdown, a closing fence
+must start a line. Scanning is a forward str.find over the new text only; an
+unterminated block at the end of the reply is recovered by finish().
+
+Block bodies are parsed with loads_lenient() (tolerates surrounding prose and
+trailing commas; it lives in ai/providers/json_output.py, so the provider layer
+does not depend on the scene schema) and turned into scene updates by scene_update(), which checks
+them against the SceneState schema (data/state.py validate_scene) instead of
+letting malformed output silently vanish: a block that cannot be used comes
+back with an error, so callers can ask a provider to repair it.
+SCENE_PATCH_SCHEMA is the JSON Schema handed to provider-native structured
+modes (Ollama format, Claude tool use) via generate_structured().
+"""
+
+from dataclasses import dataclass
+from typing import Any
+
+from dungeonmaster.ai.providers.json_output import StructuredOutputError, loads_lenient
+from dungeonmaster.data.state import ENTITY_TYPES, validate_scene
+
+_FENCE = "```"
+_BLOCK_KINDS = ("json", "json-patch")
+
+SCENE_PATCH_SCHEMA: dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "scene_id": {"type": "string"},
+        "location": {
+            "type": "object",
+            "properties": {
+                "name": {"type": "string"},
+                "description": {"type": "string"},
+            },
+            "additionalProperties": False,
+        },
+        "positions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "entity_id": {"type": "string"},
+                    "entity_type": {"type": "string", "enum": list(ENTITY_TYPES)},
+                    "x": {"type": "number"},
+                    "y": {"type": "number"},
+                    "zone": {"type": "string"},
+                    "remove": {"type": "boolean"},
+                },
+                "required": ["entity_id"],
+                "additionalProperties": False,
+            },
+        },
+        "turn_order": {"type": "array", "items": {"type": "string"}},
+    },
+    "additionalProperties": False,
+}
+
+
+@dataclass
+class StructuredSettings:
+    """How the engine handles scene updates in replies."""
+
+    # Stream replies and apply each update as soon as its block closes. Off by default: the
+    # interface gets the reply only once it is complete, and a streamed call is neither hedged
+    # nor failed over after its first chunk (ai/pool.py), so streaming only costs resilience.
+    stream: bool = False
+    repair: bool = True  # ask for a schema-constrained fix of an unusable update
+
+    @classmethod
+    def from_config(cls, cfg: dict | None) -> "StructuredSettings":
+        cfg = cfg or {}
+        return cls(
+            stream=bool(cfg.get("stream", False)), repair=bool(cfg.get("repair", True))
+        )
+
+
+@dataclass
+class FencedBlock:
+    """One ```json / ```json-patch block: its kind, raw body, and whether its fence was closed."""
+
+    kind: str
+    body: str
+    closed: bool = True
+
+
+@dataclass
+class SceneUpdate:
+    """A usable scene update ("patch" or "scene" with its data), or the error that made a block unusable."""
+
+    kind: str
+    data: Any = None
+    error: str | None = None
+    source: str = ""  # raw block body, for repair prompts
+
+
+class FencedBlockParser:
+    """Incremental scanner for ```json / ```json-patch blocks in streamed text (see module docstring)."""
+
+    def __init__(self) -> None:
+        self._buf = ""
+        self._pos = 0  # scanning resumes here
+        # inside a block: its kind ("" for other languages)
+        self._kind: str | None = None
+        self._body_start = 0
+
+    @property
+    def text(self) -> str:
+        """All text fed so far."""
+        return self._buf
+
+    def feed(self, chunk: str) -> list[FencedBlock]:
+        """Add a chunk of text; return the blocks whose closing fence it completed."""
+        self._buf += chunk
+        blocks: list[FencedBlock] = []
+        while True:
+            if self._kind is None:
+                start = self._buf.find(_FENCE, self._pos)
+                if start < 0:
+                    self._pos = max(self._pos, len(self._buf) - len(_FENCE) + 1)
+                    return blocks
+                newline = self._buf.find("\n", start + len(_FENCE))
+                if newline < 0:
+                    self._pos = start  # info string not complete yet
+                    return blocks
+                info = self._buf[start + len(_FENCE) : newline].strip().lower()
+                self._kind = info if info in _BLOCK_KINDS else ""
+                self._body_start = self._pos = newline + 1
+            else:
+                # A closing fence starts a line; ``` inside a code line does not end the block
+                newline = self._buf.find("\n" + _FENCE, self._pos - 1)
+                if newline < 0:
+                    self._pos = max(self._body_start, len(self._buf) - len(_FENCE))
+                    return blocks
+                if self._kind:
+                    blocks.append(
+                        FencedBlock(
+                            self._kind, self._buf[self._body_start : newline + 1]
+                        )
+                    )
+                self._kind = None
+                self._pos = newline + 1 + len(_FENCE)
+
+    def finish(self) -> list[FencedBlock]:
+        """End of text: return a block left open by a truncated reply (if it was json/json-patch)."""
+        if not self._kind:
+            return []
+        block = FencedBlock(self._kind, self._buf[self._body_start :], closed=False)
+        self._kind = None
+        return [block]
+
+
+def fenced_blocks(text: str) -> list[FencedBlock]:
+    """All json/json-patch blocks in a complete reply, including an unterminated last one."""
+    parser = FencedBlockParser()
+    return parser.feed(text) + parser.finish()
+
+
+def _patch_errors(patch: Any) -> list[str]:
+    if isinstance(patch, list):
+        bad = [
+            op
+            for op in patch
+            if not isinstance(op, dict) or "op" not in op or "path" not in op
+        ]
+        return [f"JSON Patch operations need op and path: {bad[0]!r}"] if bad else []
+    if not isinstance(patch, dict):
+        return ["scene patch must be an object or a list of operations"]
+    unknown = sorted(set(patch) - set(SCENE_PATCH_SCHEMA["properties"]))
+    return [f"unknown scene fields: {', '.join(unknown)}"] if unknown else []
+
+
+def scene_update(block: FencedBlock) -> SceneUpdate | None:
+    """
+    Scene update held by block: a json-patch delta, a {"scene_patch": ...} object or a whole
+    scene (checked against the SceneState schema). None for a ```json block that is not
+    about the scene; a SceneUpdate with error set for one that is but cannot be used.
+    """
+    try:
+        data = loads_lenient(block.body)
+    except StructuredOutputError as e:
+        return SceneUpdate(
+            "patch" if block.kind == "json-patch" else "scene",
+            error=str(e),
+            source=block.body,
+        )
+    if block.kind == "json-patch" or (isinstance(data, dict) and "scene_patch" in data):
+        patch = data if block.kind == "json-patch" else data["scene_patch"]
+        errors = _patch_errors(patch)
+        return SceneUpdate("patch", patch, "; ".join(errors) or None, block.body)
+    if not isinstance(data, dict) or not (
+        {"scene_id", "location", "positions"} & set(data)
+    ):
+        return None  # some other JSON the model showed the players
+    errors = validate_scene(data)
+    return SceneUpdate("scene", data, "; ".join(errors) or None, block.body)
@@ -0,0 +1,198 @@
+"""
+Content-addressed rulebook index shared by every vault on a host.
+
+Campaigns that play the same game system usually carry identical copies of the
+same rulebooks in their systems/ folders. Indexed per vault, each copy is
+embedded again into its own Chroma collection. SystemIndex stores the chunks
+and embeddings of a rulebook once, keyed by its content hash (the hash RAGStore
+already records per source: the chunk texts, so chunking settings are part of
+the key), in one immutable file per rulebook:
+
+    <root>/<embedding model>/<hash[:2]>/<hash>.npz
+
+A file is written to a temporary name and renamed into place, and is never
+modified afterwards, so any number of processes can share the directory without
+locking, and a read_only index (e.g. a mount built by another host) is only
+ever read. RAGStore binds each of its rulebook paths to a hash (bind()), and
+query() searches the bound rulebooks by squared L2 distance, the metric of the
+per-campaign Chroma collections its results are merged with. Rulebooks a
+read-only index does not have are indexed in the campaign's own collection.
+"""
+
+import os
+import re
+import tempfile
+import threading
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+_MODEL_DIR = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+@dataclass
+class SystemIndexSettings:
+    """Where the shared rulebook index lives and whether this process may add to it."""
+
+    enabled: bool = False
+    path: str = "data/_index/systems"
+    # only use rulebooks already in the index (e.g. a shared read-only mount)
+    read_only: bool = False
+
+    @classmethod
+    def from_config(cls, cfg: dict | None) -> "SystemIndexSettings":
+        cfg = cfg or {}
+        return cls(
+            enabled=bool(cfg.get("enabled", False)),
+            path=str(cfg.get("path") or "data/_index/systems"),
+            read_only=bool(cfg.get("read_only", False)),
+        )
+
+
+@dataclass
+class SystemChunk:
+    """A chunk returned by SystemIndex.query(): its rulebook hash, position, text and distance."""
+
+    file_hash: str
+    index: int
+    text: str
+    distance: float
+    vector: list[float] | None = None
+
+
+class SystemIndex:
+    """Shared, content-addressed store of rulebook chunks and embeddings (see module docstring)."""
+
+    def __init__(self, root: str | Path, model: str = "", read_only: bool = False):
+        self._dir = Path(root).expanduser() / (
+            _MODEL_DIR.sub("_", model).strip("_.") or "default"
+        )
+        self._read_only = read_only
+        self._lock = threading.Lock()
+        # hash -> (texts, float32 matrix)
+        self._loaded: dict[str, tuple[list[str], Any]] = {}
+        self._sources: dict[str, str] = {}  # source path -> hash
+
+    @property
+    def directory(self) -> Path:
+        return self._dir
+
+    @property
+    def writable(self) -> bool:
+        return not self._read_only
+
+    def _path(self, file_hash: str) -> Path:
+        return self._dir / file_hash[:2] / f"{file_hash}.npz"
+
+    def has(self, file_hash: str) -> bool:
+        """True if the rulebook with this hash is in the index."""
+        return file_hash in self._loaded or self._path(file_hash).is_file()
+
+    def add(
+        self, file_hash: str, texts: list[str], embeddings: list[list[float]]
+    ) -> None:
+        """Store a rulebook's chunks and embeddings under its hash (no-op if already stored)."""
+        import numpy as np
+
+        if self._read_only:
+            raise PermissionError(f"system index {self._dir} is read-only")
+        if len(texts) != len(embeddings):
+            raise ValueError(f"{len(texts)} chunks but {len(embeddings)} embeddings")
+        path = self._path(file_hash)
+        if path.is_file():
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        fd, tmp = tempfile.mkstemp(
+            dir=path.parent, prefix=f".{file_hash}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, embeddings=matrix, texts=np.asarray(texts, dtype=str))
+                f.flush()
+                os.fsync(f.fileno())
+            # another process storing the same hash writes identical content
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except FileNotFoundError:
+                pass
+            raise
+        with self._lock:
+            self._loaded[file_hash] = (list(texts), matrix)
+
+    def _load(self, file_hash: str) -> tuple[list[str], Any] | None:
+        import numpy as np
+
+        with self._lock:
+            entry = self._loaded.get(file_hash)
+        if entry is not None:
+            return entry
+        try:
+            with np.load(self._path(file_hash), allow_pickle=False) as data:
+                entry = (
+                    [str(t) for t in data["texts"]],
+                    data["embeddings"].astype(np.float32, copy=False),
+                )
+        except (OSError, KeyError, ValueError):
+            return None
+        with self._lock:
+            return self._loaded.setdefault(file_hash, entry)
+
+    def bind(self, source: str, file_hash: str) -> None:
+        """Serve source (a rulebook path) from the stored rulebook with this hash."""
+        with self._lock:
+            self._sources[source] = file_hash
+
+    def unbind(self, source: str) -> str | None:
+        """Stop serving source; returns the hash it was bound to."""
+        with self._lock:
+            return self._sources.pop(source, None)
+
+    def bound(self, under: Path | None = None) -> dict[str, str]:
+        """Bound source paths (those below the directory under, if given) and their hashes."""
+        with self._lock:
+            sources = dict(self._sources)
+        if under is None:
+            return sources
+        return {
+            source: h
+            for source, h in sources.items()
+            if Path(source).is_relative_to(under)
+        }
+
+    def query(
+        self,
+        hashes: Iterable[str],
+        query_emb: list[float],
+        n: int,
+        with_vectors: bool = False,
+    ) -> list[SystemChunk]:
+        """The n chunks of the given rulebooks nearest query_emb (squared L2), nearest first."""
+        import numpy as np
+
+        if n <= 0:
+            return []
+        query = np.asarray(query_emb, dtype=np.float32)
+        hits: list[SystemChunk] = []
+        for file_hash in sorted(set(hashes)):
+            entry = self._load(file_hash)
+            if entry is None or not entry[0] or entry[1].shape[1:] != query.shape:
+                continue
+            texts, matrix = entry
+            distances = ((matrix - query) ** 2).sum(axis=1)
+            top = np.argsort(distances)[:n] if len(texts) > n else np.arange(len(texts))
+            hits.extend(
+                SystemChunk(
+                    file_hash=file_hash,
+                    index=int(i),
+                    text=texts[i],
+                    distance=float(distances[i]),
+                    vector=matrix[i].tolist() if with_vectors else None,
+                )
+                for i in top
+            )
+        hits.sort(key=lambda hit: hit.distance)
+        return hits[:n]
@@ -65,18 +65,136 @@ def load_config(path: str | Path | None = None) -> dict[str, Any]:
 def _default_config_dict() -> dict[str, Any]:
     """Minimal default config when no file is present."""
     return {
-        "vault": {"path": "data"},
+        "vault": {"path": "data", "fsync": "batch", "fsync_interval": 1.0},
         "ai": {
             "ollama": {
                 "base_url": "http://localhost:11434",
                 "narrative_model": "llama3.2",
                 "embedding_model": "nomic-embed-text",
+                "hosts": [],
             },
             "claude": {
                 "api_key": os.environ.get("ANTHROPIC_API_KEY", ""),
                 "ruling_model": "claude-3-5-sonnet-20241022",
+                "rate_limit": {
+                    "requests_per_minute": 50,
+                    "tokens_per_minute": 40000,
+                    "output_tokens_per_minute": 8000,
+                    "max_retries": 5,
+                    "base_delay": 1.0,
+                    "max_delay": 30.0,
+                },
+            },
+            "pool": {
+                "health_interval": 30,
+                "failure_threshold": 3,
+                "cooldown": 30,
+                "hedge": False,
+                "hedge_min_samples": 20,
+            },
+            "router": {
+                "enabled": True,
+                "small_model": "",
+                "small_threshold": 0.2,
+                "ruling_threshold": 0.55,
+                "must_rule_threshold": 0.85,
+                "embedding_weight": 0.5,
+                "ruling_queue_limit": 4,
+                "narrative_queue_limit": 8,
+            },
+            "ruling_cache": {
+                "enabled": False,
+                "similarity_threshold": 0.95,
+                "max_entries": 512,
+            },
+        },
+        "rag": {
+            "chunk_size": 512,
+            "chunk_overlap": 64,
+            "top_k": 5,
+            "budgets": {"rules": 1500, "notes": 500, "entities": 400},
+            "rerank": {
+                "enabled": True,
+                "overfetch": 4,
+                "mmr_lambda": 0.7,
+                "duplicate_threshold": 0.95,
+                "cross_encoder": "",
+            },
+            "system_index": {
+                "enabled": False,
+                "path": "data/_index/systems",
+                "read_only": False,
+            },
+            "preprocess": {"workers": 2, "batch_files": 8},
+        },
+        "engine": {
+            "scene_radius": 30.0,
+            "max_scene_positions": 25,
+            "entity_budget": 1500,
+            "max_entities": 3,
+            "sheet_budget": {"narrative": 1200, "ruling": 4000},
+            "prompt_budget": {"narrative": 3000, "ruling": 6000},
+            "chars_per_token": {
+                "claude*": 3.5,
+                "llama*": 3.8,
+                "mistral*": 3.6,
+                "*": 4.0,
+            },
+            "speculative": {
+                "enabled": False,
+                "min_score": 0.3,
+                "draft_model": "",
+                "revise": True,
+            },
+            "structured": {"stream": False, "repair": True},
+            "pregen": {
+                "enabled": False,
+                "idle_in_flight": 0,
+                "poll_interval": 0.5,
+                "max_npcs": 3,
+                "max_scenes": 8,
+                "max_question_chars": 120,
+            },
+            "rounds": {"enabled": False, "window": 30.0, "min_players": 2},
+        },
+        "campaigns": {
+            "default": "",
+            "root": "data/campaigns",
+            "systems_path": "data/systems",
+            "index_path": "data/_index/chroma",
+            "hosted": {},
+        },
+        "notes": {
+            "max_bytes": 65536,
+            "summary": {
+                "enabled": True,
+                "min_chars": 3000,
+                "batch_chars": 12000,
+                "max_chars": 1500,
+                "interval": 60.0,
+            },
+        },
+        "state": {
+            "feed": {
+                "enabled": False,
+                "host": "127.0.0.1",
+                "port": 8765,
+                "unix_socket": "",
+                "history": 256,
+            },
+        },
+        "discord": {
+            "token": os.environ.get("DISCORD_BOT_TOKEN", ""),
+            "dm_only": True,
+            "attach_threshold": 8000,
+            "admission": {
+                "user_burst": 3,
+                "user_per_minute": 10,
+                "guild_burst": 20,
+                "guild_per_minute": 60,
+                "max_in_flight_per_user": 1,
+                "max_queued_per_user": 3,
+                "max_concurrent": 2,
             },
         },
-        "rag": {"chunk_size": 512, "chunk_overlap": 64, "top_k": 5},
-        "discord": {"token": os.environ.get("DISCORD_BOT_TOKEN", ""), "dm_only": True},
     }
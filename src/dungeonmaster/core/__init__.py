@@ -1,7 +1,36 @@
 """Core engine: session management, message routing, note-taking."""
 
+from dungeonmaster.core.admission import (
+    AdmissionController,
+    AdmissionRejected,
+    AdmissionSettings,
+)
+from dungeonmaster.core.campaigns import Campaign, CampaignRegistry, CampaignSettings
 from dungeonmaster.core.engine import Engine
-from dungeonmaster.core.session import Session, SessionManager
+from dungeonmaster.core.note_summary import NoteSummarizer, NoteSummarySettings
 from dungeonmaster.core.note_taker import NoteTaker
+from dungeonmaster.core.pregen import PregenSettings, ScenePregenerator
+from dungeonmaster.core.rounds import RoundCoordinator, RoundSettings
+from dungeonmaster.core.session import Session, SessionManager
+from dungeonmaster.core.speculative import SpeculativeNarrator, SpeculativeSettings
 
-__all__ = ["Engine", "Session", "SessionManager", "NoteTaker"]
+__all__ = [
+    "AdmissionController",
+    "AdmissionRejected",
+    "AdmissionSettings",
+    "Campaign",
+    "CampaignRegistry",
+    "CampaignSettings",
+    "Engine",
+    "NoteSummarizer",
+    "NoteSummarySettings",
+    "NoteTaker",
+    "PregenSettings",
+    "RoundCoordinator",
+    "RoundSettings",
+    "ScenePregenerator",
+    "Session",
+    "SessionManager",
+    "SpeculativeNarrator",
+    "SpeculativeSettings",
+]
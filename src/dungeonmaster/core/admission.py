@@ -0,0 +1,277 @@
+"""
+Admission control: per-user and per-guild throttling with fair scheduling.
+
+Every player request passes through an AdmissionController before it reaches
+the engine. A new request is refused outright when the player's (or guild's)
+token bucket is empty or the player already has too many requests queued.
+Admitted requests wait in per-user queues; at most max_concurrent run at once,
+at most max_in_flight_per_user per player, and free slots are handed out
+round-robin across players (least recently served first) so one busy player
+cannot starve the table.
+Callers can pass on_queued to tell a player their position in line.
+"""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, fields
+from typing import Any
+
+from dungeonmaster.ai.providers.rate_limit import TokenBucket
+from dungeonmaster.metrics import Metrics
+from dungeonmaster.metrics import metrics as default_metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AdmissionSettings:
+    """Limits for an AdmissionController. A rate or count of 0 disables that limit."""
+
+    user_burst: int = 3
+    user_per_minute: float = 10.0
+    guild_burst: int = 20
+    guild_per_minute: float = 60.0
+    max_in_flight_per_user: int = 1
+    max_queued_per_user: int = 3
+    max_concurrent: int = 2
+
+    @classmethod
+    def from_config(cls, cfg: dict[str, Any] | None) -> "AdmissionSettings":
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in (cfg or {}).items() if k in known})
+
+
+class AdmissionRejected(Exception):
+    """A request was refused: reason is "rate_limited" or "queue_full"."""
+
+    def __init__(self, reason: str, retry_after: float | None = None):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Throttle and schedule requests per user. Use `async with controller.slot(user_id, guild_id)`
+    around the work; raises AdmissionRejected before queueing if the request is refused.
+    """
+
+    def __init__(
+        self,
+        settings: AdmissionSettings | None = None,
+        metrics: Metrics | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.settings = settings or AdmissionSettings()
+        self._metrics = metrics or default_metrics
+        self._clock = clock
+        self._user_buckets: dict[str, TokenBucket] = {}
+        self._guild_buckets: dict[str, TokenBucket] = {}
+        self._waiting: dict[str, deque[asyncio.Future]] = {}
+        self._order: list[str] = []  # users with queued requests, in arrival order
+        # user -> sequence number of their latest slot
+        self._last_grant: dict[str, int] = {}
+        # queued user -> grant count when they started waiting
+        self._queued_since: dict[str, int] = {}
+        self._grants = 0
+        self._in_flight: dict[str, int] = defaultdict(int)
+        self._active = 0
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(q) for q in self._waiting.values())
+
+    def in_flight(self, user_id: str) -> int:
+        return self._in_flight.get(user_id, 0)
+
+    def _bucket(
+        self, table: dict[str, TokenBucket], key: str, burst: int, per_minute: float
+    ) -> TokenBucket | None:
+        if per_minute <= 0 or burst <= 0:
+            return None
+        bucket = table.get(key)
+        if bucket is None:
+            bucket = table[key] = TokenBucket(burst, per_minute / 60.0, self._clock)
+        return bucket
+
+    def check(self, user_id: str, guild_id: str | None = None) -> None:
+        """Charge the user's and guild's buckets, or raise AdmissionRejected without charging either."""
+        s = self.settings
+        if (
+            s.max_queued_per_user
+            and len(self._waiting.get(user_id, ())) >= s.max_queued_per_user
+        ):
+            self._reject("queue_full")
+        buckets = [
+            self._bucket(self._user_buckets, user_id, s.user_burst, s.user_per_minute)
+        ]
+        if guild_id is not None:
+            buckets.append(
+                self._bucket(
+                    self._guild_buckets, guild_id, s.guild_burst, s.guild_per_minute
+                )
+            )
+        buckets = [b for b in buckets if b is not None]
+        wait = max((b.wait_time(1) for b in buckets), default=0.0)
+        if wait > 0:
+            self._reject("rate_limited", wait)
+        for bucket in buckets:
+            bucket.consume(1)
+
+    def _reject(self, reason: str, retry_after: float | None = None) -> None:
+        self._metrics.incr(f"admission.rejected.{reason}")
+        raise AdmissionRejected(reason, retry_after)
+
+    def _next_user(self, users: list[str], last_grant: dict[str, int]) -> str:
+        # Least recently served first; never-served users (-1) in arrival order
+        return min(users, key=lambda u: last_grant.get(u, -1))
+
+    def position(
+        self, user_id: str, waiter: asyncio.Future | None = None
+    ) -> int | None:
+        """1-based position in the fair dispatch order of a queued request (default: the user's next)."""
+        queues = {u: deque(self._waiting[u]) for u in self._order}
+        if waiter is None:
+            if not queues.get(user_id):
+                return None
+            waiter = queues[user_id][0]
+        order = list(self._order)
+        last_grant = dict(self._last_grant)
+        seq = self._grants
+        position = 0
+        while order:
+            user = self._next_user(order, last_grant)
+            position += 1
+            if queues[user].popleft() is waiter:
+                return position
+            seq += 1
+            last_grant[user] = seq
+            if not queues[user]:
+                order.remove(user)
+        return None
+
+    async def acquire(
+        self,
+        user_id: str,
+        guild_id: str | None = None,
+        on_queued: Callable[[int], Awaitable[Any]] | None = None,
+    ) -> float:
+        """Wait for a slot; returns seconds queued. Pair with release(user_id)."""
+        self.check(user_id, guild_id)
+        start = self._clock()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(user_id, deque()).append(waiter)
+        if user_id not in self._order:
+            self._order.append(user_id)
+            self._queued_since[user_id] = self._grants
+        self._dispatch()
+        try:
+            if not waiter.done() and on_queued is not None:
+                position = self.position(user_id, waiter)
+                try:
+                    await on_queued(position or 1)
+                except Exception as e:  # noqa: BLE001 - a failed notice must not lose the queue slot
+                    logger.debug("Queue position notice failed: %s", e)
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted, but the caller went away before using the slot
+                self.release(user_id)
+            else:
+                self._discard(user_id, waiter)
+            raise
+        waited = self._clock() - start
+        self._metrics.observe("admission.wait", waited)
+        return waited
+
+    def release(self, user_id: str) -> None:
+        self._in_flight[user_id] -= 1
+        if self._in_flight[user_id] <= 0:
+            del self._in_flight[user_id]
+        self._active -= 1
+        self._dispatch()
+        self._prune()
+
+    def _prune(self) -> None:
+        """
+        Forget grants made before the oldest request now waiting arrived, for users with
+        nothing queued or running. With nobody waiting, every grant is kept: the user just
+        served must not look never served to the next arrivals.
+        """
+        if not self._queued_since:
+            return
+        oldest = min(self._queued_since.values())
+        stale = [
+            u
+            for u, seq in self._last_grant.items()
+            if seq < oldest and u not in self._waiting and u not in self._in_flight
+        ]
+        for user in stale:
+            del self._last_grant[user]
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        user_id: str,
+        guild_id: str | None = None,
+        on_queued: Callable[[int], Awaitable[Any]] | None = None,
+    ) -> AsyncIterator[float]:
+        waited = await self.acquire(user_id, guild_id, on_queued)
+        try:
+            yield waited
+        finally:
+            self.release(user_id)
+
+    def _discard(self, user_id: str, waiter: asyncio.Future) -> None:
+        queue = self._waiting.get(user_id)
+        if queue is None:
+            return
+        try:
+            queue.remove(waiter)
+        except ValueError:
+            pass
+        if not queue:
+            del self._waiting[user_id]
+            self._order.remove(user_id)
+            del self._queued_since[user_id]
+        self._record_depth()
+
+    def _dispatch(self) -> None:
+        """Hand free slots to queued requests, least recently served user first."""
+        s = self.settings
+        while self._order and (not s.max_concurrent or self._active < s.max_concurrent):
+            eligible = [
+                u
+                for u in self._order
+                if not s.max_in_flight_per_user
+                or self.in_flight(u) < s.max_in_flight_per_user
+            ]
+            if not eligible:
+                break  # every queued user is at their in-flight cap
+            user = self._next_user(eligible, self._last_grant)
+            queue = self._waiting[user]
+            waiter = queue.popleft()
+            if not queue:
+                del self._waiting[user]
+                self._order.remove(user)
+                del self._queued_since[user]
+            if waiter.done():
+                continue  # cancelled while queued
+            self._grants += 1
+            self._last_grant[user] = self._grants
+            self._in_flight[user] += 1
+            self._active += 1
+            waiter.set_result(None)
+        self._record_depth()
+
+    def _record_depth(self) -> None:
+        self._metrics.gauge("admission.queue_depth", self.queue_depth)
+        self._metrics.gauge("admission.active", self._active)
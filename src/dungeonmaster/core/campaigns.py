@@ -0,0 +1,126 @@
+"""
+Campaigns hosted in one process.
+
+By default a process serves one campaign from vault.path. With campaigns.hosted
+configured it serves several, and each one gets its own vault (notes,
+characters, NPCs, scene state), engine, sessions and ruling cache. Provider
+clients, the query-embedding cache and the vector index client are built once
+and shared. Campaigns that name the same game system share one rulebook
+directory (<systems_path>/<system>/) and one rules collection in the index, so
+a rulebook is chunked and embedded once however many tables use it.
+
+CampaignRegistry maps each request to a campaign: by the player's Discord user
+id, else by the guild the request came from, else the default campaign.
+Players no campaign claims are turned away.
+"""
+
+import re
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from dungeonmaster.core.engine import Engine
+from dungeonmaster.core.rounds import RoundCoordinator
+
+_NAME = re.compile(r"[^a-z0-9_-]+")
+
+
+def safe_name(name: str) -> str:
+    """name as used in collection and directory names (lowercase letters, digits, - and _)."""
+    return _NAME.sub("_", name.lower()).strip("_") or "campaign"
+
+
+@dataclass
+class CampaignSettings:
+    """One hosted campaign: its vault, game system and the users/guilds that play in it."""
+
+    name: str
+    vault: str
+    # campaigns with the same system share rulebooks and their index; "" = own systems/
+    system: str = ""
+    users: list[str] = field(default_factory=list)
+    guilds: list[str] = field(default_factory=list)
+
+    @classmethod
+    def from_config(
+        cls, name: str, cfg: dict | None, campaigns_root: str | Path = "data/campaigns"
+    ) -> "CampaignSettings":
+        cfg = cfg or {}
+        return cls(
+            name=name,
+            vault=str(cfg.get("vault") or Path(campaigns_root) / safe_name(name)),
+            system=str(cfg.get("system") or ""),
+            users=[str(u) for u in cfg.get("users") or []],
+            guilds=[str(g) for g in cfg.get("guilds") or []],
+        )
+
+    def collection_names(self) -> dict[str, str]:
+        """Vector index collections: rules shared per system, notes and entities per campaign."""
+        own = safe_name(self.name)
+        rules = (
+            f"rules_{safe_name(self.system)}"
+            if self.system
+            else f"rules_campaign_{own}"
+        )
+        return {"rules": rules, "notes": f"notes_{own}", "entities": f"entities_{own}"}
+
+
+@dataclass
+class Campaign:
+    """A running campaign: its engine and what the Discord bot needs to serve it."""
+
+    name: str
+    engine: Engine
+    rounds: RoundCoordinator | None = None
+    notes_summary: Callable[[], str] | None = None
+
+
+class CampaignRegistry:
+    """Map Discord users and guilds to hosted campaigns (see module docstring)."""
+
+    def __init__(self, default: str = ""):
+        self.default = default
+        self._campaigns: dict[str, Campaign] = {}
+        self._by_user: dict[str, str] = {}
+        self._by_guild: dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._campaigns)
+
+    @property
+    def campaigns(self) -> list[Campaign]:
+        return list(self._campaigns.values())
+
+    def get(self, name: str) -> Campaign | None:
+        return self._campaigns.get(name)
+
+    def add(
+        self,
+        campaign: Campaign,
+        users: list[str] | None = None,
+        guilds: list[str] | None = None,
+    ) -> None:
+        """Host campaign for these users and guilds. A user or guild can belong to one campaign only."""
+        if campaign.name in self._campaigns:
+            raise ValueError(f"campaign {campaign.name!r} is already hosted")
+        for ids, table in (
+            (users or [], self._by_user),
+            (guilds or [], self._by_guild),
+        ):
+            taken = [i for i in ids if str(i) in table]
+            if taken:
+                raise ValueError(
+                    f"{taken[0]} is already in campaign {table[taken[0]]!r}"
+                )
+        self._campaigns[campaign.name] = campaign
+        self._by_user.update({str(u): campaign.name for u in users or []})
+        self._by_guild.update({str(g): campaign.name for g in guilds or []})
+
+    def campaign_for(
+        self, user_id: str, guild_id: str | None = None
+    ) -> Campaign | None:
+        """The user's campaign, else the guild's, else the default one; None if none applies."""
+        name = self._by_user.get(user_id)
+        if name is None and guild_id is not None:
+            name = self._by_guild.get(guild_id)
+        return self._campaigns.get(name or self.default)
@@ -1,31 +1,111 @@
 """
 Core message-handling engine.
 
-Single entrypoint for player messages: loads session (history), RAG context,
-scene state, and character sheet; builds a system prompt; calls the AI
-orchestrator; parses optional scene JSON from the reply and saves it; appends
-to the note taker. See docs/ARCHITECTURE.md for the full sequence diagram.
+Single entrypoint for player messages: loads session (history), RAG context
+(rules, campaign notes and character/NPC lore, each within its token budget),
+scene state (only the positions near the acting player), the character sheet
+(in full when it fits the task's sheet budget, else its cached summary plus the
+relevant sections), and the relevant sections of any characters/NPCs the
+message mentions; builds the system prompt within a per-task token budget
+(core/prompt.py); calls the AI orchestrator; applies the scene deltas
+(```json-patch blocks) or full scene JSON in the reply, checked against the
+scene schema (ai/structured.py; with StructuredSettings.stream each update is
+applied as soon as its block has streamed in, and unusable ones can be repaired
+through a provider-native structured call); appends to the note taker. An
+optional ModelRouter re-routes the message by its content and the queue
+depths (an explicit ruling request is never downgraded). With an optional
+SpeculativeNarrator, mixed action turns run the ruling and a narrative draft
+in parallel (core/speculative.py), unless the router reports a full ruling
+queue. Rulings, speculative ones included, may be answered from an optional
+RulingCache before any model call, and short look/who questions from an optional ScenePregenerator
+(core/pregen.py). resolve_round() answers a whole combat round of actions,
+collected by a RoundCoordinator (core/rounds.py), with one ruling call.
+See docs/ARCHITECTURE.md for the full sequence diagram.
 """
 
 import json
-import re
+import logging
 
 from dungeonmaster.ai.orchestrator import AIOrchestrator
-from dungeonmaster.ai.rag import RAGStore
+from dungeonmaster.ai.rag import RAGStore, RetrievedChunk
+from dungeonmaster.ai.router import ModelRouter, Route
+from dungeonmaster.ai.ruling_cache import RulingCache, normalize_question
+from dungeonmaster.ai.structured import (
+    SCENE_PATCH_SCHEMA,
+    FencedBlock,
+    FencedBlockParser,
+    SceneUpdate,
+    StructuredSettings,
+    fenced_blocks,
+    scene_update,
+)
 from dungeonmaster.core.note_taker import NoteTaker
-from dungeonmaster.core.session import SessionManager
-from dungeonmaster.data.state import SceneState, StateStore
+from dungeonmaster.core.pregen import ScenePregenerator
+from dungeonmaster.core.prompt import PromptBuilder, chars_per_token_for
+from dungeonmaster.core.rounds import ROUND_PROMPT, RoundAction, split_round_reply
+from dungeonmaster.core.session import Session, SessionManager
+from dungeonmaster.core.speculative import (
+    DRAFT_PROMPT,
+    RULING_PROMPT,
+    SpeculativeNarrator,
+    is_mixed_action,
+)
+from dungeonmaster.data.entities import EntityIndex
+from dungeonmaster.data.scene_patch import PatchError
+from dungeonmaster.data.sheets import SheetCache
+from dungeonmaster.data.state import Position, SceneState, StateStore
+from dungeonmaster.metrics import Metrics
+from dungeonmaster.metrics import metrics as default_metrics
 
+logger = logging.getLogger(__name__)
 
-def _extract_scene_update(text: str) -> dict | None:
-    """Parse first ```json ... ``` fenced block in text; return None if missing or invalid."""
-    match = re.search(r"```json\s*([\s\S]*?)\s*```", text)
-    if match:
-        try:
-            return json.loads(match.group(1).strip())
-        except json.JSONDecodeError:
-            pass
-    return None
+
+_WARMING_PROMPT = (
+    "The rules index is still warming up, so no rule context is available yet. "
+    "Answer from general knowledge and keep any ruling provisional."
+)
+_WARMING_NOTICE = "_(Rules index is still warming up; this ruling is provisional.)_"
+_SCENE_PATCH_PROMPT = (
+    "If the scene changes, end your reply with a ```json-patch block holding only what changed, "
+    'e.g. {"location": {"name": "Cellar"}, "positions": [{"entity_id": "goblin", "x": 3, "y": 4}, '
+    '{"entity_id": "rat", "remove": true}]}. Positions are matched by entity_id; omit unchanged ones.'
+)
+
+_REPAIR_PROMPT = (
+    "You fix scene updates for a TTRPG engine. Keep the intent of the broken update; change only what it meant "
+    "to change. Positions are matched by entity_id; use remove: true to take an entity out."
+)
+_ROLE_PROMPT = "You are the Dungeon Master for a TTRPG. Use only the provided rule context when making rulings."
+# Retrieved context blocks in prompt order: (RAG namespace, prompt section, heading)
+_CONTEXT_SECTIONS = (
+    ("rules", "rules", "Relevant rules/source material:"),
+    ("entities", "lore", "Relevant lore:"),
+    ("notes", "notes", "Relevant campaign history:"),
+)
+# Which sections survive a tight budget first (lower = kept first), per task type
+_SECTION_PRIORITY = {
+    "narrative": {
+        "scene": 1,
+        "character": 2,
+        "entities": 3,
+        "notes": 4,
+        "rules": 5,
+        "lore": 6,
+    },
+    "ruling": {
+        "rules": 1,
+        "character": 2,
+        "scene": 3,
+        "entities": 4,
+        "lore": 5,
+        "notes": 6,
+    },
+}
+
+
+def _format_position(p: Position) -> str:
+    text = f"{p.entity_id}({p.entity_type}) at ({p.x:g}, {p.y:g})"
+    return f"{text} in {p.zone}" if p.zone else text
 
 
 class Engine:
@@ -41,12 +121,48 @@ class Engine:
         state_store: StateStore,
         session_manager: SessionManager,
         note_taker: NoteTaker | None = None,
+        ruling_cache: RulingCache | None = None,
+        scene_radius: float = 30.0,
+        max_scene_positions: int = 25,
+        entity_index: EntityIndex | None = None,
+        entity_budget: int = 1500,
+        max_entities: int = 3,
+        sheet_cache: SheetCache | None = None,
+        sheet_budget: dict[str, int] | None = None,
+        prompt_budget: dict[str, int] | None = None,
+        chars_per_token: dict[str, float] | None = None,
+        metrics: Metrics | None = None,
+        router: ModelRouter | None = None,
+        speculative: SpeculativeNarrator | None = None,
+        pregen: ScenePregenerator | None = None,
+        structured: StructuredSettings | None = None,
     ):
         self._orchestrator = orchestrator
         self._rag = rag
         self._state_store = state_store
         self._session_manager = session_manager
         self._note_taker = note_taker
+        self._ruling_cache = ruling_cache
+        self._scene_radius = scene_radius
+        self._max_scene_positions = max_scene_positions
+        self._entity_index = entity_index
+        self._entity_budget = entity_budget
+        self._max_entities = max_entities
+        self._sheet_cache = sheet_cache
+        # Characters of sheet the prompt may hold per task type; rulings need the detail
+        self._sheet_budget = {"narrative": 1200, "ruling": 4000, **(sheet_budget or {})}
+        # System prompt size per task type (estimated tokens); keeps prefill time predictable
+        self._prompt_budget = {
+            "narrative": 3000,
+            "ruling": 6000,
+            **(prompt_budget or {}),
+        }
+        self._chars_per_token = chars_per_token
+        self._metrics = metrics
+        self._router = router
+        self._speculative = speculative
+        self._pregen = pregen
+        self._structured = structured
 
     async def handle_message(
         self,
@@ -62,61 +178,417 @@ class Engine:
         session = self._session_manager.get_or_create(session_id)
         session.add_turn("user", content)
 
-        # Retrieve relevant rule/lore chunks for the system prompt
-        rag_context = ""
-        if self._rag:
+        # "What do I see?" right after a scene change: served from text pre-generated while idle
+        if self._pregen is not None and task_type == "narrative":
+            pregenerated = self._pregen.answer(self._state_store.load_scene(), content)
+            if pregenerated is not None:
+                return self._finish_turn(session, user_id, content, pregenerated)
+
+        # Pick provider and model size from what the message asks, not just the command
+        index_warming = bool(self._rag and self._rag.warming)
+        model: str | None = None
+        ruling_busy = False
+        if self._router is not None:
+            route = await self._route(
+                content, task_type, with_embedding=not index_warming
+            )
+            task_type, model, ruling_busy = (
+                route.task_type,
+                route.model,
+                route.ruling_busy,
+            )
+
+        # Retrieve relevant rules, campaign history and lore chunks (queried in parallel, each
+        # namespace within its token budget, sized for the model that answers). While the index
+        # is still opening at startup, serve without rule context (degraded mode).
+        context: dict[str, list[RetrievedChunk]] = {}
+        if self._rag and not index_warming:
             try:
-                chunks = await self._rag.query(content, top_k=5)
-                if chunks:
-                    rag_context = "\n\n---\n\n".join(chunks)
-            except Exception:
-                pass
+                context = await self._rag.retrieve_context(
+                    content,
+                    top_k=5,
+                    exclude_sources={str(self._state_store.character_path(user_id))},
+                    chars_per_token=self._chars_per_token_for(task_type, model),
+                )
+            except Exception as e:  # noqa: BLE001 - any provider or index error: reply without context
+                logger.debug("Context retrieval failed: %s", e)
+        chunks = context.get("rules", [])
+        # Mixed action turns also get a ruling, drafted in parallel; not while the router holds
+        # rulings back because the ruling queue is full
+        speculate = (
+            self._speculative is not None
+            and not ruling_busy
+            and is_mixed_action(content, self._speculative.settings.min_score)
+        )
 
         scene = self._state_store.load_scene()
-        scene_block = f"Current scene: {scene.location.name}. {scene.location.description}"
+        scene_block = (
+            f"Current scene: {scene.location.name}. {scene.location.description}"
+        )
         if scene.positions:
-            scene_block += "\nPositions: " + ", ".join(
-                f"{p.entity_id}({p.entity_type})" for p in scene.positions
+            scene_block += "\n" + self._positions_block(user_id, scene)
+
+        # Characters/NPCs the message mentions: only their relevant sections, within budget
+        entity_block = ""
+        if self._entity_index is not None:
+            entity_block = self._entity_index.context_for(
+                content,
+                budget=self._entity_budget,
+                max_entities=self._max_entities,
+                exclude={self._state_store.character_path(user_id)},
             )
 
-        character = self._state_store.load_character(user_id)
-        character_block = f"Player character sheet:\n{character}" if character else "No character sheet for this player yet."
+        character_blocks: dict[str, str] = {}
 
-        # Assemble system prompt: role, scene, character, optional RAG context
-        system = f"""You are the Dungeon Master for a TTRPG. Use only the provided rule context when making rulings.
+        def character_for(turn_type: str) -> str:
+            if turn_type not in character_blocks:
+                character_blocks[turn_type] = self._character_block(
+                    user_id, content, turn_type
+                )
+            return character_blocks[turn_type]
 
-{scene_block}
+        # Repeat rulings (any player, any scene) over the same rule chunks can be served from the cache
+        question_embedding: list[float] = []
+        if (
+            (task_type == "ruling" or speculate)
+            and self._ruling_cache is not None
+            and self._rag
+            and chunks
+        ):
+            try:
+                question_embedding = await self._rag.embed_query(
+                    normalize_question(content)
+                )
+            except Exception:  # noqa: BLE001 - any provider error: skip the cache
+                question_embedding = []
+            if question_embedding:
+                cached = self._ruling_cache.lookup(content, question_embedding, chunks)
+                if cached is not None:
+                    # Cached replies never re-apply a (possibly stale) scene block
+                    return self._finish_turn(session, user_id, content, cached)
 
-{character_block}
-"""
-        if rag_context:
-            system += f"\n\nRelevant rules/source material:\n{rag_context}"
+        def system_for(
+            turn_type: str, turn_model: str | None, instructions: str
+        ) -> str:
+            return self._system_prompt(
+                turn_type,
+                turn_model,
+                character_for(turn_type),
+                scene_block,
+                entity_block,
+                context,
+                index_warming,
+                instructions,
+            )
 
         messages = session.to_messages()
         # Last message is the current user message; we're generating the DM reply
         prompt = messages[-1]["content"] if messages else content
 
-        result = await self._orchestrator.generate(
-            prompt=prompt,
-            system=system,
-            task_type=task_type,
+        # Mixed action turns: ruling and a provisional narrative draft in parallel, then reconciled
+        if speculate:
+            speculative = await self._speculative.run(
+                prompt,
+                ruling_system=system_for(
+                    "ruling", None, f"{_SCENE_PATCH_PROMPT}\n{RULING_PROMPT}"
+                ),
+                draft_system=system_for(
+                    "narrative",
+                    self._speculative.settings.draft_model or None,
+                    DRAFT_PROMPT,
+                ),
+            )
+            reply = speculative.text.strip()
+            await self._apply_scene_updates(reply)
+            if index_warming and reply:
+                reply += f"\n\n{_WARMING_NOTICE}"
+            # Cache the ruling alone: the draft narrates this player's attempt, not the rule
+            if question_embedding and speculative.ruling:
+                self._ruling_cache.store(
+                    content, question_embedding, chunks, speculative.ruling.strip()
+                )
+            return self._finish_turn(session, user_id, content, reply)
+
+        system = system_for(task_type, model, _SCENE_PATCH_PROMPT)
+        reply = (await self._generate_reply(prompt, system, task_type, model)).strip()
+        if index_warming and task_type == "ruling" and reply:
+            reply += f"\n\n{_WARMING_NOTICE}"
+        if question_embedding:
+            self._ruling_cache.store(content, question_embedding, chunks, reply)
+        return self._finish_turn(session, user_id, content, reply)
+
+    async def resolve_round(self, actions: list[RoundAction]) -> dict[str, str]:
+        """
+        Resolve a combat round's actions (in turn order) with one ruling call that shares the
+        rule context, scene and character sheets. Returns each player's reply by user_id.
+        """
+        if not actions:
+            return {}
+        sessions = []
+        for action in actions:
+            session = self._session_manager.get_or_create(action.session_id)
+            session.add_turn("user", action.content)
+            sessions.append(session)
+        combined = "\n".join(action.content for action in actions)
+        sheets = {
+            self._state_store.character_path(action.user_id) for action in actions
+        }
+
+        context: dict[str, list[RetrievedChunk]] = {}
+        index_warming = bool(self._rag and self._rag.warming)
+        if self._rag and not index_warming:
+            try:
+                context = await self._rag.retrieve_context(
+                    combined,
+                    top_k=5,
+                    exclude_sources={str(path) for path in sheets},
+                    chars_per_token=self._chars_per_token_for("ruling", None),
+                )
+            except Exception as e:  # noqa: BLE001 - any provider or index error: resolve without context
+                logger.debug("Context retrieval for the round failed: %s", e)
+
+        scene = self._state_store.load_scene()
+        scene_block = (
+            f"Current scene: {scene.location.name}. {scene.location.description}"
         )
+        if scene.positions:
+            scene_block += "\n" + self._positions_block(None, scene)
+        entity_block = ""
+        if self._entity_index is not None:
+            entity_block = self._entity_index.context_for(
+                combined,
+                budget=self._entity_budget,
+                max_entities=self._max_entities,
+                exclude=sheets,
+            )
+        character_block = "\n\n".join(
+            f"{action.actor}: {self._character_block(action.user_id, action.content, 'ruling')}"
+            for action in actions
+        )
+        actors = [action.actor for action in actions]
+        instructions = (
+            f"{_SCENE_PATCH_PROMPT}\n{ROUND_PROMPT.format(actors=', '.join(actors))}"
+        )
+        system = self._system_prompt(
+            "ruling",
+            None,
+            character_block,
+            scene_block,
+            entity_block,
+            context,
+            index_warming,
+            instructions,
+        )
+        prompt = "Actions this round, in turn order:\n" + "\n".join(
+            f"- {action.actor}: {action.content}" for action in actions
+        )
+        reply = (await self._generate_reply(prompt, system, "ruling", None)).strip()
+        parts = split_round_reply(reply, actors)
+        replies = {}
+        for action, session in zip(actions, sessions):
+            part = parts[action.actor]
+            if index_warming and part:
+                part += f"\n\n{_WARMING_NOTICE}"
+            replies[action.user_id] = self._finish_turn(
+                session, action.user_id, action.content, part
+            )
+        return replies
 
-        reply = result.text.strip()
-        session.add_turn("assistant", reply)
+    def _system_prompt(
+        self,
+        task_type: str,
+        model: str | None,
+        character_block: str,
+        scene_block: str,
+        entity_block: str,
+        context: dict[str, list[RetrievedChunk]],
+        index_warming: bool,
+        instructions: str,
+    ) -> str:
+        """
+        Assemble the system prompt within the task's token budget: sections are kept by
+        priority and cut at chunk/line boundaries when they do not all fit.
+        """
+        builder = PromptBuilder(
+            self._prompt_budget.get(task_type, self._prompt_budget["narrative"]),
+            chars_per_token=self._chars_per_token_for(task_type, model),
+            metrics=self._metrics,
+        )
+        priority = _SECTION_PRIORITY.get(task_type, _SECTION_PRIORITY["narrative"])
+        builder.add("role", _ROLE_PROMPT, required=True)
+        builder.add("scene", scene_block, priority["scene"])
+        builder.add("character", character_block, priority["character"])
+        builder.add("instructions", instructions, required=True)
+        builder.add(
+            "entities",
+            entity_block,
+            priority["entities"],
+            heading="Relevant characters/NPCs:",
+        )
+        for namespace, section, heading in _CONTEXT_SECTIONS:
+            builder.add(
+                section,
+                priority=priority[section],
+                heading=heading,
+                parts=[c.text for c in context.get(namespace, [])],
+            )
+        if index_warming:
+            builder.add("warming", _WARMING_PROMPT, required=True)
+        return builder.build().text
 
-        # If the model returned a ```json ... ``` block, persist as new scene state
-        scene_update = _extract_scene_update(reply)
-        if scene_update:
+    def _chars_per_token_for(self, task_type: str, model: str | None) -> float:
+        """Chars-per-token of the model answering task_type, for prompt and retrieval budgets."""
+        return chars_per_token_for(
+            model or self._orchestrator.model_for(task_type), self._chars_per_token
+        )
+
+    async def _route(self, content: str, task_type: str, with_embedding: bool) -> Route:
+        """Route for the message (task_type, model override); the query embedding is cached for retrieval."""
+        embedding: list[float] = []
+        if with_embedding and self._rag:
             try:
-                new_scene = SceneState.from_dict(scene_update)
-                self._state_store.save_scene(new_scene)
-            except (TypeError, KeyError):
-                pass
+                embedding = await self._rag.embed_query(content)
+            except Exception:  # noqa: BLE001 - any provider error: route by keywords
+                embedding = []
+        depths = {t: self._orchestrator.in_flight(t) for t in ("narrative", "ruling")}
+        return await self._router.route(content, task_type, embedding or None, depths)
 
-        if self._note_taker:
-            self._note_taker.note_event("player", content)
-            self._note_taker.note_event("dm", reply)  # Append both to vault notes/
+    def _character_block(self, user_id: str, content: str, task_type: str) -> str:
+        """
+        The player's sheet: in full if it fits the task type's sheet budget, else its summary
+        plus the sections relevant to the message. Without a SheetCache the raw sheet is used.
+        """
+        if self._sheet_cache is None:
+            character = self._state_store.load_character(user_id)
+        else:
+            sheet = self._sheet_cache.get(user_id)
+            budget = self._sheet_budget.get(task_type, self._sheet_budget["narrative"])
+            character = sheet.render(content, budget) if sheet is not None else ""
+        if not character:
+            return "No character sheet for this player yet."
+        return f"Player character sheet:\n{character}"
 
+    def _positions_block(self, user_id: str | None, scene: SceneState) -> str:
+        """
+        Positions relevant to the acting player: themselves, then entities in their zone or
+        within scene_radius, nearest first, capped at max_scene_positions. With no acting
+        player (a whole round), the scene's first max_scene_positions positions.
+        """
+        index = self._state_store.scene_index()
+        actor = (
+            (index.get(user_id) or index.get(f"player_{user_id}")) if user_id else None
+        )
+        if actor is not None:
+            shown = index.relevant_to(
+                actor.entity_id, self._scene_radius, self._max_scene_positions
+            )
+        elif self._max_scene_positions > 0:
+            shown = scene.positions[: self._max_scene_positions]
+        else:
+            shown = scene.positions
+        block = "Positions: " + ", ".join(_format_position(p) for p in shown)
+        hidden = len(scene.positions) - len(shown)
+        if hidden > 0:
+            block += f" (+{hidden} more elsewhere, not shown)"
+        return block
 
+    def _finish_turn(
+        self, session: Session, user_id: str, content: str, reply: str
+    ) -> str:
+        """Record the reply in the session and append both sides of the turn to the notes."""
+        session.add_turn("assistant", reply)
+        if self._note_taker:
+            self._note_taker.note_event("player", content, player_id=user_id)
+            # Append both to vault notes/
+            self._note_taker.note_event("dm", reply, player_id=user_id)
         return reply
+
+    async def _generate_reply(
+        self, prompt: str, system: str, task_type: str, model: str | None
+    ) -> str:
+        """
+        Generate the reply and apply its scene updates. When streaming, each update is applied
+        as soon as its block has closed, before the rest of the reply has been generated;
+        unusable ones are repaired once the stream has ended, so a repair call never holds
+        the stream open.
+        """
+        if self._structured is None or not self._structured.stream:
+            result = await self._orchestrator.generate(
+                prompt=prompt, system=system, task_type=task_type, model=model
+            )
+            await self._apply_scene_updates(result.text)
+            return result.text
+        parser = FencedBlockParser()
+        unusable: list[SceneUpdate] = []
+        async for chunk in self._orchestrator.generate_stream(
+            prompt=prompt, system=system, task_type=task_type, model=model
+        ):
+            unusable += self._apply_blocks(parser.feed(chunk))
+        unusable += self._apply_blocks(parser.finish())
+        await self._repair_updates(unusable)
+        return parser.text
+
+    async def _apply_scene_updates(self, reply: str) -> None:
+        """Apply every scene delta or full scene block in the reply, in order, then repair unusable ones."""
+        await self._repair_updates(self._apply_blocks(fenced_blocks(reply)))
+
+    def _apply_blocks(self, blocks: list[FencedBlock]) -> list[SceneUpdate]:
+        """Apply each block's scene update in order; returns the unusable ones."""
+        unusable = []
+        for block in blocks:
+            update = self._apply_block(block)
+            if update is not None:
+                unusable.append(update)
+        return unusable
+
+    def _apply_block(self, block: FencedBlock) -> SceneUpdate | None:
+        """Apply one block's scene update; an unusable one is logged, counted and returned for repair."""
+        update = scene_update(block)
+        if update is None:
+            return None
+        if update.error is None:
+            try:
+                self._apply_update(update)
+                return None
+            except PatchError as e:
+                update.error = str(e)
+        self._metrics_or_default().incr("structured.invalid")
+        logger.warning("Unusable scene update in reply: %s", update.error)
+        return update
+
+    def _metrics_or_default(self) -> Metrics:
+        return self._metrics if self._metrics is not None else default_metrics
+
+    async def _repair_updates(self, updates: list[SceneUpdate]) -> None:
+        """Repair unusable scene updates in order, if repair is on."""
+        if self._structured is None or not self._structured.repair:
+            return
+        for update in updates:
+            await self._repair_update(update, self._metrics_or_default())
+
+    def _apply_update(self, update: SceneUpdate) -> None:
+        """Save a valid scene update: a delta is patched in, a full scene replaces the current one."""
+        if update.kind == "patch":
+            self._state_store.apply_scene_patch(update.data)
+        else:
+            self._state_store.save_scene(SceneState.from_dict(update.data))
+
+    async def _repair_update(self, update: SceneUpdate, metrics: Metrics) -> None:
+        """Ask the narrative provider (in its native JSON/tool mode) for the intended change as a merge patch."""
+        scene = json.dumps(self._state_store.load_scene().to_dict(), ensure_ascii=False)
+        prompt = (
+            f"Current scene:\n{scene}\n\nBroken scene update:\n{update.source.strip()}\n\n"
+            f"Problem: {update.error}\n\nReturn the intended change as a scene merge patch."
+        )
+        try:
+            patch = await self._orchestrator.generate_structured(
+                prompt=prompt,
+                schema=SCENE_PATCH_SCHEMA,
+                system=_REPAIR_PROMPT,
+                task_type="narrative",
+            )
+            self._state_store.apply_scene_patch(patch)
+        except Exception as e:  # noqa: BLE001 - any provider or patch error: keep the scene as it is
+            logger.warning("Scene update repair failed: %s", e)
+            return
+        metrics.incr("structured.repaired")
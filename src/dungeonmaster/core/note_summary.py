@@ -0,0 +1,185 @@
+"""
+Incremental session-notes summary for /notes.
+
+NoteSummarizer keeps a running summary of the session notes plus the sequence
+number of the last indexed note event it covers (persisted in
+vault/_index/notes_summary.json). Once at least min_chars of new event text has
+accumulated, run() folds the new events (at most batch_chars per call) into
+the summary with one small narrative-model call, in the background. summary()
+never calls a model: it returns the stored summary plus the latest events not
+yet folded in, so /notes answers immediately.
+"""
+
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from dungeonmaster.ai.orchestrator import AIOrchestrator
+from dungeonmaster.core.note_taker import NoteEvent, NoteTaker
+from dungeonmaster.data.vault import Vault
+
+logger = logging.getLogger(__name__)
+
+_SUMMARY_FILE = "notes_summary.json"
+_SYSTEM = (
+    "You keep the campaign log for a TTRPG. Update the running summary with the new events. "
+    "Keep every plot point, decision, NPC, item and unresolved thread; drop banter. "
+    "Reply with the updated summary only, as short Markdown bullet points."
+)
+
+
+@dataclass
+class NoteSummarySettings:
+    """Background summarization thresholds (characters of note text)."""
+
+    min_chars: int = 3000  # new event text needed before a summary update
+    batch_chars: int = 12000  # most new event text folded in per model call
+    max_chars: int = 1500  # summary length asked for (and cut to)
+    interval: float = 60.0  # seconds between checks when no event wakes the summarizer
+    recent: int = 5  # unsummarized events shown after the summary
+
+    @classmethod
+    def from_config(cls, cfg: dict | None) -> "NoteSummarySettings":
+        cfg = cfg or {}
+        return cls(
+            min_chars=int(cfg.get("min_chars", 3000)),
+            batch_chars=int(cfg.get("batch_chars", 12000)),
+            max_chars=int(cfg.get("max_chars", 1500)),
+            interval=float(cfg.get("interval", 60.0)),
+            recent=int(cfg.get("recent", 5)),
+        )
+
+
+def _format_event(event: NoteEvent, limit: int = 0) -> str:
+    who = f"{event.role} ({event.player_id})" if event.player_id else event.role
+    text = " ".join(event.text.split())
+    if limit and len(text) > limit:
+        text = text[: limit - 1] + "…"
+    return f"[{event.timestamp[:16]}] {who}: {text}"
+
+
+class NoteSummarizer:
+    """Running summary of the note index, updated in the background."""
+
+    def __init__(
+        self,
+        vault: Vault,
+        note_taker: NoteTaker,
+        orchestrator: AIOrchestrator,
+        settings: NoteSummarySettings | None = None,
+    ):
+        self._note_taker = note_taker
+        self._orchestrator = orchestrator
+        self._settings = settings or NoteSummarySettings()
+        self._path = vault.index_dir() / _SUMMARY_FILE
+        self._vault = vault
+        self._summary = ""
+        self._seq = 0
+        self._updated = ""
+        self._load()
+        self._pending_chars = sum(
+            len(e.text) for e in note_taker.events(since_seq=self._seq)
+        )
+        self._wake = asyncio.Event()
+        note_taker.add_event_listener(self._on_event)
+
+    def _load(self) -> None:
+        if not self._path.exists():
+            return
+        try:
+            data = json.loads(self._vault.read_text(self._path))
+            self._summary, self._seq = (
+                str(data.get("summary", "")),
+                int(data.get("seq", 0)),
+            )
+            self._updated = str(data.get("updated", ""))
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning("Could not load notes summary: %s", e)
+
+    def _save(self) -> None:
+        data = {"summary": self._summary, "seq": self._seq, "updated": self._updated}
+        self._vault.write_text(
+            self._path, json.dumps(data, ensure_ascii=False, indent=2)
+        )
+
+    def _on_event(self, event: NoteEvent) -> None:
+        self._pending_chars += len(event.text)
+        if self._pending_chars >= self._settings.min_chars:
+            self._wake.set()
+
+    @property
+    def seq(self) -> int:
+        """Sequence number of the last note event folded into the summary."""
+        return self._seq
+
+    def summary(self) -> str:
+        """Stored summary plus the latest events not yet summarized (no model call)."""
+        pending = (
+            self._note_taker.events(since_seq=self._seq) if self._pending_chars else []
+        )
+        parts = []
+        if self._summary:
+            parts.append(
+                f"**Session summary** (as of {self._updated[:16].replace('T', ' ')} UTC)\n{self._summary}"
+            )
+        recent = pending[-self._settings.recent :] if self._settings.recent > 0 else []
+        if recent:
+            lines = "\n".join(f"- {_format_event(e, 200)}" for e in recent)
+            parts.append(
+                f"**Since then:**\n{lines}"
+                if self._summary
+                else f"**Latest events:**\n{lines}"
+            )
+        return "\n\n".join(parts) or "No session notes yet."
+
+    async def update(self) -> bool:
+        """Fold pending events (up to batch_chars) into the summary. Returns False if there were none."""
+        pending = self._note_taker.events(since_seq=self._seq)
+        batch: list[NoteEvent] = []
+        size = 0
+        for event in pending:
+            if batch and size + len(event.text) > self._settings.batch_chars:
+                break
+            batch.append(event)
+            size += len(event.text)
+        if not batch:
+            return False
+        per_event = max(200, self._settings.batch_chars // len(batch))
+        events_text = "\n".join(_format_event(e, per_event) for e in batch)
+        prompt = (
+            f"Running summary so far:\n{self._summary or '(none yet)'}\n\nNew events:\n{events_text}\n\n"
+            f"Updated summary (at most {self._settings.max_chars} characters):"
+        )
+        result = await self._orchestrator.generate(
+            prompt=prompt, system=_SYSTEM, task_type="narrative"
+        )
+        text = result.text.strip()
+        if not text:
+            return False
+        self._summary = text[: self._settings.max_chars]
+        self._seq = batch[-1].seq
+        self._updated = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+        self._pending_chars = max(0, self._pending_chars - size)
+        self._save()
+        return True
+
+    async def run(self) -> None:
+        """Background loop: update whenever min_chars of new notes have accumulated."""
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self._settings.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self._pending_chars < self._settings.min_chars:
+                continue
+            try:
+                while (
+                    self._pending_chars >= self._settings.min_chars
+                    and await self.update()
+                ):
+                    pass
+            except Exception as e:  # noqa: BLE001 - keep the background summarizer running
+                logger.warning("Notes summary update failed: %s", e)
@@ -2,14 +2,64 @@
 Note Taker: append session events to Markdown files in the vault's notes/ directory.
 
 Each event is recorded with a timestamp and role (player/dm). Used to maintain
-a session log that can be viewed or edited in Obsidian.
+a session log that can be viewed or edited in Obsidian. A note rolls over to a
+new part (session-20250101-2.md, -3, ...) once it would exceed max_bytes, or
+when rollover() starts a new session, so no single file grows without limit.
+Without an explicit note_id, notes are per UTC day: the first event after
+midnight starts the next day's session note. Notes are appended to in place
+through the vault (Vault.append_text), never read back and rewritten.
+Every event is also appended to _index/notes_index.jsonl (sequence number,
+time, note, role, player and text) so events can be looked up by time, player
+or role, and summarized incrementally, without re-reading the notes. The parsed
+index is kept in memory; events() only reads lines added since its last call.
 """
 
+import bisect
+import json
+import logging
+import threading
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import Any
 
 from dungeonmaster.data.vault import Vault
 
+logger = logging.getLogger(__name__)
+
+_INDEX_FILE = "notes_index.jsonl"
+
+
+@dataclass
+class NoteEvent:
+    """One indexed note event."""
+
+    seq: int
+    timestamp: str  # ISO 8601 UTC, "Z" suffix
+    note_id: str
+    role: str
+    player_id: str | None
+    text: str
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "NoteEvent":
+        return cls(
+            seq=int(data["seq"]),
+            timestamp=str(data.get("timestamp", "")),
+            note_id=str(data.get("note_id", "")),
+            role=str(data.get("role", "")),
+            player_id=data.get("player_id"),
+            text=str(data.get("text", "")),
+        )
+
+
+def _daily_id(now: datetime) -> str:
+    return f"session-{now.strftime('%Y%m%d')}"
+
 
 class NoteTaker:
     """
@@ -17,26 +67,151 @@ class NoteTaker:
     Uses a single rolling note file or per-session files.
     """
 
-    def __init__(self, vault: Vault, note_id: str | None = None):
+    def __init__(
+        self, vault: Vault, note_id: str | None = None, max_bytes: int = 65536
+    ):
         self._vault = vault
         self._vault.ensure_all_dirs()
-        self._note_id = note_id or f"session-{datetime.utcnow().strftime('%Y%m%d')}"
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._listeners: list[Callable[[NoteEvent], None]] = []
+        self._index_path = self._vault.index_dir() / _INDEX_FILE
+        self._events: list[NoteEvent] = []  # parsed index, oldest first
+        self._index_offset = 0  # bytes of the index file parsed into _events
+        self._seq = self._last_seq()
+        # roll over to a new session note when the UTC date changes
+        self._daily = note_id is None
+        self._start(note_id or _daily_id(datetime.now(timezone.utc)))
+
+    def _start(self, base_id: str) -> None:
+        """Continue the latest existing part of base_id (or its first part)."""
+        self._base_id = base_id
+        self._part = 1
+        while self._vault.note_path(self._part_id(self._part + 1)).exists():
+            self._part += 1
+        path = self._path()
+        self._size = path.stat().st_size if path.exists() else 0
+
+    def _part_id(self, part: int) -> str:
+        return self._base_id if part == 1 else f"{self._base_id}-{part}"
+
+    @property
+    def note_id(self) -> str:
+        """Id of the note file currently written to."""
+        return self._part_id(self._part)
 
     def _path(self) -> Path:
-        return self._vault.note_path(self._note_id)
+        return self._vault.note_path(self.note_id)
+
+    def rollover(self, note_id: str | None = None) -> str:
+        """Start a new note: the next part of the current one, or a new session note_id. Returns its id."""
+        if note_id is not None and note_id != self._base_id:
+            self._start(note_id)
+        elif self._size > 0:
+            self._part += 1
+            self._size = 0
+        return self.note_id
 
     def append(self, content: str) -> None:
-        """Append a line or block to the current note file."""
+        """Append a line or block to the current note file, rolling over if it would exceed max_bytes."""
+        block = content.strip()
+        if (
+            self._max_bytes > 0
+            and self._size > 0
+            and self._size + len(block.encode("utf-8")) + 2 > self._max_bytes
+        ):
+            self.rollover()
         path = self._path()
-        if path.exists():
-            existing = self._vault.read_text(path)
-            new_content = f"{existing.rstrip()}\n\n{content.strip()}\n"
+        if self._size > 0 and path.exists():
+            addition = f"\n{block}\n"
         else:
-            new_content = f"# {self._note_id}\n\n{content.strip()}\n"
-        self._vault.write_text(path, new_content)
+            addition = f"# {self.note_id}\n\n{block}\n"
+        self._vault.append_text(path, addition)
+        self._size += len(addition.encode("utf-8"))
 
-    def note_event(self, role: str, content: str) -> None:
-        """Record an event (e.g. 'player' action or 'dm' narration)."""
-        timestamp = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    def note_event(
+        self, role: str, content: str, player_id: str | None = None
+    ) -> NoteEvent:
+        """Record an event (e.g. 'player' action or 'dm' narration) in the note and the index."""
+        now = datetime.now(timezone.utc)
+        if self._daily and _daily_id(now) != self._base_id:
+            self.rollover(_daily_id(now))
+        timestamp = now.isoformat().replace("+00:00", "Z")
         block = f"**[{timestamp}] {role}:**\n{content.strip()}"
         self.append(block)
+        with self._lock:
+            self._seq += 1
+            event = NoteEvent(
+                self._seq, timestamp, self.note_id, role, player_id, content.strip()
+            )
+            self._vault.append_text(
+                self._index_path, json.dumps(event.to_dict(), ensure_ascii=False) + "\n"
+            )
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception as e:  # noqa: BLE001 - a failing listener must not lose the note
+                logger.warning("Note listener failed: %s", e)
+        return event
+
+    def add_event_listener(self, listener: Callable[[NoteEvent], None]) -> None:
+        """Call listener(event) after each note_event (e.g. to wake the summarizer)."""
+        self._listeners.append(listener)
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+    def _last_seq(self) -> int:
+        events = self.events()
+        return events[-1].seq if events else 0
+
+    def events(
+        self,
+        since_seq: int = 0,
+        player_id: str | None = None,
+        role: str | None = None,
+        start: str | None = None,
+        end: str | None = None,
+    ) -> list[NoteEvent]:
+        """
+        Indexed events after since_seq, oldest first, optionally filtered by player, role and
+        ISO timestamp range [start, end). Malformed index lines are skipped.
+        """
+        with self._lock:
+            self._read_index()
+            events = self._events[
+                bisect.bisect_right(self._events, since_seq, key=lambda e: e.seq) :
+            ]
+        return [
+            event
+            for event in events
+            if (player_id is None or event.player_id == player_id)
+            and (role is None or event.role == role)
+            and (start is None or event.timestamp >= start)
+            and (end is None or event.timestamp < end)
+        ]
+
+    def _read_index(self) -> None:
+        """Parse index lines added since the last call (all of them if the file shrank or is new)."""
+        try:
+            size = self._index_path.stat().st_size
+        except FileNotFoundError:
+            size = 0
+        if size < self._index_offset:
+            self._events, self._index_offset = [], 0
+        if size == self._index_offset:
+            return
+        with open(self._index_path, "rb") as f:
+            f.seek(self._index_offset)
+            data = f.read(size - self._index_offset)
+        # a partly written last line is parsed on a later call
+        complete = data.rfind(b"\n") + 1
+        for line in data[:complete].splitlines():
+            try:
+                event = NoteEvent.from_dict(json.loads(line))
+            except (ValueError, KeyError, TypeError):
+                continue
+            if not self._events or event.seq > self._events[-1].seq:
+                self._events.append(event)
+        self._index_offset += complete
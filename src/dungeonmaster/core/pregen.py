@@ -0,0 +1,242 @@
+"""
+Idle-time pre-generation of scene descriptions.
+
+When the scene moves to a new location (or new NPCs appear), the next player
+to arrive usually asks "what do I see?" and would wait for a full generation.
+ScenePregenerator listens to StateStore scene changes and, while the narrative
+provider is idle (no more than idle_in_flight requests running), generates a
+location description and a short introduction for each NPC present, with the
+narrative provider only: background work never falls back to the ruling
+provider, so an Ollama outage cannot turn into paid Claude calls. Off by
+default (engine.pregen.enabled). Results are cached per (scene_id, version); changes that do
+not touch the location or add NPCs (e.g. someone moves) carry the entry over to
+the new version instead of regenerating it. A newer scene change abandons the
+work still queued for an older one.
+
+answer() serves short follow-up questions ("what do I see?", "look around",
+"who is the innkeeper?") from the cache for the current scene; anything else
+(or a miss) goes through the normal engine path. Hits, misses and generations
+are counted in metrics as pregen.hit, pregen.miss and pregen.generated.
+"""
+
+import asyncio
+import logging
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from dungeonmaster.ai.orchestrator import AIOrchestrator
+from dungeonmaster.data.state import SceneState, StateStore
+from dungeonmaster.metrics import Metrics
+from dungeonmaster.metrics import metrics as default_metrics
+
+logger = logging.getLogger(__name__)
+
+_SYSTEM = (
+    "You are the Dungeon Master for a TTRPG. Write what the players perceive, in second person and present "
+    "tense, in three to five sentences. Do not make rulings, ask for rolls or add a scene update block."
+)
+_LOOK = re.compile(
+    r"\b(?:what do (?:i|we) see|look around|looking around|where am i|where are we|"
+    r"describe (?:the |this )?(?:room|area|place|scene|surroundings|location))\b",
+    re.IGNORECASE,
+)
+_WHO = re.compile(r"\bwho(?:'s| is| are| else is)\b", re.IGNORECASE)
+_WHO_HERE = re.compile(
+    r"\bwho(?:'s| is| are| else is) (?:here|around|present|in (?:the|this) (?:room|place))\b",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class PregenSettings:
+    """Idle threshold, how much to pre-generate, and which questions may be answered from the cache."""
+
+    enabled: bool = False
+    # narrative requests running at most for the provider to count as idle
+    idle_in_flight: int = 0
+    poll_interval: float = 0.5  # seconds between idle checks while waiting
+    # NPC introductions per scene (nearest the start of the position list first)
+    max_npcs: int = 3
+    max_scenes: int = 8  # (scene_id, version) entries kept
+    # longer messages are treated as actions, never answered from cache
+    max_question_chars: int = 120
+
+    @classmethod
+    def from_config(cls, cfg: dict | None) -> "PregenSettings":
+        cfg = cfg or {}
+        return cls(
+            enabled=bool(cfg.get("enabled", False)),
+            idle_in_flight=int(cfg.get("idle_in_flight", 0)),
+            poll_interval=float(cfg.get("poll_interval", 0.5)),
+            max_npcs=int(cfg.get("max_npcs", 3)),
+            max_scenes=int(cfg.get("max_scenes", 8)),
+            max_question_chars=int(cfg.get("max_question_chars", 120)),
+        )
+
+
+def _npc_ids(scene: dict[str, Any]) -> list[str]:
+    return [
+        p["entity_id"]
+        for p in scene.get("positions", [])
+        if p.get("entity_type") == "npc" and p.get("entity_id")
+    ]
+
+
+def _display_name(entity_id: str) -> str:
+    return entity_id.replace("_", " ").replace("-", " ")
+
+
+class ScenePregenerator:
+    """Pre-generate and cache descriptions for the current scene while idle (see module docstring)."""
+
+    def __init__(
+        self,
+        state_store: StateStore,
+        orchestrator: AIOrchestrator,
+        settings: PregenSettings | None = None,
+        metrics: Metrics | None = None,
+    ):
+        self._state_store = state_store
+        self._orchestrator = orchestrator
+        self.settings = settings or PregenSettings()
+        self._metrics = metrics if metrics is not None else default_metrics
+        self._cache: OrderedDict[tuple[str, int], dict[str, str]] = OrderedDict()
+        self._latest: tuple[str, int] | None = None
+        self._latest_npcs: set[str] = set()
+        self._pending: SceneState | None = None
+        self._wake = asyncio.Event()
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def get(self, scene_id: str, version: int) -> dict[str, str]:
+        """Cached texts for one scene version: "location" and "npc:<entity_id>" keys (empty if none)."""
+        return dict(self._cache.get((scene_id, version), {}))
+
+    def schedule(self, scene: SceneState) -> None:
+        """Queue pre-generation for scene, replacing any older scene still waiting."""
+        self._pending = scene
+        self._latest = (scene.scene_id, scene.version)
+        self._latest_npcs = {
+            p.entity_id for p in scene.positions if p.entity_type == "npc"
+        }
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+        else:
+            self._wake.set()
+
+    def on_scene_change(
+        self, version: int, delta: dict[str, Any], scene: dict[str, Any]
+    ) -> None:
+        """StateStore scene listener: regenerate for a new location or new NPCs, else carry the cache over."""
+        key = (scene.get("scene_id", "default"), version)
+        previous = self._latest
+        npcs = set(_npc_ids(scene))
+        relevant = (
+            "scene_id" in delta or "location" in delta or bool(npcs - self._latest_npcs)
+        )
+        if previous in self._cache and not relevant:
+            self._cache[key] = self._cache[previous]
+            self._trim()
+            self._latest, self._latest_npcs = key, npcs
+            return
+        self.schedule(SceneState.from_dict(scene))
+
+    async def _wait_idle(self) -> bool:
+        """Wait until the narrative provider is idle; False if a newer scene was queued meanwhile."""
+        while self._orchestrator.in_flight("narrative") > self.settings.idle_in_flight:
+            await asyncio.sleep(self.settings.poll_interval)
+            if self._pending is not None:
+                return False
+        return self._pending is None
+
+    async def _generate(self, prompt: str) -> str:
+        result = await self._orchestrator.generate(
+            prompt=prompt, system=_SYSTEM, task_type="narrative", fallback=False
+        )
+        self._metrics.incr("pregen.generated")
+        return result.text.strip()
+
+    async def pregenerate(self, scene: SceneState) -> dict[str, str]:
+        """Generate the location description and NPC introductions for scene, one call at a time when idle."""
+        self._pending = None
+        key = (scene.scene_id, scene.version)
+        entry = self._cache.setdefault(key, {})
+        self._trim()
+        npcs = [p for p in scene.positions if p.entity_type == "npc"][
+            : max(0, self.settings.max_npcs)
+        ]
+        others = (
+            ", ".join(_display_name(p.entity_id) for p in scene.positions) or "no one"
+        )
+        place = scene.location.name or "the scene"
+        jobs = [
+            (
+                "location",
+                f"Describe {place}. {scene.location.description}\nPresent: {others}.",
+            )
+        ]
+        for npc in npcs:
+            notes = self._state_store.load_npc(npc.entity_id)[:1500] or "(none)"
+            prompt = f"Introduce {_display_name(npc.entity_id)} as the players first notice them in {place}."
+            jobs.append((f"npc:{npc.entity_id}", f"{prompt}\nNPC notes:\n{notes}"))
+        for name, prompt in jobs:
+            if name in entry:
+                continue
+            if not await self._wait_idle():
+                break
+            try:
+                text = await self._generate(prompt)
+            except Exception as e:  # noqa: BLE001 - any provider error: stop this scene's pre-generation
+                logger.warning("Scene pre-generation failed for %s: %s", name, e)
+                break
+            if text:
+                entry[name] = text
+        return dict(entry)
+
+    def _trim(self) -> None:
+        """Keep the newest max_scenes entries."""
+        while len(self._cache) > max(1, self.settings.max_scenes):
+            self._cache.popitem(last=False)
+
+    def answer(self, scene: SceneState, content: str) -> str | None:
+        """Cached reply to a short look/who question about scene's current version, else None."""
+        text = content.strip()
+        # In-character speech is addressed to NPCs, not a request for description
+        if len(text) > self.settings.max_question_chars or text.lower().startswith(
+            "[says]"
+        ):
+            return None
+        entry = self._cache.get((scene.scene_id, scene.version), {})
+        if _WHO.search(text):
+            lowered = text.lower()
+            mentioned = [
+                entry[f"npc:{p.entity_id}"]
+                for p in scene.positions
+                if f"npc:{p.entity_id}" in entry
+                and (
+                    _display_name(p.entity_id).lower() in lowered
+                    or _WHO_HERE.search(text)
+                )
+            ]
+            reply = "\n\n".join(mentioned) or None
+        elif _LOOK.search(text):
+            reply = entry.get("location")
+        else:
+            return None
+        self._metrics.incr("pregen.hit" if reply else "pregen.miss")
+        return reply
+
+    async def run(self) -> None:
+        """Background loop: pre-generate the most recently scheduled scene whenever one is queued."""
+        self._loop = asyncio.get_running_loop()
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            scene = self._pending
+            if scene is None:
+                continue
+            try:
+                await self.pregenerate(scene)
+            except Exception as e:  # noqa: BLE001 - keep the background pre-generator running
+                logger.warning("Scene pre-generation failed: %s", e)
@@ -0,0 +1,193 @@
+"""
+System prompt assembly under a token budget.
+
+PromptBuilder collects named sections, each with a priority (lower is more
+important), and renders them in the order they were added. When the total
+estimated size exceeds the budget, sections are admitted by priority: a
+section that does not fit is cut at a boundary that suits it (whole retrieved
+chunks for list sections, else line or sentence boundaries) and dropped if
+less than min_tokens would remain. Required sections are always kept whole.
+The result depends only on the inputs, so the same context always yields
+the same prompt (and the same prefill cost).
+
+Token counts are a fast estimate: characters / chars-per-token for the target
+model (chars_per_token_for() matches model names against a pattern table),
+computed by the same estimate_tokens() the RAG budgets and reranker use.
+Each build records per-section sizes in metrics as prompt.tokens.<section>,
+plus prompt.truncated.<section> / prompt.dropped.<section> counters.
+"""
+
+import fnmatch
+from dataclasses import dataclass, field
+
+from dungeonmaster.ai.rerank import estimate_tokens
+from dungeonmaster.data.markdown import trim
+from dungeonmaster.metrics import Metrics
+from dungeonmaster.metrics import metrics as default_metrics
+
+# Rough chars-per-token by model family; the first matching pattern wins
+DEFAULT_CHARS_PER_TOKEN = {
+    "claude*": 3.5,
+    "llama*": 3.8,
+    "mistral*": 3.6,
+    "*": 4.0,
+}
+
+
+def chars_per_token_for(
+    model: str | None, table: dict[str, float] | None = None
+) -> float:
+    """Chars-per-token ratio for model: first fnmatch pattern in table that matches (case-insensitive)."""
+    table = table or DEFAULT_CHARS_PER_TOKEN
+    name = (model or "").lower()
+    for pattern, ratio in table.items():
+        if fnmatch.fnmatchcase(name, pattern.lower()):
+            return float(ratio)
+    return 4.0
+
+
+@dataclass
+class PromptSection:
+    """One block of the system prompt. parts (if set) are joined by separator and truncated whole."""
+
+    name: str
+    text: str
+    priority: int = 5
+    heading: str = ""
+    parts: list[str] | None = None
+    separator: str = "\n\n---\n\n"
+    required: bool = False
+    min_tokens: int = 20
+
+    def render(self, body: str | None = None) -> str:
+        body = self.text if body is None else body
+        return f"{self.heading}\n{body}" if self.heading else body
+
+
+@dataclass
+class BuiltPrompt:
+    """Rendered prompt plus what happened to each section."""
+
+    text: str
+    tokens: int
+    # section -> estimated tokens kept
+    sizes: dict[str, int] = field(default_factory=dict)
+    truncated: list[str] = field(default_factory=list)
+    dropped: list[str] = field(default_factory=list)
+
+
+class PromptBuilder:
+    """Priority-ordered, budgeted system prompt assembly (see module docstring)."""
+
+    def __init__(
+        self,
+        budget_tokens: int,
+        chars_per_token: float = 4.0,
+        metrics: Metrics | None = None,
+    ):
+        self._budget = budget_tokens
+        self._chars_per_token = chars_per_token
+        self._metrics = metrics if metrics is not None else default_metrics
+        self._sections: list[PromptSection] = []
+
+    def estimate(self, text: str) -> int:
+        """Estimated tokens in text."""
+        return estimate_tokens(text, self._chars_per_token)
+
+    def add(
+        self,
+        name: str,
+        text: str = "",
+        priority: int = 5,
+        heading: str = "",
+        parts: list[str] | None = None,
+        required: bool = False,
+        min_tokens: int = 20,
+    ) -> "PromptBuilder":
+        """Add a section (empty sections are ignored). Returns self for chaining."""
+        if parts is not None:
+            parts = [p for p in parts if p]
+            text = "\n\n---\n\n".join(parts)
+        if text.strip():
+            self._sections.append(
+                PromptSection(
+                    name,
+                    text.strip(),
+                    priority,
+                    heading,
+                    parts,
+                    required=required,
+                    min_tokens=min_tokens,
+                )
+            )
+        return self
+
+    def _fit(self, section: PromptSection, tokens: int) -> str | None:
+        """Section body cut to at most tokens (whole parts, else line/sentence boundary), or None."""
+        overhead = self.estimate(section.render(""))
+        max_chars = int((tokens - overhead) * self._chars_per_token)
+        if max_chars <= 0 or tokens < section.min_tokens:
+            return None
+        if section.parts is not None:
+            kept: list[str] = []
+            for part in section.parts:
+                candidate = section.separator.join([*kept, part])
+                if len(candidate) > max_chars:
+                    break
+                kept.append(part)
+            # Even the best part is too long: keep a cut-down version of it rather than nothing
+            body = (
+                section.separator.join(kept)
+                if kept
+                else trim(section.parts[0], max_chars)
+            )
+        else:
+            body = trim(section.text, max_chars)
+        return body if body.strip() else None
+
+    def build(self) -> BuiltPrompt:
+        """Render the sections that fit the budget, in insertion order, and record their sizes."""
+        bodies: dict[int, str] = {}
+        truncated: list[str] = []
+        dropped: list[str] = []
+        remaining = self._budget
+        sections = self._sections
+        order = sorted(
+            range(len(sections)),
+            key=lambda i: (not sections[i].required, sections[i].priority, i),
+        )
+        for i in order:
+            section = sections[i]
+            cost = self.estimate(section.render()) + 1  # + blank-line joint
+            if section.required or cost <= remaining:
+                bodies[i] = section.text
+                remaining -= cost
+                continue
+            body = self._fit(section, remaining - 1)
+            if body is None:
+                dropped.append(section.name)
+                continue
+            bodies[i] = body
+            truncated.append(section.name)
+            remaining -= self.estimate(section.render(body)) + 1
+
+        rendered = [
+            (sections[i].name, sections[i].render(bodies[i])) for i in sorted(bodies)
+        ]
+        text = "\n\n".join(r for _, r in rendered)
+        sizes = {name: self.estimate(r) for name, r in rendered}
+        built = BuiltPrompt(
+            text=text,
+            tokens=self.estimate(text),
+            sizes=sizes,
+            truncated=truncated,
+            dropped=dropped,
+        )
+        for name, size in sizes.items():
+            self._metrics.observe(f"prompt.tokens.{name}", size)
+        self._metrics.observe("prompt.tokens.total", built.tokens)
+        for name in truncated:
+            self._metrics.incr(f"prompt.truncated.{name}")
+        for name in dropped:
+            self._metrics.incr(f"prompt.dropped.{name}")
+        return built
@@ -0,0 +1,217 @@
+"""
+Batched combat rounds.
+
+In combat every player sends an /action, and handled one by one each action
+repeats the RAG lookup, the scene load and a full model round trip, with
+outcomes that may contradict each other. In round mode a RoundCoordinator
+collects the /action messages of the players in SceneState.turn_order (entries
+whose position is a player, matched to a user as "<user_id>" or
+"player_<user_id>"). The first action opens a round. It closes when every
+player in the turn order has acted, or window seconds after it opened. All
+actions are then resolved by Engine.resolve_round in one ruling call that
+shares the rule context, scene and character sheets. The model answers with
+one "### <actor>" section per player (ROUND_PROMPT), and split_round_reply()
+fans these back out to the waiting players. A second action from a player in
+the same round is merged into their first one.
+
+Round mode needs at least min_players players in the turn order. Any other
+message (and any action outside it) takes the normal per-message path.
+Rounds are counted in metrics as rounds.resolved and rounds.timeout, and the
+number of actions per round is observed as rounds.actions.
+"""
+
+import asyncio
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from dungeonmaster.data.state import SceneState, StateStore
+from dungeonmaster.metrics import Metrics
+from dungeonmaster.metrics import metrics as default_metrics
+
+if TYPE_CHECKING:  # engine.py imports this module
+    from dungeonmaster.core.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+ROUND_PROMPT = (
+    "Several players act in this combat round. Resolve all of their actions together, in turn order and "
+    "consistently with each other: each action gets one outcome, and shared effects happen once. Write one "
+    "section per player, each starting with a line '### <actor>' for these actors: {actors}. Address the "
+    "player in their own section. Put any scene update block after the last section."
+)
+
+_ACTION = re.compile(r"^\s*\[action\]", re.IGNORECASE)
+_HEADING = re.compile(r"^[ \t]*#{1,6}[ \t]*(.+?)[ \t#]*$", re.MULTILINE)
+
+
+@dataclass
+class RoundSettings:
+    """Whether actions are batched into rounds, how long a round waits, and from how many players."""
+
+    enabled: bool = False
+    window: float = 30.0  # seconds a round stays open for the rest of the turn order
+    min_players: int = 2  # players in the turn order for round mode to apply
+
+    @classmethod
+    def from_config(cls, cfg: dict | None) -> "RoundSettings":
+        cfg = cfg or {}
+        return cls(
+            enabled=bool(cfg.get("enabled", False)),
+            window=float(cfg.get("window", 30.0)),
+            min_players=int(cfg.get("min_players", 2)),
+        )
+
+
+@dataclass
+class RoundAction:
+    """One player's action in a round: actor is their turn_order entry."""
+
+    session_id: str
+    user_id: str
+    actor: str
+    content: str
+
+
+def _label(text: str) -> str:
+    return re.sub(r"[\W_]+", "", text.lower())
+
+
+def split_round_reply(text: str, actors: list[str]) -> dict[str, str]:
+    """
+    Each actor's "### <actor>" section of a round reply, after any text shared by all (before the
+    first section). An actor without a section gets the whole reply.
+    """
+    wanted = {_label(actor): actor for actor in actors}
+    marks = [
+        (m.start(), m.end(), wanted.get(_label(m.group(1))))
+        for m in _HEADING.finditer(text)
+    ]
+    marks = [mark for mark in marks if mark[2] is not None]
+    if not marks:
+        return {actor: text for actor in actors}
+    shared = text[: marks[0][0]].strip()
+    sections: dict[str, list[str]] = {}
+    for i, (_, end, actor) in enumerate(marks):
+        stop = marks[i + 1][0] if i + 1 < len(marks) else len(text)
+        sections.setdefault(actor, []).append(text[end:stop].strip())
+    return {
+        actor: "\n\n".join(part for part in (shared, *sections[actor]) if part)
+        if actor in sections
+        else text
+        for actor in actors
+    }
+
+
+def round_players(scene: SceneState) -> list[str]:
+    """turn_order entries that are players (or have no position to say otherwise), in order."""
+    types = {p.entity_id: p.entity_type for p in scene.positions}
+    return [
+        entry for entry in scene.turn_order if types.get(entry, "player") == "player"
+    ]
+
+
+@dataclass
+class _Pending:
+    action: RoundAction
+    waiters: list[asyncio.Future] = field(default_factory=list)
+
+
+@dataclass
+class _Round:
+    players: list[str]
+    pending: dict[str, _Pending] = field(default_factory=dict)
+    complete: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class RoundCoordinator:
+    """Collect the turn order's actions and resolve them in one batched call (see module docstring)."""
+
+    def __init__(
+        self,
+        engine: "Engine",
+        state_store: StateStore,
+        settings: RoundSettings | None = None,
+        metrics: Metrics | None = None,
+    ):
+        self._engine = engine
+        self._state_store = state_store
+        self.settings = settings or RoundSettings(enabled=True)
+        self._metrics = metrics if metrics is not None else default_metrics
+        self._round: _Round | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def _actor(self, user_id: str, players: list[str]) -> str | None:
+        for entry in players:
+            if entry in (user_id, f"player_{user_id}"):
+                return entry
+        return None
+
+    def collects(self, user_id: str, content: str) -> bool:
+        """True if this message is an /action by a player in the turn order while round mode applies."""
+        if not self.settings.enabled or not _ACTION.match(content):
+            return False
+        players = round_players(self._state_store.load_scene())
+        return (
+            len(players) >= max(1, self.settings.min_players)
+            and self._actor(user_id, players) is not None
+        )
+
+    async def submit(self, session_id: str, user_id: str, content: str) -> str:
+        """Add the player's action to the open round (opening one if needed); returns their part of the reply."""
+        rnd = self._round
+        if rnd is None:
+            players = round_players(self._state_store.load_scene())
+            # the turn order changed since collects()
+            if self._actor(user_id, players) is None:
+                return await self._engine.handle_message(session_id, user_id, content)
+            # A round opens only with a valid first action, so it never idles out the window empty
+            rnd = self._round = _Round(players=players)
+            task = asyncio.create_task(self._run(rnd))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        actor = self._actor(user_id, rnd.players)
+        if actor is None:  # the turn order changed after this round opened
+            return await self._engine.handle_message(session_id, user_id, content)
+        pending = rnd.pending.get(actor)
+        if pending is None:
+            pending = rnd.pending[actor] = _Pending(
+                RoundAction(session_id, user_id, actor, content)
+            )
+        else:
+            pending.action.content += f"\n{content}"
+        waiter = asyncio.get_running_loop().create_future()
+        pending.waiters.append(waiter)
+        if set(rnd.players) <= set(rnd.pending):
+            rnd.complete.set()
+            self._round = None  # later actions open the next round
+        return await waiter
+
+    async def _run(self, rnd: _Round) -> None:
+        """Close the round when everyone has acted or the window ends, then resolve it."""
+        try:
+            await asyncio.wait_for(rnd.complete.wait(), self.settings.window)
+        except asyncio.TimeoutError:
+            self._metrics.incr("rounds.timeout")
+        if self._round is rnd:
+            self._round = None
+        order = {actor: i for i, actor in enumerate(rnd.players)}
+        pending = sorted(rnd.pending.values(), key=lambda p: order[p.action.actor])
+        if not pending:
+            return
+        self._metrics.observe("rounds.actions", len(pending))
+        try:
+            replies = await self._engine.resolve_round([p.action for p in pending])
+        except Exception as e:  # noqa: BLE001 - any error is passed to every waiting player
+            logger.warning("Round resolution failed: %s", e)
+            for p in pending:
+                for waiter in p.waiters:
+                    if not waiter.done():
+                        waiter.set_exception(e)
+            return
+        self._metrics.incr("rounds.resolved")
+        for p in pending:
+            for waiter in p.waiters:
+                if not waiter.done():
+                    waiter.set_result(replies.get(p.action.user_id, ""))
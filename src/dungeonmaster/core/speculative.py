@@ -0,0 +1,194 @@
+"""
+Speculative narration for mixed action turns.
+
+An action such as "I try to grapple the ogre and drag it off the ledge" needs
+both a ruling and narration. Instead of one serial round trip, the engine
+starts the RAG-backed ruling on the ruling provider and a provisional draft on
+the narrative provider at the same time. The draft only narrates the attempt
+(it must not decide the outcome); the ruling opens with a verdict line:
+
+    VERDICT: ALLOWED | PARTIAL | DISALLOWED
+
+Once both are back they are reconciled: an allowed or partial verdict keeps the
+draft as is and appends the ruling's outcome, a disallowed one asks the
+narrative provider for a minimal revision of the draft (or drops it when
+revision is off or fails). Drafts and revisions never fall back to the ruling
+provider: when the narrative provider fails, the reply is the ruling alone.
+End-to-end latency is then roughly that of the
+slower call rather than the sum of both. Outcomes are counted in metrics as
+speculative.<verdict>, speculative.revised and speculative.draft_dropped.
+"""
+
+import asyncio
+import logging
+import re
+from dataclasses import dataclass
+
+from dungeonmaster.ai.orchestrator import AIOrchestrator
+from dungeonmaster.ai.router import keyword_score
+from dungeonmaster.metrics import Metrics
+from dungeonmaster.metrics import metrics as default_metrics
+
+logger = logging.getLogger(__name__)
+
+RULING_PROMPT = (
+    "A separate narrator is already describing the player's attempt. Begin your reply with one line: "
+    "VERDICT: ALLOWED, VERDICT: PARTIAL or VERDICT: DISALLOWED. Then give only the ruling and its outcome "
+    "(checks, DCs, effects) in a few sentences; do not re-describe the attempt."
+)
+DRAFT_PROMPT = (
+    "Narrate only the player's attempt as it begins, in two to four sentences. Do not decide whether it "
+    "succeeds, state rolls or apply rules: a ruling will follow your text. Do not add a scene update block."
+)
+REVISE_PROMPT = (
+    "You are the Dungeon Master. The ruling below does not allow the player's action as drafted. Revise the "
+    "draft as little as possible so it agrees with the ruling. Reply with the revised narration only."
+)
+
+_VERDICT = re.compile(
+    r"^\W*verdict\W*(allowed|partial|disallowed)\W*$", re.IGNORECASE | re.MULTILINE
+)
+_ACTION_CUE = re.compile(
+    r"^\s*\[action\]|(?<!can )(?<!could )(?<!may )(?<!should )\bi\s+(?:try|attempt|attack|cast|jump|leap|"
+    r"climb|swing|shoot|grab|grapple|shove|dodge|charge|sneak|hide|throw|push|pull|break|pick|disarm|use)\b",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class SpeculativeSettings:
+    """When a turn counts as a mixed action, and how the draft is produced and revised."""
+
+    enabled: bool = False
+    # router keyword score from which an action also needs a ruling
+    min_score: float = 0.3
+    # narrative model for drafts; "" = the narrative provider's default
+    draft_model: str = ""
+    revise: bool = True  # revise a draft the ruling disallows (else drop it)
+
+    @classmethod
+    def from_config(cls, cfg: dict | None) -> "SpeculativeSettings":
+        cfg = cfg or {}
+        return cls(
+            enabled=bool(cfg.get("enabled", False)),
+            min_score=float(cfg.get("min_score", 0.3)),
+            draft_model=str(cfg.get("draft_model") or ""),
+            revise=bool(cfg.get("revise", True)),
+        )
+
+
+@dataclass
+class SpeculativeResult:
+    """Reconciled reply and how it came about."""
+
+    text: str
+    verdict: str  # "allowed", "partial", "disallowed" or "unknown" (no verdict line)
+    revised: bool = False
+    draft_used: bool = True
+    # the ruling body alone (verdict line removed), without any narration
+    ruling: str = ""
+
+
+def is_mixed_action(text: str, min_score: float = 0.3) -> bool:
+    """True if text describes a player action (/action or "I try/attack/...") that also raises a rules question."""
+    return bool(_ACTION_CUE.search(text)) and keyword_score(text) >= min_score
+
+
+def parse_verdict(text: str) -> tuple[str, str]:
+    """(verdict, ruling text without the verdict line); verdict is "unknown" when there is no verdict line."""
+    match = _VERDICT.search(text)
+    if match is None:
+        return "unknown", text.strip()
+    body = (text[: match.start()] + text[match.end() :]).strip()
+    return match.group(1).lower(), body
+
+
+class SpeculativeNarrator:
+    """Run the ruling and a provisional narrative draft in parallel, then reconcile (see module docstring)."""
+
+    def __init__(
+        self,
+        orchestrator: AIOrchestrator,
+        settings: SpeculativeSettings | None = None,
+        metrics: Metrics | None = None,
+    ):
+        self._orchestrator = orchestrator
+        self.settings = settings or SpeculativeSettings(enabled=True)
+        self._metrics = metrics if metrics is not None else default_metrics
+
+    async def run(
+        self, prompt: str, ruling_system: str, draft_system: str
+    ) -> SpeculativeResult:
+        """
+        Generate the ruling (ruling_system should include RULING_PROMPT) and the draft (draft_system
+        should include DRAFT_PROMPT) concurrently. A failed ruling raises; a failed draft is dropped.
+        """
+        draft_task = asyncio.create_task(
+            self._orchestrator.generate(
+                prompt=prompt,
+                system=draft_system,
+                task_type="narrative",
+                model=self.settings.draft_model or None,
+                fallback=False,
+            )
+        )
+        try:
+            ruling = await self._orchestrator.generate(
+                prompt=prompt, system=ruling_system, task_type="ruling"
+            )
+        except BaseException:
+            draft_task.cancel()
+            raise
+        try:
+            draft = (await draft_task).text.strip()
+        except Exception as e:  # noqa: BLE001 - any provider error: reply with the ruling only
+            logger.warning(
+                "Speculative draft failed, replying with the ruling only: %s", e
+            )
+            draft = ""
+        verdict, body = parse_verdict(ruling.text)
+        return await self.reconcile(prompt, draft, verdict, body)
+
+    async def reconcile(
+        self, prompt: str, draft: str, verdict: str, ruling: str
+    ) -> SpeculativeResult:
+        """Combine draft and ruling; a disallowed draft is minimally revised (or dropped)."""
+        self._metrics.incr(f"speculative.{verdict}")
+        revised = False
+        if draft and verdict == "disallowed":
+            draft = (
+                await self._revise(prompt, draft, ruling)
+                if self.settings.revise
+                else ""
+            )
+            revised = bool(draft)
+            self._metrics.incr(
+                "speculative.revised" if revised else "speculative.draft_dropped"
+            )
+        elif not draft:
+            self._metrics.incr("speculative.draft_dropped")
+        text = f"{draft}\n\n{ruling}" if draft and ruling else draft or ruling
+        return SpeculativeResult(
+            text=text,
+            verdict=verdict,
+            revised=revised,
+            draft_used=bool(draft),
+            ruling=ruling,
+        )
+
+    async def _revise(self, prompt: str, draft: str, ruling: str) -> str:
+        """Draft revised to agree with the ruling, or "" if the revision call fails."""
+        try:
+            result = await self._orchestrator.generate(
+                prompt=f"Player: {prompt}\n\nDraft:\n{draft}\n\nRuling:\n{ruling}",
+                system=REVISE_PROMPT,
+                task_type="narrative",
+                model=self.settings.draft_model or None,
+                fallback=False,
+            )
+        except Exception as e:  # noqa: BLE001 - any provider error: drop the draft
+            logger.warning(
+                "Speculative draft revision failed, dropping the draft: %s", e
+            )
+            return ""
+        return result.text.strip()
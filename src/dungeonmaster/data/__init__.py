@@ -1,7 +1,21 @@
-"""Data layer: vault, state, file watcher."""
+"""
+Data layer: vault, state, file watcher.
+
+VaultWatcher is exported lazily so watchdog is only imported when watching starts.
+"""
+
+import importlib
+from typing import Any
 
 from dungeonmaster.data.state import SceneState, StateStore
 from dungeonmaster.data.vault import Vault
-from dungeonmaster.data.watcher import VaultWatcher
 
-__all__ = ["Vault", "SceneState", "StateStore", "VaultWatcher"]
+__all__ = ["SceneState", "StateStore", "Vault", "VaultWatcher"]
+
+
+def __getattr__(name: str) -> Any:
+    if name != "VaultWatcher":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = importlib.import_module("dungeonmaster.data.watcher").VaultWatcher
+    globals()[name] = value
+    return value
@@ -0,0 +1,285 @@
+"""
+Scene change feed: versioned scene deltas pushed to VTT/frontend consumers.
+
+StateStore notifies its scene listeners with (version, delta, scene) on every
+saved change; SceneChangeFeed.publish keeps the latest snapshot plus a ring
+buffer of recent deltas, so a consumer that knows its last version can catch up
+with only the deltas it missed (or a fresh snapshot if it fell too far behind)
+and then follow live events. SceneFeedServer serves the feed as Server-Sent
+Events over a small asyncio HTTP listener on TCP or a Unix socket:
+
+  GET /scene                  current scene JSON (with "version")
+  GET /events?since=<version> text/event-stream of "snapshot" and "patch" events;
+                              each event's id is its version (Last-Event-ID works)
+
+Serving several campaigns, the server holds one feed per campaign name and the
+same endpoints are under /<campaign>/ (e.g. GET /strahd/events).
+
+Deltas use the scene patch format from data/scene_patch.py.
+"""
+
+import asyncio
+import json
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SceneEvent:
+    """One feed event: kind is "patch" (delta from version - 1) or "snapshot" (full scene)."""
+
+    version: int
+    kind: str
+    data: dict[str, Any]
+
+    def to_sse(self) -> bytes:
+        payload = json.dumps(self.data, separators=(",", ":"), ensure_ascii=False)
+        return f"id: {self.version}\nevent: {self.kind}\ndata: {payload}\n\n".encode()
+
+
+class Subscription:
+    """
+    One consumer's view of the feed: catch-up events first, then live ones. A consumer
+    that falls more than the queue size behind is resynced with a fresh snapshot.
+    """
+
+    def __init__(
+        self,
+        feed: "SceneChangeFeed",
+        backlog: list[SceneEvent],
+        last: int,
+        maxsize: int,
+    ):
+        self._feed = feed
+        self._backlog = deque(backlog)
+        self._queue: asyncio.Queue[SceneEvent] = asyncio.Queue(maxsize)
+        self._last = last
+        self._resync = False
+
+    def _push(self, event: SceneEvent) -> None:
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self._resync = True
+
+    async def get(self, timeout: float | None = None) -> SceneEvent | None:
+        """Next event, or None if nothing arrives within timeout seconds."""
+        while True:
+            if self._resync:
+                self._resync = False
+                self._backlog.clear()
+                while not self._queue.empty():
+                    self._queue.get_nowait()
+                snapshot = self._feed.snapshot()
+                if snapshot is not None:
+                    self._last = snapshot.version
+                    return snapshot
+            if self._backlog:
+                event = self._backlog.popleft()
+            else:
+                try:
+                    event = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    return None
+            if event.kind == "snapshot" or event.version > self._last:
+                self._last = event.version
+                return event
+
+    def close(self) -> None:
+        self._feed._subscribers.discard(self)
+
+    def __aiter__(self) -> "Subscription":
+        return self
+
+    async def __anext__(self) -> SceneEvent:
+        return await self.get()  # type: ignore[return-value]
+
+
+class SceneChangeFeed:
+    """
+    Ring buffer of the last `history` scene deltas plus the latest snapshot.
+    publish() must be called on the event loop thread that subscribers run on.
+    """
+
+    def __init__(self, history: int = 256, subscriber_queue: int = 256):
+        self._events: deque[SceneEvent] = deque(maxlen=history)
+        self._snapshot: dict[str, Any] | None = None
+        self._subscribers: set[Subscription] = set()
+        self._subscriber_queue = subscriber_queue
+
+    @property
+    def version(self) -> int:
+        return self._snapshot["version"] if self._snapshot else 0
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def seed(self, scene: dict[str, Any]) -> None:
+        """Set the current snapshot (e.g. at startup) without emitting an event."""
+        self._snapshot = scene
+        self._events.clear()
+
+    def snapshot(self) -> SceneEvent | None:
+        if self._snapshot is None:
+            return None
+        return SceneEvent(self._snapshot["version"], "snapshot", self._snapshot)
+
+    def publish(
+        self, version: int, delta: dict[str, Any], scene: dict[str, Any]
+    ) -> None:
+        """Record a change (StateStore scene listener signature) and fan it out to subscribers."""
+        if self._snapshot is not None and version != self.version + 1:
+            # A gap (e.g. scene.json was replaced externally): older deltas no longer chain
+            self._events.clear()
+        self._snapshot = scene
+        event = SceneEvent(version, "patch", delta)
+        self._events.append(event)
+        for subscription in list(self._subscribers):
+            subscription._push(event)
+
+    def since(self, version: int) -> list[SceneEvent] | None:
+        """Deltas after version, oldest first; None if they are no longer all buffered."""
+        if version == self.version:
+            return []
+        events = [e for e in self._events if e.version > version]
+        if version > self.version or not events or events[0].version != version + 1:
+            return None
+        return events
+
+    def subscribe(self, since: int | None = None) -> Subscription:
+        """Subscribe from a known version (deltas only) or from scratch (snapshot first)."""
+        backlog = self.since(since) if since is not None else None
+        last = since or 0
+        if backlog is None:
+            snapshot = self.snapshot()
+            backlog = [snapshot] if snapshot is not None else []
+        subscription = Subscription(self, backlog, last, self._subscriber_queue)
+        self._subscribers.add(subscription)
+        return subscription
+
+
+class SceneFeedServer:
+    """Minimal HTTP/SSE server for a SceneChangeFeed, or one per campaign name (TCP host:port, or a Unix socket path)."""
+
+    def __init__(
+        self,
+        feed: SceneChangeFeed | dict[str, SceneChangeFeed],
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        unix_socket: str | None = None,
+        keepalive: float = 15.0,
+    ):
+        # "" serves /scene and /events; a campaign name serves /<name>/scene and /<name>/events
+        self._feeds = dict(feed) if isinstance(feed, dict) else {"": feed}
+        self._host = host
+        self._port = port
+        self._unix_socket = unix_socket
+        self._keepalive = keepalive
+        self._server: asyncio.AbstractServer | None = None
+        self._clients: set[asyncio.Task] = set()
+
+    @property
+    def address(self) -> Any:
+        """Bound (host, port) or socket path once started."""
+        if self._server is None:
+            return None
+        return self._server.sockets[0].getsockname()
+
+    async def start(self) -> None:
+        if self._unix_socket:
+            self._server = await asyncio.start_unix_server(
+                self._handle, path=self._unix_socket
+            )
+        else:
+            self._server = await asyncio.start_server(
+                self._handle, self._host, self._port
+            )
+        logger.info("Scene feed listening on %s", self.address)
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            # Open event streams would otherwise keep wait_closed() waiting
+            for task in list(self._clients):
+                task.cancel()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        task = asyncio.current_task()
+        self._clients.add(task)
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            headers: dict[str, str] = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            if len(request_line) < 2 or request_line[0] != "GET":
+                await self._respond(writer, 405, "text/plain", b"method not allowed\n")
+                return
+            url = urlsplit(request_line[1])
+            prefix, _, endpoint = url.path.rpartition("/")
+            feed = self._feeds.get(prefix.strip("/"))
+            if feed is not None and endpoint == "scene":
+                snapshot = feed.snapshot()
+                body = json.dumps(
+                    snapshot.data if snapshot else {}, ensure_ascii=False
+                ).encode("utf-8")
+                await self._respond(writer, 200, "application/json", body)
+            elif feed is not None and endpoint == "events":
+                since = parse_qs(url.query).get(
+                    "since", [headers.get("last-event-id")]
+                )[0]
+                await self._stream(
+                    writer, feed, int(since) if since and since.isdigit() else None
+                )
+            else:
+                await self._respond(writer, 404, "text/plain", b"not found\n")
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            self._clients.discard(task)
+            writer.close()
+
+    async def _respond(
+        self, writer: asyncio.StreamWriter, status: int, content_type: str, body: bytes
+    ) -> None:
+        reason = {200: "OK", 404: "Not Found", 405: "Method Not Allowed"}[status]
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode(
+                "latin-1"
+            )
+            + body
+        )
+        await writer.drain()
+
+    async def _stream(
+        self, writer: asyncio.StreamWriter, feed: SceneChangeFeed, since: int | None
+    ) -> None:
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+            b"Connection: keep-alive\r\n\r\n"
+        )
+        await writer.drain()
+        subscription = feed.subscribe(since)
+        try:
+            while True:
+                event = await subscription.get(timeout=self._keepalive)
+                writer.write(
+                    event.to_sse() if event is not None else b": keepalive\n\n"
+                )
+                await writer.drain()
+        finally:
+            subscription.close()
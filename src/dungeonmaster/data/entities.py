@@ -0,0 +1,226 @@
+"""
+Entity index over characters/ and npcs/: names, aliases and [[links]].
+
+Each Markdown file becomes an Entity named by its frontmatter `name`, its
+first H1 heading or its file name, plus any frontmatter `aliases` (the
+Obsidian convention) and the labels other files use in [[Target|label]]
+links to it. mentions() finds the entities a message refers to by name,
+alias or [[link]]; context_for() returns only the sections of those entities
+that are relevant to the message (always the lead section, then sections
+sharing words with the message), trimmed to a character budget. Files are
+parsed lazily and re-parsed after invalidate(path), which the file watcher
+calls on change.
+"""
+
+import logging
+import re
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from dungeonmaster.data.markdown import (
+    Section,
+    find_links,
+    parse_sections,
+    select_sections,
+    split_frontmatter,
+)
+from dungeonmaster.data.vault import Vault
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Entity:
+    """A character or NPC document."""
+
+    entity_id: str  # file stem
+    kind: str  # "character" | "npc"
+    path: Path
+    name: str
+    aliases: list[str] = field(default_factory=list)
+    links: list[str] = field(default_factory=list)  # [[link]] targets in this document
+    sections: list[Section] = field(default_factory=list)
+    frontmatter: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def names(self) -> list[str]:
+        return [self.name, *self.aliases]
+
+
+def _as_list(value: Any) -> list[str]:
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, (list, tuple)):
+        return [str(v) for v in value if v]
+    return []
+
+
+def _parse_entity(path: Path, kind: str, text: str) -> Entity:
+    frontmatter, body = split_frontmatter(text)
+    sections = parse_sections(body)
+    h1 = next((s.heading for s in sections if s.level == 1), "")
+    fallback = path.stem.replace("_", " ").replace("-", " ")
+    name = str(frontmatter.get("name") or h1 or fallback)
+    aliases = [
+        a
+        for a in _as_list(frontmatter.get("aliases") or frontmatter.get("alias"))
+        if a != name
+    ]
+    if path.stem != name and path.stem not in aliases:
+        aliases.append(path.stem)
+    links = list(dict.fromkeys(target for target, _ in find_links(body)))
+    return Entity(
+        entity_id=path.stem,
+        kind=kind,
+        path=path,
+        name=name,
+        aliases=aliases,
+        links=links,
+        sections=sections,
+        frontmatter=frontmatter,
+    )
+
+
+class EntityIndex:
+    """Name/alias/link index over the vault's characters/ and npcs/ (thread-safe invalidation)."""
+
+    def __init__(self, vault: Vault, min_name_length: int = 3):
+        self._vault = vault
+        self._min_name_length = min_name_length
+        self._lock = threading.Lock()
+        self._entities: dict[Path, Entity] | None = None
+        self._stale: set[Path] = set()
+        self._matcher: re.Pattern | None = None
+        self._by_name: dict[str, Entity] = {}
+
+    def _roots(self) -> list[tuple[Path, str]]:
+        return [
+            (self._vault.characters_dir(), "character"),
+            (self._vault.npcs_dir(), "npc"),
+        ]
+
+    def _kind_of(self, path: Path) -> str | None:
+        for root, kind in self._roots():
+            if path.is_relative_to(root):
+                return kind
+        return None
+
+    def _load(self, path: Path, kind: str) -> Entity | None:
+        try:
+            return _parse_entity(path, kind, self._vault.read_text(path))
+        except (OSError, UnicodeDecodeError) as e:
+            logger.warning("Could not read %s: %s", path, e)
+            return None
+
+    def invalidate(self, path: str | Path | None = None) -> None:
+        """Re-parse path on next use (or everything if path is None). Safe from the watcher thread."""
+        with self._lock:
+            if path is None or self._entities is None:
+                self._entities = None
+            else:
+                self._stale.add(Path(path).resolve())
+            self._matcher = None
+
+    def _refresh(self) -> dict[Path, Entity]:
+        with self._lock:
+            if self._entities is None:
+                entities: dict[Path, Entity] = {}
+                for root, kind in self._roots():
+                    for path in sorted(root.rglob("*.md")) if root.exists() else []:
+                        entity = self._load(path.resolve(), kind)
+                        if entity is not None:
+                            entities[entity.path] = entity
+                self._entities, self._stale = entities, set()
+            for path in self._stale:
+                self._entities.pop(path, None)
+                kind = self._kind_of(path)
+                if kind is not None and path.suffix.lower() == ".md" and path.exists():
+                    entity = self._load(path, kind)
+                    if entity is not None:
+                        self._entities[path] = entity
+            self._stale = set()
+            if self._matcher is None:
+                self._build_matcher(self._entities)
+            return self._entities
+
+    def _build_matcher(self, entities: dict[Path, Entity]) -> None:
+        by_name: dict[str, Entity] = {}
+        for entity in entities.values():
+            for name in entity.names:
+                by_name.setdefault(name.lower(), entity)
+        # Link labels ([[Target|label]]) used elsewhere become extra aliases of the target
+        for entity in entities.values():
+            for target, label in find_links("\n".join(s.text for s in entity.sections)):
+                linked = by_name.get(target.lower())
+                if linked is not None and label:
+                    by_name.setdefault(label.lower(), linked)
+        self._by_name = by_name
+        names = sorted(
+            (n for n in by_name if len(n) >= self._min_name_length),
+            key=len,
+            reverse=True,
+        )
+        pattern = r"\b(" + "|".join(re.escape(n) for n in names) + r")\b"
+        self._matcher = re.compile(pattern, re.IGNORECASE) if names else None
+
+    def entities(self) -> list[Entity]:
+        return list(self._refresh().values())
+
+    def get(self, name: str) -> Entity | None:
+        """Entity by name, alias, link label or file stem (case-insensitive)."""
+        self._refresh()
+        return self._by_name.get(name.lower())
+
+    def mentions(self, text: str) -> list[Entity]:
+        """Entities referred to in text by name, alias or [[link]], in order of first mention."""
+        self._refresh()
+        found: dict[Path, Entity] = {}
+        hits: list[tuple[int, Entity]] = []
+        for match in re.finditer(r"\[\[([^\]|#]+)", text):
+            entity = self._by_name.get(match.group(1).strip().lower())
+            if entity is not None:
+                hits.append((match.start(), entity))
+        if self._matcher is not None:
+            for match in self._matcher.finditer(text):
+                hits.append((match.start(), self._by_name[match.group(1).lower()]))
+        for _, entity in sorted(hits, key=lambda h: h[0]):
+            found.setdefault(entity.path, entity)
+        return list(found.values())
+
+    def relevant_sections(self, entity: Entity, text: str, budget: int) -> str:
+        """The entity's lead section plus sections sharing words with text, trimmed to budget chars."""
+        return select_sections(entity.sections, text, budget)
+
+    def context_for(
+        self,
+        text: str,
+        budget: int = 1500,
+        max_entities: int = 3,
+        exclude: set[Path] | None = None,
+    ) -> str:
+        """
+        Prompt block for the entities mentioned in text (first max_entities), sharing budget
+        characters between them. Entities whose path is in exclude are skipped.
+        """
+        exclude = {p.resolve() for p in exclude or ()}
+        mentioned = [e for e in self.mentions(text) if e.path not in exclude][
+            :max_entities
+        ]
+        if not mentioned or budget <= 0:
+            return ""
+        per_entity = budget // len(mentioned)
+        blocks = []
+        for entity in mentioned:
+            header = f"### {entity.name} ({entity.kind})"
+            links = (
+                f"Linked: {', '.join(f'[[{link}]]' for link in entity.links[:8])}"
+                if entity.links
+                else ""
+            )
+            body = self.relevant_sections(
+                entity, text, per_entity - len(header) - len(links) - 2
+            )
+            blocks.append("\n".join(part for part in (header, body, links) if part))
+        return "\n\n".join(blocks)
@@ -0,0 +1,191 @@
+"""
+Minimal Obsidian-flavoured Markdown parsing for vault documents.
+
+split_frontmatter() separates a leading YAML frontmatter block, parse_sections()
+splits the body into heading-delimited sections (ignoring "#" lines inside
+fenced code), find_links() extracts [[wiki link]] targets, and
+select_sections() picks the sections of a document that share words with a
+query, within a character budget. Used by the entity index and character
+sheet parsing; no Markdown rendering is done.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any
+
+import yaml
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+_LINK = re.compile(r"\[\[([^\]|#]+)(?:#[^\]|]*)?(?:\|([^\]]+))?\]\]")
+_WORD = re.compile(r"[a-z0-9']+")
+_STOPWORDS = frozenset(
+    [
+        "the",
+        "and",
+        "for",
+        "with",
+        "that",
+        "this",
+        "what",
+        "who",
+        "where",
+        "when",
+        "how",
+        "does",
+        "can",
+        "his",
+        "her",
+        "their",
+        "they",
+        "them",
+        "you",
+        "your",
+        "from",
+        "into",
+        "about",
+        "have",
+        "has",
+        "was",
+        "were",
+        "are",
+        "will",
+        "would",
+        "should",
+        "could",
+        "not",
+        "but",
+        "any",
+        "all",
+        "our",
+        "out",
+    ]
+)
+
+
+@dataclass
+class Section:
+    """A heading and the text under it (up to the next heading). level 0 is the preamble."""
+
+    heading: str
+    level: int
+    text: str
+    parents: list[str] = field(default_factory=list)
+
+    @property
+    def title(self) -> str:
+        """Heading path, e.g. "Combat > Attacks"."""
+        return " > ".join([*self.parents, self.heading]) if self.heading else ""
+
+
+def split_frontmatter(text: str) -> tuple[dict[str, Any], str]:
+    """Return (frontmatter dict, body). Invalid or non-mapping frontmatter yields {}."""
+    if not text.startswith("---"):
+        return {}, text
+    lines = text.split("\n")
+    if lines[0].strip() != "---":
+        return {}, text
+    for i in range(1, len(lines)):
+        if lines[i].strip() in ("---", "..."):
+            try:
+                data = yaml.safe_load("\n".join(lines[1:i])) or {}
+            except yaml.YAMLError:
+                data = {}
+            return (data if isinstance(data, dict) else {}), "\n".join(lines[i + 1 :])
+    return {}, text
+
+
+def parse_sections(body: str) -> list[Section]:
+    """Split Markdown into sections by ATX heading; the text before the first heading is level 0."""
+    sections: list[Section] = []
+    stack: list[tuple[int, str]] = []  # open headings, outermost first
+    heading, level, parents, lines = "", 0, [], []
+    in_fence = False
+
+    def flush() -> None:
+        text = "\n".join(lines).strip()
+        if heading or text:
+            sections.append(
+                Section(heading=heading, level=level, text=text, parents=parents)
+            )
+
+    for line in body.split("\n"):
+        if _FENCE.match(line):
+            in_fence = not in_fence
+        match = None if in_fence else _HEADING.match(line)
+        if match is None:
+            lines.append(line)
+            continue
+        flush()
+        level, heading, lines = len(match.group(1)), match.group(2).strip(), []
+        stack = [(lvl, h) for lvl, h in stack if lvl < level]
+        parents = [h for _, h in stack]
+        stack.append((level, heading))
+    flush()
+    return sections
+
+
+def find_links(text: str) -> list[tuple[str, str | None]]:
+    """[[Target]], [[Target|Label]] and [[Target#Heading]] links as (target, label) pairs."""
+    return [
+        (m.group(1).strip(), m.group(2).strip() if m.group(2) else None)
+        for m in _LINK.finditer(text)
+    ]
+
+
+def words(text: str) -> set[str]:
+    """Lower-cased content words of text (stopwords and words under 3 letters dropped)."""
+    return {
+        w for w in _WORD.findall(text.lower()) if len(w) > 2 and w not in _STOPWORDS
+    }
+
+
+def trim(text: str, budget: int) -> str:
+    """Cut text to at most budget chars, preferring a line or sentence boundary, with an ellipsis."""
+    if len(text) <= budget:
+        return text
+    cut = text[: max(0, budget - 1)]
+    for sep in ("\n", ". "):
+        i = cut.rfind(sep)
+        if i > budget // 2:
+            cut = cut[: i + len(sep)].rstrip()
+            break
+    return cut + "…"
+
+
+def render_section(section: Section) -> str:
+    """Section as Markdown: heading path and text (the preamble and H1 title render as text only)."""
+    if section.level <= 1:
+        return section.text
+    return f"{'#' * section.level} {section.title}\n{section.text}".strip()
+
+
+def select_sections(
+    sections: list[Section], query: str, budget: int, lead: bool = True
+) -> str:
+    """
+    Sections sharing words with query (heading matches count double), best first, rendered
+    and trimmed to budget chars. With lead=True the first section is always included first.
+    """
+    query_words = words(query)
+    sections = [s for s in sections if s.text or s.level > 1]
+    if not sections:
+        return ""
+    chosen, rest = ([sections[0]], sections[1:]) if lead else ([], sections)
+    scored = []
+    for i, section in enumerate(rest):
+        score = 2 * len(query_words & words(section.heading)) + len(
+            query_words & words(section.text)
+        )
+        if score > 0:
+            scored.append((-score, i, section))
+    chosen += [s for _, _, s in sorted(scored, key=lambda item: item[:2])]
+    parts: list[str] = []
+    remaining = budget
+    for section in chosen:
+        if remaining <= 0:
+            break
+        block = trim(render_section(section), remaining)
+        parts.append(block)
+        remaining -= len(block) + 2
+    return "\n\n".join(p for p in parts if p)
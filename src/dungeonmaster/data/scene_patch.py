@@ -0,0 +1,225 @@
+"""
+Scene deltas: JSON Patch (RFC 6902) and scene merge-patch (RFC 7386).
+
+The model (or a VTT client) sends only what changed instead of a whole scene.
+A list is treated as RFC 6902 operations against the scene dict; an object is
+an RFC 7386 merge patch, extended so that "positions" merges per entity:
+each entry is matched by entity_id and merged into the existing position (or
+appended), and an entry with "remove": true deletes that entity.
+make_scene_patch() produces the same format as a diff between two scene dicts,
+which is what the change feed and VTT sync send.
+"""
+
+import copy
+from typing import Any
+
+_MISSING = object()
+
+
+class PatchError(ValueError):
+    """A patch is malformed or does not apply to the document."""
+
+
+# --- RFC 6901 JSON Pointer -------------------------------------------------
+
+
+def _parse_pointer(pointer: str) -> list[str]:
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise PatchError(f"invalid JSON pointer: {pointer!r}")
+    return [t.replace("~1", "/").replace("~0", "~") for t in pointer[1:].split("/")]
+
+
+def _index(container: list, token: str, allow_end: bool = False) -> int:
+    if allow_end and token == "-":
+        return len(container)
+    if not token.isdigit() or (token != "0" and token.startswith("0")):
+        raise PatchError(f"invalid array index: {token!r}")
+    i = int(token)
+    if i > len(container) or (i == len(container) and not allow_end):
+        raise PatchError(f"array index out of range: {i}")
+    return i
+
+
+def _resolve(doc: Any, tokens: list[str]) -> Any:
+    node = doc
+    for token in tokens:
+        if isinstance(node, dict):
+            if token not in node:
+                raise PatchError(f"path not found: /{'/'.join(tokens)}")
+            node = node[token]
+        elif isinstance(node, list):
+            node = node[_index(node, token)]
+        else:
+            raise PatchError(f"path not found: /{'/'.join(tokens)}")
+    return node
+
+
+def _add(doc: Any, tokens: list[str], value: Any) -> Any:
+    if not tokens:
+        return value
+    parent = _resolve(doc, tokens[:-1])
+    key = tokens[-1]
+    if isinstance(parent, dict):
+        parent[key] = value
+    elif isinstance(parent, list):
+        parent.insert(_index(parent, key, allow_end=True), value)
+    else:
+        raise PatchError(f"cannot add to non-container at /{'/'.join(tokens[:-1])}")
+    return doc
+
+
+def _remove(doc: Any, tokens: list[str]) -> tuple[Any, Any]:
+    if not tokens:
+        raise PatchError("cannot remove the document root")
+    parent = _resolve(doc, tokens[:-1])
+    key = tokens[-1]
+    if isinstance(parent, dict):
+        if key not in parent:
+            raise PatchError(f"path not found: /{'/'.join(tokens)}")
+        return doc, parent.pop(key)
+    if isinstance(parent, list):
+        return doc, parent.pop(_index(parent, key))
+    raise PatchError(f"path not found: /{'/'.join(tokens)}")
+
+
+def apply_json_patch(doc: Any, operations: list[dict[str, Any]]) -> Any:
+    """Apply RFC 6902 operations; returns a new document and leaves doc untouched."""
+    if not isinstance(operations, list):
+        raise PatchError("JSON Patch must be a list of operations")
+    doc = copy.deepcopy(doc)
+    for op in operations:
+        if not isinstance(op, dict) or "op" not in op or "path" not in op:
+            raise PatchError(f"invalid operation: {op!r}")
+        name = op["op"]
+        path = _parse_pointer(op["path"])
+        if name in ("add", "replace", "test") and "value" not in op:
+            raise PatchError(f"{name} requires a value")
+        if name == "add":
+            doc = _add(doc, path, copy.deepcopy(op["value"]))
+        elif name == "remove":
+            doc, _ = _remove(doc, path)
+        elif name == "replace":
+            if path:
+                doc, _ = _remove(doc, path)
+            doc = _add(doc, path, copy.deepcopy(op["value"]))
+        elif name in ("move", "copy"):
+            if "from" not in op:
+                raise PatchError(f"{name} requires from")
+            source = _parse_pointer(op["from"])
+            if name == "move":
+                if path[: len(source)] == source and path != source:
+                    raise PatchError("cannot move a value into one of its children")
+                doc, value = _remove(doc, source)
+            else:
+                value = copy.deepcopy(_resolve(doc, source))
+            doc = _add(doc, path, value)
+        elif name == "test":
+            if _resolve(doc, path) != op["value"]:
+                raise PatchError(f"test failed at {op['path']}")
+        else:
+            raise PatchError(f"unknown operation: {name!r}")
+    return doc
+
+
+# --- RFC 7386 merge patch, with keyed positions -----------------------------
+
+
+def merge_patch(target: Any, patch: Any) -> Any:
+    """Plain RFC 7386 merge patch; returns a new value."""
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result = copy.deepcopy(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
+
+
+def _merge_positions(
+    current: list[dict[str, Any]], patch: list[dict[str, Any]]
+) -> list[dict[str, Any]]:
+    merged = [copy.deepcopy(p) for p in current]
+    by_id = {p.get("entity_id"): i for i, p in enumerate(merged)}
+    removed: set[int] = set()
+    for entry in patch:
+        if not isinstance(entry, dict) or not entry.get("entity_id"):
+            raise PatchError(f"position patch entries need an entity_id: {entry!r}")
+        entity_id = entry["entity_id"]
+        i = by_id.get(entity_id)
+        if entry.get("remove"):
+            if i is not None:
+                removed.add(i)
+            continue
+        entry = {k: v for k, v in entry.items() if k != "remove"}
+        if i is None or i in removed:
+            by_id[entity_id] = len(merged)
+            merged.append(merge_patch({}, entry))
+            continue
+        merged[i] = merge_patch(merged[i], entry)
+    return [p for i, p in enumerate(merged) if i not in removed]
+
+
+def apply_scene_patch(scene: dict[str, Any], patch: Any) -> dict[str, Any]:
+    """
+    Apply a scene delta to a scene dict (see SceneState.to_dict); returns a new dict.
+    A list is JSON Patch; an object is a merge patch with per-entity positions.
+    """
+    if isinstance(patch, list):
+        return apply_json_patch(scene, patch)
+    if not isinstance(patch, dict):
+        raise PatchError("scene patch must be a JSON object or a list of operations")
+    positions = patch.get("positions", _MISSING)
+    rest = {k: v for k, v in patch.items() if k != "positions"}
+    result = merge_patch(scene, rest)
+    if isinstance(positions, list):
+        result["positions"] = _merge_positions(scene.get("positions") or [], positions)
+    elif positions is None:
+        result["positions"] = []
+    elif positions is not _MISSING:
+        raise PatchError("positions must be a list of entries keyed by entity_id")
+    return result
+
+
+def make_merge_patch(old: Any, new: Any) -> Any:
+    """RFC 7386 diff: the merge patch that turns old into new (keys set to None are removed)."""
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return copy.deepcopy(new)
+    patch: dict[str, Any] = {}
+    for key in sorted(old.keys() - new.keys()):
+        patch[key] = None
+    for key, value in new.items():
+        if key not in old:
+            patch[key] = copy.deepcopy(value)
+        elif old[key] != value:
+            patch[key] = make_merge_patch(old[key], value)
+    return patch
+
+
+def make_scene_patch(old: dict[str, Any], new: dict[str, Any]) -> dict[str, Any]:
+    """Scene diff in apply_scene_patch's format: only changed fields and changed entities."""
+    old_positions = {p.get("entity_id"): p for p in old.get("positions") or []}
+    new_positions = {p.get("entity_id"): p for p in new.get("positions") or []}
+    patch = make_merge_patch(
+        {k: v for k, v in old.items() if k != "positions"},
+        {k: v for k, v in new.items() if k != "positions"},
+    )
+    entries: list[dict[str, Any]] = []
+    for entity_id, position in new_positions.items():
+        before = old_positions.get(entity_id)
+        if before is None:
+            entries.append(copy.deepcopy(position))
+        elif before != position:
+            entries.append(
+                {"entity_id": entity_id, **make_merge_patch(before, position)}
+            )
+    entries.extend(
+        {"entity_id": e, "remove": True}
+        for e in sorted(old_positions.keys() - new_positions.keys())
+    )
+    if entries:
+        patch["positions"] = entries
+    return patch
@@ -0,0 +1,193 @@
+"""
+Parsed character sheets with precomputed compact summaries.
+
+A sheet is parsed once into heading-keyed sections (data/markdown.py) and a
+short summary: frontmatter stats, "Key: value" lines, and one digest line per
+section ("Spells: 14 entries: Fire Bolt, Shield, …"). SheetCache keeps one
+ParsedSheet per file, re-parsed when its (inode, mtime, size) stamp changes or
+after invalidate(path), which the file watcher calls. ParsedSheet.render()
+lets the engine send the full sheet when it fits the prompt budget and
+otherwise the summary plus only the sections relevant to the message.
+"""
+
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from dungeonmaster.data.markdown import (
+    Section,
+    parse_sections,
+    select_sections,
+    split_frontmatter,
+    trim,
+)
+from dungeonmaster.data.vault import Vault
+
+logger = logging.getLogger(__name__)
+
+_KEY_VALUE = re.compile(
+    r"^\s*(?:[-*+]\s+)?\**([A-Za-z][\w /'()-]{0,24}?)\**\s*:\s*\**\s*(\S.{0,40}?)\s*$"
+)
+_LIST_ITEM = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+(.*)$")
+_SKIP_FRONTMATTER = frozenset(
+    {"name", "aliases", "alias", "tags", "cssclass", "cssclasses"}
+)
+
+
+def _item_name(item: str) -> str:
+    """Leading name of a list item: "**Fire Bolt** (cantrip): 1d10 fire" -> "Fire Bolt"."""
+    name = re.split(
+        r"\s+[-–—]\s+|[:(;,]",
+        item.replace("*", "").replace("[[", "").replace("]]", ""),
+        1,
+    )[0]
+    return name.strip()[:40]
+
+
+def _first_sentence(text: str, limit: int = 100) -> str:
+    line = next((ln.strip() for ln in text.split("\n") if ln.strip()), "")
+    end = line.find(". ")
+    return trim(line[: end + 1] if end > 0 else line, limit)
+
+
+def _digest(section: Section) -> str:
+    """One-line digest of a section: its stats, its list entries, or its first sentence."""
+    lines = [ln for ln in section.text.split("\n") if ln.strip()]
+    stats = [m for m in (_KEY_VALUE.match(ln) for ln in lines) if m]
+    if stats and len(stats) * 2 >= len(lines):
+        return ", ".join(
+            f"{m.group(1).strip()} {m.group(2).strip()}" for m in stats[:8]
+        )
+    items = [m.group(1) for m in (_LIST_ITEM.match(ln) for ln in lines) if m]
+    if items and len(items) * 2 >= len(lines):
+        names = [n for n in (_item_name(i) for i in items) if n]
+        shown = ", ".join(names[:5]) + (", …" if len(names) > 5 else "")
+        return f"{len(items)} entries: {shown}" if len(items) > 1 else shown
+    return _first_sentence(section.text)
+
+
+def summarize_sheet(
+    name: str,
+    frontmatter: dict[str, Any],
+    sections: list[Section],
+    max_chars: int = 600,
+) -> str:
+    """Compact summary: name and stats, then one digest line per section, within max_chars."""
+    stats = [
+        f"{key} {value}"
+        for key, value in frontmatter.items()
+        if key.lower() not in _SKIP_FRONTMATTER
+        and isinstance(value, (str, int, float))
+        and len(str(value)) <= 40
+    ]
+    lines = [f"{name}" + (f" ({', '.join(stats)})" if stats else "")]
+    for section in sections:
+        if not section.text:
+            continue
+        digest = _digest(section)
+        if digest:
+            lines.append(
+                f"- {section.heading}: {digest}" if section.level > 1 else f"- {digest}"
+            )
+    return trim("\n".join(lines), max_chars)
+
+
+@dataclass
+class ParsedSheet:
+    """A character sheet split into sections, with its precomputed summary."""
+
+    player_id: str
+    path: Path
+    name: str
+    text: str  # full Markdown body (frontmatter removed)
+    summary: str
+    sections: list[Section] = field(default_factory=list)
+    frontmatter: dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def parse(
+        cls, player_id: str, path: Path, markdown: str, summary_chars: int = 600
+    ) -> "ParsedSheet":
+        frontmatter, body = split_frontmatter(markdown)
+        sections = parse_sections(body)
+        h1 = next((s.heading for s in sections if s.level == 1), "")
+        name = str(frontmatter.get("name") or h1 or path.stem)
+        return cls(
+            player_id=player_id,
+            path=path,
+            name=name,
+            text=body.strip(),
+            summary=summarize_sheet(name, frontmatter, sections, summary_chars),
+            sections=sections,
+            frontmatter=frontmatter,
+        )
+
+    def section(self, heading: str) -> Section | None:
+        """Section by heading or heading path ("Combat > Attacks"), case-insensitive."""
+        key = heading.strip().lower()
+        return next(
+            (s for s in self.sections if key in (s.heading.lower(), s.title.lower())),
+            None,
+        )
+
+    def render(self, query: str, budget: int) -> str:
+        """
+        The full sheet if it fits in budget chars; otherwise the summary followed by the
+        sections most relevant to query, trimmed to budget.
+        """
+        if len(self.text) <= budget:
+            return self.text
+        remaining = budget - len(self.summary) - 2
+        detail = (
+            select_sections(self.sections, query, remaining, lead=False)
+            if remaining > 0
+            else ""
+        )
+        return f"{self.summary}\n\n{detail}" if detail else trim(self.summary, budget)
+
+
+class SheetCache:
+    """Parsed character sheets by player id, re-parsed when the file changes (thread-safe)."""
+
+    def __init__(self, vault: Vault, summary_chars: int = 600):
+        self._vault = vault
+        self._summary_chars = summary_chars
+        self._lock = threading.Lock()
+        self._sheets: dict[Path, tuple[tuple[int, int, int], ParsedSheet]] = {}
+
+    def get(self, player_id: str) -> ParsedSheet | None:
+        """The player's parsed sheet, or None if they have none."""
+        path = self._vault.character_path(player_id).resolve()
+        try:
+            st = os.stat(path)
+        except OSError:
+            with self._lock:
+                self._sheets.pop(path, None)
+            return None
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._sheets.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        try:
+            sheet = ParsedSheet.parse(
+                player_id, path, self._vault.read_text(path), self._summary_chars
+            )
+        except (OSError, UnicodeDecodeError) as e:
+            logger.warning("Could not read %s: %s", path, e)
+            return None
+        with self._lock:
+            self._sheets[path] = (stamp, sheet)
+        return sheet
+
+    def invalidate(self, path: str | Path | None = None) -> None:
+        """Drop path (or every sheet if None) so it is re-parsed on next use. Safe from the watcher thread."""
+        with self._lock:
+            if path is None:
+                self._sheets.clear()
+            else:
+                self._sheets.pop(Path(path).resolve(), None)
@@ -0,0 +1,144 @@
+"""
+Spatial index over scene positions.
+
+SceneIndex buckets positions into a uniform grid of cell_size x cell_size
+cells and keeps a zone -> entities map, so radius, nearest and zone lookups
+touch only nearby cells instead of scanning every token on a large battle map. Coordinates and
+radii must be finite; NaN or infinity raises ValueError.
+relevant_to() picks what matters to one actor (same zone or within a radius,
+nearest first) so the engine can keep the scene part of the prompt small.
+Indexes are immutable snapshots; StateStore.scene_index() caches one per
+scene version.
+"""
+
+import math
+from collections import defaultdict
+from collections.abc import Iterable
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:  # state.py imports this module
+    from dungeonmaster.data.state import Position, SceneState
+
+
+class SceneIndex:
+    """Uniform-grid + zone index over a snapshot of scene positions."""
+
+    def __init__(self, positions: Iterable["Position"], cell_size: float = 10.0):
+        if cell_size <= 0:
+            raise ValueError("cell_size must be positive")
+        self.cell_size = float(cell_size)
+        self._by_id: dict[str, Position] = {}
+        self._cells: dict[tuple[int, int], list[Position]] = defaultdict(list)
+        self._zones: dict[str, list[Position]] = defaultdict(list)
+        for p in positions:
+            if not (math.isfinite(p.x) and math.isfinite(p.y)):
+                raise ValueError(
+                    f"position of {p.entity_id!r} must be finite, got ({p.x}, {p.y})"
+                )
+            self._by_id[p.entity_id] = p
+            self._cells[self._cell(p.x, p.y)].append(p)
+            if p.zone:
+                self._zones[p.zone].append(p)
+
+    @classmethod
+    def from_scene(cls, scene: "SceneState", cell_size: float = 10.0) -> "SceneIndex":
+        return cls(scene.positions, cell_size)
+
+    def _cell(self, x: float, y: float) -> tuple[int, int]:
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def get(self, entity_id: str) -> "Position | None":
+        return self._by_id.get(entity_id)
+
+    def zones(self) -> list[str]:
+        return sorted(self._zones)
+
+    def in_zone(self, zone: str) -> list["Position"]:
+        return list(self._zones.get(zone, ()))
+
+    def within(
+        self, x: float, y: float, radius: float
+    ) -> list[tuple[float, "Position"]]:
+        """(distance, position) pairs within radius of (x, y), nearest first."""
+        if not (math.isfinite(x) and math.isfinite(y) and math.isfinite(radius)):
+            raise ValueError(
+                f"point and radius must be finite, got ({x}, {y}) and {radius}"
+            )
+        if radius < 0:
+            return []
+        cx0, cy0 = self._cell(x - radius, y - radius)
+        cx1, cy1 = self._cell(x + radius, y + radius)
+        found: list[tuple[float, Position]] = []
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(self._cells):
+            # Radius covers more cells than are occupied: walk the occupied ones instead
+            cells = (
+                c
+                for key, c in self._cells.items()
+                if cx0 <= key[0] <= cx1 and cy0 <= key[1] <= cy1
+            )
+        else:
+            cells = (
+                self._cells[(cx, cy)]
+                for cx in range(cx0, cx1 + 1)
+                for cy in range(cy0, cy1 + 1)
+                if (cx, cy) in self._cells
+            )
+        for cell in cells:
+            for p in cell:
+                d = math.hypot(p.x - x, p.y - y)
+                if d <= radius:
+                    found.append((d, p))
+        found.sort(key=lambda item: (item[0], item[1].entity_id))
+        return found
+
+    def near(self, entity_id: str, radius: float) -> list["Position"]:
+        """Other entities within radius of entity_id, nearest first ([] if it has no position)."""
+        origin = self._by_id.get(entity_id)
+        if origin is None:
+            return []
+        return [
+            p
+            for _, p in self.within(origin.x, origin.y, radius)
+            if p.entity_id != entity_id
+        ]
+
+    def nearest(self, x: float, y: float, k: int) -> list["Position"]:
+        """The k positions closest to (x, y), growing the search ring cell by cell."""
+        if k <= 0 or not self._by_id:
+            return []
+        if not (math.isfinite(x) and math.isfinite(y)):
+            raise ValueError(f"point must be finite, got ({x}, {y})")
+        radius = self.cell_size
+        while True:
+            found = self.within(x, y, radius)
+            if len(found) >= min(k, len(self._by_id)):
+                return [p for _, p in found[:k]]
+            radius *= 2
+
+    def relevant_to(
+        self, entity_id: str, radius: float, limit: int = 0
+    ) -> list["Position"]:
+        """
+        The actor itself, then entities within radius or in the actor's zone, nearest first.
+        limit > 0 caps the result. [] if the actor has no position.
+        """
+        origin = self._by_id.get(entity_id)
+        if origin is None:
+            return []
+        seen = {entity_id}
+        scored: list[tuple[float, Position]] = []
+        for d, p in self.within(origin.x, origin.y, radius):
+            if p.entity_id not in seen:
+                seen.add(p.entity_id)
+                scored.append((d, p))
+        if origin.zone:
+            for p in self._zones.get(origin.zone, ()):
+                if p.entity_id not in seen:
+                    seen.add(p.entity_id)
+                    scored.append((math.hypot(p.x - origin.x, p.y - origin.y), p))
+        scored.sort(key=lambda item: (item[0], item[1].entity_id))
+        out = [origin] + [p for _, p in scored]
+        return out[:limit] if limit > 0 else out
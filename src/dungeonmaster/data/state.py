@@ -2,16 +2,47 @@
 State management: scene JSON and character/NPC Markdown.
 
 SceneState is the in-memory representation of state/scene.json (location,
-positions, turn_order). StateStore reads/writes scene JSON and character/NPC
-Markdown files through the vault. See docs/VAULT_AND_STATE.md for the schema.
+positions, turn_order, version). StateStore reads/writes scene JSON and
+character/NPC Markdown files through the vault. The scene is cached in memory
+(reloaded when scene.json changes on disk), updated either whole (save_scene)
+or by delta (apply_scene_patch, see data/scene_patch.py), versioned, and
+written compactly (Vault writes are atomic). Scene listeners (e.g. the change
+feed in data/change_feed.py) are told (version, delta, scene) on every change.
+An edit made outside DungeonMaster is saved back as the next version, found on
+the next read or when the file watcher calls refresh_scene().
+Patched scenes are checked against the schema (validate_scene) before saving.
+See docs/VAULT_AND_STATE.md for the schema.
 """
 
 import json
+import logging
+import math
+from collections.abc import Callable
 from dataclasses import asdict, dataclass, field
+from pathlib import Path
 from typing import Any
 
+from dungeonmaster.data.scene_patch import (
+    PatchError,
+    apply_scene_patch,
+    make_scene_patch,
+)
+from dungeonmaster.data.spatial import SceneIndex
 from dungeonmaster.data.vault import Vault
 
+logger = logging.getLogger(__name__)
+
+ENTITY_TYPES = ("player", "npc", "object")
+_SCENE_KEYS = {
+    "scene_id",
+    "location",
+    "positions",
+    "turn_order",
+    "timestamp",
+    "version",
+}
+_POSITION_KEYS = {"entity_id", "entity_type", "x", "y", "zone"}
+
 
 @dataclass
 class Position:
@@ -32,6 +63,14 @@ class Location:
     description: str = ""
 
 
+def _coordinate(value: Any) -> float:
+    """value as a float coordinate; ValueError for NaN or infinity (JSON allows both)."""
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"coordinate must be finite, got {value!r}")
+    return number
+
+
 @dataclass
 class SceneState:
     """
@@ -43,6 +82,7 @@ class SceneState:
     positions: list[Position] = field(default_factory=list)
     turn_order: list[str] = field(default_factory=list)
     timestamp: str = ""
+    version: int = 0  # bumped by StateStore on every saved change
 
     def to_dict(self) -> dict[str, Any]:
         return {
@@ -54,6 +94,7 @@ class SceneState:
             "positions": [asdict(p) for p in self.positions],
             "turn_order": self.turn_order,
             "timestamp": self.timestamp,
+            "version": self.version,
         }
 
     @classmethod
@@ -67,8 +108,8 @@ class SceneState:
             Position(
                 entity_id=p.get("entity_id", ""),
                 entity_type=p.get("entity_type", "npc"),
-                x=float(p.get("x", 0)),
-                y=float(p.get("y", 0)),
+                x=_coordinate(p.get("x", 0)),
+                y=_coordinate(p.get("y", 0)),
                 zone=p.get("zone", ""),
             )
             for p in data.get("positions", [])
@@ -79,31 +120,222 @@ class SceneState:
             positions=positions,
             turn_order=list(data.get("turn_order", [])),
             timestamp=data.get("timestamp", ""),
+            version=int(data.get("version", 0)),
         )
 
 
+def _is_number(value: Any) -> bool:
+    return (
+        isinstance(value, (int, float))
+        and not isinstance(value, bool)
+        and math.isfinite(value)
+    )
+
+
+def validate_scene(data: Any) -> list[str]:
+    """
+    Schema errors in a scene dict (the SceneState.to_dict layout; missing fields are allowed
+    and take their defaults). An empty list means SceneState.from_dict keeps everything.
+    """
+    if not isinstance(data, dict):
+        return ["scene must be a JSON object"]
+    errors = [f"unknown scene field {key!r}" for key in sorted(set(data) - _SCENE_KEYS)]
+    for key in ("scene_id", "timestamp"):
+        if key in data and not isinstance(data[key], str):
+            errors.append(f"{key} must be a string")
+    if "version" in data and (
+        not isinstance(data["version"], int) or isinstance(data["version"], bool)
+    ):
+        errors.append("version must be an integer")
+    location = data.get("location")
+    if location is not None:
+        if not isinstance(location, dict):
+            errors.append("location must be an object")
+        else:
+            errors += [
+                f"unknown location field {key!r}"
+                for key in sorted(set(location) - {"name", "description"})
+            ]
+            errors += [
+                f"location.{k} must be a string"
+                for k, v in location.items()
+                if not isinstance(v, str)
+            ]
+    positions = data.get("positions", [])
+    if not isinstance(positions, list):
+        errors.append("positions must be a list")
+        positions = []
+    for i, p in enumerate(positions):
+        where = f"positions[{i}]"
+        if not isinstance(p, dict):
+            errors.append(f"{where} must be an object")
+            continue
+        errors += [
+            f"unknown {where} field {key!r}" for key in sorted(set(p) - _POSITION_KEYS)
+        ]
+        if not isinstance(p.get("entity_id"), str) or not p.get("entity_id"):
+            errors.append(f"{where}.entity_id must be a non-empty string")
+        if "entity_type" in p and p["entity_type"] not in ENTITY_TYPES:
+            errors.append(
+                f"{where}.entity_type must be one of {', '.join(ENTITY_TYPES)}"
+            )
+        errors += [
+            f"{where}.{k} must be a number"
+            for k in ("x", "y")
+            if k in p and not _is_number(p[k])
+        ]
+        if "zone" in p and not isinstance(p["zone"], str):
+            errors.append(f"{where}.zone must be a string")
+    turn_order = data.get("turn_order", [])
+    if not isinstance(turn_order, list) or not all(
+        isinstance(t, str) for t in turn_order
+    ):
+        errors.append("turn_order must be a list of strings")
+    return errors
+
+
 class StateStore:
     """Read/write scene state and character/NPC Markdown from the vault."""
 
     def __init__(self, vault: Vault):
         self._vault = vault
+        self._scene_data: dict[str, Any] | None = None
+        # (mtime_ns, size) of the cached scene.json
+        self._scene_stamp: tuple[int, int] | None = None
+        self._scene_listeners: list[
+            Callable[[int, dict[str, Any], dict[str, Any]], None]
+        ] = []
+        self._scene_index: tuple[dict[str, Any], SceneIndex] | None = None
 
-    def load_scene(self) -> SceneState:
-        """Load scene.json; return default SceneState if missing or invalid."""
+    def add_scene_listener(
+        self, listener: Callable[[int, dict[str, Any], dict[str, Any]], None]
+    ) -> None:
+        """Call listener(version, delta, scene_dict) after every scene change (delta per scene_patch)."""
+        self._scene_listeners.append(listener)
+
+    def _notify_scene_changed(
+        self, old: dict[str, Any] | None, new: dict[str, Any]
+    ) -> None:
+        if not self._scene_listeners:
+            return
+        delta = make_scene_patch(old or SceneState().to_dict(), new)
+        for listener in self._scene_listeners:
+            try:
+                listener(new["version"], delta, new)
+            except Exception as e:  # noqa: BLE001 - a failing listener must not fail the scene write
+                logger.warning("Scene listener failed: %s", e)
+
+    def _scene_dict(self) -> dict[str, Any]:
+        """Current scene as a normalized dict; re-read only when scene.json changed on disk."""
         path = self._vault.scene_path()
-        if not path.exists():
-            return SceneState()
         try:
-            text = self._vault.read_text(path)
-            data = json.loads(text)
-            return SceneState.from_dict(data)
-        except (json.JSONDecodeError, TypeError):
-            return SceneState()
-
-    def save_scene(self, scene: SceneState) -> None:
-        """Write scene state to scene.json."""
+            stat = path.stat()
+        except FileNotFoundError:
+            self._scene_data, self._scene_stamp = None, None
+            return SceneState().to_dict()
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if self._scene_data is None or stamp != self._scene_stamp:
+            previous = self._scene_data
+            try:
+                data = SceneState.from_dict(
+                    json.loads(self._vault.read_text(path))
+                ).to_dict()
+            except (json.JSONDecodeError, TypeError, ValueError, AttributeError) as e:
+                if previous is not None:
+                    # Half-saved or broken edit: keep serving the last good scene until it is fixed
+                    logger.warning("Ignoring invalid %s: %s", path, e)
+                    self._scene_stamp = stamp
+                    return previous
+                data = SceneState().to_dict()
+            self._scene_data, self._scene_stamp = data, stamp
+            if previous is not None and {**data, "version": 0} != {
+                **previous,
+                "version": 0,
+            }:
+                # Edited outside DungeonMaster (Obsidian, VTT): save it as the next version, so
+                # subscribers that have seen the current one accept it, and tell listeners
+                data["version"] = previous["version"] + 1
+                self._write_scene(data, previous)
+            elif previous is not None:
+                data["version"] = previous["version"]
+        return self._scene_data
+
+    def _write_scene(
+        self, data: dict[str, Any], previous: dict[str, Any] | None = None
+    ) -> None:
         path = self._vault.scene_path()
-        self._vault.write_text(path, json.dumps(scene.to_dict(), indent=2))
+        if previous is None:
+            previous = self._scene_data
+        self._vault.write_text(
+            path, json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+        )
+        stat = path.stat()
+        self._scene_data, self._scene_stamp = data, (stat.st_mtime_ns, stat.st_size)
+        self._notify_scene_changed(previous, data)
+
+    def refresh_scene(self) -> int:
+        """
+        Pick up an edit made to scene.json outside DungeonMaster now, rather than on the next
+        read; the file watcher calls this (on the event loop thread). Returns the scene version.
+        """
+        return self._scene_dict()["version"]
+
+    @property
+    def scene_version(self) -> int:
+        return self._scene_dict()["version"]
+
+    def load_scene(self) -> SceneState:
+        """Load scene.json; return default SceneState if missing or invalid."""
+        return SceneState.from_dict(self._scene_dict())
+
+    def scene_index(self, cell_size: float = 10.0) -> SceneIndex:
+        """Spatial index over the current scene's positions, rebuilt only when the scene changes."""
+        data = self._scene_dict()
+        cached = self._scene_index
+        if cached is None or cached[0] is not data or cached[1].cell_size != cell_size:
+            cached = self._scene_index = (
+                data,
+                SceneIndex.from_scene(SceneState.from_dict(data), cell_size),
+            )
+        return cached[1]
+
+    def save_scene(self, scene: SceneState) -> SceneState:
+        """Replace the whole scene; the saved copy (with its new version) is returned."""
+        data = scene.to_dict()
+        data["version"] = self.scene_version + 1
+        self._write_scene(data)
+        return SceneState.from_dict(data)
+
+    def apply_scene_patch(
+        self, patch: Any, base_version: int | None = None
+    ) -> SceneState:
+        """
+        Apply a scene delta (JSON Patch list or scene merge-patch object) and save it.
+        With base_version, raise PatchError if the scene has moved on since that version.
+        No-op patches leave the file and version untouched.
+        """
+        current = self._scene_dict()
+        if base_version is not None and base_version != current["version"]:
+            raise PatchError(
+                f"scene is at version {current['version']}, patch is for {base_version}"
+            )
+        patched = apply_scene_patch(current, patch)
+        errors = validate_scene(patched)
+        if errors:
+            raise PatchError(f"patch produces an invalid scene: {'; '.join(errors)}")
+        try:
+            data = SceneState.from_dict(patched).to_dict()
+        except (TypeError, ValueError, AttributeError) as e:
+            raise PatchError(f"patch produces an invalid scene: {e}") from e
+        data["version"] = current["version"]
+        if data == current:
+            return SceneState.from_dict(current)
+        data["version"] += 1
+        self._write_scene(data)
+        return SceneState.from_dict(data)
+
+    def character_path(self, player_id: str) -> Path:
+        return self._vault.character_path(player_id)
 
     def load_character(self, player_id: str) -> str:
         """Load a player's character sheet as Markdown; empty string if missing."""
@@ -2,10 +2,41 @@
 Obsidian-compatible vault: paths and read/write for systems, notes, characters, npcs, state.
 
 One DungeonMaster instance = one campaign; vault root holds a single vault.
+Writes are atomic (temp file + rename), so readers such as the VTT frontend,
+Obsidian sync or the file watcher never see a half-written file. Append-only
+logs (session notes, the notes index) are appended to in place instead
+(append_text), so readers may see a partly written last entry.
 """
 
+import os
+import stat
+import tempfile
+import threading
 from pathlib import Path
 
+FSYNC_MODES = ("always", "batch", "never")
+
+
+def _read_umask() -> int:
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# Read once: os.umask can only be queried by setting it, which is not thread-safe
+_UMASK = _read_umask()
+
+
+def _fsync_dir(directory: Path) -> None:
+    """Persist a rename by syncing its directory (no-op where directories can't be opened, e.g. Windows)."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
 
 class Vault:
     """
@@ -18,10 +49,32 @@ class Vault:
       npcs/      - NPC roster (Markdown)
       state/     - scene.json
       _index/    - internal (embeddings); not for Obsidian
+
+    fsync: "batch" (default) renames immediately and syncs pending files on flush(), which the
+    app calls periodically from a worker thread, so writers on the event loop never wait for
+    the disk; "always" syncs every write before it is renamed into place; "never" leaves
+    durability to the OS.
+
+    systems_root (optional) puts systems/ elsewhere, so campaigns hosted in one process
+    can share one rulebook directory per game system.
     """
 
-    def __init__(self, root: str | Path):
+    def __init__(
+        self,
+        root: str | Path,
+        fsync: str = "batch",
+        systems_root: str | Path | None = None,
+    ):
+        if fsync not in FSYNC_MODES:
+            raise ValueError(f"fsync must be one of {FSYNC_MODES}, got {fsync!r}")
         self._root = Path(root).resolve()
+        self._systems_root = (
+            Path(systems_root).resolve() if systems_root is not None else None
+        )
+        self._fsync = fsync
+        self._lock = threading.Lock()
+        self._generations: dict[Path, int] = {}
+        self._pending: set[Path] = set()
 
     @property
     def root(self) -> Path:
@@ -30,13 +83,18 @@ class Vault:
 
     def ensure_all_dirs(self) -> None:
         """Create vault subdirectories if they do not exist."""
-        for name in ("systems", "notes", "characters", "npcs", "state", "_index"):
+        for name in ("notes", "characters", "npcs", "state", "_index"):
             (self._root / name).mkdir(parents=True, exist_ok=True)
+        self.systems_dir().mkdir(parents=True, exist_ok=True)
 
     # Path helpers
 
     def systems_dir(self) -> Path:
-        return self._root / "systems"
+        return (
+            self._systems_root
+            if self._systems_root is not None
+            else self._root / "systems"
+        )
 
     def notes_dir(self) -> Path:
         return self._root / "notes"
@@ -76,10 +134,85 @@ class Vault:
         """Read file as UTF-8 text."""
         return path.read_text(encoding="utf-8")
 
-    def write_text(self, path: Path, content: str) -> None:
-        """Write UTF-8 text; create parent dirs if needed."""
+    def write_text(self, path: Path, content: str) -> int:
+        """
+        Atomically replace path with UTF-8 text; create parent dirs if needed.
+        Returns the file's new generation (see generation()).
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            mode = stat.S_IMODE(path.stat().st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~_UMASK
+        # Dot-prefixed .tmp name: ignored by Obsidian and by the watcher's suffix filters
+        fd, tmp = tempfile.mkstemp(
+            dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+                f.write(content)
+                f.flush()
+                if self._fsync == "always":
+                    os.fsync(f.fileno())
+            os.chmod(tmp, mode)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except FileNotFoundError:
+                pass
+            raise
+        if self._fsync == "always":
+            _fsync_dir(path.parent)
+        with self._lock:
+            if self._fsync == "batch":
+                self._pending.add(path)
+            generation = self._generations.get(path, 0) + 1
+            self._generations[path] = generation
+        return generation
+
+    def append_text(self, path: Path, content: str) -> int:
+        """
+        Append UTF-8 text to path (created if missing) without rewriting it, for append-only
+        logs; synced per the fsync mode like write_text. Returns the file's new generation.
+        """
         path.parent.mkdir(parents=True, exist_ok=True)
-        path.write_text(content, encoding="utf-8")
+        created = not path.exists()
+        with open(path, "a", encoding="utf-8", newline="") as f:
+            f.write(content)
+            f.flush()
+            if self._fsync == "always":
+                os.fsync(f.fileno())
+        if created and self._fsync == "always":
+            _fsync_dir(path.parent)
+        with self._lock:
+            if self._fsync == "batch":
+                self._pending.add(path)
+            generation = self._generations.get(path, 0) + 1
+            self._generations[path] = generation
+        return generation
+
+    def generation(self, path: Path) -> int:
+        """Number of writes to path through this vault (0 if never written); cheap change check for pollers."""
+        with self._lock:
+            return self._generations.get(path, 0)
+
+    def flush(self) -> int:
+        """Sync files written since the last flush (batch mode). Returns the number of files synced."""
+        with self._lock:
+            pending, self._pending = self._pending, set()
+        for path in pending:
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except FileNotFoundError:
+                continue
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        for directory in {p.parent for p in pending}:
+            _fsync_dir(directory)
+        return len(pending)
 
     def read_bytes(self, path: Path) -> bytes:
         """Read file as bytes."""
@@ -94,3 +227,10 @@ class Vault:
         for ext in (".md", ".txt"):
             out.extend(self.systems_dir().rglob(f"*{ext}"))
         return sorted(out)
+
+    def list_entity_files(self) -> list[Path]:
+        """List Markdown files under characters/ and npcs/ (recursive)."""
+        out: list[Path] = []
+        for root in (self.characters_dir(), self.npcs_dir()):
+            out.extend(root.rglob("*.md"))
+        return sorted(out)
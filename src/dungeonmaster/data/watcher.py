@@ -1,16 +1,18 @@
 """
-Vault file watcher: monitor systems/, characters/, npcs/ for filesystem changes.
+Vault file watcher: monitor systems/, characters/, npcs/, state/ for filesystem changes.
 
 When a system file (.md, .txt under systems/) changes, on_system_change(path)
 is called so the app can re-ingest that path into RAG. When a character or
 NPC file changes, on_character_or_npc_change(path) can refresh in-memory state.
+When state/scene.json changes, on_scene_change(path) lets the app pick up an
+external edit (StateStore.refresh_scene) without waiting for the next read.
 Callbacks are synchronous; main.py uses asyncio.run_coroutine_threadsafe to
 schedule async re-ingest from the watcher thread.
 """
 
 import logging
+from collections.abc import Callable
 from pathlib import Path
-from typing import Callable
 
 from watchdog.events import FileSystemEvent, FileSystemEventHandler
 from watchdog.observers import Observer
@@ -28,10 +30,13 @@ class VaultWatcherHandler(FileSystemEventHandler):
         vault: Vault,
         on_system_change: Callable[[str], None] | None = None,
         on_character_or_npc_change: Callable[[str], None] | None = None,
+        on_scene_change: Callable[[str], None] | None = None,
     ):
         self._vault = vault
         self._on_system_change = on_system_change
         self._on_character_or_npc_change = on_character_or_npc_change
+        self._on_scene_change = on_scene_change
+        self._scene_path = str(vault.scene_path().resolve())
         self._systems_root = str(vault.systems_dir())
         self._characters_root = str(vault.characters_dir())
         self._npcs_root = str(vault.npcs_dir())
@@ -46,27 +51,33 @@ class VaultWatcherHandler(FileSystemEventHandler):
         p = Path(path)
         if p.suffix.lower() != ".md":
             return False
-        return path.startswith(self._characters_root) or path.startswith(self._npcs_root)
+        return path.startswith((self._characters_root, self._npcs_root))
 
     def dispatch(self, event: FileSystemEvent) -> None:
         if event.is_directory:
             return
-        path = str(Path(event.src_path).resolve())
+        # Atomic saves (ours and most editors') arrive as a rename onto the real path
+        path = str(Path(getattr(event, "dest_path", "") or event.src_path).resolve())
         if self._on_system_change and self._is_system_file(path):
             try:
                 self._on_system_change(path)
-            except Exception as e:
+            except Exception as e:  # noqa: BLE001 - keep the watcher thread running
                 logger.warning("System change callback failed: %s", e)
         elif self._on_character_or_npc_change and self._is_character_or_npc(path):
             try:
                 self._on_character_or_npc_change(path)
-            except Exception as e:
+            except Exception as e:  # noqa: BLE001 - keep the watcher thread running
                 logger.warning("Character/NPC change callback failed: %s", e)
+        elif self._on_scene_change and path == self._scene_path:
+            try:
+                self._on_scene_change(path)
+            except Exception as e:  # noqa: BLE001 - keep the watcher thread running
+                logger.warning("Scene change callback failed: %s", e)
 
 
 class VaultWatcher:
     """
-    Watch vault systems/, characters/, npcs/. Callbacks are sync; app can schedule
+    Watch vault systems/, characters/, npcs/ (and state/ for scene.json). Callbacks are sync; app can schedule
     async re-ingest from on_system_change (e.g. via asyncio queue).
     """
 
@@ -75,12 +86,16 @@ class VaultWatcher:
         vault: Vault,
         on_system_change: Callable[[str], None] | None = None,
         on_character_or_npc_change: Callable[[str], None] | None = None,
+        on_scene_change: Callable[[str], None] | None = None,
     ):
         self._vault = vault
+        self._watch_systems = on_system_change is not None
+        self._watch_state = on_scene_change is not None
         self._handler = VaultWatcherHandler(
             vault,
             on_system_change=on_system_change,
             on_character_or_npc_change=on_character_or_npc_change,
+            on_scene_change=on_scene_change,
         )
         self._observer: Observer | None = None
 
@@ -88,11 +103,13 @@ class VaultWatcher:
         """Start watching. Creates dirs if missing."""
         self._vault.ensure_all_dirs()
         self._observer = Observer()
-        for path in (
-            self._vault.systems_dir(),
-            self._vault.characters_dir(),
-            self._vault.npcs_dir(),
-        ):
+        watched = [self._vault.characters_dir(), self._vault.npcs_dir()]
+        # A shared systems/ directory is watched by one of the campaigns using it only
+        if self._watch_systems:
+            watched.insert(0, self._vault.systems_dir())
+        if self._watch_state:
+            watched.append(self._vault.state_dir())
+        for path in watched:
             if path.exists():
                 self._observer.schedule(
                     self._handler,
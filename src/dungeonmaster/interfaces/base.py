@@ -33,8 +33,6 @@ class InterfaceAdapter:
 
     async def start(self) -> None:
         """Start the interface (e.g. connect Discord)."""
-        pass
 
     async def stop(self) -> None:
         """Stop the interface."""
-        pass
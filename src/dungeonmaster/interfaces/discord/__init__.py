@@ -1,5 +1,18 @@
-"""Discord bot interface."""
+"""
+Discord bot interface.
 
-from dungeonmaster.interfaces.discord.bot import DiscordBot
+DiscordBot is exported lazily so discord.py is only imported when the bot is built.
+"""
+
+import importlib
+from typing import Any
 
 __all__ = ["DiscordBot"]
+
+
+def __getattr__(name: str) -> Any:
+    if name != "DiscordBot":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = importlib.import_module("dungeonmaster.interfaces.discord.bot").DiscordBot
+    globals()[name] = value
+    return value
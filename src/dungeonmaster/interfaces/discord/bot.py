@@ -4,19 +4,40 @@ Discord bot interface for DungeonMaster.
 Players interact by DMing the bot. Slash commands: /start, /action, /say,
 /status, /notes. Each command and each plain DM message is forwarded to
 engine.handle_message(session_id=user_id, user_id, content, task_type).
-Replies are sent back to the channel (truncated to 2000 chars for Discord).
+Requests pass through an AdmissionController first (per-user and per-guild
+rate limits, per-user in-flight cap, fair round-robin queue); queued players
+are told their position in line (in a DM when the reply will be public, since
+the first follow-up of a deferred command becomes its visible response). With a RoundCoordinator, /action messages
+in combat are collected into rounds and resolved in one batched call
+(core/rounds.py); they are rate limited but hold no admission slot while
+their round waits for the rest of the party. With a CampaignRegistry
+(core/campaigns.py), each request goes to the engine of the player's (or
+guild's) campaign, and players outside every campaign are turned away.
+/notes returns the precomputed session-notes
+summary when a notes_summary callable is given (no model call, no admission
+slot), else it goes through the engine. Replies are delivered in full by ReplySender:
+split on paragraphs and code fences into 2000-character messages (or attached
+as a file when very long).
 """
 
 import logging
+import math
+from collections.abc import Awaitable, Callable
 from typing import Any
 
 import discord
 from discord import app_commands
 from discord.ext import commands
 
+from dungeonmaster.core.admission import AdmissionController, AdmissionRejected
+from dungeonmaster.core.campaigns import CampaignRegistry
+from dungeonmaster.core.rounds import RoundCoordinator
+from dungeonmaster.interfaces.discord.delivery import ReplySender
 
 logger = logging.getLogger(__name__)
 
+_NO_CAMPAIGN = "You're not in any campaign hosted here yet; ask your DM to add you."
+
 
 class DiscordBot(commands.Bot):
     """
@@ -27,10 +48,16 @@ class DiscordBot(commands.Bot):
     def __init__(
         self,
         token: str,
-        engine_handle_message: Any,  # async (session_id, user_id, content, task_type?) -> str
+        # async (session_id, user_id, content, task_type?) -> str
+        engine_handle_message: Any,
         dm_only: bool = True,
         command_prefix: str = "!",
         intents: discord.Intents | None = None,
+        attach_threshold: int = 0,
+        admission: AdmissionController | None = None,
+        notes_summary: Callable[[], str] | None = None,
+        rounds: RoundCoordinator | None = None,
+        campaigns: CampaignRegistry | None = None,
     ):
         if intents is None:
             intents = discord.Intents.default()
@@ -40,6 +67,81 @@ class DiscordBot(commands.Bot):
         self._token = token
         self._engine_handle = engine_handle_message
         self._dm_only = dm_only
+        self._replies = ReplySender(attach_threshold=attach_threshold)
+        self._admission = admission or AdmissionController()
+        self._notes_summary = notes_summary
+        self._rounds = rounds
+        self._campaigns = campaigns
+
+    async def _handle(
+        self,
+        user_id: str,
+        guild_id: str | None,
+        content: str,
+        task_type: str,
+        notify: Callable[[str], Awaitable[Any]],
+    ) -> str:
+        """Forward to the engine once admitted; returns the reply, or a refusal message."""
+
+        async def on_queued(position: int) -> None:
+            await notify(f"You're #{position} in line; the DM will get to you shortly.")
+
+        engine_handle, rounds = self._engine_handle, self._rounds
+        if self._campaigns is not None:
+            campaign = self._campaigns.campaign_for(user_id, guild_id)
+            if campaign is None:
+                return _NO_CAMPAIGN
+            engine_handle, rounds = campaign.engine.handle_message, campaign.rounds
+        try:
+            if rounds is not None and rounds.collects(user_id, content):
+                # Waiting for the rest of the party must not hold a slot the others need to join the round
+                self._admission.check(user_id, guild_id)
+                return await rounds.submit(user_id, user_id, content)
+            async with self._admission.slot(user_id, guild_id, on_queued=on_queued):
+                return await engine_handle(
+                    user_id, user_id, content, task_type=task_type
+                )
+        except AdmissionRejected as e:
+            if e.reason == "rate_limited" and e.retry_after is not None:
+                return f"Slow down a little! Try again in {math.ceil(e.retry_after)}s."
+            return (
+                "You already have requests waiting; hold on until the DM answers them."
+            )
+
+    def _interaction_handle(
+        self,
+        interaction: discord.Interaction,
+        content: str,
+        task_type: str,
+        ephemeral: bool = False,
+    ) -> Awaitable[str]:
+        """
+        Handle a deferred command. The first follow-up replaces the deferred response and takes
+        its visibility, so a queue notice for a public reply goes to the player's DMs instead.
+        """
+        guild_id = (
+            str(interaction.guild_id) if interaction.guild_id is not None else None
+        )
+
+        async def notify(text: str) -> Any:
+            if ephemeral:
+                return await interaction.followup.send(text, ephemeral=True)
+            return await interaction.user.send(text)
+
+        return self._handle(
+            str(interaction.user.id), guild_id, content, task_type, notify=notify
+        )
+
+    async def _followup(
+        self, interaction: discord.Interaction, reply: str, ephemeral: bool = False
+    ) -> None:
+        """Send a (possibly long) reply as interaction follow-ups."""
+        await self._replies.send(
+            interaction.channel_id,
+            interaction.followup.send,
+            reply,
+            ephemeral=ephemeral,
+        )
 
     async def setup_hook(self) -> None:
         """Register slash commands and sync tree."""
@@ -51,80 +153,93 @@ class DiscordBot(commands.Bot):
         tree.add_command(self._cmd_notes())
         try:
             await tree.sync()
-        except Exception as e:
+        except Exception as e:  # noqa: BLE001 - sync can fail in many ways; commands still work once synced
             logger.warning("Slash command sync failed (may need time): %s", e)
 
     def _cmd_start(self) -> app_commands.Command:
-        @app_commands.command(name="start", description="Start or resume your session with the DM")
+        @app_commands.command(
+            name="start", description="Start or resume your session with the DM"
+        )
         async def start(interaction: discord.Interaction) -> None:
             await interaction.response.defer(ephemeral=True)
-            session_id = str(interaction.user.id)
-            reply = await self._engine_handle(
-                session_id,
-                str(interaction.user.id),
+            reply = await self._interaction_handle(
+                interaction,
                 "[Player used /start to begin or resume the game.]",
-                task_type="narrative",
+                "narrative",
+                ephemeral=True,
             )
-            await interaction.followup.send(reply[:2000], ephemeral=True)
+            await self._followup(interaction, reply, ephemeral=True)
+
         return start
 
     def _cmd_action(self) -> app_commands.Command:
-        @app_commands.command(name="action", description="Describe an action your character takes")
+        @app_commands.command(
+            name="action", description="Describe an action your character takes"
+        )
         @app_commands.describe(action="What your character does")
         async def action(interaction: discord.Interaction, action: str) -> None:
             await interaction.response.defer()
-            session_id = str(interaction.user.id)
-            reply = await self._engine_handle(
-                session_id,
-                str(interaction.user.id),
-                f"[Action] {action}",
-                task_type="narrative",
+            reply = await self._interaction_handle(
+                interaction, f"[Action] {action}", "narrative"
             )
-            await interaction.followup.send(reply[:2000])
+            await self._followup(interaction, reply)
+
         return action
 
     def _cmd_say(self) -> app_commands.Command:
-        @app_commands.command(name="say", description="Have your character say something")
+        @app_commands.command(
+            name="say", description="Have your character say something"
+        )
         @app_commands.describe(text="What your character says")
         async def say(interaction: discord.Interaction, text: str) -> None:
             await interaction.response.defer()
-            session_id = str(interaction.user.id)
-            reply = await self._engine_handle(
-                session_id,
-                str(interaction.user.id),
-                f"[Says] {text}",
-                task_type="narrative",
+            reply = await self._interaction_handle(
+                interaction, f"[Says] {text}", "narrative"
             )
-            await interaction.followup.send(reply[:2000])
+            await self._followup(interaction, reply)
+
         return say
 
     def _cmd_status(self) -> app_commands.Command:
-        @app_commands.command(name="status", description="Ask for a ruling or current situation")
+        @app_commands.command(
+            name="status", description="Ask for a ruling or current situation"
+        )
         @app_commands.describe(question="Your question")
         async def status(interaction: discord.Interaction, question: str) -> None:
             await interaction.response.defer()
-            session_id = str(interaction.user.id)
-            reply = await self._engine_handle(
-                session_id,
-                str(interaction.user.id),
-                f"[Status/Ruling] {question}",
-                task_type="ruling",
+            reply = await self._interaction_handle(
+                interaction, f"[Status/Ruling] {question}", "ruling"
             )
-            await interaction.followup.send(reply[:2000])
+            await self._followup(interaction, reply)
+
         return status
 
     def _cmd_notes(self) -> app_commands.Command:
         @app_commands.command(name="notes", description="Get a summary of recent notes")
         async def notes(interaction: discord.Interaction) -> None:
             await interaction.response.defer(ephemeral=True)
-            session_id = str(interaction.user.id)
-            reply = await self._engine_handle(
-                session_id,
-                str(interaction.user.id),
-                "[Player requested recent session notes summary.]",
-                task_type="ruling",
-            )
-            await interaction.followup.send(reply[:2000], ephemeral=True)
+            summary = self._notes_summary
+            if self._campaigns is not None:
+                guild_id = (
+                    str(interaction.guild_id)
+                    if interaction.guild_id is not None
+                    else None
+                )
+                campaign = self._campaigns.campaign_for(
+                    str(interaction.user.id), guild_id
+                )
+                summary = campaign.notes_summary if campaign is not None else None
+            if summary is not None:
+                reply = summary()
+            else:
+                reply = await self._interaction_handle(
+                    interaction,
+                    "[Player requested recent session notes summary.]",
+                    "ruling",
+                    ephemeral=True,
+                )
+            await self._followup(interaction, reply, ephemeral=True)
+
         return notes
 
     async def on_message(self, message: discord.Message) -> None:
@@ -135,17 +250,17 @@ class DiscordBot(commands.Bot):
         if not isinstance(message.channel, discord.DMChannel):
             return
         # Plain DM text (no slash): treat as player message
-        session_id = str(message.author.id)
         try:
-            reply = await self._engine_handle(
-                session_id,
+            reply = await self._handle(
                 str(message.author.id),
+                None,
                 message.content,
-                task_type="narrative",
+                "narrative",
+                notify=message.channel.send,
             )
-            await message.channel.send(reply[:2000])
-        except Exception as e:
-            logger.exception("Engine handle_message failed: %s", e)
+            await self._replies.send(message.channel.id, message.channel.send, reply)
+        except Exception:
+            logger.exception("Engine handle_message failed")
             await message.channel.send("Something went wrong. Please try again.")
 
     def run_bot(self) -> None:
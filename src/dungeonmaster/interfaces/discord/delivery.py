@@ -0,0 +1,190 @@
+"""
+Reply delivery for Discord: split long replies and send them in order.
+
+Discord caps messages at 2000 characters. split_reply() breaks a reply on
+paragraph boundaries (then lines, sentences, words) and never inside a code
+fence without closing it and reopening it in the next chunk. ReplySender
+sends the chunks of one reply back-to-back under a per-channel lock, paced by
+a small token bucket that mirrors Discord's per-channel send rate limit, so a
+reply is delivered in full exactly once and never interleaved with another.
+Very long replies can instead be sent as a short preview plus a file attachment.
+"""
+
+import asyncio
+import io
+import re
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import discord
+
+from dungeonmaster.ai.providers.rate_limit import TokenBucket
+
+DISCORD_LIMIT = 2000
+
+_FENCE = re.compile(r"^\s*(```|~~~)")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def _segments(text: str) -> list[tuple[str, bool]]:
+    """Split text into (segment, is_code) pairs: paragraphs and whole fenced code blocks."""
+    segments: list[tuple[str, bool]] = []
+    para: list[str] = []
+    code: list[str] | None = None
+    for line in text.split("\n"):
+        if code is not None:
+            code.append(line)
+            if _FENCE.match(line):
+                segments.append(("\n".join(code), True))
+                code = None
+            continue
+        if _FENCE.match(line):
+            if para:
+                segments.append(("\n".join(para), False))
+                para = []
+            code = [line]
+        elif not line.strip():
+            if para:
+                segments.append(("\n".join(para), False))
+                para = []
+        else:
+            para.append(line)
+    if code is not None:
+        # Unterminated fence: close it so Discord renders the rest as code
+        code.append(_FENCE.match(code[0]).group(1))
+        segments.append(("\n".join(code), True))
+    if para:
+        segments.append(("\n".join(para), False))
+    return segments
+
+
+def _pack(units: list[str], limit: int, sep: str) -> list[str]:
+    """Greedily join units with sep into pieces of at most limit characters (units must fit)."""
+    pieces: list[str] = []
+    current = ""
+    for unit in units:
+        if not current:
+            current = unit
+        elif len(current) + len(sep) + len(unit) <= limit:
+            current += sep + unit
+        else:
+            pieces.append(current)
+            current = unit
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _split_prose(text: str, limit: int) -> list[str]:
+    """Split oversized prose by lines, then sentences, then words, then hard cuts."""
+    if len(text) <= limit:
+        return [text]
+    for splitter, sep in (
+        (lambda t: t.split("\n"), "\n"),
+        (_SENTENCE_END.split, " "),
+        (str.split, " "),
+    ):
+        units = [u for u in splitter(text) if u]
+        if len(units) > 1:
+            out: list[str] = []
+            for unit in units:
+                out.extend(_split_prose(unit, limit) if len(unit) > limit else [unit])
+            return _pack(out, limit, sep)
+    return [text[i : i + limit] for i in range(0, len(text), limit)]
+
+
+def _split_code(block: str, limit: int) -> list[str]:
+    """Split an oversized fenced block, closing and reopening the fence around each piece."""
+    lines = block.split("\n")
+    opener, closer = lines[0], _FENCE.match(lines[0]).group(1)
+    body = lines[1:-1] if len(lines) > 1 and _FENCE.match(lines[-1]) else lines[1:]
+    budget = max(1, limit - len(opener) - len(closer) - 2)
+    units: list[str] = []
+    for line in body:
+        units.extend(
+            [line[i : i + budget] for i in range(0, len(line), budget)] or [""]
+        )
+    return [f"{opener}\n{piece}\n{closer}" for piece in _pack(units, budget, "\n")]
+
+
+def split_reply(text: str, limit: int = DISCORD_LIMIT) -> list[str]:
+    """
+    Split text into chunks of at most limit characters, preferring paragraph breaks
+    and keeping code fences balanced in every chunk. Returns [] for blank text.
+    """
+    text = text.strip()
+    if not text:
+        return []
+    if len(text) <= limit:
+        return [text]
+    pieces: list[str] = []
+    for segment, is_code in _segments(text):
+        if len(segment) <= limit:
+            pieces.append(segment)
+        elif is_code:
+            pieces.extend(_split_code(segment, limit))
+        else:
+            pieces.extend(_split_prose(segment, limit))
+    return _pack(pieces, limit, "\n\n")
+
+
+class ReplySender:
+    """
+    Deliver replies to Discord in full: split, then send chunks in order per channel.
+    attach_threshold > 0 sends replies longer than that as a preview plus a Markdown file.
+    """
+
+    def __init__(
+        self,
+        limit: int = DISCORD_LIMIT,
+        attach_threshold: int = 0,
+        channel_burst: int = 5,
+        channel_rate: float = 1.0,
+    ):
+        self._limit = limit
+        self._attach_threshold = attach_threshold
+        self._channel_burst = channel_burst
+        self._channel_rate = channel_rate
+        self._locks: dict[Any, asyncio.Lock] = {}
+        self._buckets: dict[Any, TokenBucket] = {}
+
+    async def _pace(self, channel_key: Any) -> None:
+        bucket = self._buckets.get(channel_key)
+        if bucket is None:
+            bucket = self._buckets[channel_key] = TokenBucket(
+                self._channel_burst, self._channel_rate
+            )
+        wait = bucket.wait_time(1)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        bucket.consume(1)
+
+    async def send(
+        self,
+        channel_key: Any,
+        send: Callable[..., Awaitable[Any]],
+        text: str,
+        **send_kwargs: Any,
+    ) -> int:
+        """
+        Send text via send(content=..., **send_kwargs) (e.g. channel.send or
+        interaction.followup.send). Returns the number of messages sent.
+        """
+        lock = self._locks.setdefault(channel_key, asyncio.Lock())
+        async with lock:
+            if self._attach_threshold and len(text) > self._attach_threshold:
+                preview = split_reply(text, self._limit - 80)[0]
+                await self._pace(channel_key)
+                await send(
+                    content=f"{preview}\n\n*(Full reply attached.)*",
+                    file=discord.File(
+                        io.BytesIO(text.encode("utf-8")), filename="reply.md"
+                    ),
+                    **send_kwargs,
+                )
+                return 1
+            chunks = split_reply(text, self._limit) or ["…"]
+            for chunk in chunks:
+                await self._pace(channel_key)
+                await send(content=chunk, **send_kwargs)
+            return len(chunks)
@@ -2,14 +2,24 @@
 DungeonMaster application entrypoint.
 
 Loads config (YAML + env), builds the vault, RAG store, state store, AI
-orchestrator, and engine; optionally runs initial RAG ingest; starts the
-file watcher and the Discord bot. One process = one campaign.
+orchestrator, and engine; starts the Discord login while the vector index is
+opened and ingested in the background (replies are served in a degraded
+"rules index warming" mode until then); starts the file watcher (re-ingest on
+system changes, entity index and sheet cache refresh on character/NPC
+changes). Heavy dependencies (provider SDKs, chromadb, discord.py, watchdog)
+are imported lazily and a startup timing report is logged. One process serves
+one campaign, or with campaigns.hosted several, each with its own vault and
+engine on shared provider clients, embedding cache and vector index
+(core/campaigns.py).
 """
 
 import asyncio
 import logging
 import sys
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 # Ensure src is on path when run as module
 if __name__ == "__main__":
@@ -17,18 +27,39 @@ if __name__ == "__main__":
     if str(src) not in sys.path:
         sys.path.insert(0, str(src.parent))
 
-from dungeonmaster.config import load_config
-from dungeonmaster.data.vault import Vault
-from dungeonmaster.data.state import StateStore
-from dungeonmaster.data.watcher import VaultWatcher
-from dungeonmaster.ai.rag import RAGStore
-from dungeonmaster.ai.providers.ollama import OllamaProvider
-from dungeonmaster.ai.providers.claude import ClaudeProvider
 from dungeonmaster.ai.orchestrator import AIOrchestrator
+from dungeonmaster.ai.pool import ProviderPool
+from dungeonmaster.ai.preprocess import Preprocessor, PreprocessSettings
+from dungeonmaster.ai.rag import EmbeddingCache, RAGStore, SharedChromaClient
+from dungeonmaster.ai.rerank import Reranker, RerankSettings
+from dungeonmaster.ai.router import ModelRouter, RouterSettings
+from dungeonmaster.ai.ruling_cache import RulingCache
+from dungeonmaster.ai.structured import StructuredSettings
+from dungeonmaster.ai.system_index import SystemIndex, SystemIndexSettings
+from dungeonmaster.config import load_config
+from dungeonmaster.core.admission import AdmissionController, AdmissionSettings
+from dungeonmaster.core.campaigns import (
+    Campaign,
+    CampaignRegistry,
+    CampaignSettings,
+    safe_name,
+)
 from dungeonmaster.core.engine import Engine
-from dungeonmaster.core.session import SessionManager
+from dungeonmaster.core.note_summary import NoteSummarizer, NoteSummarySettings
 from dungeonmaster.core.note_taker import NoteTaker
-from dungeonmaster.interfaces.discord import DiscordBot
+from dungeonmaster.core.pregen import PregenSettings, ScenePregenerator
+from dungeonmaster.core.rounds import RoundCoordinator, RoundSettings
+from dungeonmaster.core.session import SessionManager
+from dungeonmaster.core.speculative import SpeculativeNarrator, SpeculativeSettings
+from dungeonmaster.data.change_feed import SceneChangeFeed, SceneFeedServer
+from dungeonmaster.data.entities import EntityIndex
+from dungeonmaster.data.sheets import SheetCache
+from dungeonmaster.data.state import StateStore
+from dungeonmaster.data.vault import Vault
+from dungeonmaster.metrics import PhaseTimer
+
+if TYPE_CHECKING:  # watchdog is imported when the watcher starts
+    from dungeonmaster.data.watcher import VaultWatcher
 
 
 logging.basicConfig(
@@ -38,108 +69,587 @@ logging.basicConfig(
 logger = logging.getLogger("dungeonmaster")
 
 
-def _build_engine(config: dict):
-    """Build vault, RAG, state, orchestrator, engine from config."""
-    vault_path = config.get("vault", {}).get("path", "data")
-    vault = Vault(Path(vault_path).resolve())
-    vault.ensure_all_dirs()
+@dataclass
+class Shared:
+    """Components built once per process and shared by every campaign it hosts."""
+
+    orchestrator: AIOrchestrator
+    embed_fn: Callable[[list[str]], Awaitable[list[list[float]]]]
+    router: ModelRouter | None
+    query_cache: EmbeddingCache
+    system_index: SystemIndex | None = None
+    preprocessor: Preprocessor | None = None
+
+
+@dataclass
+class Runtime:
+    """Components built for one campaign that run_async needs to start, wire and close."""
 
-    # Ollama
+    engine: Engine
+    rag: RAGStore
+    vault: Vault
+    orchestrator: AIOrchestrator
+    state_store: StateStore
+    entity_index: EntityIndex
+    sheet_cache: SheetCache
+    note_taker: NoteTaker
+    pregen: ScenePregenerator | None = None
+    ruling_cache: RulingCache | None = None
+    campaign: CampaignSettings | None = None  # None: the single campaign at vault.path
+    # False when another campaign re-ingests the shared rulebooks
+    watch_systems: bool = True
+    # shared by every campaign; closed on shutdown
+    preprocessor: Preprocessor | None = None
+
+
+def _build_shared(config: dict, timer: PhaseTimer | None = None) -> Shared:
+    """Build the provider pools, orchestrator, router, query-embedding cache, rulebook index and ingest pool."""
+    timer = timer or PhaseTimer()
+    with timer.phase("import.providers"):
+        from dungeonmaster.ai.providers.claude import ClaudeProvider
+        from dungeonmaster.ai.providers.ollama import OllamaProvider
+        from dungeonmaster.ai.providers.rate_limit import RateLimiter, RetryPolicy
+        from dungeonmaster.ai.providers.transport import TransportSettings
+
+    pool_cfg = config.get("ai", {}).get("pool", {})
+
+    def make_pool(providers: list, pool_name: str) -> ProviderPool:
+        return ProviderPool(
+            providers,
+            pool_name=pool_name,
+            health_interval=pool_cfg.get("health_interval", 30),
+            failure_threshold=pool_cfg.get("failure_threshold", 3),
+            cooldown=pool_cfg.get("cooldown", 30),
+            hedge=pool_cfg.get("hedge", False),
+            hedge_min_samples=pool_cfg.get("hedge_min_samples", 20),
+        )
+
+    # Ollama: base_url plus any extra hosts, pooled for narrative + embeddings
     ollama_cfg = config.get("ai", {}).get("ollama", {})
-    ollama = OllamaProvider(
-        base_url=ollama_cfg.get("base_url", "http://localhost:11434"),
-        default_model=ollama_cfg.get("narrative_model", "llama3.2"),
-        embedding_model=ollama_cfg.get("embedding_model", "nomic-embed-text"),
+    base_urls = [ollama_cfg.get("base_url", "http://localhost:11434")]
+    base_urls += [h for h in ollama_cfg.get("hosts") or [] if h not in base_urls]
+    ollama_transport = TransportSettings.from_config(ollama_cfg.get("transport"))
+    ollama = make_pool(
+        [
+            OllamaProvider(
+                base_url=url,
+                default_model=ollama_cfg.get("narrative_model", "llama3.2"),
+                embedding_model=ollama_cfg.get("embedding_model", "nomic-embed-text"),
+                transport=ollama_transport,
+                embedding_transport=TransportSettings.from_config(
+                    ollama_cfg.get("embedding_transport"),
+                    base=ollama_transport,
+                ),
+            )
+            for url in base_urls
+        ],
+        "narrative",
     )
 
     async def embed_fn(texts: list[str]):
         return await ollama.embed(texts)
 
-    rag_cfg = config.get("rag", {})
-    rag = RAGStore(
-        vault=vault,
-        embed_fn=embed_fn,
-        chunk_size=rag_cfg.get("chunk_size", 512),
-        chunk_overlap=rag_cfg.get("chunk_overlap", 64),
-        top_k=rag_cfg.get("top_k", 5),
-    )
-
     # Claude (optional)
     claude_cfg = config.get("ai", {}).get("claude", {})
     api_key = claude_cfg.get("api_key", "") or ""
     ruling_provider = None
     if api_key:
-        ruling_provider = ClaudeProvider(
-            api_key=api_key,
-            default_model=claude_cfg.get("ruling_model", "claude-3-5-sonnet-20241022"),
+        limit_cfg = claude_cfg.get("rate_limit", {})
+        ruling_provider = make_pool(
+            [
+                ClaudeProvider(
+                    api_key=api_key,
+                    default_model=claude_cfg.get(
+                        "ruling_model", "claude-3-5-sonnet-20241022"
+                    ),
+                    transport=TransportSettings.from_config(
+                        claude_cfg.get("transport")
+                    ),
+                    rate_limiter=RateLimiter(
+                        requests_per_minute=limit_cfg.get("requests_per_minute", 0),
+                        tokens_per_minute=limit_cfg.get("tokens_per_minute", 0),
+                        output_tokens_per_minute=limit_cfg.get(
+                            "output_tokens_per_minute", 0
+                        ),
+                        name="claude",
+                    ),
+                    retry_policy=RetryPolicy(
+                        max_retries=limit_cfg.get("max_retries", 5),
+                        base_delay=limit_cfg.get("base_delay", 1.0),
+                        max_delay=limit_cfg.get("max_delay", 30.0),
+                    ),
+                )
+            ],
+            "ruling",
         )
 
     orchestrator = AIOrchestrator(
         narrative_provider=ollama,
         ruling_provider=ruling_provider,
     )
+    # Content-based routing: provider and model size per message (embeddings reuse the RAG cache)
+    router_settings = RouterSettings.from_config(config.get("ai", {}).get("router"))
+    router = (
+        ModelRouter(router_settings, embed_fn=embed_fn)
+        if router_settings.enabled
+        else None
+    )
+    # Rulebooks embedded once per host, keyed by content hash (per embedding model)
+    index_settings = SystemIndexSettings.from_config(
+        config.get("rag", {}).get("system_index")
+    )
+    system_index = None
+    if index_settings.enabled:
+        system_index = SystemIndex(
+            Path(index_settings.path).expanduser().resolve(),
+            model=ollama_cfg.get("embedding_model", "nomic-embed-text"),
+            read_only=index_settings.read_only,
+        )
+    # Worker processes are started on the first ingest
+    preprocessor = Preprocessor(
+        PreprocessSettings.from_config(config.get("rag", {}).get("preprocess"))
+    )
+    return Shared(
+        orchestrator, embed_fn, router, EmbeddingCache(), system_index, preprocessor
+    )
+
+
+def _build_campaign(
+    config: dict,
+    shared: Shared,
+    vault: Vault,
+    campaign: CampaignSettings | None = None,
+    index_client: SharedChromaClient | None = None,
+) -> Runtime:
+    """Build one campaign's RAG store, state, caches and engine on the shared components."""
+    orchestrator = shared.orchestrator
+    rag_cfg = config.get("rag", {})
+    rerank_settings = RerankSettings.from_config(rag_cfg.get("rerank"))
+    rag = RAGStore(
+        vault=vault,
+        embed_fn=shared.embed_fn,
+        chunk_size=rag_cfg.get("chunk_size", 512),
+        chunk_overlap=rag_cfg.get("chunk_overlap", 64),
+        top_k=rag_cfg.get("top_k", 5),
+        budgets=rag_cfg.get("budgets"),
+        reranker=Reranker(rerank_settings) if rerank_settings.enabled else None,
+        collection_names=campaign.collection_names() if campaign is not None else None,
+        client_factory=index_client,
+        query_cache=shared.query_cache,
+        system_index=shared.system_index,
+        preprocessor=shared.preprocessor,
+    )
+
     state_store = StateStore(vault)
+    entity_index = EntityIndex(vault)
+    sheet_cache = SheetCache(vault)
     session_manager = SessionManager()
-    note_taker = NoteTaker(vault)
+    note_taker = NoteTaker(
+        vault, max_bytes=config.get("notes", {}).get("max_bytes", 65536)
+    )
 
+    # Ruling cache (optional): entries are dropped when their source files are re-ingested
+    cache_cfg = config.get("ai", {}).get("ruling_cache", {})
+    ruling_cache = None
+    if cache_cfg.get("enabled", False):
+        ruling_cache = RulingCache(
+            vault,
+            similarity_threshold=cache_cfg.get("similarity_threshold", 0.95),
+            max_entries=cache_cfg.get("max_entries", 512),
+        )
+        rag.add_source_listener(ruling_cache.invalidate_source)
+
+    engine_cfg = config.get("engine", {})
+    # Scene descriptions and NPC introductions pre-generated while the narrative provider is idle
+    pregen_settings = PregenSettings.from_config(engine_cfg.get("pregen"))
+    pregen = None
+    if pregen_settings.enabled:
+        pregen = ScenePregenerator(state_store, orchestrator, pregen_settings)
+        state_store.add_scene_listener(pregen.on_scene_change)
+    speculative_settings = SpeculativeSettings.from_config(
+        engine_cfg.get("speculative")
+    )
     engine = Engine(
         orchestrator=orchestrator,
         rag=rag,
         state_store=state_store,
         session_manager=session_manager,
         note_taker=note_taker,
+        ruling_cache=ruling_cache,
+        scene_radius=engine_cfg.get("scene_radius", 30.0),
+        max_scene_positions=engine_cfg.get("max_scene_positions", 25),
+        entity_index=entity_index,
+        entity_budget=engine_cfg.get("entity_budget", 1500),
+        max_entities=engine_cfg.get("max_entities", 3),
+        sheet_cache=sheet_cache,
+        sheet_budget=engine_cfg.get("sheet_budget"),
+        prompt_budget=engine_cfg.get("prompt_budget"),
+        chars_per_token=engine_cfg.get("chars_per_token"),
+        router=shared.router,
+        speculative=SpeculativeNarrator(orchestrator, speculative_settings)
+        if speculative_settings.enabled
+        else None,
+        pregen=pregen,
+        structured=StructuredSettings.from_config(engine_cfg.get("structured")),
+    )
+    return Runtime(
+        engine,
+        rag,
+        vault,
+        orchestrator,
+        state_store,
+        entity_index,
+        sheet_cache,
+        note_taker,
+        pregen=pregen,
+        ruling_cache=ruling_cache,
+        campaign=campaign,
+        preprocessor=shared.preprocessor,
     )
-    return engine, rag, vault
 
 
-async def run_async(config: dict) -> None:
-    """Build and run: optional initial RAG ingest, start Discord bot."""
-    engine, rag, vault = _build_engine(config)
+def _build_engine(config: dict, timer: PhaseTimer | None = None) -> Runtime:
+    """Build vault, RAG, state, orchestrator, engine from config. The RAG store is not opened yet."""
+    vault_cfg = config.get("vault", {})
+    vault = Vault(
+        Path(vault_cfg.get("path", "data")).resolve(),
+        fsync=vault_cfg.get("fsync", "batch"),
+    )
+    vault.ensure_all_dirs()
+    return _build_campaign(config, _build_shared(config, timer), vault)
 
-    # Optional: ingest system docs on startup
-    try:
-        n = await rag.ingest_all()
-        logger.info("RAG ingest: %d chunks indexed", n)
-    except Exception as e:
-        logger.warning("RAG initial ingest failed: %s", e)
 
-    discord_cfg = config.get("discord", {})
-    token = discord_cfg.get("token", "").strip()
-    if not token:
-        logger.error("No Discord token (DISCORD_BOT_TOKEN or config discord.token). Exiting.")
-        return
+def _build_runtimes(config: dict, timer: PhaseTimer | None = None) -> list[Runtime]:
+    """
+    One Runtime per hosted campaign (campaigns.hosted), the default campaign first, all on one
+    set of shared components; without hosted campaigns, the single campaign at vault.path.
+    """
+    campaigns_cfg = config.get("campaigns", {})
+    hosted = campaigns_cfg.get("hosted") or {}
+    if not hosted:
+        return [_build_engine(config, timer)]
+    root = campaigns_cfg.get("root", "data/campaigns")
+    settings = [
+        CampaignSettings.from_config(name, cfg, root) for name, cfg in hosted.items()
+    ]
+    default = campaigns_cfg.get("default", "")
+    settings.sort(key=lambda c: c.name != default)
+    shared = _build_shared(config, timer)
+    index_client = SharedChromaClient(
+        Path(campaigns_cfg.get("index_path", "data/_index/chroma")).resolve()
+    )
+    systems_path = Path(campaigns_cfg.get("systems_path", "data/systems")).resolve()
+    fsync = config.get("vault", {}).get("fsync", "batch")
+    runtimes: list[Runtime] = []
+    # system -> campaign that ingests and watches its rulebooks
+    owners: dict[str, Runtime] = {}
+    for campaign in settings:
+        vault = Vault(
+            Path(campaign.vault).resolve(),
+            fsync=fsync,
+            systems_root=systems_path / safe_name(campaign.system)
+            if campaign.system
+            else None,
+        )
+        vault.ensure_all_dirs()
+        runtime = _build_campaign(config, shared, vault, campaign, index_client)
+        owner = (
+            owners.setdefault(campaign.system, runtime) if campaign.system else runtime
+        )
+        if owner is not runtime:
+            runtime.watch_systems = False
+            if runtime.ruling_cache is not None:
+                # Rulebook re-ingests happen in the owner's store
+                owner.rag.add_source_listener(runtime.ruling_cache.invalidate_source)
+        runtimes.append(runtime)
+    return runtimes
 
-    loop = asyncio.get_running_loop()
 
-    # Optional file watcher: on system change, re-ingest that path (from watcher thread)
-    def on_system_change(path: str) -> None:
+async def _index_notes(
+    rag: RAGStore,
+    note_taker: NoteTaker,
+    wake: asyncio.Event,
+    retry_delay: float = 1.0,
+    max_retry_delay: float = 60.0,
+) -> None:
+    """
+    Ingest note events after rag.notes_seq into the RAG notes namespace now (catching up
+    on events recorded while the process was down) and whenever wake is set. A failed
+    ingest leaves notes_seq where it was, so its events are retried, with backoff.
+    """
+    delay = retry_delay
+    while True:
+        wake.clear()
+        try:
+            await rag.ingest_notes(note_taker.events(since_seq=rag.notes_seq))
+        except Exception as e:  # noqa: BLE001 - any provider or index error: retry with backoff
+            logger.warning("Notes ingest failed, retrying in %.0fs: %s", delay, e)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_retry_delay)
+            continue
+        delay = retry_delay
+        await wake.wait()
+
+
+@dataclass
+class Services:
+    """Background work started for one campaign, stopped again on shutdown."""
+
+    tasks: list[asyncio.Task] = field(default_factory=list)
+    watcher: "VaultWatcher | None" = None
+    summarizer: NoteSummarizer | None = None
+
+
+def _start_campaign(
+    runtime: Runtime, config: dict, loop: asyncio.AbstractEventLoop
+) -> Services:
+    """Start a campaign's vault flushing, notes summary and indexing, pre-generation and file watcher."""
+    from dungeonmaster.data.watcher import VaultWatcher
+
+    rag, vault, orchestrator = runtime.rag, runtime.vault, runtime.orchestrator
+    services = Services()
+
+    async def flush_vault(interval: float) -> None:
+        """Batch fsync mode: sync recently written vault files periodically."""
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(vault.flush)
+
+    vault_cfg = config.get("vault", {})
+    if vault_cfg.get("fsync", "batch") == "batch":
+        services.tasks.append(
+            asyncio.create_task(flush_vault(vault_cfg.get("fsync_interval", 1.0)))
+        )
+
+    # Session notes summary, kept up to date in the background for /notes
+    summary_cfg = config.get("notes", {}).get("summary", {})
+    if summary_cfg.get("enabled", True):
+        services.summarizer = NoteSummarizer(
+            vault,
+            runtime.note_taker,
+            orchestrator,
+            NoteSummarySettings.from_config(summary_cfg),
+        )
+        services.tasks.append(asyncio.create_task(services.summarizer.run()))
+
+    # Campaign notes reach the RAG notes namespace as they are recorded
+    notes_recorded = asyncio.Event()
+    runtime.note_taker.add_event_listener(lambda event: notes_recorded.set())
+    services.tasks.append(
+        asyncio.create_task(_index_notes(rag, runtime.note_taker, notes_recorded))
+    )
+
+    # Pre-generate for the scene the campaign is in now, then for every new scene
+    if runtime.pregen is not None:
+        runtime.pregen.schedule(runtime.state_store.load_scene())
+        services.tasks.append(asyncio.create_task(runtime.pregen.run()))
+
+    # Optional file watcher (callbacks run on the watcher thread): re-ingest a changed
+    # system, character or NPC file; pick up an external scene.json edit
+    def reingest_path(path: str) -> None:
         async def reingest() -> None:
             try:
+                await rag.wait_ready()
                 rag.delete_by_source(path)
                 await rag.ingest_path(Path(path))
                 logger.info("Re-ingested: %s", path)
-            except Exception as e:
+            except Exception as e:  # noqa: BLE001 - any provider or index error: keep watching
                 logger.warning("Re-ingest failed for %s: %s", path, e)
 
         asyncio.run_coroutine_threadsafe(reingest(), loop)
 
-    watcher = VaultWatcher(vault, on_system_change=on_system_change)
-    watcher.start()
+    # On character/NPC change, re-parse that file for entity lookups and sheets, and re-ingest it
+    def on_character_or_npc_change(path: str) -> None:
+        runtime.entity_index.invalidate(path)
+        runtime.sheet_cache.invalidate(path)
+        reingest_path(path)
+
+    # On an external scene.json edit, save it as the next version and publish it now
+    def on_scene_change(path: str) -> None:
+        loop.call_soon_threadsafe(runtime.state_store.refresh_scene)
+
+    services.watcher = VaultWatcher(
+        vault,
+        on_system_change=reingest_path if runtime.watch_systems else None,
+        on_character_or_npc_change=on_character_or_npc_change,
+        on_scene_change=on_scene_change,
+    )
+    services.watcher.start()
+    return services
+
+
+async def run_async(config: dict) -> None:
+    """Build and run: Discord login concurrently with index open + initial RAG ingest."""
+    timer = PhaseTimer()
+    with timer.phase("build.engine"):
+        runtimes = _build_runtimes(config, timer)
+    runtime = runtimes[0]  # the only campaign, or the default one when hosting several
+    orchestrator = runtime.orchestrator
+    await orchestrator.start()
+
+    # Optional scene change feed for VTT/frontends
+    feed_cfg = config.get("state", {}).get("feed", {})
+    feed_server = None
+    if feed_cfg.get("enabled", False):
+        # One feed per campaign: /scene and /events, or /<campaign>/... for hosted campaigns
+        feeds: dict[str, SceneChangeFeed] = {}
+        for r in runtimes:
+            name = safe_name(r.campaign.name) if r.campaign is not None else ""
+            feed = feeds[name] = SceneChangeFeed(history=feed_cfg.get("history", 256))
+            feed.seed(r.state_store.load_scene().to_dict())
+            r.state_store.add_scene_listener(feed.publish)
+        feed_server = SceneFeedServer(
+            feeds,
+            host=feed_cfg.get("host", "127.0.0.1"),
+            port=feed_cfg.get("port", 8765),
+            unix_socket=feed_cfg.get("unix_socket") or None,
+        )
+        await feed_server.start()
+
+    discord_cfg = config.get("discord", {})
+    token = discord_cfg.get("token", "").strip()
+    if not token:
+        logger.error(
+            "No Discord token (DISCORD_BOT_TOKEN or config discord.token). Exiting."
+        )
+        if feed_server is not None:
+            await feed_server.close()
+        await orchestrator.close()
+        return
+
+    async def warm_index() -> None:
+        """
+        Open the vector stores off the event loop, then ingest system, character and NPC docs
+        campaign by campaign, so rulebooks shared by several campaigns are embedded once.
+        """
+        start = timer.elapsed()
+        with timer.phase("index.open"):
+            opened = await asyncio.gather(
+                *(r.rag.open_async() for r in runtimes), return_exceptions=True
+            )
+        for r, result in zip(runtimes, opened):
+            if isinstance(result, Exception):
+                logger.warning(
+                    "RAG index open failed%s: %s", _campaign_label(r), result
+                )
+        with timer.phase("index.ingest"):
+            for r in runtimes:
+                try:
+                    n = await r.rag.ingest_all()
+                    logger.info(
+                        "RAG ingest%s: %d chunks indexed", _campaign_label(r), n
+                    )
+                except Exception as e:  # noqa: BLE001 - serve without the index rather than fail startup
+                    logger.warning(
+                        "RAG initial ingest failed%s: %s", _campaign_label(r), e
+                    )
+        logger.info(
+            "Rules index ready %.2fs after startup (%.2fs warming)",
+            timer.elapsed(),
+            timer.elapsed() - start,
+        )
+
+    warm_task = asyncio.create_task(warm_index())
+    loop = asyncio.get_running_loop()
+
+    with timer.phase("import.discord"):
+        from dungeonmaster.interfaces.discord import DiscordBot
+    with timer.phase("watcher.start"):
+        services = [_start_campaign(r, config, loop) for r in runtimes]
+
+    round_settings = RoundSettings.from_config(config.get("engine", {}).get("rounds"))
+
+    def rounds_for(r: Runtime) -> RoundCoordinator | None:
+        return (
+            RoundCoordinator(r.engine, r.state_store, round_settings)
+            if round_settings.enabled
+            else None
+        )
+
+    def summary_of(svc: Services) -> Callable[[], str] | None:
+        return svc.summarizer.summary if svc.summarizer is not None else None
+
+    campaigns = None
+    if runtime.campaign is not None:
+        campaigns = CampaignRegistry(
+            default=config.get("campaigns", {}).get("default", "")
+        )
+        for r, svc in zip(runtimes, services):
+            campaigns.add(
+                Campaign(
+                    r.campaign.name,
+                    r.engine,
+                    rounds=rounds_for(r),
+                    notes_summary=summary_of(svc),
+                ),
+                users=r.campaign.users,
+                guilds=r.campaign.guilds,
+            )
+        logger.info(
+            "Hosting %d campaigns: %s",
+            len(campaigns),
+            ", ".join(c.name for c in campaigns.campaigns),
+        )
 
     bot = DiscordBot(
         token=token,
-        engine_handle_message=engine.handle_message,
+        engine_handle_message=runtime.engine.handle_message,
         dm_only=discord_cfg.get("dm_only", True),
+        attach_threshold=discord_cfg.get("attach_threshold", 0),
+        admission=AdmissionController(
+            AdmissionSettings.from_config(discord_cfg.get("admission"))
+        ),
+        notes_summary=summary_of(services[0]),
+        rounds=rounds_for(runtime) if campaigns is None else None,
+        campaigns=campaigns,
     )
 
+    async def report_startup() -> None:
+        with timer.phase("discord.login"):
+            await bot.wait_until_ready()
+        await warm_task
+        logger.info("Startup timing:\n%s", timer.report())
+
     async def run_bot():
         async with bot:
             await bot.start(token)
 
+    report_task = asyncio.create_task(report_startup())
     try:
         await run_bot()
     finally:
-        watcher.stop()
+        report_task.cancel()
+        warm_task.cancel()
+        for svc in services:
+            for task in svc.tasks:
+                task.cancel()
+            if svc.watcher is not None:
+                svc.watcher.stop()
+        await _flush_runtimes(runtimes)
+        if runtime.preprocessor is not None:
+            runtime.preprocessor.close()
+        if feed_server is not None:
+            await feed_server.close()
+        await orchestrator.close()
+
+
+async def _flush_runtimes(runtimes: list[Runtime]) -> None:
+    """On shutdown, write each campaign's queued ruling cache snapshot (off the loop), then its batched vault writes."""
+    caches = {
+        id(r.ruling_cache): r.ruling_cache
+        for r in runtimes
+        if r.ruling_cache is not None
+    }
+    for cache in caches.values():
+        await asyncio.to_thread(cache.flush)
+    for r in runtimes:
+        r.vault.flush()
+
+
+def _campaign_label(runtime: Runtime) -> str:
+    return (
+        f" for campaign {runtime.campaign.name}" if runtime.campaign is not None else ""
+    )
 
 
 def main() -> None:
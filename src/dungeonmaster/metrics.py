@@ -0,0 +1,126 @@
+"""
+Lightweight in-process metrics: counters, gauges, and latency samples.
+
+Components record into the process-wide `metrics` registry (or one passed in
+for tests). Samples are kept in a bounded window per name so percentiles
+reflect recent behaviour. snapshot() returns a plain dict suitable for logging.
+PhaseTimer times named (possibly overlapping) phases such as startup steps.
+"""
+
+import math
+import time
+from collections import defaultdict, deque
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+
+class Metrics:
+    """Named counters, gauges and bounded sample windows (e.g. latencies in seconds)."""
+
+    def __init__(self, window: int = 1024):
+        self._window = window
+        self._counters: dict[str, float] = defaultdict(float)
+        self._gauges: dict[str, float] = {}
+        self._samples: dict[str, deque[float]] = {}
+
+    def incr(self, name: str, value: float = 1) -> None:
+        self._counters[name] += value
+
+    def gauge(self, name: str, value: float) -> None:
+        self._gauges[name] = value
+
+    def observe(self, name: str, value: float) -> None:
+        samples = self._samples.get(name)
+        if samples is None:
+            samples = self._samples[name] = deque(maxlen=self._window)
+        samples.append(value)
+
+    def counter(self, name: str) -> float:
+        return self._counters.get(name, 0)
+
+    def samples(self, name: str) -> list[float]:
+        return list(self._samples.get(name, ()))
+
+    def percentile(self, name: str, q: float) -> float | None:
+        """q in [0, 1]; nearest-rank percentile of the recent window, None if empty."""
+        return percentile(self._samples.get(name, ()), q)
+
+    def snapshot(self) -> dict:
+        return {
+            "counters": dict(self._counters),
+            "gauges": dict(self._gauges),
+            "samples": {
+                name: {
+                    "count": len(s),
+                    "p50": percentile(s, 0.5),
+                    "p95": percentile(s, 0.95),
+                }
+                for name, s in self._samples.items()
+            },
+        }
+
+    def reset(self) -> None:
+        self._counters.clear()
+        self._gauges.clear()
+        self._samples.clear()
+
+
+def percentile(values, q: float) -> float | None:
+    """Nearest-rank percentile of an iterable of numbers; None if empty."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = max(1, math.ceil(q * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+# Process-wide default registry
+metrics = Metrics()
+
+
+class PhaseTimer:
+    """
+    Times named phases relative to a common start (e.g. process startup). Phases may
+    overlap; each is recorded as a sample under "<prefix>.<name>" in the metrics registry.
+    """
+
+    def __init__(
+        self,
+        prefix: str = "startup",
+        registry: Metrics | None = None,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        self._prefix = prefix
+        self._metrics = registry or metrics
+        self._clock = clock
+        self._t0 = clock()
+        self.phases: dict[str, tuple[float, float]] = {}
+
+    def elapsed(self) -> float:
+        return self._clock() - self._t0
+
+    def record(self, name: str, start: float, end: float) -> None:
+        """Record a phase given absolute clock readings."""
+        self.phases[name] = (start - self._t0, end - self._t0)
+        self._metrics.observe(f"{self._prefix}.{name}", end - start)
+
+    def mark(self, name: str) -> None:
+        """Record a zero-length milestone at the current time."""
+        now = self._clock()
+        self.record(name, now, now)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = self._clock()
+        try:
+            yield
+        finally:
+            self.record(name, start, self._clock())
+
+    def report(self) -> str:
+        """One line per phase, ordered by start: name, duration, and offset from t0."""
+        lines = [
+            f"  {name:<24} {end - start:7.3f}s  (+{start:.3f}s .. +{end:.3f}s)"
+            for name, (start, end) in sorted(self.phases.items(), key=lambda kv: kv[1])
+        ]
+        return "\n".join(lines)
@@ -4,8 +4,8 @@ from pathlib import Path
 
 import pytest
 
+from dungeonmaster.data.state import Location, Position, SceneState, StateStore
 from dungeonmaster.data.vault import Vault
-from dungeonmaster.data.state import StateStore, SceneState, Location, Position
 
 
 @pytest.fixture
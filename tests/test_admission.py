@@ -0,0 +1,162 @@
+"""Tests for per-user admission control and fair scheduling."""
+
+import asyncio
+
+import pytest
+
+from dungeonmaster.core.admission import (
+    AdmissionController,
+    AdmissionRejected,
+    AdmissionSettings,
+)
+from dungeonmaster.metrics import Metrics
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _controller(**overrides) -> AdmissionController:
+    settings = AdmissionSettings(
+        **{"user_per_minute": 0, "guild_per_minute": 0, **overrides}
+    )
+    return AdmissionController(settings, metrics=Metrics())
+
+
+async def test_user_bucket_rejects_burst_and_refills():
+    clock = FakeClock()
+    ctl = AdmissionController(
+        AdmissionSettings(user_burst=2, user_per_minute=6, guild_per_minute=0),
+        metrics=Metrics(),
+        clock=clock,
+    )
+    for _ in range(2):
+        async with ctl.slot("alice"):
+            pass
+    with pytest.raises(AdmissionRejected) as exc:
+        await ctl.acquire("alice")
+    assert exc.value.reason == "rate_limited"
+    assert exc.value.retry_after == pytest.approx(10.0)
+    # Other players are unaffected
+    async with ctl.slot("bob"):
+        pass
+    clock.now = 10.0
+    async with ctl.slot("alice"):
+        pass
+
+
+async def test_guild_bucket_shared_across_users():
+    ctl = AdmissionController(
+        AdmissionSettings(user_per_minute=0, guild_burst=1, guild_per_minute=1),
+        metrics=Metrics(),
+    )
+    async with ctl.slot("alice", guild_id="g1"):
+        pass
+    with pytest.raises(AdmissionRejected):
+        await ctl.acquire("bob", guild_id="g1")
+    async with ctl.slot("bob", guild_id="g2"):
+        pass
+
+
+async def test_round_robin_across_users():
+    ctl = _controller(max_concurrent=1, max_in_flight_per_user=1, max_queued_per_user=0)
+    order: list[str] = []
+    gate = asyncio.Event()
+
+    async def request(user: str, tag: str) -> None:
+        async with ctl.slot(user):
+            order.append(tag)
+            await gate.wait()
+
+    # Alice floods first; Bob and Carol arrive later but are interleaved fairly
+    tasks = [asyncio.create_task(request("alice", f"a{i}")) for i in range(3)]
+    await asyncio.sleep(0)
+    tasks += [
+        asyncio.create_task(request("bob", "b0")),
+        asyncio.create_task(request("carol", "c0")),
+    ]
+    await asyncio.sleep(0)
+    gate.set()
+    await asyncio.gather(*tasks)
+    assert order == ["a0", "b0", "c0", "a1", "a2"]
+    assert ctl.active == 0 and ctl.queue_depth == 0
+
+
+async def test_per_user_in_flight_cap_and_queue_limit():
+    ctl = _controller(max_concurrent=4, max_in_flight_per_user=1, max_queued_per_user=1)
+    gate = asyncio.Event()
+    positions: list[int] = []
+
+    async def request(user: str) -> None:
+        async def on_queued(position: int) -> None:
+            positions.append(position)
+
+        async with ctl.slot(user, on_queued=on_queued):
+            await gate.wait()
+
+    first = asyncio.create_task(request("alice"))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(request("alice"))
+    await asyncio.sleep(0)
+    assert ctl.in_flight("alice") == 1
+    assert positions == [1]
+    with pytest.raises(AdmissionRejected) as exc:
+        await ctl.acquire("alice")
+    assert exc.value.reason == "queue_full"
+    gate.set()
+    await asyncio.gather(first, second)
+    assert ctl.in_flight("alice") == 0
+
+
+async def test_cancelled_waiter_leaves_queue():
+    ctl = _controller(max_concurrent=1)
+    gate = asyncio.Event()
+
+    async def hold() -> None:
+        async with ctl.slot("alice"):
+            await gate.wait()
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(ctl.acquire("bob"))
+    await asyncio.sleep(0)
+    assert ctl.position("bob") == 1
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert ctl.queue_depth == 0
+    gate.set()
+    await holder
+    assert ctl.active == 0
+
+
+async def test_just_served_player_does_not_jump_the_queue():
+    ctl = _controller(max_concurrent=1, max_in_flight_per_user=1, max_queued_per_user=0)
+    order: list[str] = []
+    gates = {tag: asyncio.Event() for tag in ("a0", "b0", "a1", "c0")}
+
+    async def request(user: str, tag: str) -> None:
+        async with ctl.slot(user):
+            order.append(tag)
+            await gates[tag].wait()
+
+    a0 = asyncio.create_task(request("alice", "a0"))
+    await asyncio.sleep(0)
+    b0 = asyncio.create_task(request("bob", "b0"))
+    await asyncio.sleep(0)
+    gates["a0"].set()  # Alice is done with nothing queued; Bob is served
+    await a0
+    # Alice asks again before Carol, but Carol has never been served
+    a1 = asyncio.create_task(request("alice", "a1"))
+    await asyncio.sleep(0)
+    c0 = asyncio.create_task(request("carol", "c0"))
+    await asyncio.sleep(0)
+    for gate in gates.values():
+        gate.set()
+    await asyncio.gather(b0, a1, c0)
+    assert order == ["a0", "b0", "c0", "a1"]
+    assert ctl.active == 0 and ctl.queue_depth == 0
@@ -0,0 +1,52 @@
+"""Tests for mapping players to campaigns hosted in one process."""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from dungeonmaster.core.campaigns import (
+    Campaign,
+    CampaignRegistry,
+    CampaignSettings,
+    safe_name,
+)
+
+
+def test_settings_from_config_and_collections():
+    settings = CampaignSettings.from_config(
+        "Curse of Strahd", {"system": "D&D 5e", "users": [123]}, "camps"
+    )
+    assert settings.vault == "camps/curse_of_strahd"
+    assert settings.users == ["123"] and settings.guilds == []
+    assert settings.collection_names() == {
+        "rules": "rules_d_d_5e",
+        "notes": "notes_curse_of_strahd",
+        "entities": "entities_curse_of_strahd",
+    }
+    homebrew = CampaignSettings.from_config("Homebrew", {"vault": "/srv/hb"})
+    assert homebrew.vault == "/srv/hb"
+    # no system: not shared
+    assert homebrew.collection_names()["rules"] == "rules_campaign_homebrew"
+    assert safe_name("!!!") == "campaign"
+
+
+def test_registry_routes_by_user_then_guild_then_default():
+    registry = CampaignRegistry(default="oneshot")
+    strahd, kingmaker, oneshot = (
+        Campaign(name, MagicMock()) for name in ("strahd", "kingmaker", "oneshot")
+    )
+    registry.add(strahd, users=["alice"], guilds=["g1"])
+    registry.add(kingmaker, users=["bob"])
+    registry.add(oneshot)
+    assert registry.campaign_for("alice") is strahd
+    # the user's own campaign wins
+    assert registry.campaign_for("bob", guild_id="g1") is kingmaker
+    assert registry.campaign_for("carol", guild_id="g1") is strahd
+    assert registry.campaign_for("carol") is oneshot
+    assert len(registry) == 3 and registry.get("kingmaker") is kingmaker
+
+    assert CampaignRegistry().campaign_for("carol") is None  # no default: turned away
+    with pytest.raises(ValueError, match="alice"):
+        registry.add(Campaign("other", MagicMock()), users=["alice"])
+    with pytest.raises(ValueError, match="already hosted"):
+        registry.add(Campaign("strahd", MagicMock()))
@@ -0,0 +1,139 @@
+"""Tests for the scene change feed and its SSE server."""
+
+import asyncio
+import json
+
+from dungeonmaster.data.change_feed import SceneChangeFeed, SceneFeedServer
+from dungeonmaster.data.state import SceneState, StateStore
+
+
+def _scene(version: int, name: str = "Tavern") -> dict:
+    return {
+        **SceneState().to_dict(),
+        "location": {"name": name, "description": ""},
+        "version": version,
+    }
+
+
+async def test_catch_up_from_version_then_live():
+    feed = SceneChangeFeed(history=4)
+    feed.seed(_scene(1))
+    for v in (2, 3):
+        feed.publish(v, {"version": v}, _scene(v))
+    sub = feed.subscribe(since=1)
+    assert [(e.kind, e.version) for e in [await sub.get(0.1), await sub.get(0.1)]] == [
+        ("patch", 2),
+        ("patch", 3),
+    ]
+    assert await sub.get(0.01) is None
+    feed.publish(4, {"version": 4}, _scene(4))
+    assert (await sub.get(0.1)).version == 4
+    sub.close()
+    assert feed.subscribers == 0
+
+
+async def test_too_old_or_unknown_version_gets_snapshot():
+    feed = SceneChangeFeed(history=2)
+    feed.seed(_scene(1))
+    for v in range(2, 6):
+        feed.publish(v, {"version": v}, _scene(v, f"room{v}"))
+    assert feed.since(4) == [e for e in feed._events if e.version == 5]
+    assert feed.since(1) is None
+    assert feed.since(99) is None
+    event = await feed.subscribe(since=1).get(0.1)
+    assert event.kind == "snapshot" and event.version == 5
+    assert event.data["location"]["name"] == "room5"
+
+
+async def test_slow_subscriber_is_resynced_with_snapshot():
+    feed = SceneChangeFeed(subscriber_queue=2)
+    feed.seed(_scene(1))
+    sub = feed.subscribe(since=1)
+    for v in range(2, 6):
+        feed.publish(v, {"version": v}, _scene(v))
+    event = await sub.get(0.1)
+    assert event.kind == "snapshot" and event.version == 5
+    assert await sub.get(0.01) is None
+
+
+def test_state_store_publishes_deltas(
+    state_store: StateStore, sample_scene: SceneState
+):
+    events = []
+    state_store.add_scene_listener(
+        lambda version, delta, scene: events.append((version, delta))
+    )
+    state_store.save_scene(sample_scene)
+    state_store.apply_scene_patch({"positions": [{"entity_id": "player1", "x": 2}]})
+    assert [v for v, _ in events] == [1, 2]
+    assert events[1][1] == {
+        "version": 2,
+        "positions": [{"entity_id": "player1", "x": 2.0}],
+    }
+
+
+async def test_sse_server_streams_events():
+    feed = SceneChangeFeed()
+    feed.seed(_scene(1))
+    server = SceneFeedServer(feed, port=0, keepalive=0.05)
+    await server.start()
+    host, port = server.address[:2]
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(b"GET /events?since=1 HTTP/1.1\r\nHost: x\r\n\r\n")
+        await writer.drain()
+        assert (await reader.readline()).startswith(b"HTTP/1.1 200")
+        await reader.readuntil(b"\r\n\r\n")
+        feed.publish(
+            2, {"version": 2, "location": {"name": "Cellar"}}, _scene(2, "Cellar")
+        )
+        while (line := await asyncio.wait_for(reader.readline(), 1.0)) != b"id: 2\n":
+            assert line in (b": keepalive\n", b"\n")
+        assert await reader.readline() == b"event: patch\n"
+        data = json.loads((await reader.readline())[len(b"data: ") :])
+        assert data["location"] == {"name": "Cellar"}
+        writer.close()
+
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(b"GET /scene HTTP/1.1\r\n\r\n")
+        response = await asyncio.wait_for(reader.read(), 1.0)
+        assert json.loads(response.split(b"\r\n\r\n", 1)[1])["version"] == 2
+        writer.close()
+    finally:
+        await server.close()
+
+
+async def test_sse_server_serves_one_feed_per_campaign():
+    strahd, kingmaker = SceneChangeFeed(), SceneChangeFeed()
+    strahd.seed(_scene(1, "Barovia"))
+    kingmaker.seed(_scene(4, "Stolen Lands"))
+    server = SceneFeedServer({"strahd": strahd, "kingmaker": kingmaker}, port=0)
+    await server.start()
+    host, port = server.address[:2]
+
+    async def get(path: bytes) -> bytes:
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(b"GET " + path + b" HTTP/1.1\r\n\r\n")
+        response = await asyncio.wait_for(reader.read(), 1.0)
+        writer.close()
+        return response
+
+    try:
+        assert (
+            json.loads((await get(b"/strahd/scene")).split(b"\r\n\r\n", 1)[1])[
+                "version"
+            ]
+            == 1
+        )
+        kingmaker.publish(5, {"version": 5}, _scene(5, "Stolen Lands"))
+        assert (
+            json.loads((await get(b"/kingmaker/scene")).split(b"\r\n\r\n", 1)[1])[
+                "version"
+            ]
+            == 5
+        )
+        # no unnamed feed when hosting
+        assert (await get(b"/scene")).startswith(b"HTTP/1.1 404")
+        assert (await get(b"/phandelver/events")).startswith(b"HTTP/1.1 404")
+    finally:
+        await server.close()
@@ -5,7 +5,7 @@ from pathlib import Path
 
 import pytest
 
-from dungeonmaster.config import load_config, _resolve_env
+from dungeonmaster.config import _resolve_env, load_config
 
 
 def test_resolve_env_string():
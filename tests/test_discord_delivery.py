@@ -0,0 +1,65 @@
+"""Tests for Discord reply splitting and delivery."""
+
+import pytest
+
+from dungeonmaster.interfaces.discord.delivery import ReplySender, split_reply
+
+
+def test_split_short_and_blank():
+    assert split_reply("hello") == ["hello"]
+    assert split_reply("   ") == []
+
+
+def test_split_on_paragraphs():
+    paras = [f"p{i} " * 30 for i in range(10)]
+    text = "\n\n".join(p.strip() for p in paras)
+    chunks = split_reply(text, limit=400)
+    assert all(len(c) <= 400 for c in chunks)
+    # No paragraph is cut in half
+    assert "\n\n".join(chunks) == text
+
+
+def test_split_oversized_paragraph_by_sentences():
+    text = " ".join(f"Sentence number {i} is here." for i in range(100))
+    chunks = split_reply(text, limit=200)
+    assert all(len(c) <= 200 for c in chunks)
+    assert all(c.endswith(".") for c in chunks)
+    assert " ".join(chunks) == text
+
+
+def test_split_keeps_code_fences_balanced():
+    code = "\n".join(f"line {i} = {i * i}" for i in range(200))
+    text = f"Intro.\n\n```python\n{code}\n```\n\nOutro."
+    chunks = split_reply(text, limit=500)
+    assert all(len(c) <= 500 for c in chunks)
+    for chunk in chunks:
+        assert chunk.count("```") % 2 == 0
+    assert sum(c.count("line ") for c in chunks) == 200
+
+
+@pytest.mark.asyncio
+async def test_sender_sends_all_chunks_in_order():
+    sent = []
+
+    async def send(content, **kwargs):
+        sent.append((content, kwargs))
+
+    sender = ReplySender(limit=100, channel_burst=100)
+    text = "\n\n".join(f"Paragraph {i}. " * 3 for i in range(10))
+    n = await sender.send("chan", send, text, ephemeral=True)
+    assert n == len(sent) > 1
+    assert all(kwargs == {"ephemeral": True} for _, kwargs in sent)
+    assert "Paragraph 0" in sent[0][0] and "Paragraph 9" in sent[-1][0]
+
+
+@pytest.mark.asyncio
+async def test_sender_attaches_very_long_reply():
+    sent = []
+
+    async def send(content, **kwargs):
+        sent.append((content, kwargs))
+
+    sender = ReplySender(attach_threshold=500)
+    await sender.send("chan", send, "word " * 500)
+    assert len(sent) == 1
+    assert sent[0][1]["file"].filename == "reply.md"
@@ -4,22 +4,31 @@ from unittest.mock import AsyncMock
 
 import pytest
 
-from dungeonmaster.core.engine import Engine, _extract_scene_update
-from dungeonmaster.core.session import SessionManager
 from dungeonmaster.ai.orchestrator import AIOrchestrator
 from dungeonmaster.ai.providers.base import GenerateResult
+from dungeonmaster.ai.structured import fenced_blocks, scene_update
+from dungeonmaster.core.engine import Engine
+from dungeonmaster.core.session import SessionManager
+
+
+def _reply_updates(text: str) -> list:
+    """Scene updates the engine would apply from a reply, in order."""
+    return [u for u in map(scene_update, fenced_blocks(text)) if u is not None]
 
 
-def test_extract_scene_update_none():
-    assert _extract_scene_update("no json here") is None
-    assert _extract_scene_update("```\n{}\n```") is None
+def test_reply_without_scene_update():
+    assert _reply_updates("no json here") == []
+    assert _reply_updates("```\n{}\n```") == []
 
 
-def test_extract_scene_update_found():
-    text = "Here is the scene:\n```json\n{\"scene_id\": \"room1\"}\n```"
-    out = _extract_scene_update(text)
-    assert out is not None
-    assert out["scene_id"] == "room1"
+def test_reply_with_full_scene():
+    text = 'Here is the scene:\n```json\n{"scene_id": "room1"}\n```'
+    [update] = _reply_updates(text)
+    assert (update.kind, update.data["scene_id"], update.error) == (
+        "scene",
+        "room1",
+        None,
+    )
 
 
 @pytest.mark.asyncio
@@ -30,7 +39,9 @@ async def test_engine_handle_message(vault, state_store):
     mock_provider = AsyncMock()
     mock_provider.generate = fake_generate
     mock_provider.default_model = "test"
-    orchestrator = AIOrchestrator(narrative_provider=mock_provider, ruling_provider=None)
+    orchestrator = AIOrchestrator(
+        narrative_provider=mock_provider, ruling_provider=None
+    )
     engine = Engine(
         orchestrator=orchestrator,
         rag=None,
@@ -43,3 +54,685 @@ async def test_engine_handle_message(vault, state_store):
     session = engine._session_manager.get("sess1")
     assert session is not None
     assert len(session.turns) == 2  # user + assistant
+
+
+@pytest.mark.asyncio
+async def test_engine_ruling_served_from_cache(vault, state_store):
+    from dungeonmaster.ai.rag import RetrievedChunk
+    from dungeonmaster.ai.ruling_cache import RulingCache
+
+    calls = []
+
+    async def fake_generate(prompt, model=None, system=None, **kwargs):
+        calls.append(prompt)
+        return GenerateResult(text="Use your reaction.", model="test", raw=None)
+
+    mock_provider = AsyncMock()
+    mock_provider.generate = fake_generate
+    mock_provider.default_model = "test"
+
+    rag = AsyncMock()
+    rag.retrieve_context.return_value = {
+        "rules": [
+            RetrievedChunk(id="c1", text="Opportunity attacks...", source="phb.md")
+        ]
+    }
+    rag.embed_query.return_value = [1.0, 0.0]
+    rag.warming = False
+
+    engine = Engine(
+        orchestrator=AIOrchestrator(narrative_provider=mock_provider),
+        rag=rag,
+        state_store=state_store,
+        session_manager=SessionManager(),
+        ruling_cache=RulingCache(vault),
+    )
+    first = await engine.handle_message(
+        "a", "a", "[Status/Ruling] Opportunity attack?", task_type="ruling"
+    )
+    second = await engine.handle_message(
+        "b", "b", "[Status/Ruling] opportunity attack", task_type="ruling"
+    )
+    assert first == second == "Use your reaction."
+    assert len(calls) == 1
+
+    # Another player with their own sheet, or the same question after the scene changed, still hits
+    state_store.save_character("c", "# Rogue\n\nSneak attack 3d6.")
+    state_store.apply_scene_patch({"location": {"name": "Cellar"}})
+    assert (
+        await engine.handle_message(
+            "c",
+            "c",
+            "[Status/Ruling] how does opportunity attack work",
+            task_type="ruling",
+        )
+        == first
+    )
+    assert len(calls) == 1
+
+    # Different rule chunks are a different ruling
+    rag.retrieve_context.return_value = {
+        "rules": [RetrievedChunk(id="c2", text="Reactions...", source="phb.md")]
+    }
+    await engine.handle_message(
+        "a", "a", "[Status/Ruling] opportunity attack", task_type="ruling"
+    )
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_engine_sizes_retrieval_for_the_answering_model(state_store):
+    narrative = AsyncMock()
+    narrative.generate.return_value = GenerateResult(
+        text="You look around.", model="llama3.2", raw=None
+    )
+    narrative.default_model = "llama3.2"
+    ruling = AsyncMock()
+    ruling.generate.return_value = GenerateResult(
+        text="Roll Athletics.", model="claude-3-5-sonnet", raw=None
+    )
+    ruling.default_model = "claude-3-5-sonnet"
+    rag = AsyncMock()
+    rag.retrieve_context.return_value = {}
+    rag.warming = False
+    engine = Engine(
+        orchestrator=AIOrchestrator(
+            narrative_provider=narrative, ruling_provider=ruling
+        ),
+        rag=rag,
+        state_store=state_store,
+        session_manager=SessionManager(),
+    )
+    await engine.handle_message("s", "u", "I look around.")
+    assert rag.retrieve_context.call_args.kwargs["chars_per_token"] == 3.8
+    await engine.handle_message("s", "u", "Can I grapple the ogre?", task_type="ruling")
+    assert rag.retrieve_context.call_args.kwargs["chars_per_token"] == 3.5
+
+
+@pytest.mark.asyncio
+async def test_engine_degraded_while_index_warming(state_store):
+    seen = {}
+
+    async def fake_generate(prompt, model=None, system=None, **kwargs):
+        seen["system"] = system
+        return GenerateResult(text="Probably a DC 15 check.", model="test", raw=None)
+
+    mock_provider = AsyncMock()
+    mock_provider.generate = fake_generate
+    mock_provider.default_model = "test"
+    rag = AsyncMock()
+    rag.warming = True
+    engine = Engine(
+        orchestrator=AIOrchestrator(narrative_provider=mock_provider),
+        rag=rag,
+        state_store=state_store,
+        session_manager=SessionManager(),
+    )
+    reply = await engine.handle_message(
+        "s", "u", "Can I jump the chasm?", task_type="ruling"
+    )
+    assert "warming up" in seen["system"]
+    assert "provisional" in reply
+    rag.retrieve_context.assert_not_called()
+
+
+def test_reply_with_scene_patch():
+    text = 'You move.\n```json-patch\n{"positions": [{"entity_id": "p1", "x": 2}]}\n```'
+    [update] = _reply_updates(text)
+    assert (update.kind, update.data) == (
+        "patch",
+        {"positions": [{"entity_id": "p1", "x": 2}]},
+    )
+    [update] = _reply_updates(
+        '```json\n{"scene_patch": [{"op": "remove", "path": "/turn_order/0"}]}\n```'
+    )
+    assert (update.kind, update.data) == (
+        "patch",
+        [{"op": "remove", "path": "/turn_order/0"}],
+    )
+    assert [u.kind for u in _reply_updates('```json\n{"scene_id": "room1"}\n```')] == [
+        "scene"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_engine_applies_scene_patch(state_store, sample_scene):
+    state_store.save_scene(sample_scene)
+
+    async def fake_generate(prompt, model=None, system=None, **kwargs):
+        return GenerateResult(
+            text='You step to the bar.\n```json-patch\n{"positions": [{"entity_id": "player1", "x": 3}]}\n```',
+            model="test",
+            raw=None,
+        )
+
+    mock_provider = AsyncMock()
+    mock_provider.generate = fake_generate
+    mock_provider.default_model = "test"
+    engine = Engine(
+        orchestrator=AIOrchestrator(narrative_provider=mock_provider),
+        rag=None,
+        state_store=state_store,
+        session_manager=SessionManager(),
+    )
+    await engine.handle_message("s", "player1", "I walk to the bar.")
+    scene = state_store.load_scene()
+    assert scene.version == 2
+    assert scene.positions[0].x == 3
+    assert scene.location.name == sample_scene.location.name
+
+
+@pytest.mark.asyncio
+async def test_engine_prompt_only_includes_nearby_positions(state_store):
+    from dungeonmaster.data.state import Position, SceneState
+
+    positions = [
+        Position("hero", "player", 0, 0, "hall"),
+        Position("goblin", "npc", 2, 0),
+    ]
+    positions += [Position(f"far{i}", "npc", 500 + i, 500) for i in range(50)]
+    state_store.save_scene(SceneState(positions=positions))
+    systems = []
+
+    async def fake_generate(prompt, model=None, system=None, **kwargs):
+        systems.append(system)
+        return GenerateResult(text="ok", model="test", raw=None)
+
+    mock_provider = AsyncMock()
+    mock_provider.generate = fake_generate
+    mock_provider.default_model = "test"
+    engine = Engine(
+        orchestrator=AIOrchestrator(narrative_provider=mock_provider),
+        rag=None,
+        state_store=state_store,
+        session_manager=SessionManager(),
+        scene_radius=10,
+    )
+    await engine.handle_message("s", "hero", "I look around.")
+    assert "hero(player) at (0, 0) in hall" in systems[0]
+    assert "goblin(npc) at (2, 0)" in systems[0]
+    assert "far0" not in systems[0]
+    assert "+50 more elsewhere" in systems[0]
+
+
+@pytest.mark.asyncio
+async def test_engine_injects_mentioned_npc_sections(vault, state_store):
+    from dungeonmaster.data.entities import EntityIndex
+
+    vault.write_text(
+        vault.npc_path("barkeep"),
+        "# Barkeep\n\nGrumpy.\n\n## Secrets\nHides a map.\n\n## Combat\nCudgel.",
+    )
+    systems = []
+
+    async def fake_generate(prompt, model=None, system=None, **kwargs):
+        systems.append(system)
+        return GenerateResult(text="ok", model="test", raw=None)
+
+    mock_provider = AsyncMock()
+    mock_provider.generate = fake_generate
+    mock_provider.default_model = "test"
+    engine = Engine(
+        orchestrator=AIOrchestrator(narrative_provider=mock_provider),
+        rag=None,
+        state_store=state_store,
+        session_manager=SessionManager(),
+        entity_index=EntityIndex(vault),
+    )
+    await engine.handle_message("s", "alice", "I ask the barkeep about his secrets.")
+    assert "Relevant characters/NPCs:\n### Barkeep (npc)" in systems[0]
+    assert "Hides a map." in systems[0]
+    assert "Cudgel" not in systems[0]
+
+
+@pytest.mark.asyncio
+async def test_engine_sends_sheet_summary_or_full_by_task_type(vault, state_store):
+    from dungeonmaster.data.sheets import SheetCache
+
+    spells = "\n".join(
+        f"- Spell{i}: a long description of what spell number {i} does."
+        for i in range(20)
+    )
+    vault.write_text(
+        vault.character_path("alice"),
+        f"# Alice\n\nA paladin.\n\n## Stats\nHP: 27\nAC: 18\n\n## Spells\n{spells}",
+    )
+    systems = []
+
+    async def fake_generate(prompt, model=None, system=None, **kwargs):
+        systems.append(system)
+        return GenerateResult(text="ok", model="test", raw=None)
+
+    mock_provider = AsyncMock()
+    mock_provider.generate = fake_generate
+    mock_provider.default_model = "test"
+    engine = Engine(
+        orchestrator=AIOrchestrator(
+            narrative_provider=mock_provider, ruling_provider=mock_provider
+        ),
+        rag=None,
+        state_store=state_store,
+        session_manager=SessionManager(),
+        sheet_cache=SheetCache(vault),
+        sheet_budget={"narrative": 300, "ruling": 5000},
+    )
+    await engine.handle_message("s", "alice", "I walk into town.")
+    assert "Stats: HP 27, AC 18" in systems[0]
+    assert "Spells: 20 entries: Spell0" in systems[0]
+    assert "spell number 19" not in systems[0]
+    await engine.handle_message("s", "alice", "Can I cast Spell19?", task_type="ruling")
+    assert "spell number 19 does." in systems[1]
+
+
+@pytest.mark.asyncio
+async def test_engine_prompt_respects_budget(vault, state_store):
+    from dungeonmaster.metrics import Metrics
+
+    vault.write_text(
+        vault.character_path("alice"),
+        "# Alice\n\n" + "A very long backstory line.\n" * 200,
+    )
+    systems = []
+
+    async def fake_generate(prompt, model=None, system=None, **kwargs):
+        systems.append(system)
+        return GenerateResult(text="ok", model="test", raw=None)
+
+    mock_provider = AsyncMock()
+    mock_provider.generate = fake_generate
+    mock_provider.default_model = "test"
+    metrics = Metrics()
+    engine = Engine(
+        orchestrator=AIOrchestrator(narrative_provider=mock_provider),
+        rag=None,
+        state_store=state_store,
+        session_manager=SessionManager(),
+        prompt_budget={"narrative": 300},
+        metrics=metrics,
+    )
+    await engine.handle_message("s", "alice", "Hello")
+    assert len(systems[0]) <= 300 * 4
+    assert systems[0].startswith("You are the Dungeon Master")
+    assert "json-patch" in systems[0]  # required instructions are never cut
+    assert metrics.counter("prompt.truncated.character") == 1
+    assert metrics.samples("prompt.tokens.role")
+
+
+@pytest.mark.asyncio
+async def test_engine_routes_by_content(vault, state_store):
+    from dungeonmaster.ai.router import ModelRouter, RouterSettings
+    from dungeonmaster.metrics import Metrics
+
+    def provider(name):
+        calls = []
+
+        async def fake_generate(prompt, model=None, system=None, **kwargs):
+            calls.append(model)
+            return GenerateResult(text=name, model=model or name, raw=None)
+
+        p = AsyncMock()
+        p.generate = fake_generate
+        p.default_model = f"{name}-model"
+        p.in_flight = 0
+        return p, calls
+
+    narrative, narrative_calls = provider("ollama")
+    ruling, ruling_calls = provider("claude")
+    engine = Engine(
+        orchestrator=AIOrchestrator(
+            narrative_provider=narrative, ruling_provider=ruling
+        ),
+        rag=None,
+        state_store=state_store,
+        session_manager=SessionManager(),
+        router=ModelRouter(RouterSettings(small_model="tiny"), metrics=Metrics()),
+    )
+    assert (
+        await engine.handle_message(
+            "s", "alice", "Can I grapple and still take an opportunity attack?"
+        )
+        == "claude"
+    )
+    # An explicit ruling request is never downgraded, whatever its content
+    assert (
+        await engine.handle_message(
+            "s", "alice", "I nod and sit down.", task_type="ruling"
+        )
+        == "claude"
+    )
+    assert (
+        await engine.handle_message("s", "alice", "I head down the stairs.") == "ollama"
+    )
+    assert ruling_calls == ["claude-model", "claude-model"]
+    assert narrative_calls == ["tiny"]
+
+
+@pytest.mark.asyncio
+async def test_engine_speculates_on_mixed_action(vault, state_store):
+    from dungeonmaster.core.speculative import SpeculativeNarrator
+
+    systems = {}
+
+    def provider(name, reply):
+        async def fake_generate(prompt, model=None, system=None, **kwargs):
+            systems[name] = system
+            return GenerateResult(text=reply, model=name, raw=None)
+
+        p = AsyncMock()
+        p.generate = fake_generate
+        p.default_model = f"{name}-model"
+        return p
+
+    orchestrator = AIOrchestrator(
+        narrative_provider=provider("ollama", "You lunge at the ogre."),
+        ruling_provider=provider("claude", "VERDICT: ALLOWED\nRoll Athletics, DC 15."),
+    )
+    engine = Engine(
+        orchestrator=orchestrator,
+        rag=None,
+        state_store=state_store,
+        session_manager=SessionManager(),
+        speculative=SpeculativeNarrator(orchestrator),
+    )
+    reply = await engine.handle_message(
+        "s", "alice", "[Action] I grapple the ogre. Can I drag it off the ledge?"
+    )
+    assert reply == "You lunge at the ogre.\n\nRoll Athletics, DC 15."
+    assert "VERDICT" in systems["claude"] and "json-patch" in systems["claude"]
+    assert (
+        "Narrate only the player's attempt" in systems["ollama"]
+        and "json-patch" not in systems["ollama"]
+    )
+
+    assert (
+        await engine.handle_message("s", "alice", "[Action] I wave to the bard.")
+        == "You lunge at the ogre."
+    )
+
+
+@pytest.mark.asyncio
+async def test_engine_speculation_honours_router_and_ruling_cache(vault, state_store):
+    from dungeonmaster.ai.rag import RetrievedChunk
+    from dungeonmaster.ai.router import ModelRouter, RouterSettings
+    from dungeonmaster.ai.ruling_cache import RulingCache
+    from dungeonmaster.core.speculative import SpeculativeNarrator
+    from dungeonmaster.metrics import Metrics
+
+    calls = []
+
+    def provider(name, reply):
+        async def fake_generate(prompt, model=None, system=None, **kwargs):
+            calls.append(name)
+            return GenerateResult(text=reply, model=name, raw=None)
+
+        p = AsyncMock()
+        p.generate = fake_generate
+        p.default_model = f"{name}-model"
+        p.in_flight = 0
+        return p
+
+    narrative = provider("ollama", "You lunge at the ogre.")
+    ruling = provider("claude", "VERDICT: ALLOWED\nRoll Athletics, DC 15.")
+    rag = AsyncMock()
+    rag.retrieve_context.return_value = {
+        "rules": [RetrievedChunk(id="c1", text="Grappling...", source="phb.md")]
+    }
+    rag.embed_query.return_value = [1.0, 0.0]
+    rag.warming = False
+    orchestrator = AIOrchestrator(narrative_provider=narrative, ruling_provider=ruling)
+    engine = Engine(
+        orchestrator=orchestrator,
+        rag=rag,
+        state_store=state_store,
+        session_manager=SessionManager(),
+        router=ModelRouter(RouterSettings(ruling_queue_limit=1), metrics=Metrics()),
+        ruling_cache=RulingCache(vault),
+        speculative=SpeculativeNarrator(orchestrator),
+    )
+    action = "[Action] I grapple the ogre. Can I drag it off the ledge?"
+    first = await engine.handle_message("s", "alice", action)
+    assert first == "You lunge at the ogre.\n\nRoll Athletics, DC 15." and sorted(
+        calls
+    ) == ["claude", "ollama"]
+    # The same action again gets the cached ruling (never the first attempt's narration),
+    # before anything is drafted
+    assert (
+        await engine.handle_message("s", "bob", action) == "Roll Athletics, DC 15."
+        and len(calls) == 2
+    )
+
+    # With the ruling queue full the router keeps borderline turns off the ruling provider
+    ruling.in_flight = 1
+    await engine.handle_message(
+        "s", "alice", "[Action] I try to grapple the guard. Can I?"
+    )
+    assert calls[2:] == ["ollama"]
+
+
+@pytest.mark.asyncio
+async def test_engine_answers_look_from_pregenerated_scene(
+    vault, state_store, sample_scene
+):
+    from dungeonmaster.core.pregen import ScenePregenerator
+
+    calls = []
+
+    async def fake_generate(prompt, model=None, system=None, **kwargs):
+        calls.append(prompt)
+        return GenerateResult(
+            text="Smoke and laughter fill the tavern.", model="test", raw=None
+        )
+
+    mock_provider = AsyncMock()
+    mock_provider.generate = fake_generate
+    mock_provider.default_model = "test"
+    mock_provider.in_flight = 0
+    orchestrator = AIOrchestrator(narrative_provider=mock_provider)
+    pregen = ScenePregenerator(state_store, orchestrator)
+    await pregen.pregenerate(state_store.save_scene(sample_scene))
+    engine = Engine(
+        orchestrator=orchestrator,
+        rag=None,
+        state_store=state_store,
+        session_manager=SessionManager(),
+        pregen=pregen,
+    )
+    assert (
+        await engine.handle_message("s", "alice", "What do I see?")
+        == "Smoke and laughter fill the tavern."
+    )
+    assert len(calls) == 1  # only the pre-generation call
+    assert len(engine._session_manager.get("s").turns) == 2
+
+
+@pytest.mark.asyncio
+async def test_engine_streams_and_applies_patch_before_reply_ends(
+    state_store, sample_scene
+):
+    from dungeonmaster.ai.providers.base import BaseAIProvider
+    from dungeonmaster.ai.structured import StructuredSettings
+
+    state_store.save_scene(sample_scene)
+    versions_seen = []
+
+    class StreamingProvider(BaseAIProvider):
+        default_model = "test"
+
+        @property
+        def name(self) -> str:
+            return "stream"
+
+        async def generate(self, prompt, model=None, system=None, **kwargs):
+            raise AssertionError("streaming path expected")
+
+        async def generate_stream(self, prompt, model=None, system=None, **kwargs):
+            chunks = (
+                "You step ",
+                "to the bar.\n```json-",
+                'patch\n{"positions": [{"entity_id": "player1", "x": 3}]}',
+                "\n```\n",
+                "The barkeep looks up.",
+            )
+            for chunk in chunks:
+                versions_seen.append(state_store.scene_version)
+                yield chunk
+
+        async def is_available(self) -> bool:
+            return True
+
+    engine = Engine(
+        orchestrator=AIOrchestrator(narrative_provider=StreamingProvider()),
+        rag=None,
+        state_store=state_store,
+        session_manager=SessionManager(),
+        structured=StructuredSettings(stream=True),
+    )
+    reply = await engine.handle_message("s", "player1", "I walk to the bar.")
+    assert reply.endswith("The barkeep looks up.")
+    # patched once the block closed, while still generating
+    assert versions_seen == [1, 1, 1, 1, 2]
+    assert state_store.load_scene().positions[0].x == 3
+
+
+@pytest.mark.asyncio
+async def test_engine_repairs_streamed_update_after_the_stream(
+    state_store, sample_scene
+):
+    from dungeonmaster.ai.providers.base import BaseAIProvider
+    from dungeonmaster.ai.structured import StructuredSettings
+
+    state_store.save_scene(sample_scene)
+    events = []
+
+    class StreamingProvider(BaseAIProvider):
+        default_model = "test"
+
+        @property
+        def name(self) -> str:
+            return "stream"
+
+        async def generate(self, prompt, model=None, system=None, **kwargs):
+            raise AssertionError("streaming path expected")
+
+        async def generate_stream(self, prompt, model=None, system=None, **kwargs):
+            yield 'You hide.\n```json-patch\n{"positions": [{"entity_id": "player1", "entity_type": "rogue"}]}\n```\n'
+            events.append("chunk")
+            yield "The guard walks past."
+            events.append("end")
+
+        async def generate_structured(
+            self, prompt, schema, model=None, system=None, **kwargs
+        ):
+            events.append("repair")
+            return {"positions": [{"entity_id": "player1", "zone": "shadows"}]}
+
+    engine = Engine(
+        orchestrator=AIOrchestrator(narrative_provider=StreamingProvider()),
+        rag=None,
+        state_store=state_store,
+        session_manager=SessionManager(),
+        structured=StructuredSettings(stream=True),
+    )
+    await engine.handle_message("s", "player1", "I hide in the shadows.")
+    # the repair call did not pause the stream
+    assert events == ["chunk", "end", "repair"]
+    assert state_store.load_scene().positions[0].zone == "shadows"
+
+
+@pytest.mark.asyncio
+async def test_engine_repairs_invalid_scene_update(state_store, sample_scene):
+    from dungeonmaster.ai.structured import StructuredSettings
+    from dungeonmaster.metrics import Metrics
+
+    state_store.save_scene(sample_scene)
+
+    async def fake_generate(prompt, model=None, system=None, **kwargs):
+        return GenerateResult(
+            text='You sneak.\n```json-patch\n{"positions": [{"entity_id": "player1", "entity_type": "rogue"}]}\n```',
+            model="test",
+            raw=None,
+        )
+
+    mock_provider = AsyncMock()
+    mock_provider.generate = fake_generate
+    mock_provider.default_model = "test"
+    mock_provider.generate_structured.return_value = {
+        "positions": [{"entity_id": "player1", "zone": "shadows"}]
+    }
+    metrics = Metrics()
+    engine = Engine(
+        orchestrator=AIOrchestrator(narrative_provider=mock_provider),
+        rag=None,
+        state_store=state_store,
+        session_manager=SessionManager(),
+        metrics=metrics,
+        structured=StructuredSettings(stream=False),
+    )
+    await engine.handle_message("s", "player1", "I hide in the shadows.")
+    prompt = mock_provider.generate_structured.call_args.kwargs["prompt"]
+    assert "entity_type must be one of" in prompt and '"rogue"' in prompt
+    assert state_store.load_scene().positions[0].zone == "shadows"
+    assert (
+        metrics.counter("structured.invalid")
+        == metrics.counter("structured.repaired")
+        == 1
+    )
+
+
+@pytest.mark.asyncio
+async def test_engine_resolves_round_in_one_call(vault, state_store):
+    from dungeonmaster.core.rounds import RoundAction
+    from dungeonmaster.data.state import Location, Position, SceneState
+
+    state_store.save_scene(
+        SceneState(
+            scene_id="ambush",
+            location=Location("Road", "A muddy road."),
+            positions=[
+                Position("player_alice", "player", 0, 0),
+                Position("goblin", "npc", 3, 0),
+            ],
+            turn_order=["player_alice", "bob", "goblin"],
+        )
+    )
+    calls = []
+
+    async def fake_generate(prompt, model=None, system=None, **kwargs):
+        calls.append((prompt, system))
+        return GenerateResult(
+            text=(
+                "The goblin shrieks.\n### player_alice\nYour blade bites deep.\n### bob\nYour arrow goes wide.\n"
+                '```json-patch\n{"positions": [{"entity_id": "goblin", "remove": true}]}\n```'
+            ),
+            model="test",
+            raw=None,
+        )
+
+    mock_provider = AsyncMock()
+    mock_provider.generate = fake_generate
+    mock_provider.default_model = "test"
+    engine = Engine(
+        orchestrator=AIOrchestrator(narrative_provider=mock_provider),
+        rag=None,
+        state_store=state_store,
+        session_manager=SessionManager(),
+    )
+    replies = await engine.resolve_round(
+        [
+            RoundAction(
+                "alice", "alice", "player_alice", "[Action] I stab the goblin."
+            ),
+            RoundAction("bob", "bob", "bob", "[Action] I shoot the goblin."),
+        ]
+    )
+    assert len(calls) == 1
+    prompt, system = calls[0]
+    assert (
+        "- player_alice: [Action] I stab the goblin.\n- bob: [Action] I shoot the goblin."
+        in prompt
+    )
+    assert "player_alice, bob" in system and "goblin(npc)" in system
+    assert replies["alice"] == "The goblin shrieks.\n\nYour blade bites deep."
+    assert replies["bob"].startswith("The goblin shrieks.\n\nYour arrow goes wide.")
+    assert [p.entity_id for p in state_store.load_scene().positions] == ["player_alice"]
+    assert len(engine._session_manager.get("bob").turns) == 2
@@ -0,0 +1,80 @@
+"""Tests for the character/NPC entity index and relevance-filtered context."""
+
+from dungeonmaster.data.entities import EntityIndex
+from dungeonmaster.data.vault import Vault
+
+BARKEEP = """---
+aliases: [Old Tom]
+---
+# Tom Barrow
+
+Gruff barkeep of the Rusty Dagger. Friend of [[Lady Ash|the lady]].
+
+## Combat
+Fights with a cudgel. AC 12, 18 HP.
+
+## Secrets
+Smuggles wine through the cellar for the thieves' guild.
+
+## Family
+Two daughters in the capital.
+"""
+
+LADY = "# Lady Ash\n\nA noble who owns half the town."
+
+
+def _index(vault: Vault) -> EntityIndex:
+    vault.write_text(vault.npc_path("tom_barrow"), BARKEEP)
+    vault.write_text(vault.npc_path("lady_ash"), LADY)
+    vault.write_text(vault.character_path("alice"), "# Alice\n\nA paladin.")
+    return EntityIndex(vault)
+
+
+def test_names_aliases_and_link_labels(vault: Vault):
+    index = _index(vault)
+    assert index.get("Tom Barrow").entity_id == "tom_barrow"
+    assert index.get("old tom").entity_id == "tom_barrow"
+    assert index.get("tom_barrow").entity_id == "tom_barrow"
+    # [[Lady Ash|the lady]] makes "the lady" an alias of Lady Ash
+    assert index.get("the lady").entity_id == "lady_ash"
+    assert index.get("Tom Barrow").links == ["Lady Ash"]
+
+
+def test_mentions_in_order(vault: Vault):
+    index = _index(vault)
+    found = index.mentions("I ask [[Lady Ash]] whether old tom can be trusted")
+    assert [e.entity_id for e in found] == ["lady_ash", "tom_barrow"]
+    assert index.mentions("Nobody here") == []
+
+
+def test_context_includes_only_relevant_sections(vault: Vault):
+    index = _index(vault)
+    context = index.context_for(
+        "Does Old Tom fight back? What combat stats?", budget=600
+    )
+    assert context.startswith("### Tom Barrow (npc)")
+    assert "Gruff barkeep" in context
+    assert "cudgel" in context
+    assert "Smuggles" not in context and "daughters" not in context
+    assert "[[Lady Ash]]" in context
+    assert (
+        len(index.context_for("Tell me about Old Tom's cellar secrets", budget=120))
+        <= 120
+    )
+
+
+def test_context_excludes_acting_player_and_invalidates(vault: Vault):
+    index = _index(vault)
+    assert (
+        index.context_for(
+            "Alice draws her sword", exclude={vault.character_path("alice")}
+        )
+        == ""
+    )
+    vault.write_text(vault.npc_path("mira"), "---\nname: Mira\n---\nA fox.")
+    assert index.mentions("Mira waves") == []
+    index.invalidate(vault.npc_path("mira"))
+    assert [e.name for e in index.mentions("Mira waves")] == ["Mira"]
+    vault.npc_path("mira").unlink()
+    index.invalidate(str(vault.npc_path("mira")))
+    assert index.mentions("Mira waves") == []
@@ -0,0 +1,23 @@
+"""Tests for lenient JSON parsing of model output."""
+
+import subprocess
+import sys
+
+import pytest
+
+from dungeonmaster.ai.providers.json_output import StructuredOutputError, loads_lenient
+
+
+def test_loads_lenient():
+    assert loads_lenient('{"a": [1, 2,],}') == {"a": [1, 2]}
+    assert loads_lenient('Here you go: {"a": "}"} hope that helps') == {"a": "}"}
+    with pytest.raises(StructuredOutputError):
+        loads_lenient("no json")
+
+
+def test_provider_layer_does_not_import_the_data_layer():
+    code = "import sys, dungeonmaster.ai.providers.base; print('dungeonmaster.data' in sys.modules)"
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert out.stdout.strip() == "False"
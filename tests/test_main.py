@@ -0,0 +1,121 @@
+"""Tests for the application entrypoint's cold-start behaviour."""
+
+import asyncio
+import subprocess
+import sys
+
+import pytest
+
+
+def test_main_import_is_lazy():
+    """Importing the entrypoint must not load provider SDKs, chromadb, discord, watchdog or numpy."""
+    code = (
+        "import sys, dungeonmaster.main; "
+        "heavy = ('ollama', 'anthropic', 'chromadb', 'discord', 'watchdog', 'numpy'); "
+        "print(','.join(m for m in heavy if m in sys.modules))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert out.stdout.strip() == ""
+
+
+def test_build_runtimes_shares_providers_and_rulebooks(tmp_path):
+    from dungeonmaster.config import _default_config_dict
+    from dungeonmaster.main import _build_runtimes
+
+    config = _default_config_dict()
+    config["ai"]["claude"]["api_key"] = ""
+    config["campaigns"] = {
+        "default": "kingmaker",
+        "root": str(tmp_path / "campaigns"),
+        "systems_path": str(tmp_path / "systems"),
+        "index_path": str(tmp_path / "index"),
+        "hosted": {
+            "strahd": {"system": "dnd5e", "users": ["alice"]},
+            "phandelver": {"system": "dnd5e", "users": ["bob"]},
+            "kingmaker": {"system": "pf2e"},
+        },
+    }
+    config["rag"]["system_index"] = {
+        "enabled": True,
+        "path": str(tmp_path / "system_index"),
+    }
+    runtimes = _build_runtimes(config)
+    assert [r.campaign.name for r in runtimes] == ["kingmaker", "strahd", "phandelver"]
+    assert len({id(r.orchestrator) for r in runtimes}) == 1
+    assert len({id(r.rag._query_embeddings) for r in runtimes}) == 1
+    assert len({id(r.rag._system_index) for r in runtimes}) == 1
+    assert (
+        runtimes[0].rag._system_index.directory
+        == (tmp_path / "system_index" / "nomic-embed-text").resolve()
+    )
+    strahd, phandelver = runtimes[1], runtimes[2]
+    assert (
+        strahd.vault.systems_dir()
+        == phandelver.vault.systems_dir()
+        == (tmp_path / "systems" / "dnd5e").resolve()
+    )
+    assert strahd.vault.root != phandelver.vault.root
+    assert [r.watch_systems for r in runtimes] == [True, True, False]
+
+
+@pytest.mark.asyncio
+async def test_notes_indexing_retries_failed_batch(vault):
+    from dungeonmaster.core.note_taker import NoteTaker
+    from dungeonmaster.main import _index_notes
+
+    class FlakyRag:
+        def __init__(self):
+            self.notes_seq = 0
+            self.calls: list[list[int]] = []
+
+        async def ingest_notes(self, events):
+            seqs = [e.seq for e in events]
+            self.calls.append(seqs)
+            if len(self.calls) == 2:
+                raise RuntimeError("embedding service unavailable")
+            self.notes_seq = max(seqs, default=self.notes_seq)
+            return len(seqs)
+
+    rag = FlakyRag()
+    taker = NoteTaker(vault, note_id="s")
+    taker.note_event("player", "I open the door.")
+    wake = asyncio.Event()
+    taker.add_event_listener(lambda event: wake.set())
+    task = asyncio.create_task(_index_notes(rag, taker, wake, retry_delay=0.01))
+    try:
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if rag.calls == [[1]]:
+                taker.note_event("dm", "It creaks open.")  # this batch fails once
+            if rag.notes_seq == 3:
+                break
+            if len(rag.calls) == 3 and rag.notes_seq == 2:
+                taker.note_event("player", "I step inside.")
+        assert rag.calls == [[1], [2], [2], [3]]
+        assert rag.notes_seq == 3
+    finally:
+        task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_shutdown_flushes_ruling_cache(vault):
+    from types import SimpleNamespace
+
+    from dungeonmaster.ai.rag import RetrievedChunk
+    from dungeonmaster.ai.ruling_cache import RulingCache
+    from dungeonmaster.main import _flush_runtimes
+
+    cache = RulingCache(vault)
+    # as if the writer thread were still saving: the snapshot stays queued
+    cache._writing = True
+    cache.store(
+        "opportunity attack?",
+        [1.0, 0.0],
+        [RetrievedChunk(id="c1", text="...", source="phb.md")],
+        "Reaction.",
+    )
+    assert len(RulingCache(vault)) == 0
+    await _flush_runtimes([SimpleNamespace(ruling_cache=cache, vault=vault)])
+    assert len(RulingCache(vault)) == 1
@@ -0,0 +1,35 @@
+"""Tests for frontmatter, section and wiki-link parsing."""
+
+from dungeonmaster.data.markdown import find_links, parse_sections, split_frontmatter
+
+
+def test_split_frontmatter():
+    fm, body = split_frontmatter(
+        "---\nname: Mira\naliases: [The Fox]\n---\n# Mira\nRogue."
+    )
+    assert fm == {"name": "Mira", "aliases": ["The Fox"]}
+    assert body == "# Mira\nRogue."
+    assert split_frontmatter("# No frontmatter") == ({}, "# No frontmatter")
+    assert split_frontmatter("---\n: [bad\n---\nbody") == ({}, "body")
+
+
+def test_parse_sections_with_parents_and_code_fences():
+    sections = parse_sections(
+        "Intro\n# Mira\nLead\n## Combat\n```\n# not a heading\n```\n### Attacks\nDagger\n## Secrets\nSpy"
+    )
+    assert [(s.title, s.level) for s in sections] == [
+        ("", 0),
+        ("Mira", 1),
+        ("Mira > Combat", 2),
+        ("Mira > Combat > Attacks", 3),
+        ("Mira > Secrets", 2),
+    ]
+    assert "# not a heading" in sections[2].text
+
+
+def test_find_links():
+    assert find_links("See [[Old Tom]], [[Town#Gate]] and [[Lady Ash|the lady]].") == [
+        ("Old Tom", None),
+        ("Town", None),
+        ("Lady Ash", "the lady"),
+    ]
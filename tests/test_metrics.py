@@ -0,0 +1,32 @@
+"""Tests for the metrics registry and phase timer."""
+
+from dungeonmaster.metrics import Metrics, PhaseTimer, percentile
+
+
+def test_percentile():
+    assert percentile([], 0.5) is None
+    assert percentile([3, 1, 2], 0.5) == 2
+    assert percentile(range(1, 101), 0.95) == 95
+
+
+def test_metrics_counters_and_samples():
+    m = Metrics(window=3)
+    m.incr("calls")
+    m.incr("calls", 2)
+    for v in (1, 2, 3, 4):
+        m.observe("latency", v)
+    assert m.counter("calls") == 3
+    assert m.samples("latency") == [2, 3, 4]
+    assert m.snapshot()["samples"]["latency"]["count"] == 3
+
+
+def test_phase_timer_records_phases():
+    now = [0.0]
+    m = Metrics()
+    timer = PhaseTimer(registry=m, clock=lambda: now[0])
+    with timer.phase("import"):
+        now[0] = 1.5
+    timer.mark("ready")
+    assert timer.phases["import"] == (0.0, 1.5)
+    assert m.samples("startup.import") == [1.5]
+    assert "import" in timer.report() and "ready" in timer.report()
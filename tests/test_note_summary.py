@@ -0,0 +1,74 @@
+"""Tests for the incremental session-notes summarizer."""
+
+import asyncio
+
+from dungeonmaster.ai.providers.base import GenerateResult
+from dungeonmaster.core.note_summary import NoteSummarizer, NoteSummarySettings
+from dungeonmaster.core.note_taker import NoteTaker
+
+
+class FakeOrchestrator:
+    def __init__(self):
+        self.prompts = []
+
+    async def generate(self, prompt, system=None, task_type="narrative", **kwargs):
+        self.prompts.append(prompt)
+        return GenerateResult(
+            text=f"- summary {len(self.prompts)}", model="test", raw=None
+        )
+
+
+def test_summary_without_model_call(vault):
+    taker = NoteTaker(vault, note_id="s")
+    summarizer = NoteSummarizer(vault, taker, FakeOrchestrator())
+    assert summarizer.summary() == "No session notes yet."
+    taker.note_event("player", "I open the door.", player_id="alice")
+    assert "Latest events:**\n- [" in summarizer.summary()
+    assert "player (alice): I open the door." in summarizer.summary()
+
+
+async def test_incremental_update_folds_only_new_events(vault):
+    taker = NoteTaker(vault, note_id="s")
+    orchestrator = FakeOrchestrator()
+    summarizer = NoteSummarizer(
+        vault, taker, orchestrator, NoteSummarySettings(batch_chars=100, recent=2)
+    )
+    for i in range(3):
+        taker.note_event("dm", f"Event {i} " + "z" * 50)
+    assert await summarizer.update()
+    assert summarizer.seq == 1  # batch_chars caps each call
+    assert (
+        "Event 0" in orchestrator.prompts[0]
+        and "Event 1" not in orchestrator.prompts[0]
+    )
+    assert await summarizer.update()
+    assert (
+        "- summary 1" in orchestrator.prompts[1]
+        and "Event 0" not in orchestrator.prompts[1]
+    )
+    text = summarizer.summary()
+    assert text.startswith("**Session summary**") and "- summary 2" in text
+    assert "Since then:" in text and "Event 2" in text
+    # Persisted: a new summarizer picks up where this one stopped
+    assert NoteSummarizer(vault, taker, orchestrator).seq == summarizer.seq
+
+
+async def test_background_run_triggers_on_accumulated_notes(vault):
+    taker = NoteTaker(vault, note_id="s")
+    orchestrator = FakeOrchestrator()
+    summarizer = NoteSummarizer(
+        vault, taker, orchestrator, NoteSummarySettings(min_chars=20, interval=5)
+    )
+    task = asyncio.create_task(summarizer.run())
+    try:
+        taker.note_event("player", "short")
+        await asyncio.sleep(0.01)
+        assert orchestrator.prompts == []
+        taker.note_event("dm", "a much longer narration")
+        for _ in range(100):
+            if summarizer.seq == 2:
+                break
+            await asyncio.sleep(0.01)
+        assert summarizer.seq == 2
+    finally:
+        task.cancel()
@@ -22,3 +22,64 @@ def test_note_taker_note_event(vault):
     text = vault.read_text(taker._path())
     assert "player" in text and "I open the door" in text
     assert "dm" in text and "The room is dark" in text
+
+
+def test_note_taker_rolls_over_by_size(vault):
+    taker = NoteTaker(vault, note_id="s1", max_bytes=200)
+    for i in range(7):
+        taker.append(f"Event {i}: " + "x" * 40)
+    assert taker.note_id == "s1-3"
+    for part in ("s1", "s1-2", "s1-3"):
+        assert len(vault.read_text(vault.note_path(part)).encode()) <= 200
+    # A new NoteTaker continues the latest part; rollover() starts the next one or a new session
+    again = NoteTaker(vault, note_id="s1", max_bytes=200)
+    assert again.note_id == "s1-3"
+    assert again.rollover() == "s1-4"
+    assert again.rollover("s2") == "s2"
+
+
+def test_note_taker_indexes_events(vault):
+    taker = NoteTaker(vault, note_id="idx")
+    seen = []
+    taker.add_event_listener(seen.append)
+    taker.note_event("player", "I open the door.", player_id="alice")
+    taker.note_event("dm", "The room is dark.", player_id="alice")
+    taker.note_event("player", "I light a torch.", player_id="bob")
+    assert [e.seq for e in seen] == [1, 2, 3]
+    assert [e.text for e in taker.events(player_id="alice")] == [
+        "I open the door.",
+        "The room is dark.",
+    ]
+    assert [e.player_id for e in taker.events(role="player")] == ["alice", "bob"]
+    assert [e.seq for e in taker.events(since_seq=2)] == [3]
+    assert taker.events(start="9999") == []
+    assert NoteTaker(vault, note_id="idx").last_seq == 3
+
+
+def test_note_taker_reads_only_new_index_lines(vault):
+    taker = NoteTaker(vault, note_id="tail")
+    taker.note_event("player", "one")
+    assert [e.text for e in taker.events()] == ["one"]
+    with open(taker._index_path, "a", encoding="utf-8") as f:
+        # another writer, last line half written
+        f.write('{"seq": 2, "text": "two"}\n{"seq": 3, "te')
+    assert [e.seq for e in taker.events()] == [1, 2]
+    with open(taker._index_path, "a", encoding="utf-8") as f:
+        f.write('xt": "three"}\n')
+    assert [e.text for e in taker.events(since_seq=1)] == ["two", "three"]
+
+
+def test_note_taker_appends_in_place_and_rolls_over_daily(vault):
+    taker = NoteTaker(vault)
+    today = taker.note_id
+    taker._start("session-20000101")  # as if the process started on an earlier day
+    taker.note_event("dm", "Yesterday.")
+    assert taker.note_id == today
+    path = taker._path()
+    path.write_text(vault.read_text(path) + "Edited in Obsidian.\n", encoding="utf-8")
+    taker.note_event("dm", "Later.")
+    text = vault.read_text(path)
+    assert text.startswith(f"# {today}\n") and text.index(
+        "Edited in Obsidian."
+    ) < text.index("Later.")
+    assert not vault.note_path("session-20000101").exists()
@@ -0,0 +1,139 @@
+"""Tests for ProviderPool routing, failover, circuit breaking and hedging."""
+
+import asyncio
+
+import pytest
+
+from dungeonmaster.ai.pool import ProviderPool
+from dungeonmaster.ai.providers.base import BaseAIProvider, GenerateResult
+from dungeonmaster.metrics import Metrics
+
+
+class FakeProvider(BaseAIProvider):
+    def __init__(
+        self, label: str, delay: float = 0.0, fail: bool = False, available: bool = True
+    ):
+        self.label = label
+        self.delay = delay
+        self.fail = fail
+        self.available = available
+        self.calls = 0
+
+    @property
+    def name(self) -> str:
+        return self.label
+
+    async def generate(self, prompt, model=None, system=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.label} down")
+        return GenerateResult(text=self.label, model="m")
+
+    async def generate_stream(self, prompt, model=None, system=None, **kwargs):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError(f"{self.label} down")
+        for chunk in (self.label, "!"):
+            yield chunk
+
+    async def is_available(self) -> bool:
+        return self.available
+
+
+@pytest.mark.asyncio
+async def test_pool_fails_over_and_opens_breaker():
+    bad, good = FakeProvider("bad", fail=True), FakeProvider("good")
+    pool = ProviderPool(
+        [bad, good], failure_threshold=2, cooldown=60, metrics=Metrics()
+    )
+    for _ in range(3):
+        assert (await pool.generate("hi")).text == "good"
+    # Breaker opened after 2 failures, so the third call skipped the bad provider
+    assert bad.calls == 2
+    assert pool.members[0].open_until > 0
+
+
+@pytest.mark.asyncio
+async def test_pool_prefers_lower_latency():
+    slow, fast = FakeProvider("slow", delay=0.05), FakeProvider("fast", delay=0.0)
+    pool = ProviderPool([slow, fast], metrics=Metrics())
+    for _ in range(4):
+        await pool.generate("hi")
+    assert fast.calls > slow.calls
+
+
+@pytest.mark.asyncio
+async def test_pool_all_failing_raises():
+    pool = ProviderPool([FakeProvider("a", fail=True)], metrics=Metrics())
+    with pytest.raises(RuntimeError):
+        await pool.generate("hi")
+
+
+@pytest.mark.asyncio
+async def test_pool_probe_marks_unhealthy():
+    down, up = FakeProvider("down", available=False), FakeProvider("up")
+    pool = ProviderPool([down, up], metrics=Metrics())
+    await pool.probe()
+    assert [m.healthy for m in pool.members] == [False, True]
+    assert (await pool.generate("hi")).text == "up"
+    assert down.calls == 0
+
+
+@pytest.mark.asyncio
+async def test_pool_hedges_slow_primary():
+    metrics = Metrics()
+    primary, backup = FakeProvider("primary"), FakeProvider("backup", delay=0.0)
+    pool = ProviderPool(
+        [primary, backup], hedge=True, hedge_min_samples=3, metrics=metrics
+    )
+    # Train primary's latency window, then make it slow
+    pool.members[0].latencies.extend([0.01] * 5)
+    pool.members[0].ewma = 0.0
+    pool.members[1].ewma = 1.0
+    primary.delay = 0.5
+    result = await pool.generate("hi")
+    assert result.text == "backup"
+    assert metrics.counter("ai.pool.pool.hedged") == 1
+
+
+@pytest.mark.asyncio
+async def test_pool_hedged_call_failing_twice_does_not_retry_backup():
+    primary, backup = (
+        FakeProvider("primary", delay=0.05, fail=True),
+        FakeProvider("backup", fail=True),
+    )
+    pool = ProviderPool(
+        [primary, backup], hedge=True, hedge_min_samples=3, metrics=Metrics()
+    )
+    pool.members[0].latencies.extend([0.01] * 5)
+    pool.members[0].ewma = 0.0
+    pool.members[1].ewma = 1.0
+    with pytest.raises(RuntimeError, match="down"):
+        await pool.generate("hi")
+    assert (primary.calls, backup.calls) == (1, 1)
+
+
+class MidStreamFailure(FakeProvider):
+    async def generate_stream(self, prompt, model=None, system=None, **kwargs):
+        self.calls += 1
+        yield "partial"
+        raise RuntimeError(f"{self.label} dropped")
+
+
+@pytest.mark.asyncio
+async def test_pool_stream_fails_over_only_before_first_chunk():
+    bad, good = FakeProvider("bad", fail=True), FakeProvider("good")
+    pool = ProviderPool([bad, good], metrics=Metrics())
+    assert [c async for c in pool.generate_stream("hi")] == ["good", "!"]
+    assert pool.in_flight == 0
+
+    dropped, spare = MidStreamFailure("dropped"), FakeProvider("spare")
+    pool = ProviderPool([dropped, spare], metrics=Metrics())
+    chunks = []
+    with pytest.raises(RuntimeError, match="dropped"):
+        async for chunk in pool.generate_stream("hi"):
+            chunks.append(chunk)
+    # Text already yielded cannot be taken back, so there is no failover mid-stream
+    assert chunks == ["partial"] and spare.calls == 0
+    assert pool.in_flight == 0
@@ -0,0 +1,141 @@
+"""Tests for idle-time scene pre-generation."""
+
+import asyncio
+
+import pytest
+
+from dungeonmaster.ai.orchestrator import AIOrchestrator
+from dungeonmaster.ai.providers.base import GenerateResult
+from dungeonmaster.core.pregen import PregenSettings, ScenePregenerator
+from dungeonmaster.data.state import Location, Position, SceneState
+from dungeonmaster.metrics import Metrics
+
+
+class _Provider:
+    """Fake narrative provider that echoes the first line of each prompt."""
+
+    name = "fake"
+    default_model = "fake-model"
+
+    def __init__(self):
+        self.in_flight = 0
+        self.prompts = []
+
+    async def generate(self, prompt, model=None, system=None, **kwargs):
+        self.prompts.append(prompt)
+        return GenerateResult(text=prompt.splitlines()[0], model=self.default_model)
+
+
+def _scene(location="Cellar", npcs=("old_tom",), scene_id="inn"):
+    positions = [Position("alice", "player", 0, 0)] + [
+        Position(n, "npc", 2, 2) for n in npcs
+    ]
+    return SceneState(
+        scene_id=scene_id,
+        location=Location(location, "Damp and dark."),
+        positions=positions,
+    )
+
+
+def _pregen(state_store, provider=None, **settings):
+    provider = provider or _Provider()
+    pregen = ScenePregenerator(
+        state_store,
+        AIOrchestrator(narrative_provider=provider),
+        PregenSettings(**settings),
+        metrics=Metrics(),
+    )
+    state_store.add_scene_listener(pregen.on_scene_change)
+    return pregen, provider
+
+
+@pytest.mark.asyncio
+async def test_pregenerates_location_and_npcs_keyed_by_version(state_store):
+    state_store.save_npc("old_tom", "# Old Tom\nA grumpy innkeeper.")
+    pregen, provider = _pregen(state_store)
+    scene = state_store.save_scene(_scene())
+    texts = await pregen.pregenerate(scene)
+    assert texts["location"].startswith("Describe Cellar.")
+    assert texts["npc:old_tom"].startswith("Introduce old tom")
+    assert "grumpy innkeeper" in provider.prompts[1]
+    assert pregen.get("inn", scene.version) == texts
+    assert pregen.get("inn", scene.version + 1) == {}
+
+
+@pytest.mark.asyncio
+async def test_answers_follow_up_questions_from_cache(state_store):
+    pregen, _provider = _pregen(state_store)
+    scene = state_store.save_scene(_scene())
+    await pregen.pregenerate(scene)
+    assert pregen.answer(scene, "[Action] What do I see?").startswith(
+        "Describe Cellar."
+    )
+    assert pregen.answer(scene, "Who is old tom?").startswith("Introduce old tom")
+    assert pregen.answer(scene, "who's here?").startswith("Introduce old tom")
+    assert pregen.answer(scene, "[Says] Who is here?") is None
+    assert pregen.answer(scene, "I attack the rat.") is None
+    assert pregen.answer(scene, "look around " + "and then more " * 20) is None
+
+
+@pytest.mark.asyncio
+async def test_moves_carry_cache_over_and_new_location_reschedules(state_store):
+    pregen, _provider = _pregen(state_store)
+    scene = state_store.save_scene(_scene())
+    await pregen.pregenerate(scene)
+
+    moved = state_store.apply_scene_patch(
+        {"positions": [{"entity_id": "alice", "x": 5, "y": 5}]}
+    )
+    assert pregen._pending is None
+    assert pregen.answer(moved, "look around").startswith("Describe Cellar.")
+
+    newcomer = state_store.apply_scene_patch(
+        {"positions": [{"entity_id": "rat", "entity_type": "npc"}]}
+    )
+    assert pregen._pending is not None and pregen._pending.version == newcomer.version
+
+    elsewhere = state_store.apply_scene_patch({"location": {"name": "Attic"}})
+    assert pregen._pending.version == elsewhere.version
+    # not generated yet: normal path
+    assert pregen.answer(elsewhere, "look around") is None
+
+
+@pytest.mark.asyncio
+async def test_waits_for_idle_and_abandons_stale_scene(state_store):
+    provider = _Provider()
+    provider.in_flight = 1
+    pregen, _ = _pregen(state_store, provider, poll_interval=0.01)
+    first = state_store.save_scene(_scene())
+    task = asyncio.create_task(pregen.run())
+    await asyncio.sleep(0.05)
+    assert provider.prompts == []  # busy: nothing generated yet
+
+    second = state_store.save_scene(_scene(location="Attic", npcs=()))
+    await asyncio.sleep(0.05)
+    provider.in_flight = 0
+    await asyncio.sleep(0.05)
+    task.cancel()
+    assert provider.prompts == ["Describe Attic. Damp and dark.\nPresent: alice."]
+    assert pregen.get("inn", first.version) == {}
+    assert pregen.get("inn", second.version)["location"].startswith("Describe Attic")
+
+
+def test_settings_from_config():
+    s = PregenSettings.from_config({"max_npcs": "2", "enabled": False})
+    assert (s.enabled, s.max_npcs, s.idle_in_flight) == (False, 2, 0)
+    assert PregenSettings.from_config(None) == PregenSettings()
+
+
+@pytest.mark.asyncio
+async def test_failed_pregeneration_does_not_fall_back_to_ruling_provider(state_store):
+    class _Down(_Provider):
+        async def generate(self, prompt, model=None, system=None, **kwargs):
+            raise RuntimeError("ollama down")
+
+    ruling = _Provider()
+    pregen = ScenePregenerator(
+        state_store, AIOrchestrator(_Down(), ruling), metrics=Metrics()
+    )
+    assert await pregen.pregenerate(state_store.save_scene(_scene())) == {}
+    assert ruling.prompts == []
+    assert not PregenSettings().enabled
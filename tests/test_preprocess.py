@@ -0,0 +1,108 @@
+"""Tests for ingest preprocessing in worker processes."""
+
+import hashlib
+import pickle
+from concurrent.futures import Executor, Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from dungeonmaster.ai.preprocess import (
+    Preprocessor,
+    PreprocessSettings,
+    chunk_text,
+    prepare_file,
+)
+
+
+def test_chunk_text_overlap_not_below_chunk_size_terminates():
+    assert chunk_text("hello", chunk_size=10, overlap=64) == ["hello"]
+    assert chunk_text("abcdef", chunk_size=2, overlap=5) == [
+        "ab",
+        "bc",
+        "cd",
+        "de",
+        "ef",
+    ]
+    # Other settings keep their boundaries (and so their stored source hashes), tail chunk included
+    assert chunk_text("a" * 580, chunk_size=100, overlap=20)[-2:] == [
+        "a" * 100,
+        "a" * 20,
+    ]
+
+
+def test_prepare_file_packs_chunks_and_hash(tmp_path):
+    path = tmp_path / "rules.md"
+    path.write_text("Strength\0checks use a d20. Dexterity saves are common.")
+    prepared = prepare_file(str(path), 20, 0)
+    assert prepared.texts == [
+        "Strength\0checks use",
+        "a d20. Dexterity sav",
+        "es are common.",
+    ]
+    assert (
+        prepared.source_hash
+        == hashlib.sha256("\0".join(prepared.texts).encode()).hexdigest()
+    )
+    assert pickle.loads(pickle.dumps(prepared)).texts == prepared.texts
+    missing = prepare_file(str(tmp_path / "missing.md"), 20, 0)
+    assert missing.texts == [] and missing.source_hash == ""
+
+
+def test_settings_from_config():
+    assert PreprocessSettings.from_config(
+        {"workers": 0, "batch_files": 3}
+    ) == PreprocessSettings(0, 3)
+    assert PreprocessSettings.from_config(None) == PreprocessSettings()
+    assert Preprocessor(PreprocessSettings(workers=3, batch_files=4)).window == 12
+    assert Preprocessor(PreprocessSettings(workers=0, batch_files=0)).window == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(60)
+@pytest.mark.parametrize("workers", [0, 1])
+async def test_preprocessor_batches_keep_order(tmp_path, workers):
+    paths = []
+    for i in range(5):
+        paths.append(tmp_path / f"{i}.md")
+        paths[-1].write_text(f"Rulebook {i}. " * 10)
+    pre = Preprocessor(PreprocessSettings(workers=workers, batch_files=2))
+    try:
+        prepared = await pre.prepare(paths, chunk_size=50, overlap=10)
+    finally:
+        pre.close()
+    assert [p.path for p in prepared] == [str(p) for p in paths]
+    assert prepared[3].texts[0].startswith("Rulebook 3.")
+    assert prepared[3].texts == prepare_file(str(paths[3]), 50, 10).texts
+
+
+class _BrokenPool(Executor):
+    def __init__(self):
+        self.shutdowns = []
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        future.set_exception(BrokenProcessPool("worker killed"))
+        return future
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self.shutdowns.append((wait, cancel_futures))
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(30)
+async def test_broken_pool_is_shut_down_and_batches_retried_in_a_thread(tmp_path):
+    paths = []
+    for i in range(3):
+        paths.append(tmp_path / f"{i}.md")
+        paths[-1].write_text(f"Rulebook {i}.")
+    pre = Preprocessor(PreprocessSettings(workers=1, batch_files=1))
+    broken = pre._executor = _BrokenPool()
+    prepared = await pre.prepare(paths, chunk_size=50, overlap=0)
+    assert [p.texts for p in prepared] == [
+        ["Rulebook 0."],
+        ["Rulebook 1."],
+        ["Rulebook 2."],
+    ]
+    assert broken.shutdowns == [(False, True)]  # once, though every batch failed on it
+    assert pre._executor is None
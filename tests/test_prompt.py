@@ -0,0 +1,67 @@
+"""Tests for budgeted system prompt assembly."""
+
+from dungeonmaster.core.prompt import PromptBuilder, chars_per_token_for
+from dungeonmaster.metrics import Metrics
+
+
+def test_everything_fits_in_insertion_order():
+    m = Metrics()
+    built = (
+        PromptBuilder(1000, metrics=m)
+        .add("role", "You are the DM.", required=True)
+        .add("scene", "A tavern.", priority=1)
+        .add("rules", priority=2, heading="Rules:", parts=["Rule A.", "Rule B."])
+        .add("empty", "   ")
+        .build()
+    )
+    assert (
+        built.text
+        == "You are the DM.\n\nA tavern.\n\nRules:\nRule A.\n\n---\n\nRule B."
+    )
+    assert set(built.sizes) == {"role", "scene", "rules"}
+    assert built.truncated == built.dropped == []
+    assert m.samples("prompt.tokens.scene") == [built.sizes["scene"]]
+    assert m.samples("prompt.tokens.total") == [built.tokens]
+
+
+def test_low_priority_sections_are_cut_at_part_boundaries_then_dropped():
+    m = Metrics()
+    chunks = [f"Chunk {i}: " + "x" * 70 for i in range(5)]  # ~20 tokens each
+    builder = PromptBuilder(80, metrics=m)
+    builder.add("role", "Role.", required=True)
+    builder.add("notes", "n" * 200, priority=3)
+    builder.add("rules", heading="Rules:", parts=chunks, priority=1)
+    built = builder.build()
+    assert "Chunk 2" in built.text and "Chunk 3" not in built.text
+    assert built.text.count("Chunk") == 3  # whole chunks only
+    assert built.truncated == ["rules"] and built.dropped == ["notes"]
+    assert built.tokens <= 80
+    assert (
+        m.counter("prompt.truncated.rules") == 1
+        and m.counter("prompt.dropped.notes") == 1
+    )
+    # Deterministic: same inputs, same prompt
+    again = PromptBuilder(80, metrics=m).add("role", "Role.", required=True)
+    again.add("notes", "n" * 200, priority=3).add(
+        "rules", heading="Rules:", parts=chunks, priority=1
+    )
+    assert again.build().text == built.text
+
+
+def test_text_sections_cut_on_line_boundary():
+    text = "\n".join(f"Line {i} of the character sheet." for i in range(40))
+    built = (
+        PromptBuilder(60, chars_per_token=4.0, metrics=Metrics())
+        .add("character", text, priority=1)
+        .build()
+    )
+    assert built.text.startswith("Line 0") and built.text.endswith("…")
+    assert built.text.rstrip("…").endswith("sheet.")
+    assert built.sizes["character"] <= 60
+
+
+def test_chars_per_token_table():
+    assert chars_per_token_for("claude-3-5-sonnet") == 3.5
+    assert chars_per_token_for("Llama3.2") == 3.8
+    assert chars_per_token_for(None) == 4.0
+    assert chars_per_token_for("gpt", {"gpt*": 3.0}) == 3.0
@@ -1,10 +1,12 @@
 """Tests for RAG chunking and store (ChromaDB with in-memory or temp persist)."""
 
+import asyncio
 import sys
 
 import pytest
 
-from dungeonmaster.ai.rag import _chunk_text, RAGStore
+from dungeonmaster.ai.preprocess import Preprocessor, PreprocessSettings
+from dungeonmaster.ai.rag import RAGStore, _chunk_text
 from dungeonmaster.data.vault import Vault
 
 # ChromaDB/pydantic may be incompatible with Python 3.14+
@@ -54,9 +56,350 @@ async def test_rag_ingest_and_query(tmp_path):
         chunk_overlap=0,
         top_k=2,
         chroma_client=ephemeral,
+        preprocessor=Preprocessor(PreprocessSettings(workers=0)),
     )
     n = await rag.ingest_path(vault.systems_dir() / "rules.md")
     assert n >= 1
     results = await rag.query("strength check")
     assert len(results) >= 1
     assert any("Strength" in r or "d20" in r for r in results)
+
+
+def _fresh_client():
+    import chromadb
+
+    client = chromadb.EphemeralClient()
+    # Ephemeral clients share one in-process store: start from empty collections
+    for collection in client.list_collections():
+        client.delete_collection(getattr(collection, "name", collection))
+    return client
+
+
+_VOCAB = ("strength", "door", "dragon", "barkeep", "torch", "gold")
+
+
+async def _keyword_embed(texts):
+    return [[float(t.lower().count(w)) + 0.01 for w in _VOCAB] for t in texts]
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(30)
+async def test_rag_namespaces_and_budgeted_context(tmp_path):
+    from dungeonmaster.core.note_taker import NoteTaker
+
+    vault = Vault(tmp_path)
+    vault.ensure_all_dirs()
+    (vault.systems_dir() / "rules.md").write_text("Strength checks use a d20.")
+    vault.write_text(vault.npc_path("barkeep"), "# Barkeep\n\nThe barkeep hoards gold.")
+    rag = RAGStore(
+        vault,
+        _keyword_embed,
+        chunk_size=200,
+        chunk_overlap=0,
+        chroma_client=_fresh_client(),
+    )
+    assert rag.namespace_for(vault.npc_path("barkeep")) == "entities"
+    assert await rag.ingest_all() == 2
+
+    taker = NoteTaker(vault, note_id="s")
+    events = [
+        taker.note_event("player", "I open the door.", player_id="alice"),
+        taker.note_event("dm", "A dragon sleeps beyond the door.", player_id="alice"),
+    ]
+    assert await rag.ingest_notes(events) == 2
+    assert rag.notes_seq == 2
+    assert await rag.ingest_notes(events) == 0  # already ingested
+
+    context = await rag.retrieve_context("Does the barkeep have gold?", top_k=1)
+    assert set(context) == {"rules", "notes", "entities"}
+    assert context["entities"][0].source == str(vault.npc_path("barkeep"))
+    context = await rag.retrieve_context("dragon behind the door", top_k=1)
+    assert "dragon sleeps" in context["notes"][0].text
+    assert context["notes"][0].text.startswith("[")
+
+    tight = RAGStore(
+        vault,
+        _keyword_embed,
+        chroma_client=rag._client,
+        budgets={"rules": 0, "notes": 3},
+    )
+    context = await tight.retrieve_context("dragon", top_k=5)
+    assert "rules" not in context
+    assert context["notes"] == []  # no chunk fits in 3 tokens
+    excluded = await tight.retrieve_context(
+        "barkeep", exclude_sources={str(vault.npc_path("barkeep"))}
+    )
+    assert excluded["entities"] == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(30)
+async def test_reingesting_a_shrunk_file_drops_its_stale_chunks_off_the_loop(tmp_path):
+    import threading
+
+    vault = Vault(tmp_path)
+    vault.ensure_all_dirs()
+    path = vault.systems_dir() / "rules.md"
+    path.write_text("strength " * 30)
+    rag = RAGStore(
+        vault,
+        _keyword_embed,
+        chunk_size=100,
+        chunk_overlap=0,
+        chroma_client=_fresh_client(),
+    )
+    assert await rag.ingest_path(path) == 3
+    threads = []
+    collection = rag._coll("rules")
+
+    class Recording:
+        def __getattr__(self, name):
+            threads.append(threading.current_thread())
+            return getattr(collection, name)
+
+    rag._collections["rules"] = Recording()
+    path.write_text("door " * 10)
+    assert await rag.ingest_path(path) == 1
+    assert collection.get(where={"source": str(path)})["documents"] == [
+        ("door " * 10).strip()
+    ]
+    # Chroma calls ran in worker threads
+    assert threads and threading.main_thread() not in threads
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(30)
+async def test_ingest_all_prepares_one_window_at_a_time(tmp_path):
+    vault = Vault(tmp_path)
+    vault.ensure_all_dirs()
+    for i in range(5):
+        (vault.systems_dir() / f"book{i}.md").write_text(
+            f"Book {i}: strength checks use a d20."
+        )
+    pre = Preprocessor(PreprocessSettings(workers=0, batch_files=2))
+    sizes = []
+    prepare = pre.prepare
+
+    async def spy(paths, *args):
+        sizes.append(len(paths))
+        return await prepare(paths, *args)
+
+    pre.prepare = spy
+    rag = RAGStore(
+        vault,
+        _keyword_embed,
+        chunk_size=200,
+        chunk_overlap=0,
+        chroma_client=_fresh_client(),
+        preprocessor=pre,
+    )
+    assert await rag.ingest_all() == 5
+    assert sizes == [2, 2, 1]  # never more than pre.window prepared files in memory
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(30)
+async def test_rag_rerank_drops_overlapping_duplicates(tmp_path):
+    from dungeonmaster.ai.rerank import Reranker
+
+    vault = Vault(tmp_path)
+    vault.ensure_all_dirs()
+    (vault.systems_dir() / "a.md").write_text("Strength strength strength.")
+    (vault.systems_dir() / "b.md").write_text("Strength strength strength!")
+    (vault.systems_dir() / "c.md").write_text("Gold and a torch.")
+    rag = RAGStore(
+        vault,
+        _keyword_embed,
+        chunk_size=200,
+        chroma_client=_fresh_client(),
+        reranker=Reranker(),
+    )
+    await rag.ingest_all()
+    chunks = await rag.retrieve("strength", top_k=3)
+    assert len(chunks) == 2  # a.md and b.md embed identically: only one is kept
+    assert "Gold" in chunks[1].text
+    context = await rag.retrieve_context("strength", top_k=1)
+    assert len(context["rules"]) == 2  # budget, not top_k, bounds the result
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(30)
+async def test_campaigns_share_rules_collection_and_query_cache(tmp_path):
+    from dungeonmaster.ai.rag import EmbeddingCache
+
+    systems = tmp_path / "systems" / "dnd5e"
+    vaults = [
+        Vault(tmp_path / name, systems_root=systems)
+        for name in ("strahd", "phandelver")
+    ]
+    for vault in vaults:
+        vault.ensure_all_dirs()
+    (systems / "rules.md").write_text("Strength checks use a d20.")
+    vaults[0].write_text(
+        vaults[0].npc_path("barkeep"), "# Barkeep\n\nThe barkeep hoards gold."
+    )
+
+    calls = []
+
+    async def embed(texts):
+        calls.append(len(texts))
+        return await _keyword_embed(texts)
+
+    client, cache = _fresh_client(), EmbeddingCache()
+    stores = [
+        RAGStore(
+            vault,
+            embed,
+            client_factory=lambda: client,
+            query_cache=cache,
+            collection_names={
+                "rules": "rules_dnd5e",
+                "notes": f"notes_{i}",
+                "entities": f"entities_{i}",
+            },
+        )
+        for i, vault in enumerate(vaults)
+    ]
+    assert await stores[0].ingest_all() == 2
+    # the rulebook is already in the shared collection
+    assert await stores[1].ingest_all() == 0
+    assert calls == [1, 1]
+
+    # Rules are shared, lore is not
+    second = await stores[1].retrieve_context("barkeep strength", top_k=1)
+    assert second["rules"][0].source == str(systems / "rules.md")
+    assert second["entities"] == []
+    assert (await stores[0].retrieve_context("barkeep strength", top_k=1))["entities"]
+    assert calls == [1, 1, 1]  # the query was embedded once for both campaigns
+    assert len(cache) == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(30)
+async def test_system_index_embeds_identical_rulebooks_once(tmp_path):
+    from dungeonmaster.ai.system_index import SystemIndex
+
+    vaults = [Vault(tmp_path / name) for name in ("strahd", "phandelver")]
+    for vault in vaults:
+        vault.ensure_all_dirs()
+        (vault.systems_dir() / "phb.md").write_text("Strength checks use a d20.")
+    (vaults[1].systems_dir() / "homebrew.md").write_text("Dragon gold is cursed.")
+
+    calls = []
+
+    async def embed(texts):
+        calls.append(len(texts))
+        return await _keyword_embed(texts)
+
+    def store(i, index, client):
+        names = {
+            "rules": f"rules_{i}",
+            "notes": f"notes_{i}",
+            "entities": f"entities_{i}",
+        }
+        return RAGStore(
+            vaults[i],
+            embed,
+            collection_names=names,
+            chroma_client=client,
+            system_index=index,
+        )
+
+    index, client = SystemIndex(tmp_path / "shared"), _fresh_client()
+    first, second = store(0, index, client), store(1, index, client)
+    changed = []
+    second.add_source_listener(changed.append)
+    assert await first.ingest_all() == 1
+    assert await second.ingest_all() == 1  # only the homebrew rulebook is new
+    assert calls == [1, 1]
+    # rulebooks live in the shared index
+    assert client.get_collection("rules_1").count() == 0
+    chunks = await second.retrieve("strength", top_k=1)
+    assert chunks[0].source == str(vaults[1].systems_dir() / "phb.md")
+    # another vault's rulebooks stay out
+    assert [c.source for c in await first.retrieve("dragon gold", top_k=5)] == [
+        str(vaults[0].systems_dir() / "phb.md")
+    ]
+
+    # A new process binds the recorded rulebooks without embedding or invalidating anything
+    changed.clear()
+    restarted = store(1, SystemIndex(tmp_path / "shared"), client)
+    restarted.add_source_listener(changed.append)
+    assert (await restarted.retrieve("dragon", top_k=1))[
+        0
+    ].text == "Dragon gold is cursed."
+    assert await restarted.ingest_all() == 0
+    assert changed == [] and calls == [1, 1, 1, 1, 1]  # three query embeddings
+
+    # An edited rulebook is embedded under its new hash and invalidates cached rulings
+    (vaults[1].systems_dir() / "phb.md").write_text(
+        "Strength checks use a d20 plus modifier."
+    )
+    assert await restarted.ingest_path(vaults[1].systems_dir() / "phb.md") == 1
+    assert changed == [str(vaults[1].systems_dir() / "phb.md")]
+    restarted.delete_by_source(str(vaults[1].systems_dir() / "phb.md"))
+    assert [c.source for c in await restarted.retrieve("strength", top_k=5)] == [
+        str(vaults[1].systems_dir() / "homebrew.md")
+    ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(30)
+async def test_read_only_system_index_falls_back_to_vault_collection(tmp_path):
+    from dungeonmaster.ai.system_index import SystemIndex
+
+    vault = Vault(tmp_path / "vault")
+    vault.ensure_all_dirs()
+    (vault.systems_dir() / "phb.md").write_text("Strength checks use a d20.")
+    (vault.systems_dir() / "homebrew.md").write_text("Dragon gold is cursed.")
+    builder = Vault(tmp_path / "builder")  # another host that built the shared index
+    builder.ensure_all_dirs()
+    (builder.systems_dir() / "phb.md").write_text("Strength checks use a d20.")
+    shared = SystemIndex(tmp_path / "shared")
+    writer = RAGStore(
+        builder, _keyword_embed, chroma_client=_fresh_client(), system_index=shared
+    )
+    assert await writer.ingest_all() == 1
+
+    client = _fresh_client()
+    mounted = SystemIndex(tmp_path / "shared", read_only=True)
+    rag = RAGStore(vault, _keyword_embed, chroma_client=client, system_index=mounted)
+    # phb.md is in the mounted index, homebrew.md is not
+    assert await rag.ingest_all() == 1
+    assert client.get_collection("dungeonmaster_systems").count() == 1
+    sources = {c.source for c in await rag.retrieve("strength dragon gold", top_k=5)}
+    assert sources == {
+        str(vault.systems_dir() / "phb.md"),
+        str(vault.systems_dir() / "homebrew.md"),
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(30)
+async def test_index_opens_off_the_event_loop_and_retries_after_failure(tmp_path):
+    import threading
+
+    vault = Vault(tmp_path)
+    vault.ensure_all_dirs()
+    (vault.systems_dir() / "rules.md").write_text("Strength checks use a d20.")
+    client, threads, failures = _fresh_client(), [], [1]
+
+    def factory():
+        threads.append(threading.current_thread())
+        if failures:
+            failures.pop()
+            raise OSError("index locked")
+        return client
+
+    rag = RAGStore(vault, _keyword_embed, client_factory=factory)
+    results = await asyncio.gather(
+        rag.ingest_all(), rag.wait_ready(), return_exceptions=True
+    )
+    # both waiters saw the one failed open
+    assert [type(r) for r in results] == [OSError, OSError]
+    assert not rag.ready and not rag.warming
+    assert await rag.ingest_all() == 1  # the next call opens again
+    assert (await rag.retrieve("strength", top_k=1))[
+        0
+    ].text == "Strength checks use a d20."
+    assert len(threads) == 2 and threading.main_thread() not in threads
@@ -0,0 +1,118 @@
+"""Tests for the token bucket, rate limiter and retry helper."""
+
+import pytest
+
+from dungeonmaster.ai.providers.rate_limit import (
+    RateLimiter,
+    RetryPolicy,
+    TokenBucket,
+    retry_with_backoff,
+)
+from dungeonmaster.metrics import Metrics
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_token_bucket_refill():
+    clock = FakeClock()
+    bucket = TokenBucket(capacity=10, refill_per_second=1, clock=clock)
+    assert bucket.try_acquire(10)
+    assert not bucket.try_acquire(1)
+    assert bucket.wait_time(5) == pytest.approx(5)
+    clock.now = 5
+    assert bucket.try_acquire(5)
+
+
+def test_token_bucket_sync_exhausted_waits_for_reset():
+    clock = FakeClock()
+    bucket = TokenBucket(capacity=60, refill_per_second=1, clock=clock)
+    bucket.sync(remaining=0, reset_in=20)
+    assert bucket.wait_time(1) == pytest.approx(20)
+
+
+def test_limiter_update_from_headers():
+    limiter = RateLimiter(
+        requests_per_minute=50, tokens_per_minute=1000, metrics=Metrics()
+    )
+    limiter.update_from_headers(
+        {
+            "anthropic-ratelimit-requests-remaining": "3",
+            "anthropic-ratelimit-input-tokens-remaining": "100",
+            "anthropic-ratelimit-tokens-remaining": "900",
+        }
+    )
+    assert limiter.requests.tokens <= 3.1
+    assert limiter.tokens.tokens <= 100.1
+
+
+def test_limiter_tracks_output_tokens_separately():
+    clock = FakeClock()
+    limiter = RateLimiter(
+        tokens_per_minute=6000,
+        output_tokens_per_minute=600,
+        metrics=Metrics(),
+        clock=clock,
+    )
+    # a long ruling: 300 output tokens over the limit
+    limiter.charge(0, output_tokens=900)
+    waits = {bucket: bucket.wait_time(n) for bucket, n in limiter._buckets(10)}
+    assert waits[limiter.tokens] == 0
+    assert waits[limiter.output_tokens] == pytest.approx(30)  # paid back at 10 tokens/s
+    limiter.update_from_headers(
+        {
+            "anthropic-ratelimit-output-tokens-remaining": "0",
+            "anthropic-ratelimit-output-tokens-reset": "45",
+        }
+    )
+    assert limiter.output_tokens.wait_time(0) >= 30
+    assert limiter.tokens.tokens == pytest.approx(6000)
+
+
+@pytest.mark.asyncio
+async def test_limiter_acquire_records_wait():
+    metrics = Metrics()
+    limiter = RateLimiter(requests_per_minute=6000, metrics=metrics)
+    waited = await limiter.acquire()
+    assert waited >= 0
+    assert limiter.stats.acquired == 1
+    assert metrics.samples("ai.ratelimit.queue_wait")
+
+
+def test_retry_policy_honours_retry_after():
+    policy = RetryPolicy(base_delay=1, max_delay=4)
+    assert 0 <= policy.delay(10) <= 4
+    assert policy.delay(0, retry_after=7) >= 7
+
+
+@pytest.mark.asyncio
+async def test_retry_with_backoff_retries_transient_errors():
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectionError("overloaded")
+        return "ok"
+
+    policy = RetryPolicy(max_retries=5, base_delay=0.001, max_delay=0.002)
+    out = await retry_with_backoff(
+        flaky, policy, is_retryable=lambda e: True, metrics=Metrics()
+    )
+    assert out == "ok" and len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_retry_with_backoff_gives_up_on_fatal_errors():
+    async def bad():
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        await retry_with_backoff(
+            bad, RetryPolicy(), is_retryable=lambda e: False, metrics=Metrics()
+        )
@@ -0,0 +1,124 @@
+"""Tests for MMR reranking of retrieved chunks."""
+
+import sys
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+from dungeonmaster.ai.rag import RetrievedChunk
+from dungeonmaster.ai.rerank import Reranker, RerankSettings, estimate_tokens
+from dungeonmaster.core.prompt import PromptBuilder, chars_per_token_for
+
+
+def _chunks(*texts: str) -> list[RetrievedChunk]:
+    return [RetrievedChunk(id=f"c{i}", text=t) for i, t in enumerate(texts)]
+
+
+def test_near_duplicates_dropped_and_diverse_chunk_kept():
+    chunks = _chunks(
+        "grapple rules part one", "grapple rules part one again", "shove rules"
+    )
+    embeddings = [[1.0, 0.0], [0.99, 0.01], [0.6, 0.8]]
+    picked = Reranker().rerank("grapple", [1.0, 0.0], chunks, embeddings, limit=3)
+    assert [c.id for c in picked] == ["c0", "c2"]
+
+
+def test_mmr_prefers_diversity_over_second_similar_chunk():
+    chunks = _chunks("a", "b", "c")
+    embeddings = [[1.0, 0.0, 0.0], [0.9, 0.43, 0.0], [0.7, 0.0, 0.71]]
+    reranker = Reranker(RerankSettings(mmr_lambda=0.3))
+    assert [
+        c.id for c in reranker.rerank("", [1.0, 0.0, 0.0], chunks, embeddings, limit=2)
+    ] == ["c0", "c2"]
+    relevance_only = Reranker(RerankSettings(mmr_lambda=1.0, duplicate_threshold=1.01))
+    assert [
+        c.id
+        for c in relevance_only.rerank("", [1.0, 0.0, 0.0], chunks, embeddings, limit=2)
+    ] == ["c0", "c1"]
+
+
+def test_token_budget_skips_chunks_that_do_not_fit():
+    chunks = _chunks("x" * 400, "y" * 40, "z" * 40)
+    embeddings = [[1.0, 0.0], [0.0, 1.0], [0.7, 0.7]]
+    picked = Reranker().rerank("", [1.0, 0.0], chunks, embeddings, budget_tokens=30)
+    assert [c.id for c in picked] == ["c2", "c1"]
+    assert sum(estimate_tokens(c.text) for c in picked) <= 30
+
+
+def test_budget_uses_the_prompt_estimate_for_the_model():
+    ratio = chars_per_token_for("claude-3-5-sonnet")
+    text = "w" * 70
+    assert (
+        estimate_tokens(text, ratio)
+        == PromptBuilder(100, chars_per_token=ratio).estimate(text)
+        == 20
+    )
+    chunks = _chunks(text, text)
+    embeddings = [[1.0, 0.0], [0.0, 1.0]]
+    assert (
+        len(Reranker().rerank("", [1.0, 0.0], chunks, embeddings, budget_tokens=36))
+        == 2
+    )
+    assert (
+        len(
+            Reranker().rerank(
+                "",
+                [1.0, 0.0],
+                chunks,
+                embeddings,
+                budget_tokens=36,
+                chars_per_token=ratio,
+            )
+        )
+        == 1
+    )
+
+
+def test_cross_encoder_scores_replace_vector_relevance():
+    class FakeCrossEncoder:
+        def predict(self, pairs):
+            return [5.0 if "shield" in text else -5.0 for _, text in pairs]
+
+    chunks = _chunks("fireball", "shield spell")
+    reranker = Reranker(
+        RerankSettings(cross_encoder="fake"), cross_encoder=FakeCrossEncoder()
+    )
+    picked = reranker.rerank(
+        "can I cast shield", [1.0, 0.0], chunks, [[1.0, 0.0], [0.0, 1.0]], limit=1
+    )
+    assert [c.id for c in picked] == ["c1"]
+
+
+def test_missing_cross_encoder_falls_back_to_mmr():
+    reranker = Reranker(RerankSettings(cross_encoder="no/such-model-installed"))
+    picked = reranker.rerank(
+        "q", [1.0, 0.0], _chunks("a", "b"), [[1.0, 0.0], [0.0, 1.0]], limit=1
+    )
+    assert [c.id for c in picked] == ["c0"]
+
+
+def test_cross_encoder_loaded_once_across_threads(monkeypatch):
+    loads = []
+
+    class SlowCrossEncoder:
+        def __init__(self, name, device):
+            loads.append(name)
+            time.sleep(0.05)
+
+        def predict(self, pairs):
+            return [0.0 for _ in pairs]
+
+    monkeypatch.setitem(
+        sys.modules,
+        "sentence_transformers",
+        types.SimpleNamespace(CrossEncoder=SlowCrossEncoder),
+    )
+    reranker = Reranker(RerankSettings(cross_encoder="slow"))
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        list(
+            pool.map(
+                lambda _: reranker.rerank("q", [1.0, 0.0], _chunks("a"), [[1.0, 0.0]]),
+                range(3),
+            )
+        )
+    assert loads == ["slow"]
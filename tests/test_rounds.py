@@ -0,0 +1,151 @@
+"""Tests for batched combat rounds."""
+
+import asyncio
+
+import pytest
+
+from dungeonmaster.core.rounds import (
+    RoundAction,
+    RoundCoordinator,
+    RoundSettings,
+    round_players,
+    split_round_reply,
+)
+from dungeonmaster.data.state import Location, Position, SceneState
+from dungeonmaster.metrics import Metrics
+
+
+class _Engine:
+    """Fake engine recording resolve_round batches and per-message calls."""
+
+    def __init__(self):
+        self.rounds: list[list[RoundAction]] = []
+        self.messages: list[str] = []
+
+    async def resolve_round(self, actions):
+        self.rounds.append(list(actions))
+        return {a.user_id: f"{a.actor} -> {a.content}" for a in actions}
+
+    async def handle_message(self, session_id, user_id, content, task_type="narrative"):
+        self.messages.append(content)
+        return "single"
+
+
+def _combat(turn_order=("player_alice", "bob", "goblin")):
+    return SceneState(
+        scene_id="ambush",
+        location=Location("Road", "A muddy road."),
+        positions=[
+            Position("player_alice", "player", 0, 0),
+            Position("goblin", "npc", 3, 0),
+        ],
+        turn_order=list(turn_order),
+    )
+
+
+def _coordinator(state_store, scene=None, **settings):
+    state_store.save_scene(scene or _combat())
+    engine = _Engine()
+    settings = {"enabled": True, **settings}
+    coordinator = RoundCoordinator(
+        engine, state_store, RoundSettings(**settings), metrics=Metrics()
+    )
+    return coordinator, engine
+
+
+def test_split_round_reply():
+    reply = "Steel rings out.\n\n### player_alice\nYou hit. **8 damage.**\n\n### **Bob**:\nYou miss.\n### notes\nx"
+    parts = split_round_reply(reply, ["player_alice", "bob", "carol"])
+    assert parts["player_alice"] == "Steel rings out.\n\nYou hit. **8 damage.**"
+    assert parts["bob"] == "Steel rings out.\n\nYou miss.\n### notes\nx"
+    assert parts["carol"] == reply  # no section of their own
+    assert split_round_reply("No sections.", ["bob"]) == {"bob": "No sections."}
+
+
+def test_round_players_and_collects(state_store):
+    assert round_players(_combat()) == ["player_alice", "bob"]  # goblin is an NPC
+    coordinator, _ = _coordinator(state_store)
+    assert coordinator.collects("alice", "[Action] I swing at the goblin.")
+    assert coordinator.collects("bob", "[action] I loose an arrow.")
+    assert not coordinator.collects("alice", "[Says] Watch out!")
+    assert not coordinator.collects("carol", "[Action] I hide.")
+    state_store.save_scene(_combat(turn_order=("player_alice", "goblin")))
+    # fewer than min_players
+    assert not coordinator.collects("alice", "[Action] I swing.")
+
+
+@pytest.mark.asyncio
+async def test_round_resolves_once_all_players_acted(state_store):
+    coordinator, engine = _coordinator(state_store)
+    bob = asyncio.create_task(
+        coordinator.submit("bob", "bob", "[Action] I loose an arrow.")
+    )
+    await asyncio.sleep(0)
+    alice = asyncio.create_task(
+        coordinator.submit("alice", "alice", "[Action] I swing.")
+    )
+    assert await alice == "player_alice -> [Action] I swing."
+    assert await bob == "bob -> [Action] I loose an arrow."
+    assert len(engine.rounds) == 1
+    # turn order, not arrival order
+    assert [a.actor for a in engine.rounds[0]] == ["player_alice", "bob"]
+    assert coordinator._metrics.counter("rounds.resolved") == 1
+
+
+@pytest.mark.asyncio
+async def test_round_closes_after_window_and_merges_repeat_actions(state_store):
+    coordinator, engine = _coordinator(state_store, window=0.05)
+    first = asyncio.create_task(
+        coordinator.submit("alice", "alice", "[Action] I swing.")
+    )
+    await asyncio.sleep(0)
+    second = asyncio.create_task(
+        coordinator.submit("alice", "alice", "[Action] Then I step back.")
+    )
+    assert (
+        await first
+        == await second
+        == "player_alice -> [Action] I swing.\n[Action] Then I step back."
+    )
+    assert len(engine.rounds) == 1 and len(engine.rounds[0]) == 1
+    assert coordinator._metrics.counter("rounds.timeout") == 1
+
+    # The next action opens a new round
+    bob = asyncio.create_task(coordinator.submit("bob", "bob", "[Action] I duck."))
+    assert await bob == "bob -> [Action] I duck."
+    assert len(engine.rounds) == 2
+
+
+@pytest.mark.asyncio
+async def test_round_failure_reaches_every_player(state_store):
+    coordinator, engine = _coordinator(state_store)
+
+    async def fail(actions):
+        raise RuntimeError("provider down")
+
+    engine.resolve_round = fail
+    alice = asyncio.create_task(
+        coordinator.submit("alice", "alice", "[Action] I swing.")
+    )
+    bob = asyncio.create_task(coordinator.submit("bob", "bob", "[Action] I duck."))
+    results = await asyncio.gather(alice, bob, return_exceptions=True)
+    assert [str(r) for r in results] == ["provider down", "provider down"]
+
+
+@pytest.mark.asyncio
+async def test_first_action_without_actor_does_not_open_a_round(state_store):
+    coordinator, engine = _coordinator(state_store, window=60)
+    # As if carol left the turn order between collects() and submit()
+    assert (
+        await asyncio.wait_for(coordinator.submit("s", "carol", "[Action] I hide."), 1)
+        == "single"
+    )
+    assert coordinator._round is None and not coordinator._tasks
+    assert engine.rounds == []
+
+
+def test_settings_from_config():
+    assert RoundSettings.from_config(
+        {"enabled": True, "window": "10"}
+    ) == RoundSettings(True, 10.0, 2)
+    assert RoundSettings.from_config(None) == RoundSettings()
@@ -0,0 +1,146 @@
+"""Tests for content-based model routing."""
+
+import pytest
+
+from dungeonmaster.ai.router import ModelRouter, RouterSettings, keyword_score
+from dungeonmaster.metrics import Metrics
+
+
+def test_keyword_score_separates_rules_questions_from_narration():
+    ruling = keyword_score(
+        "Can I grapple him and still make an opportunity attack? What's the DC?"
+    )
+    narration = keyword_score(
+        'I walk into the tavern. "Good evening," I say to the barkeep.'
+    )
+    assert ruling >= 0.55
+    assert narration == 0.0
+    assert 0.0 <= keyword_score("?" * 50 + " rule " * 50) <= 1.0
+
+
+@pytest.mark.asyncio
+async def test_routes_by_content_not_command():
+    router = ModelRouter(RouterSettings(small_model="tiny"), metrics=Metrics())
+    route = await router.route(
+        "Does cover stack with the shield spell? Do I roll 1d20 with advantage?"
+    )
+    assert (route.task_type, route.size) == ("ruling", "large")
+    route = await router.route("I pick up the lantern and head down the stairs.")
+    assert (route.task_type, route.model, route.size) == ("narrative", "tiny", "small")
+
+
+@pytest.mark.asyncio
+async def test_explicit_ruling_is_a_floor():
+    router = ModelRouter(
+        RouterSettings(small_model="tiny", ruling_queue_limit=1), metrics=Metrics()
+    )
+    for text in ("[Status/Ruling] flanking", "I nod and sit by the fire."):
+        route = await router.route(text, task_type="ruling", queue_depths={"ruling": 5})
+        assert (route.task_type, route.size, route.reason) == (
+            "ruling",
+            "large",
+            "requested",
+        )
+
+
+@pytest.mark.asyncio
+async def test_explicit_ruling_without_rules_content_goes_to_small_model():
+    async def embed(texts):
+        # ruling prototypes, then narrative ones
+        return [[1.0, 0.0]] * 3 + [[0.0, 1.0]] * 3
+
+    router = ModelRouter(
+        RouterSettings(small_model="tiny"), embed_fn=embed, metrics=Metrics()
+    )
+    route = await router.route(
+        "[Status/Ruling] what does the tavern look like", "ruling", [0.1, 1.0]
+    )
+    assert (route.task_type, route.model, route.size, route.reason) == (
+        "narrative",
+        "tiny",
+        "small",
+        "no rules content",
+    )
+    # A rules term, a ruling-like embedding or no embedding at all keeps it on the ruling provider
+    for text, embedding in (
+        ("[Status/Ruling] flanking and cover", [0.1, 1.0]),
+        ("[Status/Ruling] what does the tavern look like", [1.0, 0.1]),
+        ("[Status/Ruling] what does the tavern look like", None),
+    ):
+        assert (await router.route(text, "ruling", embedding)).reason == "requested"
+
+
+def test_common_narration_words_are_not_rules_terms():
+    assert (
+        keyword_score(
+            "The old man does not save anyone. The hills range far to the north."
+        )
+        == 0.0
+    )
+
+
+@pytest.mark.asyncio
+async def test_without_small_model_simple_messages_use_default():
+    route = await ModelRouter(metrics=Metrics()).route("I head down the stairs.")
+    assert (route.task_type, route.model, route.size) == ("narrative", None, "default")
+
+
+@pytest.mark.asyncio
+async def test_full_ruling_queue_downgrades_borderline_rulings_only():
+    metrics = Metrics()
+    router = ModelRouter(RouterSettings(ruling_queue_limit=2), metrics=metrics)
+    borderline = "Can I jump the gap with my bonus?"
+    busy = {"ruling": 2, "narrative": 0}
+    assert (await router.route(borderline)).task_type == "ruling"
+    route = await router.route(borderline, queue_depths=busy)
+    assert (route.task_type, route.reason) == ("narrative", "ruling queue full")
+    hard = "Can I grapple? Does the saving throw DC use my modifier? Is the prone condition at disadvantage?"
+    assert (await router.route(hard, queue_depths=busy)).task_type == "ruling"
+    assert metrics.counter("router.narrative.default") == 1
+
+
+@pytest.mark.asyncio
+async def test_full_narrative_queue_uses_small_model():
+    router = ModelRouter(
+        RouterSettings(small_model="tiny", narrative_queue_limit=3), metrics=Metrics()
+    )
+    text = "Can I climb the wall quietly?"
+    assert (await router.route(text)).size == "default"
+    route = await router.route(text, queue_depths={"narrative": 3})
+    assert (route.model, route.reason) == ("tiny", "narrative queue full")
+
+
+@pytest.mark.asyncio
+async def test_embedding_similarity_blends_with_keywords():
+    calls = []
+
+    async def embed(texts):
+        calls.append(texts)
+        # First three prototypes are rulings, the rest narration
+        return [[1.0, 0.0]] * 3 + [[0.0, 1.0]] * 3
+
+    router = ModelRouter(
+        RouterSettings(embedding_weight=1.0), embed_fn=embed, metrics=Metrics()
+    )
+    assert await router.score("plain words", [1.0, 0.0]) == 1.0
+    assert await router.score("plain words", [0.0, 1.0]) == 0.0
+    assert await router.score("plain words") == keyword_score("plain words")
+    assert len(calls) == 1  # prototypes are embedded once
+
+
+@pytest.mark.asyncio
+async def test_failed_prototype_embedding_falls_back_to_keywords():
+    async def embed(texts):
+        raise RuntimeError("ollama down")
+
+    router = ModelRouter(embed_fn=embed, metrics=Metrics())
+    text = "Can I grapple the ogre?"
+    assert await router.score(text, [1.0, 0.0]) == keyword_score(text)
+
+
+def test_settings_from_config():
+    s = RouterSettings.from_config(
+        {"small_model": "tiny", "embedding_weight": 3, "ruling_queue_limit": "0"}
+    )
+    assert (s.small_model, s.embedding_weight, s.ruling_queue_limit) == ("tiny", 1.0, 0)
+    assert RouterSettings.from_config(None) == RouterSettings()
@@ -0,0 +1,98 @@
+"""Tests for the semantic ruling cache."""
+
+import asyncio
+
+from dungeonmaster.ai.rag import RetrievedChunk
+from dungeonmaster.ai.ruling_cache import RulingCache, chunks_hash, normalize_question
+
+CHUNKS = [
+    RetrievedChunk(
+        id="phb_1",
+        text="Opportunity attacks use your reaction.",
+        source="/v/systems/phb.md",
+    ),
+    RetrievedChunk(
+        id="phb_2", text="Disengage avoids them.", source="/v/systems/phb.md"
+    ),
+]
+
+
+def test_normalize_question():
+    assert normalize_question("[Status/Ruling] How does  Opportunity Attack work?") == (
+        "how does opportunity attack work"
+    )
+
+
+def test_chunks_hash_depends_on_order_and_text():
+    assert chunks_hash(CHUNKS) == chunks_hash(list(CHUNKS))
+    assert chunks_hash(CHUNKS) != chunks_hash(list(reversed(CHUNKS)))
+
+
+def test_lookup_similar_question_same_chunks(vault):
+    cache = RulingCache(vault, similarity_threshold=0.9)
+    cache.store(
+        "How do opportunity attacks work?",
+        [1.0, 0.0, 0.0],
+        CHUNKS,
+        "Use your reaction.",
+    )
+    assert (
+        cache.lookup("opportunity attack?", [0.99, 0.05, 0.0], CHUNKS)
+        == "Use your reaction."
+    )
+    assert cache.lookup("grappling?", [0.0, 1.0, 0.0], CHUNKS) is None
+    # Same question but different retrieved chunks is a miss
+    assert cache.lookup("opportunity attack?", [1.0, 0.0, 0.0], CHUNKS[:1]) is None
+    assert cache.hits == 1 and cache.misses == 2
+
+
+def test_persisted_and_invalidated_by_source(vault):
+    cache = RulingCache(vault)
+    cache.store("q", [1.0, 0.0], CHUNKS, "answer")
+    reloaded = RulingCache(vault)
+    assert len(reloaded) == 1
+    assert reloaded.invalidate_source("/v/systems/other.md") == 0
+    assert reloaded.invalidate_source("/v/systems/phb.md") == 1
+    assert len(RulingCache(vault)) == 0
+
+
+def test_max_entries_evicts_oldest(vault):
+    cache = RulingCache(vault, max_entries=2)
+    for i in range(3):
+        cache.store(f"q{i}", [1.0, float(i)], CHUNKS, f"a{i}")
+    assert len(cache) == 2
+
+
+def test_context_is_part_of_the_key(vault):
+    cache = RulingCache(vault)
+    cache.store(
+        "can I sneak attack?",
+        [1.0, 0.0],
+        CHUNKS,
+        "Yes, you have advantage.",
+        "scene v1\nRogue 5",
+    )
+    assert (
+        cache.lookup("can I sneak attack?", [1.0, 0.0], CHUNKS, "scene v1\nRogue 5")
+        is not None
+    )
+    assert (
+        cache.lookup("can I sneak attack?", [1.0, 0.0], CHUNKS, "scene v1\nFighter 5")
+        is None
+    )
+    assert (
+        cache.lookup("can I sneak attack?", [1.0, 0.0], CHUNKS, "scene v2\nRogue 5")
+        is None
+    )
+
+
+async def test_store_from_event_loop_writes_in_a_thread(vault):
+    cache = RulingCache(vault)
+    for i in range(3):
+        cache.store(f"q{i}", [1.0, float(i)], CHUNKS, f"a{i}")
+    cache.flush()
+    for _ in range(100):  # the writer thread may still be finishing an earlier snapshot
+        if len(RulingCache(vault)) == 3:
+            break
+        await asyncio.sleep(0.01)
+    assert len(RulingCache(vault)) == 3
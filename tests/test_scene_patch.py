@@ -0,0 +1,117 @@
+"""Tests for scene JSON Patch / merge-patch application and diffs."""
+
+import pytest
+
+from dungeonmaster.data.scene_patch import (
+    PatchError,
+    apply_json_patch,
+    apply_scene_patch,
+    make_scene_patch,
+    merge_patch,
+)
+
+
+def _scene() -> dict:
+    return {
+        "scene_id": "tavern",
+        "location": {"name": "Tavern", "description": "Noisy."},
+        "positions": [
+            {
+                "entity_id": "p1",
+                "entity_type": "player",
+                "x": 0.0,
+                "y": 0.0,
+                "zone": "main",
+            },
+            {
+                "entity_id": "barkeep",
+                "entity_type": "npc",
+                "x": 5.0,
+                "y": 1.0,
+                "zone": "bar",
+            },
+        ],
+        "turn_order": ["p1", "barkeep"],
+        "timestamp": "",
+        "version": 3,
+    }
+
+
+def test_json_patch_operations():
+    doc = _scene()
+    out = apply_json_patch(
+        doc,
+        [
+            {"op": "replace", "path": "/location/name", "value": "Cellar"},
+            {"op": "add", "path": "/turn_order/-", "value": "rat"},
+            {"op": "remove", "path": "/positions/1"},
+            {"op": "copy", "from": "/location/name", "path": "/scene_id"},
+            {"op": "test", "path": "/scene_id", "value": "Cellar"},
+        ],
+    )
+    assert out["location"]["name"] == "Cellar"
+    assert out["turn_order"] == ["p1", "barkeep", "rat"]
+    assert [p["entity_id"] for p in out["positions"]] == ["p1"]
+    # Input is untouched
+    assert doc == _scene()
+
+
+def test_json_patch_errors():
+    with pytest.raises(PatchError):
+        apply_json_patch(
+            _scene(), [{"op": "test", "path": "/scene_id", "value": "nope"}]
+        )
+    with pytest.raises(PatchError):
+        apply_json_patch(_scene(), [{"op": "remove", "path": "/missing"}])
+    with pytest.raises(PatchError):
+        apply_json_patch(_scene(), [{"op": "add", "path": "/positions/9", "value": {}}])
+
+
+def test_merge_patch_rfc7386():
+    assert merge_patch({"a": "b", "c": {"d": "e"}}, {"a": None, "c": {"f": 1}}) == {
+        "c": {"d": "e", "f": 1}
+    }
+    assert merge_patch({"a": [1, 2]}, {"a": [3]}) == {"a": [3]}
+
+
+def test_scene_merge_patch_keys_positions_by_entity():
+    out = apply_scene_patch(
+        _scene(),
+        {
+            "location": {"name": "Cellar"},
+            "positions": [
+                {"entity_id": "p1", "x": 2},
+                {"entity_id": "barkeep", "remove": True},
+                {"entity_id": "rat", "entity_type": "npc", "x": 1, "y": 1},
+            ],
+        },
+    )
+    assert out["location"] == {"name": "Cellar", "description": "Noisy."}
+    by_id = {p["entity_id"]: p for p in out["positions"]}
+    assert set(by_id) == {"p1", "rat"}
+    assert by_id["p1"]["x"] == 2 and by_id["p1"]["zone"] == "main"
+    assert "remove" not in by_id["rat"]
+
+
+def test_make_scene_patch_roundtrip():
+    old = _scene()
+    new = apply_scene_patch(
+        old,
+        {
+            "positions": [
+                {"entity_id": "p1", "x": 7},
+                {"entity_id": "barkeep", "remove": True},
+            ],
+            "timestamp": "t",
+        },
+    )
+    diff = make_scene_patch(old, new)
+    assert diff == {
+        "timestamp": "t",
+        "positions": [
+            {"entity_id": "p1", "x": 7},
+            {"entity_id": "barkeep", "remove": True},
+        ],
+    }
+    assert apply_scene_patch(old, diff) == new
+    assert make_scene_patch(new, new) == {}
@@ -27,7 +27,10 @@ def test_session_to_messages():
     s.add_turn("user", "hello")
     s.add_turn("assistant", "hi")
     msgs = s.to_messages(max_turns=5)
-    assert msgs == [{"role": "user", "content": "hello"}, {"role": "assistant", "content": "hi"}]
+    assert msgs == [
+        {"role": "user", "content": "hello"},
+        {"role": "assistant", "content": "hi"},
+    ]
 
 
 def test_session_manager_get_or_create():
@@ -0,0 +1,74 @@
+"""Tests for parsed character sheets, summaries and the sheet cache."""
+
+import os
+
+from dungeonmaster.data.sheets import ParsedSheet, SheetCache
+from dungeonmaster.data.vault import Vault
+
+SHEET = """---
+class: Wizard
+level: 5
+---
+# Mira Vell
+
+An elven wizard from the northern academies. Curious to a fault.
+
+## Stats
+- **HP**: 27
+- **AC**: 13
+- **Speed**: 30 ft
+
+## Spells
+- **Fire Bolt** (cantrip): 2d10 fire damage at range.
+- **Shield** (1st): +5 AC as a reaction until your next turn.
+- **Misty Step** (2nd): Teleport up to 30 feet as a bonus action.
+- **Fireball** (3rd): 8d6 fire damage in a 20-foot radius.
+
+## Inventory
+- Spellbook
+- Quarterstaff
+- Component pouch
+
+## Backstory
+Expelled for reading a forbidden tome. Seeks the missing pages.
+"""
+
+
+def test_parse_sections_and_summary(tmp_path):
+    sheet = ParsedSheet.parse("mira", tmp_path / "mira.md", SHEET)
+    assert sheet.name == "Mira Vell"
+    assert sheet.section("spells").text.startswith("- **Fire Bolt**")
+    assert sheet.section("Mira Vell > Inventory") is not None
+    lines = sheet.summary.split("\n")
+    assert lines[0] == "Mira Vell (class Wizard, level 5)"
+    assert "- An elven wizard from the northern academies." in lines
+    assert "- Stats: HP 27, AC 13, Speed 30 ft" in lines
+    assert "- Spells: 4 entries: Fire Bolt, Shield, Misty Step, Fireball" in lines
+    assert "- Backstory: Expelled for reading a forbidden tome." in lines
+    assert len(sheet.summary) < len(sheet.text) * 0.6
+
+
+def test_render_full_when_it_fits_else_summary_and_relevant_sections(tmp_path):
+    sheet = ParsedSheet.parse("mira", tmp_path / "mira.md", SHEET)
+    assert sheet.render("anything", 10_000) == sheet.text
+    short = sheet.render("Can I cast shield as a reaction?", len(sheet.summary) + 150)
+    assert short.startswith(sheet.summary)
+    assert "+5 AC as a reaction" in short
+    assert "Expelled" not in short.split("\n\n", 1)[1]
+    assert len(sheet.render("shield", 50)) <= 50
+
+
+def test_cache_reparses_on_change_and_invalidate(vault: Vault):
+    cache = SheetCache(vault)
+    assert cache.get("mira") is None
+    path = vault.character_path("mira")
+    vault.write_text(path, SHEET)
+    first = cache.get("mira")
+    assert cache.get("mira") is first
+    vault.write_text(path, SHEET.replace("27", "31"))
+    second = cache.get("mira")
+    assert second is not first and "HP 31" in second.summary
+    cache.invalidate(str(path))
+    assert cache.get("mira") is not second
+    os.remove(path)
+    assert cache.get("mira") is None
@@ -0,0 +1,96 @@
+"""Tests for the scene spatial index."""
+
+import math
+import random
+
+import pytest
+
+from dungeonmaster.data.scene_patch import PatchError
+from dungeonmaster.data.spatial import SceneIndex
+from dungeonmaster.data.state import Position, SceneState, StateStore, validate_scene
+
+
+def _positions() -> list[Position]:
+    return [
+        Position("hero", "player", 0, 0, "hall"),
+        Position("goblin", "npc", 3, 4, "hall"),
+        Position("chest", "object", 12, 0, "vault"),
+        Position("archer", "npc", 40, 40, "hall"),
+        Position("dragon", "npc", 100, 100, "lair"),
+    ]
+
+
+def test_within_and_near_sorted_by_distance():
+    index = SceneIndex(_positions(), cell_size=5)
+    assert [(d, p.entity_id) for d, p in index.within(0, 0, 12)] == [
+        (0.0, "hero"),
+        (5.0, "goblin"),
+        (12.0, "chest"),
+    ]
+    assert [p.entity_id for p in index.near("hero", 6)] == ["goblin"]
+    assert index.near("nobody", 6) == []
+
+
+def test_zones_and_nearest():
+    index = SceneIndex(_positions(), cell_size=5)
+    assert index.zones() == ["hall", "lair", "vault"]
+    assert {p.entity_id for p in index.in_zone("hall")} == {"hero", "goblin", "archer"}
+    assert [p.entity_id for p in index.nearest(90, 90, 2)] == ["dragon", "archer"]
+    assert len(index.nearest(0, 0, 50)) == 5
+
+
+def test_relevant_to_combines_radius_and_zone():
+    index = SceneIndex(_positions(), cell_size=5)
+    relevant = [p.entity_id for p in index.relevant_to("hero", radius=15)]
+    # Chest is in range; archer is far but shares the zone; dragon is neither
+    assert relevant == ["hero", "goblin", "chest", "archer"]
+    assert [p.entity_id for p in index.relevant_to("hero", radius=15, limit=2)] == [
+        "hero",
+        "goblin",
+    ]
+
+
+def test_within_matches_linear_scan():
+    rng = random.Random(7)
+    positions = [
+        Position(f"e{i}", "npc", rng.uniform(-50, 50), rng.uniform(-50, 50))
+        for i in range(300)
+    ]
+    index = SceneIndex(positions, cell_size=7)
+    for _ in range(20):
+        x, y, r = rng.uniform(-60, 60), rng.uniform(-60, 60), rng.uniform(0, 40)
+        expected = {
+            p.entity_id
+            for p in positions
+            if ((p.x - x) ** 2 + (p.y - y) ** 2) ** 0.5 <= r
+        }
+        assert {p.entity_id for _, p in index.within(x, y, r)} == expected
+
+
+def test_state_store_caches_index_per_scene(state_store: StateStore):
+    state_store.save_scene(SceneState(positions=_positions()))
+    first = state_store.scene_index()
+    assert state_store.scene_index() is first
+    state_store.apply_scene_patch({"positions": [{"entity_id": "goblin", "x": 1}]})
+    second = state_store.scene_index()
+    assert second is not first
+    assert second.get("goblin").x == 1
+
+
+def test_non_finite_coordinates_are_rejected(state_store: StateStore):
+    with pytest.raises(ValueError):
+        SceneIndex([Position("ghost", "npc", math.nan, 0)])
+    index = SceneIndex(_positions(), cell_size=5)
+    for x, y, r in ((math.nan, 0, 5), (0, math.inf, 5), (0, 0, math.inf)):
+        with pytest.raises(ValueError):
+            index.within(x, y, r)
+    with pytest.raises(ValueError):
+        index.nearest(-math.inf, 0, 1)
+    state_store.save_scene(SceneState(positions=_positions()))
+    with pytest.raises(PatchError):
+        state_store.apply_scene_patch(
+            {"positions": [{"entity_id": "goblin", "x": math.nan}]}
+        )
+    assert "positions[0].y must be a number" in validate_scene(
+        {"positions": [{"entity_id": "a", "y": math.inf}]}
+    )
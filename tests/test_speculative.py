@@ -0,0 +1,148 @@
+"""Tests for speculative narration of mixed action turns."""
+
+import asyncio
+
+import pytest
+
+from dungeonmaster.ai.orchestrator import AIOrchestrator
+from dungeonmaster.ai.providers.base import GenerateResult
+from dungeonmaster.core.speculative import (
+    SpeculativeNarrator,
+    SpeculativeSettings,
+    is_mixed_action,
+    parse_verdict,
+)
+from dungeonmaster.metrics import Metrics
+
+
+class _Provider:
+    """Fake provider: replies in order; optionally waits for an event first."""
+
+    def __init__(self, name, replies, wait=None, started=None):
+        self.name = name
+        self.default_model = f"{name}-model"
+        self.replies = list(replies)
+        self.calls = []
+        self._wait = wait
+        self._started = started
+
+    async def generate(self, prompt, model=None, system=None, **kwargs):
+        self.calls.append((prompt, model, system))
+        if self._started is not None:
+            self._started.set()
+        if self._wait is not None:
+            await self._wait.wait()
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return GenerateResult(text=reply, model=model or self.default_model)
+
+
+def test_is_mixed_action():
+    assert is_mixed_action("[Action] I grapple the ogre. Can I drag it off the ledge?")
+    assert is_mixed_action("I try to shove him prone before he can use his reaction?")
+    assert not is_mixed_action("[Action] I walk into the tavern.")
+    # a question, not an action
+    assert not is_mixed_action("Can I grapple while holding a shield?")
+
+
+def test_parse_verdict():
+    assert parse_verdict("**VERDICT: DISALLOWED**\nYou have no free hand.") == (
+        "disallowed",
+        "You have no free hand.",
+    )
+    assert parse_verdict("Verdict - allowed\nRoll Athletics.") == (
+        "allowed",
+        "Roll Athletics.",
+    )
+    assert parse_verdict("Roll Athletics.") == ("unknown", "Roll Athletics.")
+
+
+@pytest.mark.asyncio
+async def test_ruling_and_draft_run_in_parallel_and_combine():
+    draft_started = asyncio.Event()
+    narrative = _Provider("ollama", ["You lunge at the ogre."], started=draft_started)
+    ruling = _Provider(
+        "claude", ["VERDICT: ALLOWED\nRoll Athletics, DC 15."], wait=draft_started
+    )
+    metrics = Metrics()
+    narrator = SpeculativeNarrator(AIOrchestrator(narrative, ruling), metrics=metrics)
+    result = await asyncio.wait_for(
+        narrator.run("I grapple the ogre", "rule sys", "draft sys"), 1
+    )
+    assert result.text == "You lunge at the ogre.\n\nRoll Athletics, DC 15."
+    assert (result.verdict, result.revised, result.draft_used) == (
+        "allowed",
+        False,
+        True,
+    )
+    assert narrative.calls[0][2] == "draft sys" and ruling.calls[0][2] == "rule sys"
+    assert metrics.counter("speculative.allowed") == 1
+
+
+@pytest.mark.asyncio
+async def test_disallowed_draft_is_revised():
+    narrative = _Provider(
+        "ollama",
+        [
+            "You lunge and seize the ogre.",
+            "You reach for the ogre, but your hands are full.",
+        ],
+    )
+    ruling = _Provider("claude", ["VERDICT: DISALLOWED\nYou need a free hand."])
+    narrator = SpeculativeNarrator(
+        AIOrchestrator(narrative, ruling), SpeculativeSettings(draft_model="tiny")
+    )
+    result = await narrator.run("I grapple the ogre", "r", "d")
+    assert result.revised
+    assert (
+        result.text
+        == "You reach for the ogre, but your hands are full.\n\nYou need a free hand."
+    )
+    revise_prompt = narrative.calls[1][0]
+    assert (
+        "You lunge and seize the ogre." in revise_prompt
+        and "You need a free hand." in revise_prompt
+    )
+    assert [c[1] for c in narrative.calls] == ["tiny", "tiny"]
+
+
+@pytest.mark.asyncio
+async def test_disallowed_draft_dropped_without_revision():
+    narrative = _Provider("ollama", ["You seize the ogre."])
+    ruling = _Provider("claude", ["VERDICT: DISALLOWED\nYou need a free hand."])
+    narrator = SpeculativeNarrator(
+        AIOrchestrator(narrative, ruling), SpeculativeSettings(revise=False)
+    )
+    result = await narrator.run("I grapple the ogre", "r", "d")
+    assert (result.text, result.draft_used) == ("You need a free hand.", False)
+    assert len(narrative.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_draft_leaves_ruling_and_failed_ruling_raises():
+    claude = _Provider("claude", ["VERDICT: PARTIAL\nHalf.", "never used"])
+    narrator = SpeculativeNarrator(
+        AIOrchestrator(_Provider("ollama", [RuntimeError("down")]), claude)
+    )
+    assert (await narrator.run("x", "r", "d")).text == "Half."
+    # the failed draft is not retried on the ruling provider
+    assert len(claude.calls) == 1
+
+    # Same provider for both roles, so the failed ruling has no fallback
+    provider = _Provider("ollama", [RuntimeError("down"), "draft"])
+    with pytest.raises(RuntimeError):
+        await SpeculativeNarrator(AIOrchestrator(None, provider)).run("x", "r", "d")
+
+
+def test_settings_from_config():
+    s = SpeculativeSettings.from_config(
+        {"enabled": True, "draft_model": "tiny", "revise": False}
+    )
+    assert (s.enabled, s.draft_model, s.revise, s.min_score) == (
+        True,
+        "tiny",
+        False,
+        0.3,
+    )
+    assert SpeculativeSettings.from_config(None) == SpeculativeSettings()
@@ -1,8 +1,12 @@
 """Tests for SceneState and StateStore."""
 
+import pytest
+
+from dungeonmaster.data.scene_patch import PatchError
 from dungeonmaster.data.state import (
     SceneState,
     StateStore,
+    validate_scene,
 )
 
 
@@ -38,3 +42,93 @@ def test_state_store_npc(state_store: StateStore):
     assert state_store.load_npc("barkeep") == ""
     state_store.save_npc("barkeep", "# Barkeep\n\nFriendly.")
     assert "Barkeep" in state_store.load_npc("barkeep")
+
+
+def test_state_store_apply_scene_patch_versions(
+    state_store: StateStore, sample_scene: SceneState, vault
+):
+    saved = state_store.save_scene(sample_scene)
+    assert saved.version == 1
+    scene = state_store.apply_scene_patch(
+        {"positions": [{"entity_id": "player1", "x": 4}]}
+    )
+    assert scene.version == 2
+    assert scene.positions[0].x == 4
+    assert scene.positions[0].zone == "main"
+    # Written compactly, and re-read from disk by a fresh store
+    assert "\n" not in vault.scene_path().read_text(encoding="utf-8")
+    assert StateStore(vault).load_scene().positions[0].x == 4
+    # No-op patches don't bump the version
+    assert state_store.apply_scene_patch({"scene_id": "test"}).version == 2
+
+
+def test_state_store_apply_scene_patch_conflicts(
+    state_store: StateStore, sample_scene: SceneState
+):
+    state_store.save_scene(sample_scene)
+    with pytest.raises(PatchError):
+        state_store.apply_scene_patch({"scene_id": "x"}, base_version=0)
+    with pytest.raises(PatchError):
+        state_store.apply_scene_patch(
+            {"positions": [{"entity_id": "player1", "x": "far"}]}
+        )
+    assert state_store.scene_version == 1
+
+
+def test_state_store_reloads_external_edits(
+    state_store: StateStore, sample_scene: SceneState, vault
+):
+    state_store.save_scene(sample_scene)
+    state_store.load_scene()
+    vault.scene_path().write_text(
+        '{"scene_id": "edited", "version": 9}', encoding="utf-8"
+    )
+    assert state_store.load_scene().scene_id == "edited"
+
+
+def test_external_edit_is_saved_and_published_as_next_version(
+    state_store: StateStore, sample_scene: SceneState, vault
+):
+    state_store.save_scene(sample_scene)
+    seen: list[tuple[int, dict]] = []
+    state_store.add_scene_listener(
+        lambda version, delta, scene: seen.append((version, delta))
+    )
+    vault.scene_path().write_text(
+        '{"scene_id": "edited", "version": 0}', encoding="utf-8"
+    )
+    assert state_store.refresh_scene() == 2
+    assert seen and seen[0][0] == 2 and seen[0][1]["scene_id"] == "edited"
+    assert StateStore(vault).scene_version == 2  # persisted
+    assert state_store.refresh_scene() == 2 and len(seen) == 1
+    vault.scene_path().write_text('{"scene_id": "half', encoding="utf-8")
+    assert state_store.load_scene().scene_id == "edited" and len(seen) == 1
+
+
+def test_validate_scene(sample_scene: SceneState):
+    assert validate_scene(sample_scene.to_dict()) == []
+    assert validate_scene({"location": {"name": "Cellar"}}) == []
+    errors = validate_scene(
+        {
+            "weather": "rain",
+            "location": "Cellar",
+            "positions": [{"entity_id": "", "entity_type": "dragon", "x": "3"}],
+        }
+    )
+    assert "unknown scene field 'weather'" in errors
+    assert "location must be an object" in errors
+    assert "positions[0].entity_id must be a non-empty string" in errors
+    assert "positions[0].entity_type must be one of player, npc, object" in errors
+    assert "positions[0].x must be a number" in errors
+    assert validate_scene([]) == ["scene must be a JSON object"]
+
+
+def test_state_store_rejects_patch_breaking_schema(
+    state_store: StateStore, sample_scene: SceneState
+):
+    state_store.save_scene(sample_scene)
+    with pytest.raises(PatchError, match="entity_type"):
+        state_store.apply_scene_patch(
+            {"positions": [{"entity_id": "rat", "entity_type": "vermin"}]}
+        )
+    assert state_store.scene_version == 1
@@ -0,0 +1,73 @@
+"""Tests for incremental structured-output parsing of model replies."""
+
+from dungeonmaster.ai.structured import (
+    FencedBlock,
+    FencedBlockParser,
+    StructuredSettings,
+    fenced_blocks,
+    scene_update,
+)
+
+
+def test_parser_emits_blocks_as_soon_as_they_close():
+    text = 'You run.\n```json-patch\n{"positions": [{"entity_id": "p1", "x": 2}]}\n```\nThe door slams.'
+    parser = FencedBlockParser()
+    emitted = []
+    for i in range(0, len(text), 3):  # chunk boundaries fall inside fences and bodies
+        emitted.append(parser.feed(text[i : i + 3]))
+    blocks = [b for chunk in emitted for b in chunk]
+    assert blocks == [
+        FencedBlock("json-patch", '{"positions": [{"entity_id": "p1", "x": 2}]}\n')
+    ]
+    closed_at = next(i for i, chunk in enumerate(emitted) if chunk)
+    # before the rest of the reply arrived
+    assert closed_at * 3 < text.index("The door")
+    assert parser.finish() == []
+    assert parser.text == text
+
+
+def test_parser_skips_other_languages_and_recovers_unterminated_block():
+    text = '```python\nprint("```json")\n```\nok\n```json\n{"scene_id": "cellar"'
+    parser = FencedBlockParser()
+    assert parser.feed(text) == []
+    assert parser.finish() == [
+        FencedBlock("json", '{"scene_id": "cellar"', closed=False)
+    ]
+    assert [b.kind for b in fenced_blocks("```\n{}\n```\n```json\n[]\n```")] == ["json"]
+
+
+def test_scene_update_kinds_and_validation():
+    patch = scene_update(
+        FencedBlock("json-patch", '{"positions": [{"entity_id": "p1", "x": 2}]}')
+    )
+    assert (patch.kind, patch.data, patch.error) == (
+        "patch",
+        {"positions": [{"entity_id": "p1", "x": 2}]},
+        None,
+    )
+    wrapped = scene_update(
+        FencedBlock(
+            "json", '{"scene_patch": [{"op": "remove", "path": "/turn_order/0"}]}'
+        )
+    )
+    assert (wrapped.kind, wrapped.error) == ("patch", None)
+    scene = scene_update(FencedBlock("json", '{"scene_id": "cellar", "positions": []}'))
+    assert (scene.kind, scene.error) == ("scene", None)
+    # not about the scene
+    assert scene_update(FencedBlock("json", '{"str": 16, "dex": 12}')) is None
+
+    broken = scene_update(
+        FencedBlock("json-patch", '{"positions": [{"entity_id": "p1", "x": 2}')
+    )
+    assert broken.kind == "patch" and broken.error and broken.source
+    unknown = scene_update(FencedBlock("json-patch", '{"weather": "rain"}'))
+    assert unknown.error == "unknown scene fields: weather"
+    bad_scene = scene_update(FencedBlock("json", '{"scene_id": 3}'))
+    assert bad_scene.error == "scene_id must be a string"
+
+
+def test_settings_from_config():
+    assert StructuredSettings.from_config({"stream": True}) == StructuredSettings(
+        stream=True, repair=True
+    )
+    assert StructuredSettings.from_config(None) == StructuredSettings()
@@ -0,0 +1,56 @@
+"""Tests for the shared, content-addressed rulebook index."""
+
+import pytest
+
+from dungeonmaster.ai.system_index import SystemIndex, SystemIndexSettings
+
+
+def test_settings_from_config():
+    settings = SystemIndexSettings.from_config(
+        {"enabled": True, "path": "/srv/index", "read_only": True}
+    )
+    assert settings == SystemIndexSettings(
+        enabled=True, path="/srv/index", read_only=True
+    )
+    assert SystemIndexSettings.from_config(None) == SystemIndexSettings()
+
+
+def test_add_query_and_reopen(tmp_path):
+    index = SystemIndex(tmp_path, model="nomic-embed-text:latest")
+    index.add("aa11", ["near", "far"], [[1.0, 0.0], [5.0, 0.0]])
+    index.add("bb22", ["middle"], [[2.0, 0.0]])
+    assert index.has("aa11") and not index.has("cc33")
+    assert index.directory == tmp_path / "nomic-embed-text_latest"
+
+    # A second process (or host mounting the directory) sees the same rulebooks
+    reopened = SystemIndex(tmp_path, model="nomic-embed-text:latest", read_only=True)
+    hits = reopened.query(["aa11", "bb22"], [0.0, 0.0], 2, with_vectors=True)
+    assert [(h.text, h.file_hash, h.index, h.distance) for h in hits] == [
+        ("near", "aa11", 0, 1.0),
+        ("middle", "bb22", 0, 4.0),
+    ]
+    assert hits[0].vector == [1.0, 0.0]
+    assert [h.text for h in reopened.query(["bb22"], [0.0, 0.0], 5)] == ["middle"]
+    assert reopened.query(["cc33"], [0.0, 0.0], 5) == []
+    assert reopened.query(["aa11"], [0.0, 0.0, 0.0], 5) == []  # other embedding size
+    assert not SystemIndex(tmp_path, model="other").has("aa11")
+
+
+def test_read_only_index_never_writes(tmp_path):
+    index = SystemIndex(tmp_path / "mount", read_only=True)
+    assert not index.writable
+    with pytest.raises(PermissionError):
+        index.add("aa11", ["text"], [[1.0]])
+    assert not (tmp_path / "mount").exists()
+
+
+def test_bindings(tmp_path):
+    index = SystemIndex(tmp_path)
+    index.bind(str(tmp_path / "a" / "systems" / "phb.md"), "aa11")
+    index.bind(str(tmp_path / "b" / "systems" / "phb.md"), "aa11")
+    assert index.bound(tmp_path / "a") == {
+        str(tmp_path / "a" / "systems" / "phb.md"): "aa11"
+    }
+    assert len(index.bound()) == 2
+    assert index.unbind(str(tmp_path / "a" / "systems" / "phb.md")) == "aa11"
+    assert index.unbind("missing") is None
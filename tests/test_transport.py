@@ -0,0 +1,46 @@
+"""Tests for provider HTTP transport settings and reuse statistics."""
+
+import httpx
+import pytest
+
+from dungeonmaster.ai.providers.transport import (
+    TransportSettings,
+    TransportStats,
+    client_kwargs,
+)
+from dungeonmaster.metrics import Metrics
+
+
+def test_settings_from_config_inherits_base():
+    base = TransportSettings.from_config(
+        {"max_connections": 50, "read_timeout": 10, "bogus": 1}
+    )
+    assert base.max_connections == 50
+    embed = TransportSettings.from_config({"max_connections": 4}, base=base)
+    assert embed.max_connections == 4
+    assert embed.read_timeout == 10
+
+
+def test_client_kwargs_builds_httpx_client():
+    stats = TransportStats("test", metrics=Metrics())
+    kwargs = client_kwargs(TransportSettings(connect_timeout=2, http2=False), stats)
+    assert kwargs["timeout"].connect == 2
+    assert kwargs["event_hooks"]["request"] == [stats.on_request]
+    httpx.AsyncClient(**kwargs)
+
+
+@pytest.mark.asyncio
+async def test_stats_count_requests_and_connects():
+    metrics = Metrics()
+    stats = TransportStats("test", metrics=metrics)
+    for connect in (True, False, False, False):
+        request = httpx.Request("GET", "http://localhost")
+        await stats.on_request(request)
+        if connect:
+            trace = request.extensions["trace"]
+            await trace("connection.connect_tcp.started", {})
+            await trace("connection.connect_tcp.complete", {"return_value": None})
+    assert stats.requests == 4
+    assert stats.new_connections == 1
+    assert stats.reuse_ratio == 0.75
+    assert metrics.counter("ai.transport.test.connections") == 1
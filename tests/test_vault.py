@@ -1,5 +1,9 @@
 """Tests for Vault paths and read/write."""
 
+import threading
+
+import pytest
+
 from dungeonmaster.data.vault import Vault
 
 
@@ -39,3 +43,70 @@ def test_list_system_files(vault: Vault):
     assert len(files) == 3
     names = {f.name for f in files}
     assert names == {"foo.md", "bar.txt", "baz.md"}
+
+
+def test_write_text_is_atomic_and_counts_generations(vault: Vault):
+    path = vault.scene_path()
+    assert vault.generation(path) == 0
+    assert vault.write_text(path, '{"version": 1}') == 1
+    path.chmod(0o640)
+    assert vault.write_text(path, '{"version": 2}') == 2
+    assert vault.read_text(path) == '{"version": 2}'
+    assert path.stat().st_mode & 0o777 == 0o640
+    # No temp files left behind
+    assert [p.name for p in path.parent.iterdir()] == ["scene.json"]
+
+
+def test_concurrent_reader_never_sees_partial_file(vault: Vault):
+    path = vault.scene_path()
+    payloads = ["a" * 200_000, "b" * 100]
+    vault.write_text(path, payloads[0])
+    seen: set[str] = set()
+    done = threading.Event()
+
+    def reader():
+        while not done.is_set():
+            seen.add(vault.read_text(path))
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    for i in range(200):
+        vault.write_text(path, payloads[i % 2])
+    done.set()
+    thread.join()
+    assert seen <= set(payloads)
+
+
+def test_batch_fsync_flushes_pending(tmp_path):
+    vault = Vault(tmp_path / "v", fsync="batch")
+    vault.ensure_all_dirs()
+    vault.write_text(vault.character_path("a"), "# A")
+    vault.write_text(vault.character_path("a"), "# A2")
+    vault.write_text(vault.npc_path("b"), "# B")
+    assert vault.flush() == 2
+    assert vault.flush() == 0
+    default = Vault(tmp_path / "d")
+    default.ensure_all_dirs()
+    default.write_text(default.npc_path("c"), "# C")
+    assert default.flush() == 1  # batched by default: writers never wait for fsync
+    with pytest.raises(ValueError):
+        Vault(tmp_path / "x", fsync="sometimes")
+
+
+def test_shared_systems_root(tmp_path):
+    shared = tmp_path / "systems" / "dnd5e"
+    vault = Vault(tmp_path / "campaign", systems_root=shared)
+    vault.ensure_all_dirs()
+    assert vault.systems_dir() == shared.resolve() and shared.is_dir()
+    assert not (tmp_path / "campaign" / "systems").exists()
+    (shared / "phb.md").write_text("# PHB")
+    assert vault.list_system_files() == [shared.resolve() / "phb.md"]
+
+
+def test_append_text_appends_and_tracks_pending(tmp_path):
+    vault = Vault(tmp_path / "v", fsync="batch")
+    path = vault.index_dir() / "log.jsonl"
+    assert vault.append_text(path, "a\n") == 1
+    assert vault.append_text(path, "b\n") == 2
+    assert path.read_text() == "a\nb\n"
+    assert vault.flush() == 1